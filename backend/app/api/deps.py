@@ -1,23 +1,239 @@
 """API dependencies."""
+from datetime import timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.db.session import get_async_db, get_db, SessionLocal  # noqa: F401
 from app.services.storage import PDFStorageService
+from app.services.storage_backends import (
+    LocalStorageBackend,
+    S3StorageBackend,
+    StorageBackend,
+)
 from app.services.pdf_engine import PDFEngine
+from app.services.metadata_cache import (
+    DocumentMeta,
+    DocumentMetadataCache,
+    load_document_meta,
+)
+from app.services.render_cache import RenderCache, get_render_cache
+from app.services.rendering import MemoryBudget, open_memory_budget
+from app.services.shared_cache import SharedCache, open_shared_cache
+from app.services.events import EventBus, open_event_bus
+from app.services.single_flight import SingleFlight, open_single_flight
+from app.services.document_locks import DocumentLocks, open_document_locks
+from app.services.text_map_cache import TextMapCache
+from app.services.retention import RetentionService
+from app.services.versions import VersionHistory
+from app.services.jobs import JobHandler, JobQueue
+from app.services.job_handlers import build_job_handlers
+from app.core.admission import (
+    BATCH,
+    EDIT,
+    INTERACTIVE,
+    AdmissionController,
+    open_admission_controller,
+)
 from app.core.config import settings
 
 
+@lru_cache(maxsize=1)
+def _get_s3_backend() -> S3StorageBackend:
+    """Build the S3 backend once per process (keeps its client and cache index)."""
+    return S3StorageBackend(
+        bucket=settings.S3_BUCKET,
+        cache_dir=settings.STORAGE_CACHE_DIR,
+        prefix=settings.S3_PREFIX,
+        endpoint_url=settings.S3_ENDPOINT_URL,
+        region_name=settings.S3_REGION,
+        access_key_id=settings.S3_ACCESS_KEY_ID,
+        secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+        multipart_threshold=settings.S3_MULTIPART_THRESHOLD,
+        multipart_chunk_size=settings.S3_MULTIPART_CHUNK_SIZE,
+    )
+
+
+def get_storage_backend() -> StorageBackend:
+    """Get the configured PDF storage backend."""
+    if settings.STORAGE_BACKEND == "s3":
+        return _get_s3_backend()
+    if settings.STORAGE_BACKEND != "local":
+        raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
+    return LocalStorageBackend(settings.PDF_DIR)
+
+
 def get_storage_service() -> PDFStorageService:
     """Get PDF storage service instance."""
     return PDFStorageService(
         base_dir=settings.STORAGE_DIR,
         pdf_dir=settings.PDF_DIR,
         render_dir=settings.RENDER_DIR,
+        backend=get_storage_backend(),
+        shard_depth=settings.STORAGE_SHARD_DEPTH,
+    )
+
+
+def get_page_render_cache() -> RenderCache:
+    """Get the shared render cache for the configured render directory."""
+    return get_render_cache(
+        settings.RENDER_DIR,
+        settings.RENDER_CACHE_MAX_BYTES,
+        settings.RENDER_CACHE_POLICY,
     )
 
 
 def get_pdf_engine() -> PDFEngine:
     """Get PDF engine instance."""
     storage = get_storage_service()
-    return PDFEngine(storage)
+    return PDFEngine(
+        storage,
+        incremental_saves=settings.VERSION_HISTORY_MAX > 0,
+        max_render_pixels=settings.RENDER_MAX_PIXELS,
+        render_band_pixels=settings.RENDER_BAND_PIXELS,
+        render_memory=get_render_memory(),
+        open_mode=settings.PDF_OPEN_MODE,
+    )
+
+
+def get_render_memory() -> MemoryBudget:
+    """Get the memory budget shared by this process's concurrent page renders."""
+    return open_memory_budget(settings.RENDER_MEMORY_BUDGET_BYTES)
+
+
+def get_version_history() -> VersionHistory:
+    """Get the document version history service."""
+    return VersionHistory(
+        get_storage_service(),
+        max_versions=settings.VERSION_HISTORY_MAX,
+        events=get_event_bus(),
+    )
+
+
+def get_shared_cache() -> Optional[SharedCache]:
+    """Get the cache tier shared by all workers (None if disabled)."""
+    return open_shared_cache(
+        settings.SHARED_CACHE_BACKEND,
+        settings.SHARED_CACHE_PATH or str(Path(settings.STORAGE_DIR) / "shared_cache.db"),
+        settings.SHARED_CACHE_MAX_BYTES,
+        settings.SHARED_CACHE_REDIS_URL,
+        settings.SHARED_CACHE_LEASE_SECONDS,
+    )
+
+
+def get_event_bus() -> EventBus:
+    """Get the bus carrying document events to event streams."""
+    return open_event_bus(
+        settings.EVENTS_BACKEND,
+        settings.EVENTS_PATH or str(Path(settings.STORAGE_DIR) / "events.db"),
+        settings.EVENTS_REDIS_URL or settings.SHARED_CACHE_REDIS_URL,
+    )
+
+
+def get_admission_controller() -> Optional[AdmissionController]:
+    """Get the admission controller for CPU-heavy requests (None if disabled)."""
+    if not settings.ADMISSION_ENABLED:
+        return None
+    return open_admission_controller(
+        settings.ADMISSION_MAX_CONCURRENT,
+        (
+            (INTERACTIVE, settings.ADMISSION_INTERACTIVE_LIMIT),
+            (EDIT, settings.ADMISSION_EDIT_LIMIT),
+            (BATCH, settings.ADMISSION_BATCH_LIMIT),
+        ),
+        settings.ADMISSION_QUEUE_SIZE,
+        settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    )
+
+
+def get_single_flight() -> SingleFlight:
+    """Get the group that runs concurrent identical renders and extractions once."""
+    return open_single_flight(str(Path(settings.STORAGE_DIR) / "locks"))
+
+
+def get_document_locks() -> DocumentLocks:
+    """Get the locks serializing changes to each document's PDF."""
+    return open_document_locks(str(Path(settings.STORAGE_DIR) / "locks"))
+
+
+@lru_cache(maxsize=1)
+def get_metadata_cache() -> DocumentMetadataCache:
+    """Get the process-wide document metadata cache."""
+    return DocumentMetadataCache(
+        ttl_seconds=settings.METADATA_CACHE_TTL_SECONDS,
+        max_entries=settings.METADATA_CACHE_MAX_ENTRIES,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_text_map_cache() -> TextMapCache:
+    """Get the process-wide page text map cache."""
+    return TextMapCache(
+        max_entries=settings.TEXT_MAP_CACHE_MAX_ENTRIES,
+        shared=get_shared_cache(),
+        flights=get_single_flight(),
+    )
+
 
+def get_document_meta(
+    pdf_uuid: str,
+    db: Session = Depends(get_db),
+    cache: DocumentMetadataCache = Depends(get_metadata_cache),
+) -> DocumentMeta:
+    """
+    Resolve a PDF UUID path parameter to cached document metadata.
+
+    The session is only used (and a connection only checked out) on a
+    cache miss.
+
+    Raises:
+        HTTPException: 404 if the document doesn't exist
+    """
+    meta = load_document_meta(db, cache, pdf_uuid)
+    if meta is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"PDF not found: {pdf_uuid}",
+        )
+    return meta
+
+
+def get_retention_service() -> RetentionService:
+    """Get a retention service configured from settings."""
+    ttl_days = settings.DOCUMENT_TTL_DAYS
+    return RetentionService(
+        SessionLocal,
+        get_storage_service(),
+        get_page_render_cache(),
+        document_ttl=timedelta(days=ttl_days) if ttl_days > 0 else None,
+        temp_file_ttl=timedelta(seconds=settings.GC_TEMP_FILE_TTL_SECONDS),
+        orphan_grace=timedelta(seconds=settings.GC_ORPHAN_GRACE_SECONDS),
+        batch_size=settings.GC_BATCH_SIZE,
+        shards_per_run=settings.GC_SHARDS_PER_RUN,
+    )
+
+
+def get_job_queue() -> JobQueue:
+    """Get the job queue on the application database."""
+    return JobQueue(
+        SessionLocal,
+        stale_after=timedelta(seconds=settings.JOB_STALE_AFTER_SECONDS),
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        events=get_event_bus(),
+    )
+
+
+def get_job_handlers() -> Dict[str, JobHandler]:
+    """Get the handlers for every background job kind."""
+    return build_job_handlers(
+        get_storage_service(),
+        get_pdf_engine(),
+        SessionLocal,
+        get_page_render_cache(),
+        get_metadata_cache(),
+        get_version_history(),
+        get_document_locks(),
+    )
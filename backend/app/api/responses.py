@@ -0,0 +1,211 @@
+"""Custom API responses."""
+import io
+import json
+import os
+import uuid
+import zipfile
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+
+class RangeNotSatisfiable(ValueError):
+    """A byte range that starts beyond the end of the file."""
+
+
+def parse_range_header(value: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a Range header into a single byte range.
+
+    Malformed headers, other units and multi-range requests return None, in
+    which case the whole file is served (RFC 9110 lets servers ignore Range).
+
+    Args:
+        value: Range header value (e.g. "bytes=0-1023", "bytes=1024-", "bytes=-500")
+        size: File size in bytes
+
+    Returns:
+        (start, end) inclusive byte offsets, or None to serve the whole file
+
+    Raises:
+        RangeNotSatisfiable: If the range lies entirely outside the file
+    """
+    unit, _, spec = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep or not (first or last):
+        return None
+    try:
+        start = int(first) if first else None
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start is None:
+        # Suffix range: the last N bytes
+        if end <= 0 or size == 0:
+            raise RangeNotSatisfiable(value)
+        return max(0, size - end), size - 1
+    if start >= size:
+        raise RangeNotSatisfiable(value)
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+class RangeFileResponse(FileResponse):
+    """
+    FileResponse that answers single byte-range requests with 206.
+
+    Lets PDF viewers fetch the parts of a large document they need (trailer,
+    xref, the first pages) instead of waiting for the whole file. The file
+    is opened before it is stat'ed, so headers and body always describe the
+    same file even if it is atomically replaced in between.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request_headers = Headers(scope=scope)
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            stat_result = await anyio.to_thread.run_sync(os.fstat, file.wrapped.fileno())
+            self.set_stat_headers(stat_result)
+            self.headers["accept-ranges"] = "bytes"
+            size = stat_result.st_size
+
+            start, end = 0, size - 1
+            range_header = request_headers.get("range")
+            if range_header and self._if_range_matches(request_headers.get("if-range")):
+                try:
+                    byte_range = parse_range_header(range_header, size)
+                except RangeNotSatisfiable:
+                    await self._send_unsatisfiable(send, size)
+                    return
+                if byte_range is not None:
+                    start, end = byte_range
+                    self.status_code = 206
+                    self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+                    self.headers["content-length"] = str(end - start + 1)
+
+            await send({
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            })
+            if scope["method"].upper() == "HEAD":
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            else:
+                await file.seek(start)
+                remaining = end - start + 1
+                while True:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    remaining -= len(chunk)
+                    more_body = bool(chunk) and remaining > 0
+                    await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                    if not more_body:
+                        break
+        if self.background is not None:
+            await self.background()
+
+    def _if_range_matches(self, if_range: Optional[str]) -> bool:
+        """Whether a Range request applies (no If-Range, or it names the current file)."""
+        if if_range is None:
+            return True
+        return if_range in (self.headers.get("etag"), self.headers.get("last-modified"))
+
+    async def _send_unsatisfiable(self, send: Send, size: int) -> None:
+        self.status_code = 416
+        self.headers["content-range"] = f"bytes */{size}"
+        self.headers["content-length"] = "0"
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable file collecting what a ZipFile writes."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def zip_stream(files: Iterable[Tuple[str, bytes]]) -> Iterator[bytes]:
+    """
+    Stream a ZIP archive, yielding each member as soon as it is added.
+
+    Members are stored uncompressed (PNGs and PDFs are already compressed).
+
+    Args:
+        files: (archive name, contents) pairs, consumed lazily
+
+    Yields:
+        Archive bytes
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        for name, data in files:
+            archive.writestr(name, data)
+            yield sink.take()
+    yield sink.take()
+
+
+def multipart_stream(
+    parts: Iterable[Tuple[dict, bytes]], boundary: Optional[str] = None
+) -> Tuple[str, Iterator[bytes]]:
+    """
+    Stream a multipart/mixed body, yielding each part as soon as it is ready.
+
+    Args:
+        parts: (part headers, body) pairs, consumed lazily
+        boundary: Part boundary (random by default)
+
+    Returns:
+        (Content-Type header value, body iterator)
+    """
+    boundary = boundary or uuid.uuid4().hex
+
+    def body() -> Iterator[bytes]:
+        for headers, data in parts:
+            head = "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+            yield (
+                f"--{boundary}\r\n{head}Content-Length: {len(data)}\r\n\r\n".encode("latin-1")
+                + data
+                + b"\r\n"
+            )
+        yield f"--{boundary}--\r\n".encode("latin-1")
+
+    return f"multipart/mixed; boundary={boundary}", body()
+
+
+# Comment line sent on idle event streams so proxies don't time them out
+SSE_KEEPALIVE = b": keepalive\n\n"
+
+
+def sse_event(event: str, data: dict) -> bytes:
+    """
+    Encode one server-sent event.
+
+    Args:
+        event: Event name (the EventSource listener to call)
+        data: JSON-serializable payload
+
+    Returns:
+        Event bytes
+    """
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
@@ -0,0 +1,66 @@
+"""Background job status endpoints."""
+from fastapi import APIRouter, Depends, HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from app.api.deps import get_job_queue, get_metadata_cache
+from app.models.job import Job
+from app.schemas.job import JobResponse
+from app.services.jobs import JOB_SUCCEEDED, JobQueue
+from app.services.metadata_cache import DocumentMetadataCache
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+def _job_or_404(job: Job, job_id: str) -> Job:
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job not found: {job_id}",
+        )
+    return job
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    queue: JobQueue = Depends(get_job_queue),
+    meta_cache: DocumentMetadataCache = Depends(get_metadata_cache),
+):
+    """
+    Get the status, progress and result of a background job.
+
+    Args:
+        job_id: Job id
+        queue: Job queue
+        meta_cache: Metadata cache
+
+    Returns:
+        Job status
+    """
+    job = _job_or_404(await run_in_threadpool(queue.get, job_id), job_id)
+    if job.status == JOB_SUCCEEDED and job.document_uuid:
+        # The job may have run in another process; don't serve its old metadata
+        meta_cache.invalidate(job.document_uuid)
+    return JobResponse.model_validate(job)
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(
+    job_id: str,
+    queue: JobQueue = Depends(get_job_queue),
+):
+    """
+    Cancel a background job.
+
+    Queued jobs are cancelled immediately; running jobs stop at their next
+    progress checkpoint. Finished jobs are returned unchanged.
+
+    Args:
+        job_id: Job id
+        queue: Job queue
+
+    Returns:
+        Job status
+    """
+    job = _job_or_404(await run_in_threadpool(queue.cancel, job_id), job_id)
+    return JobResponse.model_validate(job)
@@ -1,161 +1,222 @@
 """PDF operations endpoints for merge, split, rotate, etc."""
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
+import shutil
+import uuid
+from dataclasses import asdict
+from pathlib import Path
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from app.api.deps import get_db, get_storage_service, get_pdf_engine
-from app.models.pdf_document import PDFDocument
+from app.api.deps import (
+    get_async_db,
+    get_document_locks,
+    get_job_queue,
+    get_metadata_cache,
+    get_page_render_cache,
+    get_pdf_engine,
+    get_storage_service,
+    get_version_history,
+)
+from app.core.config import settings
+from app.repositories import pdf_document as pdf_documents
+from app.schemas.job import JobResponse
 from app.services.storage import PDFStorageService
+from app.services.document_locks import DocumentLocks
 from app.services.pdf_engine import PDFEngine
-import fitz  # PyMuPDF
-from pathlib import Path
-import uuid
+from app.services.jobs import JobQueue, remove_job_inputs
+from app.services.job_handlers import new_job_input_dir
+from app.services.metadata_cache import (
+    DocumentMeta,
+    DocumentMetadataCache,
+    mark_document_modified_async,
+)
+from app.services.render_cache import RenderCache
+from app.services.versions import VersionHistory
 
 router = APIRouter(prefix="/pdf-operations", tags=["PDF Operations"])
 
+# Query flag switching an operation to submit-and-poll
+BACKGROUND_QUERY = Query(
+    False,
+    description="Queue the operation as a background job and return 202 with the job",
+)
+
+
+async def _submit_job(
+    queue: JobQueue, kind: str, params: dict, document_uuid: Optional[str] = None
+) -> JSONResponse:
+    """Queue a job and answer 202 Accepted pointing at its status URL."""
+    job = await run_in_threadpool(queue.submit, kind, params, document_uuid=document_uuid)
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=JobResponse.model_validate(job).model_dump(mode="json"),
+        headers={"Location": f"/api/jobs/{job.id}"},
+    )
+
+
+async def _spool_uploads(files: List[UploadFile], directory: Path) -> List[str]:
+    """Copy uploaded files to disk without reading them fully into memory."""
+    paths = []
+    for index, file in enumerate(files):
+        path = directory / f"input_{index}.pdf"
+        await file.seek(0)
+
+        def copy(source=file.file, target=path):
+            with open(target, "wb") as out:
+                shutil.copyfileobj(source, out, 1024 * 1024)
+
+        await run_in_threadpool(copy)
+        paths.append(str(path))
+    return paths
+
+
+async def _get_document_or_404(db: AsyncSession, pdf_uuid: str):
+    db_pdf = await pdf_documents.get_by_uuid(db, pdf_uuid)
+    if not db_pdf:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"PDF not found: {pdf_uuid}"
+        )
+    return db_pdf
+
 
 @router.post("/merge")
 async def merge_pdfs(
     files: List[UploadFile] = File(...),
+    background: bool = BACKGROUND_QUERY,
     storage: PDFStorageService = Depends(get_storage_service),
-    db: Session = Depends(get_db),
+    engine: PDFEngine = Depends(get_pdf_engine),
+    db: AsyncSession = Depends(get_async_db),
+    queue: JobQueue = Depends(get_job_queue),
 ):
     """
     Merge multiple PDFs into one.
-    
+
     Args:
         files: List of PDF files to merge
+        background: Run as a background job (poll GET /jobs/{id})
         storage: Storage service
-        db: Database session
-        
+        engine: PDF engine
+        db: Async database session
+        queue: Job queue
+
     Returns:
-        UUID of the merged PDF
+        UUID of the merged PDF, or the queued job (202) in background mode
     """
     if len(files) < 2:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="At least 2 PDF files required for merging"
         )
-    
-    # Create merged PDF
-    merged_doc = fitz.open()
+
+    for file in files:
+        if file.content_type != "application/pdf":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File {file.filename} is not a PDF"
+            )
+
+    input_dir = new_job_input_dir(storage)
+    params = {"input_dir": str(input_dir)}
+    try:
+        params["input_paths"] = await _spool_uploads(files, input_dir)
+        if background:
+            return await _submit_job(queue, "merge", params)
+    except BaseException:
+        remove_job_inputs(params)
+        raise
+
     pdf_uuid = str(uuid.uuid4())
-    
+
     try:
-        for file in files:
-            if file.content_type != "application/pdf":
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"File {file.filename} is not a PDF"
-                )
-            
-            # Read file content
-            content = await file.read()
-            temp_path = storage.pdf_dir / f"temp_{uuid.uuid4()}.pdf"
-            temp_path.write_bytes(content)
-            
-            # Open and append pages
-            src_doc = fitz.open(temp_path)
-            merged_doc.insert_pdf(src_doc)
-            src_doc.close()
-            temp_path.unlink()  # Cleanup
-        
-        # Save merged PDF
-        merged_path = storage.pdf_dir / f"{pdf_uuid}.pdf"
-        merged_doc.save(merged_path)
-        merged_doc.close()
-        
+        merged_path = storage.new_pdf_path(pdf_uuid)
+
+        def merge() -> int:
+            page_count = engine.merge_files(params["input_paths"], merged_path)
+            storage.commit_pdf(pdf_uuid)
+            return page_count
+
+        page_count = await run_in_threadpool(merge)
+
         # Create database record
-        page_count = len(fitz.open(merged_path))
-        db_pdf = PDFDocument(
-            uuid=pdf_uuid,
+        await pdf_documents.create(
+            db,
+            pdf_uuid=pdf_uuid,
             original_filename=f"merged_{pdf_uuid[:8]}.pdf",
             stored_path=str(merged_path),
             page_count=page_count,
         )
-        db.add(db_pdf)
-        db.commit()
-        db.refresh(db_pdf)
-        
+
         return {"uuid": pdf_uuid, "page_count": page_count}
     except Exception as e:
-        if merged_doc:
-            merged_doc.close()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to merge PDFs: {str(e)}"
         )
+    finally:
+        remove_job_inputs(params)
 
 
 @router.post("/{pdf_uuid}/split")
 async def split_pdf(
     pdf_uuid: str,
     page_ranges: List[str],  # e.g., ["1-5", "6-10", "11-"]
+    background: bool = BACKGROUND_QUERY,
     storage: PDFStorageService = Depends(get_storage_service),
-    db: Session = Depends(get_db),
+    engine: PDFEngine = Depends(get_pdf_engine),
+    db: AsyncSession = Depends(get_async_db),
+    queue: JobQueue = Depends(get_job_queue),
 ):
     """
     Split a PDF into multiple files based on page ranges.
-    
+
     Args:
         pdf_uuid: Source PDF UUID
         page_ranges: List of page ranges (1-based, inclusive)
+        background: Run as a background job (poll GET /jobs/{id})
         storage: Storage service
-        db: Database session
-        
+        engine: PDF engine
+        db: Async database session
+        queue: Job queue
+
     Returns:
-        List of UUIDs for split PDFs
+        List of UUIDs for split PDFs, or the queued job (202) in background mode
     """
-    pdf_path = storage.get_pdf_path(pdf_uuid)
-    db_pdf = db.query(PDFDocument).filter(PDFDocument.uuid == pdf_uuid).first()
-    
-    if not db_pdf:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"PDF not found: {pdf_uuid}"
+    db_pdf = await _get_document_or_404(db, pdf_uuid)
+    if background:
+        return await _submit_job(queue, "split", {"page_ranges": page_ranges}, pdf_uuid)
+
+    split_uuids = [str(uuid.uuid4()) for _ in page_ranges]
+
+    def split():
+        ranges = engine.split_pages(
+            storage.get_pdf_path(pdf_uuid),
+            page_ranges,
+            lambda index: storage.new_pdf_path(split_uuids[index]),
         )
-    
-    source_doc = fitz.open(pdf_path)
-    split_uuids = []
-    
+        for split_uuid in split_uuids:
+            storage.commit_pdf(split_uuid)
+        return ranges
+
     try:
-        for range_str in page_ranges:
-            # Parse range (e.g., "1-5" or "6-10" or "11-")
-            parts = range_str.split("-")
-            start = int(parts[0]) - 1  # Convert to 0-based
-            end = int(parts[1]) - 1 if len(parts) > 1 and parts[1] else len(source_doc) - 1
-            
-            if start < 0 or end >= len(source_doc) or start > end:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Invalid page range: {range_str}"
-                )
-            
-            # Create new PDF with selected pages
-            new_doc = fitz.open()
-            new_doc.insert_pdf(source_doc, from_page=start, to_page=end)
-            
-            # Save split PDF
-            split_uuid = str(uuid.uuid4())
-            split_path = storage.pdf_dir / f"{split_uuid}.pdf"
-            new_doc.save(split_path)
-            new_doc.close()
-            
-            # Create database record
-            page_count = end - start + 1
-            db_split = PDFDocument(
-                uuid=split_uuid,
-                original_filename=f"{db_pdf.original_filename}_split_{start+1}-{end+1}.pdf",
-                stored_path=str(split_path),
-                page_count=page_count,
-            )
-            db.add(db_split)
-            split_uuids.append(split_uuid)
-        
-        db.commit()
-        return {"split_uuids": split_uuids}
-    finally:
-        source_doc.close()
+        ranges = await run_in_threadpool(split)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # Create database records
+    await pdf_documents.create_many(db, [
+        {
+            "uuid": split_uuid,
+            "original_filename": f"{db_pdf.original_filename}_split_{start+1}-{end+1}.pdf",
+            "stored_path": str(storage.new_pdf_path(split_uuid)),
+            "page_count": end - start + 1,
+        }
+        for split_uuid, (start, end) in zip(split_uuids, ranges)
+    ])
+    return {"split_uuids": split_uuids}
 
 
 @router.post("/{pdf_uuid}/rotate")
@@ -163,117 +224,206 @@ async def rotate_pages(
     pdf_uuid: str,
     page_numbers: List[int],  # 1-based page numbers
     angle: int,  # 90, 180, or 270
+    background: bool = BACKGROUND_QUERY,
     storage: PDFStorageService = Depends(get_storage_service),
-    db: Session = Depends(get_db),
+    engine: PDFEngine = Depends(get_pdf_engine),
+    db: AsyncSession = Depends(get_async_db),
+    render_cache: RenderCache = Depends(get_page_render_cache),
+    meta_cache: DocumentMetadataCache = Depends(get_metadata_cache),
+    history: VersionHistory = Depends(get_version_history),
+    locks: DocumentLocks = Depends(get_document_locks),
+    queue: JobQueue = Depends(get_job_queue),
 ):
     """
     Rotate specific pages in a PDF.
-    
+
     Args:
         pdf_uuid: PDF UUID
         page_numbers: List of page numbers to rotate (1-based)
         angle: Rotation angle (90, 180, or 270)
+        background: Run as a background job (poll GET /jobs/{id})
         storage: Storage service
-        db: Database session
-        
+        engine: PDF engine
+        db: Async database session
+        render_cache: Render cache
+        meta_cache: Metadata cache
+        history: Version history
+        locks: Document locks (held until the change is recorded)
+        queue: Job queue
+
     Returns:
-        Success message
+        Success message, or the queued job (202) in background mode
     """
     if angle not in [90, 180, 270]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Angle must be 90, 180, or 270"
         )
-    
-    pdf_path = storage.get_pdf_path(pdf_uuid)
-    db_pdf = db.query(PDFDocument).filter(PDFDocument.uuid == pdf_uuid).first()
-    
-    if not db_pdf:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"PDF not found: {pdf_uuid}"
+
+    db_pdf = await _get_document_or_404(db, pdf_uuid)
+    if background:
+        # The version lets a retried job tell whether it already ran
+        params = {"page_numbers": page_numbers, "angle": angle, "version": db_pdf.version}
+        return await _submit_job(queue, "rotate", params, pdf_uuid)
+
+    def rotate() -> None:
+        pdf_path = storage.get_pdf_path(pdf_uuid)
+        engine.rotate_pages(pdf_path, page_numbers, angle)
+        storage.commit_pdf(pdf_uuid)
+
+    before = DocumentMeta.from_model(db_pdf)
+    async with locks.hold_async(pdf_uuid):
+        try:
+            await run_in_threadpool(rotate)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        await mark_document_modified_async(
+            db, meta_cache, history, pdf_uuid, operation="rotate", pages=page_numbers
         )
-    
-    doc = fitz.open(pdf_path)
-    
-    try:
-        for page_num in page_numbers:
-            if page_num < 1 or page_num > len(doc):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Invalid page number: {page_num}"
-                )
-            page = doc[page_num - 1]  # Convert to 0-based
-            page.set_rotation(angle)
-        
-        doc.save(pdf_path, incremental=False)
-        
-        # Invalidate rendered images
-        for page_num in page_numbers:
-            render_path = storage.get_render_path(pdf_uuid, page_num)
-            if render_path.exists():
-                render_path.unlink()
-        
-        return {"message": f"Rotated {len(page_numbers)} page(s) by {angle} degrees"}
-    finally:
-        doc.close()
+
+    # Drop the rotated pages' previous renders (new renders use the new version)
+    for page_num in page_numbers:
+        render_cache.invalidate(
+            storage.get_render_path(pdf_uuid, page_num, before.page_version(page_num))
+        )
+
+    return {"message": f"Rotated {len(page_numbers)} page(s) by {angle} degrees"}
 
 
 @router.delete("/{pdf_uuid}/pages")
 async def delete_pages(
     pdf_uuid: str,
     page_numbers: List[int],  # 1-based page numbers
+    background: bool = BACKGROUND_QUERY,
     storage: PDFStorageService = Depends(get_storage_service),
-    db: Session = Depends(get_db),
+    engine: PDFEngine = Depends(get_pdf_engine),
+    db: AsyncSession = Depends(get_async_db),
+    render_cache: RenderCache = Depends(get_page_render_cache),
+    meta_cache: DocumentMetadataCache = Depends(get_metadata_cache),
+    history: VersionHistory = Depends(get_version_history),
+    locks: DocumentLocks = Depends(get_document_locks),
+    queue: JobQueue = Depends(get_job_queue),
 ):
     """
     Delete specific pages from a PDF.
-    
+
     Args:
         pdf_uuid: PDF UUID
         page_numbers: List of page numbers to delete (1-based)
+        background: Run as a background job (poll GET /jobs/{id})
         storage: Storage service
-        db: Database session
-        
+        engine: PDF engine
+        db: Async database session
+        render_cache: Render cache
+        meta_cache: Metadata cache
+        history: Version history
+        locks: Document locks (held until the change is recorded)
+        queue: Job queue
+
     Returns:
-        Success message
+        Success message, or the queued job (202) in background mode
     """
-    pdf_path = storage.get_pdf_path(pdf_uuid)
-    db_pdf = db.query(PDFDocument).filter(PDFDocument.uuid == pdf_uuid).first()
-    
-    if not db_pdf:
+    db_pdf = await _get_document_or_404(db, pdf_uuid)
+    if background:
+        params = {"page_numbers": page_numbers, "version": db_pdf.version}
+        return await _submit_job(queue, "delete_pages", params, pdf_uuid)
+
+    def delete() -> int:
+        pdf_path = storage.get_pdf_path(pdf_uuid)
+        page_count = engine.delete_pages(pdf_path, page_numbers)
+        storage.commit_pdf(pdf_uuid)
+        return page_count
+
+    before = DocumentMeta.from_model(db_pdf)
+    async with locks.hold_async(pdf_uuid):
+        try:
+            new_page_count = await run_in_threadpool(delete)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        # Update page count (every page after the first deleted one is renumbered)
+        await mark_document_modified_async(
+            db, meta_cache, history, pdf_uuid, operation="delete_pages", page_count=new_page_count
+        )
+
+    # Drop renders of the previous version (including pages past the new end)
+    for i in range(1, before.page_count + 1):
+        render_cache.invalidate(storage.get_render_path(pdf_uuid, i, before.page_version(i)))
+
+    return {"message": f"Deleted {len(page_numbers)} page(s)", "new_page_count": new_page_count}
+
+
+@router.post("/{pdf_uuid}/optimize")
+async def optimize_pdf(
+    pdf_uuid: str,
+    image_dpi: Optional[int] = Query(
+        None, ge=36, le=1200, description="Downsample images above this resolution"
+    ),
+    subset_fonts: bool = Query(True, description="Subset embedded fonts to the glyphs used"),
+    background: bool = BACKGROUND_QUERY,
+    storage: PDFStorageService = Depends(get_storage_service),
+    engine: PDFEngine = Depends(get_pdf_engine),
+    db: AsyncSession = Depends(get_async_db),
+    render_cache: RenderCache = Depends(get_page_render_cache),
+    meta_cache: DocumentMetadataCache = Depends(get_metadata_cache),
+    history: VersionHistory = Depends(get_version_history),
+    locks: DocumentLocks = Depends(get_document_locks),
+    queue: JobQueue = Depends(get_job_queue),
+):
+    """
+    Optimize (compact and compress) a PDF in place.
+
+    Documents of OPTIMIZE_BACKGROUND_MIN_BYTES or more always run as a
+    background job.
+
+    Args:
+        pdf_uuid: PDF UUID
+        image_dpi: Downsample images above this resolution (default: keep images)
+        subset_fonts: Subset embedded fonts
+        background: Run as a background job (poll GET /jobs/{id})
+        storage: Storage service
+        engine: PDF engine
+        db: Async database session
+        render_cache: Render cache
+        meta_cache: Metadata cache
+        history: Version history
+        locks: Document locks (held until the change is recorded)
+        queue: Job queue
+
+    Returns:
+        Sizes before and after optimization, or the queued job (202) in background mode
+    """
+    db_pdf = await _get_document_or_404(db, pdf_uuid)
+    if image_dpi is not None and not engine.can_downsample_images():
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"PDF not found: {pdf_uuid}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Image downsampling (image_dpi) is not supported by this server's PyMuPDF",
         )
-    
-    doc = fitz.open(pdf_path)
-    
-    try:
-        # Convert to 0-based and sort descending to delete from end
-        pages_to_delete = sorted([p - 1 for p in page_numbers], reverse=True)
-        
-        for page_idx in pages_to_delete:
-            if page_idx < 0 or page_idx >= len(doc):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Invalid page number: {page_idx + 1}"
-                )
-            doc.delete_page(page_idx)
-        
-        doc.save(pdf_path, incremental=False)
-        
-        # Update page count
-        db_pdf.page_count = len(doc)
-        db.commit()
-        
-        # Invalidate all rendered images
-        for i in range(1, db_pdf.page_count + 1):
-            render_path = storage.get_render_path(pdf_uuid, i)
-            if render_path.exists():
-                render_path.unlink()
-        
-        return {"message": f"Deleted {len(page_numbers)} page(s)", "new_page_count": len(doc)}
-    finally:
-        doc.close()
+    params = {"image_dpi": image_dpi, "subset_fonts": subset_fonts}
+    size = await run_in_threadpool(lambda: storage.get_pdf_path(pdf_uuid).stat().st_size)
+    if background or size >= settings.OPTIMIZE_BACKGROUND_MIN_BYTES:
+        return await _submit_job(queue, "optimize", params, pdf_uuid)
+
+    def optimize():
+        result = engine.optimize(
+            storage.get_pdf_path(pdf_uuid), image_dpi=image_dpi, subset_fonts=subset_fonts
+        )
+        if result.replaced:
+            storage.commit_pdf(pdf_uuid)
+        return result
+
+    before = DocumentMeta.from_model(db_pdf)
+    async with locks.hold_async(pdf_uuid):
+        result = await run_in_threadpool(optimize)
+        if result.replaced:
+            await mark_document_modified_async(
+                db, meta_cache, history, pdf_uuid, operation="optimize"
+            )
+
+    if result.replaced:
+        # Drop renders of the previous version
+        for page_num in range(1, before.page_count + 1):
+            render_cache.invalidate(
+                storage.get_render_path(pdf_uuid, page_num, before.page_version(page_num))
+            )
 
+    return asdict(result)
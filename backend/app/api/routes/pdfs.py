@@ -1,26 +1,117 @@
 """PDF management API routes."""
+import asyncio
+import io
 import uuid
+from contextlib import ExitStack, contextmanager
+from functools import partial
 from pathlib import Path
-from typing import List
+from typing import AsyncIterator, BinaryIO, Callable, Iterator, List, Literal, Optional, Sequence, Tuple
 
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-
-from app.api.deps import get_db, get_storage_service, get_pdf_engine
+from starlette.concurrency import run_in_threadpool
+
+from app.api.deps import (
+    get_async_db,
+    get_db,
+    get_document_locks,
+    get_document_meta,
+    get_event_bus,
+    get_metadata_cache,
+    get_page_render_cache,
+    get_pdf_engine,
+    get_shared_cache,
+    get_single_flight,
+    get_storage_service,
+    get_text_map_cache,
+    get_version_history,
+)
+from app.api.responses import (
+    SSE_KEEPALIVE,
+    RangeFileResponse,
+    multipart_stream,
+    sse_event,
+    zip_stream,
+)
+from app.core.config import settings
+from app.core.tracing import span
 from app.models.pdf_document import PDFDocument
+from app.repositories import pdf_document as pdf_documents
 from app.schemas.pdf_document import PDFDocumentResponse
 from app.schemas.pdf_text_map import TextMapResponse, BlockEditRequest
+from app.schemas.pdf_version import PDFVersionResponse, VersionHistoryResponse
 from app.services.storage import PDFStorageService
-from app.services.pdf_engine import PDFEngine
+from app.services.document_locks import DocumentLocks
+from app.services.pdf_engine import PDFEngine, is_linearized, parse_page_range
+from app.services.metadata_cache import (
+    DocumentMeta,
+    DocumentMetadataCache,
+    mark_document_modified,
+)
+from app.services.events import PAGE_RENDERED, TEXT_MAP_READY, EventBus
+from app.services.render_cache import RenderCache
+from app.services.shared_cache import SharedCache, produce_once
+from app.services.single_flight import SingleFlight
+from app.services.text_map_cache import TextMap, TextMapCache
+from app.services.retention import record_access
+from app.services.versions import VersionHistory, VersionNotFound, VersionUnavailable
 
 router = APIRouter(prefix="/pdfs", tags=["pdfs"])
 
 
+@contextmanager
+def _engine_errors(pdf_uuid: str) -> Iterator[None]:
+    """
+    Map engine errors to HTTP errors.
+
+    Metadata is cached, so a request can see a page count or a document
+    that is no longer current: the engine then rejects the page
+    (ValueError, 400) or the PDF is gone (FileNotFoundError, 404).
+    """
+    try:
+        yield
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"PDF not found: {pdf_uuid}",
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+def _check_page_number(doc: DocumentMeta, page_number: int) -> None:
+    if page_number < 1 or page_number > doc.page_count:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid page number: {page_number} (max: {doc.page_count})",
+        )
+
+
+def _load_text_map(
+    engine: PDFEngine,
+    storage: PDFStorageService,
+    text_maps: TextMapCache,
+    events: EventBus,
+    doc: DocumentMeta,
+    page_number: int,
+) -> TextMap:
+    """Get a page's text map for its current version, extracting (and announcing it) on a miss."""
+    version = doc.page_version(page_number)
+
+    def extract() -> TextMap:
+        text_map = engine.extract_text_map(storage.get_pdf_path(doc.uuid), page_number)
+        events.publish(doc.uuid, TEXT_MAP_READY, page=page_number, version=version)
+        return text_map
+
+    return text_maps.get_or_load(doc.uuid, version, page_number, extract)
+
+
 @router.post("/", response_model=PDFDocumentResponse, status_code=status.HTTP_201_CREATED)
 async def upload_pdf(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     storage: PDFStorageService = Depends(get_storage_service),
     engine: PDFEngine = Depends(get_pdf_engine),
 ):
@@ -29,7 +120,7 @@ async def upload_pdf(
 
     Args:
         file: PDF file to upload
-        db: Database session
+        db: Async database session
         storage: Storage service
         engine: PDF engine
 
@@ -50,18 +141,16 @@ async def upload_pdf(
     stored_path = await storage.save_upload(file, pdf_uuid)
 
     # Get page count
-    page_count = engine.get_page_count(Path(stored_path))
+    page_count = await run_in_threadpool(engine.get_page_count, stored_path)
 
     # Create database record
-    db_pdf = PDFDocument(
-        uuid=pdf_uuid,
+    db_pdf = await pdf_documents.create(
+        db,
+        pdf_uuid=pdf_uuid,
         original_filename=file.filename,
         stored_path=stored_path,
         page_count=page_count,
     )
-    db.add(db_pdf)
-    db.commit()
-    db.refresh(db_pdf)
 
     return PDFDocumentResponse.model_validate(db_pdf)
 
@@ -87,6 +176,7 @@ def get_pdf(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"PDF not found: {pdf_uuid}",
         )
+    record_access(db, db_pdf)
     return PDFDocumentResponse.model_validate(db_pdf)
 
 
@@ -96,7 +186,10 @@ def get_page_image(
     page_number: int,
     storage: PDFStorageService = Depends(get_storage_service),
     engine: PDFEngine = Depends(get_pdf_engine),
-    db: Session = Depends(get_db),
+    doc: DocumentMeta = Depends(get_document_meta),
+    render_cache: RenderCache = Depends(get_page_render_cache),
+    flights: SingleFlight = Depends(get_single_flight),
+    events: EventBus = Depends(get_event_bus),
 ):
     """
     Get rendered page image as PNG.
@@ -106,48 +199,198 @@ def get_page_image(
         page_number: Page number (1-based)
         storage: Storage service
         engine: PDF engine
-        db: Database session
+        doc: Document metadata (cached)
+        render_cache: Render cache (shared by all workers through the render directory)
+        flights: Single-flight group, used to render each page version only once
+        events: Event bus (page_rendered events)
 
     Returns:
         PNG image stream
     """
-    # Verify PDF exists
-    db_pdf = db.query(PDFDocument).filter(PDFDocument.uuid == pdf_uuid).first()
-    if not db_pdf:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"PDF not found: {pdf_uuid}",
-        )
-
-    if page_number < 1 or page_number > db_pdf.page_count:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid page number: {page_number} (max: {db_pdf.page_count})",
-        )
+    _check_page_number(doc, page_number)
 
     # Check if rendered file exists, otherwise render and save
-    render_path = storage.get_render_path(pdf_uuid, page_number)
-    pdf_path = storage.get_pdf_path(pdf_uuid)
+    render_path = storage.get_render_path(pdf_uuid, page_number, doc.page_version(page_number))
 
-    if not render_path.exists():
-        png_bytes = engine.render_page_to_png(pdf_path, page_number)
-        render_path.parent.mkdir(parents=True, exist_ok=True)
-        render_path.write_bytes(png_bytes)
+    if not render_cache.lookup(render_path):
+        with _engine_errors(pdf_uuid):
+            _render_once(
+                flights, render_cache, events, doc, page_number, render_path,
+                partial(engine.write_page_png, storage.get_pdf_path(pdf_uuid), page_number),
+            )
 
-    return FileResponse(
+    return RangeFileResponse(
         str(render_path),
         media_type="image/png",
         filename=f"page_{page_number}.png",
     )
 
 
+def _read_render(render_path: Path) -> Optional[bytes]:
+    """Read a cached render, or None if it isn't there (yet, or any more)."""
+    try:
+        return render_path.read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def _existing_render(render_path: Path) -> Optional[Path]:
+    """Get a render's path if the file exists, else None."""
+    return render_path if render_path.exists() else None
+
+
+def _render_once(
+    flights: SingleFlight,
+    render_cache: RenderCache,
+    events: EventBus,
+    doc: DocumentMeta,
+    page_number: int,
+    render_path: Path,
+    render: Callable[[BinaryIO], None],
+) -> Path:
+    """
+    Render and cache a page, sharing one render among all concurrent requests for it.
+
+    The PNG is streamed straight into the render cache file, so it is never
+    held in memory as a whole.
+    """
+
+    def produce() -> Path:
+        # A request that just finished rendering it is no longer in flight
+        if _existing_render(render_path) is None:
+            with span("cache.render_store"):
+                render_cache.store_from(render_path, render)
+            events.publish(
+                doc.uuid, PAGE_RENDERED, page=page_number, version=doc.page_version(page_number)
+            )
+        return render_path
+
+    return flights.do(f"render:{render_path.name}", produce, partial(_existing_render, render_path))
+
+
+def _page_images(
+    storage: PDFStorageService,
+    engine: PDFEngine,
+    render_cache: RenderCache,
+    flights: SingleFlight,
+    events: EventBus,
+    doc: DocumentMeta,
+    page_numbers: Sequence[int],
+) -> Iterator[Tuple[int, bytes]]:
+    """Yield page PNGs in order, reading cached renders and rendering the rest from one opened PDF."""
+    with ExitStack() as stack:
+        renderer = None
+
+        def render(page_number: int, out: BinaryIO) -> None:
+            nonlocal renderer
+            if renderer is None:
+                renderer = stack.enter_context(
+                    engine.page_renderer(storage.get_pdf_path(doc.uuid))
+                )
+            renderer.write(page_number, out)
+
+        for page_number in page_numbers:
+            render_path = storage.get_render_path(
+                doc.uuid, page_number, doc.page_version(page_number)
+            )
+            png_bytes = None
+            if render_cache.lookup(render_path):
+                # None if evicted since the lookup
+                png_bytes = _read_render(render_path)
+            if png_bytes is None:
+                _render_once(
+                    flights, render_cache, events, doc, page_number, render_path,
+                    partial(render, page_number),
+                )
+                png_bytes = _read_render(render_path)
+            if png_bytes is None:
+                # Evicted as soon as it was stored (cache budget below a page)
+                buffer = io.BytesIO()
+                render(page_number, buffer)
+                png_bytes = buffer.getvalue()
+            yield page_number, png_bytes
+
+
+@router.get("/{pdf_uuid}/pages/images")
+def get_page_images(
+    pdf_uuid: str,
+    page_range: str = Query("1-", alias="range", description='Pages to render, e.g. "1-20" or "5-"'),
+    archive_format: Literal["multipart", "zip"] = Query(
+        "multipart", alias="format", description="multipart/mixed stream or ZIP archive"
+    ),
+    storage: PDFStorageService = Depends(get_storage_service),
+    engine: PDFEngine = Depends(get_pdf_engine),
+    doc: DocumentMeta = Depends(get_document_meta),
+    render_cache: RenderCache = Depends(get_page_render_cache),
+    flights: SingleFlight = Depends(get_single_flight),
+    events: EventBus = Depends(get_event_bus),
+):
+    """
+    Get the images of several pages in one response.
+
+    Lets a viewer prefetch a viewport's worth of pages with one request:
+    the document is looked up once, cached renders are reused, and missing
+    pages are rendered from a single opened PDF. Pages are streamed as
+    they become ready, in page order, either as multipart/mixed parts
+    (each with an X-Page-Number header) or as page_<n>.png ZIP members.
+
+    Args:
+        pdf_uuid: PDF document UUID
+        page_range: 1-based inclusive page range
+        archive_format: "multipart" or "zip"
+        storage: Storage service
+        engine: PDF engine
+        doc: Document metadata (cached)
+        render_cache: Render cache
+        flights: Single-flight group (pages other requests are rendering are shared)
+        events: Event bus (page_rendered events)
+
+    Returns:
+        Streaming multipart or ZIP response
+    """
+    try:
+        start, end = parse_page_range(page_range, doc.page_count)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    page_numbers = list(range(start + 1, end + 2))
+    if len(page_numbers) > settings.PAGE_BATCH_MAX_PAGES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.PAGE_BATCH_MAX_PAGES} pages per request",
+        )
+
+    images = _page_images(storage, engine, render_cache, flights, events, doc, page_numbers)
+    if archive_format == "zip":
+        return StreamingResponse(
+            zip_stream((f"page_{n}.png", png_bytes) for n, png_bytes in images),
+            media_type="application/zip",
+            headers={
+                "Content-Disposition": f'attachment; filename="pages_{start + 1}-{end + 1}.zip"'
+            },
+        )
+    content_type, body = multipart_stream(
+        (
+            {
+                "Content-Type": "image/png",
+                "Content-Disposition": f'inline; filename="page_{n}.png"',
+                "X-Page-Number": str(n),
+            },
+            png_bytes,
+        )
+        for n, png_bytes in images
+    )
+    return StreamingResponse(body, media_type=content_type)
+
+
 @router.get("/{pdf_uuid}/pages/{page_number}/text-map", response_model=TextMapResponse)
 def get_page_text_map(
     pdf_uuid: str,
     page_number: int,
     storage: PDFStorageService = Depends(get_storage_service),
     engine: PDFEngine = Depends(get_pdf_engine),
-    db: Session = Depends(get_db),
+    doc: DocumentMeta = Depends(get_document_meta),
+    text_maps: TextMapCache = Depends(get_text_map_cache),
+    events: EventBus = Depends(get_event_bus),
 ):
     """
     Get text map (blocks with bounding boxes) for a page.
@@ -157,28 +400,20 @@ def get_page_text_map(
         page_number: Page number (1-based)
         storage: Storage service
         engine: PDF engine
-        db: Database session
+        doc: Document metadata (cached)
+        text_maps: Text map cache
+        events: Event bus (text_map_ready events)
 
     Returns:
         Text map with blocks
     """
-    # Verify PDF exists
-    db_pdf = db.query(PDFDocument).filter(PDFDocument.uuid == pdf_uuid).first()
-    if not db_pdf:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"PDF not found: {pdf_uuid}",
-        )
+    _check_page_number(doc, page_number)
 
-    if page_number < 1 or page_number > db_pdf.page_count:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid page number: {page_number} (max: {db_pdf.page_count})",
+    with _engine_errors(pdf_uuid):
+        blocks, page_width, page_height = _load_text_map(
+            engine, storage, text_maps, events, doc, page_number
         )
 
-    pdf_path = storage.get_pdf_path(pdf_uuid)
-    blocks, page_width, page_height = engine.extract_text_map(pdf_path, page_number)
-
     return TextMapResponse(
         pdf_uuid=pdf_uuid,
         page_number=page_number,
@@ -188,6 +423,22 @@ def get_page_text_map(
     )
 
 
+def _current_meta(db: Session, pdf_uuid: str) -> DocumentMeta:
+    """Read a document's metadata from the database, bypassing the cache (404 if it's gone)."""
+    db_pdf = (
+        db.query(PDFDocument)
+        .filter(PDFDocument.uuid == pdf_uuid)
+        .populate_existing()
+        .first()
+    )
+    if db_pdf is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"PDF not found: {pdf_uuid}",
+        )
+    return DocumentMeta.from_model(db_pdf)
+
+
 @router.put("/{pdf_uuid}/pages/{page_number}/blocks/{block_id}", response_model=TextMapResponse)
 def edit_block(
     pdf_uuid: str,
@@ -197,6 +448,13 @@ def edit_block(
     storage: PDFStorageService = Depends(get_storage_service),
     engine: PDFEngine = Depends(get_pdf_engine),
     db: Session = Depends(get_db),
+    doc: DocumentMeta = Depends(get_document_meta),
+    meta_cache: DocumentMetadataCache = Depends(get_metadata_cache),
+    history: VersionHistory = Depends(get_version_history),
+    render_cache: RenderCache = Depends(get_page_render_cache),
+    text_maps: TextMapCache = Depends(get_text_map_cache),
+    events: EventBus = Depends(get_event_bus),
+    locks: DocumentLocks = Depends(get_document_locks),
 ):
     """
     Edit a text block on a page.
@@ -209,56 +467,62 @@ def edit_block(
         storage: Storage service
         engine: PDF engine
         db: Database session
+        doc: Document metadata (cached)
+        meta_cache: Metadata cache
+        history: Version history
+        render_cache: Render cache
+        text_maps: Text map cache
+        events: Event bus (text_map_ready events)
+        locks: Document locks (held until the edit is recorded)
 
     Returns:
         Updated text map for the page
     """
-    # Verify PDF exists
-    db_pdf = db.query(PDFDocument).filter(PDFDocument.uuid == pdf_uuid).first()
-    if not db_pdf:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"PDF not found: {pdf_uuid}",
-        )
+    with _engine_errors(pdf_uuid), locks.hold(pdf_uuid):
+        # The version this edit applies to (the cached metadata may be behind)
+        doc = _current_meta(db, pdf_uuid)
+        _check_page_number(doc, page_number)
+        pdf_path = storage.get_pdf_path(pdf_uuid)
+
+        # Get current text map to find the block
+        blocks, _, _ = _load_text_map(engine, storage, text_maps, events, doc, page_number)
+        target_block = None
+
+        for block in blocks:
+            if block.id == block_id:
+                target_block = block
+                break
 
-    if page_number < 1 or page_number > db_pdf.page_count:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid page number: {page_number} (max: {db_pdf.page_count})",
+        if not target_block:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Block not found: {block_id}",
+            )
+
+        # Apply edit
+        engine.apply_block_edit(
+            pdf_path,
+            page_number,
+            target_block.bbox,
+            request.new_text,
+            auto_fit=request.auto_fit,
+            mode=request.mode or settings.TEXT_EDIT_MODE,
         )
-
-    pdf_path = storage.get_pdf_path(pdf_uuid)
-
-    # Get current text map to find the block
-    blocks, _, _ = engine.extract_text_map(pdf_path, page_number)
-    target_block = None
-
-    for block in blocks:
-        if block.id == block_id:
-            target_block = block
-            break
-
-    if not target_block:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Block not found: {block_id}",
+        storage.commit_pdf(pdf_uuid)
+        version = mark_document_modified(
+            db, meta_cache, history, pdf_uuid, operation="edit_block", pages=[page_number]
         )
 
-    # Apply edit
-    engine.apply_block_edit(
-        pdf_path,
-        page_number,
-        target_block.bbox,
-        request.new_text,
-    )
+        # Return updated text map (and cache it for the page's new version)
+        updated_map = engine.extract_text_map(pdf_path, page_number)
+        text_maps.put(pdf_uuid, version, page_number, updated_map)
 
-    # Invalidate rendered page image (delete if exists)
-    render_path = storage.get_render_path(pdf_uuid, page_number)
-    if render_path.exists():
-        render_path.unlink()
-
-    # Return updated text map
-    updated_blocks, page_width, page_height = engine.extract_text_map(pdf_path, page_number)
+    # Drop the page's previous render (the new version renders under a new name)
+    render_cache.invalidate(
+        storage.get_render_path(pdf_uuid, page_number, doc.page_version(page_number))
+    )
+    events.publish(pdf_uuid, TEXT_MAP_READY, page=page_number, version=version)
+    updated_blocks, page_width, page_height = updated_map
     return TextMapResponse(
         pdf_uuid=pdf_uuid,
         page_number=page_number,
@@ -277,6 +541,13 @@ def edit_word(
     storage: PDFStorageService = Depends(get_storage_service),
     engine: PDFEngine = Depends(get_pdf_engine),
     db: Session = Depends(get_db),
+    doc: DocumentMeta = Depends(get_document_meta),
+    meta_cache: DocumentMetadataCache = Depends(get_metadata_cache),
+    history: VersionHistory = Depends(get_version_history),
+    render_cache: RenderCache = Depends(get_page_render_cache),
+    text_maps: TextMapCache = Depends(get_text_map_cache),
+    events: EventBus = Depends(get_event_bus),
+    locks: DocumentLocks = Depends(get_document_locks),
 ):
     """
     Edit a single word on a page.
@@ -284,67 +555,77 @@ def edit_word(
     Args:
         pdf_uuid: PDF document UUID
         page_number: Page number (1-based)
-        word_id: Word identifier (e.g., "page-1-block-3-word-5")
+        word_id: Word identifier (e.g., "page-1-word-3f9a0c12d4e5")
         request: Edit request with new text
         storage: Storage service
         engine: PDF engine
         db: Database session
+        doc: Document metadata (cached)
+        meta_cache: Metadata cache
+        history: Version history
+        render_cache: Render cache
+        text_maps: Text map cache
+        events: Event bus (text_map_ready events)
+        locks: Document locks (held until the edit is recorded)
 
     Returns:
         Updated text map for the page
     """
-    # Verify PDF exists
-    db_pdf = db.query(PDFDocument).filter(PDFDocument.uuid == pdf_uuid).first()
-    if not db_pdf:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"PDF not found: {pdf_uuid}",
-        )
-
-    if page_number < 1 or page_number > db_pdf.page_count:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid page number: {page_number} (max: {db_pdf.page_count})",
-        )
-
-    pdf_path = storage.get_pdf_path(pdf_uuid)
-
-    # Get current text map to find the word
-    blocks, _, _ = engine.extract_text_map(pdf_path, page_number)
-    target_word = None
-    target_block = None
-
-    for block in blocks:
-        if block.words:
-            for word in block.words:
-                if word.id == word_id:
-                    target_word = word
-                    target_block = block
+    with _engine_errors(pdf_uuid), locks.hold(pdf_uuid):
+        # The version this edit applies to (the cached metadata may be behind)
+        doc = _current_meta(db, pdf_uuid)
+        _check_page_number(doc, page_number)
+        pdf_path = storage.get_pdf_path(pdf_uuid)
+
+        # Get current text map to find the word
+        blocks, _, _ = _load_text_map(engine, storage, text_maps, events, doc, page_number)
+        target_word = None
+        target_block = None
+
+        for block in blocks:
+            if block.words:
+                for word in block.words:
+                    if word.id == word_id:
+                        target_word = word
+                        target_block = block
+                        break
+                if target_word:
                     break
-            if target_word:
-                break
 
-    if not target_word or not target_block:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Word not found: {word_id}",
+        if not target_word or not target_block:
+            # Provide helpful error message
+            available_words = []
+            for block in blocks[:3]:  # First 3 blocks only
+                if block.words:
+                    available_words.extend([w.id for w in block.words[:3]])
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Word not found: {word_id}. Available words (sample): {available_words}",
+            )
+
+        # Apply word-level edit
+        engine.apply_word_edit(
+            pdf_path,
+            page_number,
+            target_word.bbox,
+            request.new_text,
+            mode=request.mode or settings.TEXT_EDIT_MODE,
+        )
+        storage.commit_pdf(pdf_uuid)
+        version = mark_document_modified(
+            db, meta_cache, history, pdf_uuid, operation="edit_word", pages=[page_number]
         )
 
-    # Apply word-level edit
-    engine.apply_word_edit(
-        pdf_path,
-        page_number,
-        target_word.bbox,
-        request.new_text,
-    )
-
-    # Invalidate rendered page image (delete if exists)
-    render_path = storage.get_render_path(pdf_uuid, page_number)
-    if render_path.exists():
-        render_path.unlink()
+        # Return updated text map (and cache it for the page's new version)
+        updated_map = engine.extract_text_map(pdf_path, page_number)
+        text_maps.put(pdf_uuid, version, page_number, updated_map)
 
-    # Return updated text map
-    updated_blocks, page_width, page_height = engine.extract_text_map(pdf_path, page_number)
+    # Drop the page's previous render (the new version renders under a new name)
+    render_cache.invalidate(
+        storage.get_render_path(pdf_uuid, page_number, doc.page_version(page_number))
+    )
+    events.publish(pdf_uuid, TEXT_MAP_READY, page=page_number, version=version)
+    updated_blocks, page_width, page_height = updated_map
     return TextMapResponse(
         pdf_uuid=pdf_uuid,
         page_number=page_number,
@@ -354,149 +635,290 @@ def edit_word(
     )
 
 
-@router.put("/{pdf_uuid}/pages/{page_number}/words/{word_id}", response_model=TextMapResponse)
-def edit_word(
+def _linearized_copy(
+    engine: PDFEngine,
+    storage: PDFStorageService,
+    shared: Optional[SharedCache],
+    doc: DocumentMeta,
+    pdf_path: Path,
+) -> Optional[Path]:
+    """
+    Get a linearized copy of the document's current version, creating it on first use.
+
+    Returns:
+        Path of a linearized PDF, or None if linearization is unavailable
+    """
+    if is_linearized(pdf_path):
+        return pdf_path
+    if not engine.can_linearize():
+        return None
+
+    linearized_path = storage.get_linearized_path(doc.uuid, doc.version)
+    if not linearized_path.exists():
+        with produce_once(shared, f"linearize:{linearized_path.name}"):
+            # Another worker may have written it while we waited
+            if not linearized_path.exists():
+                engine.linearize(pdf_path, linearized_path)
+                for stale_path in storage.linearized_paths(doc.uuid):
+                    if stale_path != linearized_path:
+                        stale_path.unlink(missing_ok=True)
+    return linearized_path
+
+
+@router.get("/{pdf_uuid}/download")
+def download_pdf(
     pdf_uuid: str,
-    page_number: int,
-    word_id: str,
-    request: BlockEditRequest,
+    linearized: bool = False,
     storage: PDFStorageService = Depends(get_storage_service),
     engine: PDFEngine = Depends(get_pdf_engine),
-    db: Session = Depends(get_db),
+    doc: DocumentMeta = Depends(get_document_meta),
+    shared: Optional[SharedCache] = Depends(get_shared_cache),
 ):
     """
-    Edit a single word on a page.
+    Download the PDF file.
+
+    Supports byte-range requests, so viewers can load large documents
+    progressively. With linearized=true a linearized copy of the current
+    version is served (built once per version), letting viewers show the
+    first page before the rest of the file arrives; the X-Linearized
+    response header reports whether one could be produced.
 
     Args:
         pdf_uuid: PDF document UUID
-        page_number: Page number (1-based)
-        word_id: Word identifier (e.g., "page-1-block-3-word-5")
-        request: Edit request with new text
+        linearized: Serve a linearized ("fast web view") copy
         storage: Storage service
         engine: PDF engine
-        db: Database session
+        doc: Document metadata (cached)
+        shared: Shared cache tier, used to linearize each version only once
 
     Returns:
-        Updated text map for the page
+        PDF file stream (206 Partial Content for range requests)
     """
-    # Verify PDF exists
-    db_pdf = db.query(PDFDocument).filter(PDFDocument.uuid == pdf_uuid).first()
-    if not db_pdf:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"PDF not found: {pdf_uuid}",
-        )
+    headers = {}
+    with _engine_errors(pdf_uuid):
+        pdf_path = storage.get_pdf_path(pdf_uuid)
 
-    if page_number < 1 or page_number > db_pdf.page_count:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid page number: {page_number} (max: {db_pdf.page_count})",
-        )
+    if linearized:
+        linearized_path = _linearized_copy(engine, storage, shared, doc, pdf_path)
+        headers["X-Linearized"] = "true" if linearized_path is not None else "false"
+        if linearized_path is not None:
+            pdf_path = linearized_path
 
-    pdf_path = storage.get_pdf_path(pdf_uuid)
+    return RangeFileResponse(
+        str(pdf_path),
+        media_type="application/pdf",
+        filename=doc.original_filename,
+        headers=headers,
+    )
 
-    # Get current text map to find the word
-    blocks, _, _ = engine.extract_text_map(pdf_path, page_number)
-    target_word = None
-    target_block = None
 
-    # First try to find by exact ID match
-    for block in blocks:
-        if block.words:
-            for word in block.words:
-                if word.id == word_id:
-                    target_word = word
-                    target_block = block
-                    break
-            if target_word:
-                break
-    
-    # If not found by ID, try to find by parsing word_id (fallback)
-    if not target_word:
-        # Parse word_id format: "page-X-block-Y-word-Z"
-        parts = word_id.split("-")
-        if len(parts) >= 6 and parts[0] == "page" and parts[2] == "block" and parts[4] == "word":
-            try:
-                block_num = int(parts[3])
-                word_num = int(parts[5])
-                # Find block by number
-                block_index = 0
-                for block in blocks:
-                    if block.page_number == page_number:
-                        block_index += 1
-                        if block_index == block_num:
-                            if block.words and word_num <= len(block.words):
-                                target_word = block.words[word_num - 1]  # 1-based to 0-based
-                                target_block = block
-                                break
-            except (ValueError, IndexError):
-                pass
-
-    if not target_word or not target_block:
-        # Provide helpful error message
-        available_words = []
-        for block in blocks[:3]:  # First 3 blocks only
-            if block.words:
-                available_words.extend([w.id for w in block.words[:3]])
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Word not found: {word_id}. Available words (sample): {available_words}",
-        )
+def _version_history(db: Session, history: VersionHistory, pdf_uuid: str) -> VersionHistoryResponse:
+    """Build the version history response for a document."""
+    current = db.query(PDFDocument.version).filter(PDFDocument.uuid == pdf_uuid).scalar()
+    versions = history.list_versions(db, pdf_uuid)
+    by_number = {version.number: version for version in versions}
+    current_row = by_number.get(current)
+    return VersionHistoryResponse(
+        pdf_uuid=pdf_uuid,
+        current_version=current,
+        can_undo=current_row is not None and current_row.parent in by_number,
+        can_redo=any(version.parent == current for version in versions),
+        versions=[PDFVersionResponse.model_validate(version) for version in versions],
+    )
+
+
+def _move_to_version(
+    db: Session,
+    history: VersionHistory,
+    meta_cache: DocumentMetadataCache,
+    locks: DocumentLocks,
+    pdf_uuid: str,
+    move: Callable[[], object],
+) -> VersionHistoryResponse:
+    """Run an undo, redo or restore under the document's lock, mapping history errors to HTTP errors."""
+    try:
+        with locks.hold(pdf_uuid):
+            move()
+    except VersionNotFound as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except VersionUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    finally:
+        meta_cache.invalidate(pdf_uuid)
+    return _version_history(db, history, pdf_uuid)
+
+
+@router.get("/{pdf_uuid}/versions", response_model=VersionHistoryResponse)
+def list_versions(
+    pdf_uuid: str,
+    db: Session = Depends(get_db),
+    doc: DocumentMeta = Depends(get_document_meta),
+    history: VersionHistory = Depends(get_version_history),
+):
+    """
+    List a document's versions.
+
+    Every edit, rotation, page deletion and optimization creates a version.
+    The list is empty until the document is first changed.
+
+    Args:
+        pdf_uuid: PDF document UUID
+        db: Database session
+        doc: Document metadata (cached; ensures the document exists)
+        history: Version history
 
-    # Apply word-level edit
-    engine.apply_word_edit(
-        pdf_path,
-        page_number,
-        target_word.bbox,
-        request.new_text,
+    Returns:
+        Versions (oldest first), the current version and whether undo/redo are possible
+    """
+    return _version_history(db, history, pdf_uuid)
+
+
+@router.post("/{pdf_uuid}/undo", response_model=VersionHistoryResponse)
+def undo(
+    pdf_uuid: str,
+    db: Session = Depends(get_db),
+    doc: DocumentMeta = Depends(get_document_meta),
+    meta_cache: DocumentMetadataCache = Depends(get_metadata_cache),
+    history: VersionHistory = Depends(get_version_history),
+    locks: DocumentLocks = Depends(get_document_locks),
+):
+    """
+    Go back to the previous version.
+
+    Args:
+        pdf_uuid: PDF document UUID
+        db: Database session
+        doc: Document metadata (cached; ensures the document exists)
+        meta_cache: Metadata cache
+        history: Version history
+        locks: Document locks
+
+    Returns:
+        Updated version history (409 if there is nothing to undo)
+    """
+    return _move_to_version(
+        db, history, meta_cache, locks, pdf_uuid, lambda: history.undo(db, pdf_uuid)
     )
 
-    # Invalidate rendered page image (delete if exists)
-    render_path = storage.get_render_path(pdf_uuid, page_number)
-    if render_path.exists():
-        render_path.unlink()
 
-    # Return updated text map
-    updated_blocks, page_width, page_height = engine.extract_text_map(pdf_path, page_number)
-    return TextMapResponse(
-        pdf_uuid=pdf_uuid,
-        page_number=page_number,
-        page_width=page_width,
-        page_height=page_height,
-        blocks=updated_blocks,
+@router.post("/{pdf_uuid}/redo", response_model=VersionHistoryResponse)
+def redo(
+    pdf_uuid: str,
+    db: Session = Depends(get_db),
+    doc: DocumentMeta = Depends(get_document_meta),
+    meta_cache: DocumentMetadataCache = Depends(get_metadata_cache),
+    history: VersionHistory = Depends(get_version_history),
+    locks: DocumentLocks = Depends(get_document_locks),
+):
+    """
+    Re-apply the most recently undone version.
+
+    Args:
+        pdf_uuid: PDF document UUID
+        db: Database session
+        doc: Document metadata (cached; ensures the document exists)
+        meta_cache: Metadata cache
+        history: Version history
+        locks: Document locks
+
+    Returns:
+        Updated version history (409 if there is nothing to redo)
+    """
+    return _move_to_version(
+        db, history, meta_cache, locks, pdf_uuid, lambda: history.redo(db, pdf_uuid)
     )
 
 
-@router.get("/{pdf_uuid}/download")
-def download_pdf(
+@router.post("/{pdf_uuid}/versions/{version}/restore", response_model=VersionHistoryResponse)
+def restore_version(
     pdf_uuid: str,
-    storage: PDFStorageService = Depends(get_storage_service),
+    version: int,
     db: Session = Depends(get_db),
+    doc: DocumentMeta = Depends(get_document_meta),
+    meta_cache: DocumentMetadataCache = Depends(get_metadata_cache),
+    history: VersionHistory = Depends(get_version_history),
+    locks: DocumentLocks = Depends(get_document_locks),
 ):
     """
-    Download the PDF file.
+    Make an earlier (or undone) version the current one.
+
+    Restoring moves through the history like repeated undo/redo, so later
+    versions can still be restored afterwards, until the next edit. The
+    restored version becomes the current one under a new number.
 
     Args:
         pdf_uuid: PDF document UUID
-        storage: Storage service
+        version: Version number to restore
         db: Database session
+        doc: Document metadata (cached; ensures the document exists)
+        meta_cache: Metadata cache
+        history: Version history
+        locks: Document locks
 
     Returns:
-        PDF file stream
+        Updated version history (404 for unknown versions)
     """
-    # Verify PDF exists
-    db_pdf = db.query(PDFDocument).filter(PDFDocument.uuid == pdf_uuid).first()
-    if not db_pdf:
+    return _move_to_version(
+        db, history, meta_cache, locks, pdf_uuid, lambda: history.restore(db, pdf_uuid, version)
+    )
+
+
+@router.get("/{pdf_uuid}/events")
+async def document_events(
+    pdf_uuid: str,
+    db: AsyncSession = Depends(get_async_db),
+    events: EventBus = Depends(get_event_bus),
+):
+    """
+    Stream a document's events as server-sent events (text/event-stream).
+
+    The stream opens with a "document" event holding the current version,
+    page count and per-page versions (renders and text maps are named
+    after these), then pushes what changes: "version_changed" (with the
+    pages whose content changed; null means all), "page_rendered",
+    "text_map_ready", "job_progress" and "resync" (events were dropped
+    because the client fell behind; refetch what is shown). Streams end
+    after EVENTS_STREAM_MAX_SECONDS; EventSource reconnects on its own and
+    the new "document" event tells the client what it missed.
+
+    Args:
+        pdf_uuid: PDF document UUID
+        db: Async database session
+        events: Event bus
+
+    Returns:
+        Event stream
+    """
+    # Subscribe before reading the row, so no change falls in between
+    subscription = events.subscribe(pdf_uuid)
+    db_pdf = await pdf_documents.get_by_uuid(db, pdf_uuid)
+    if db_pdf is None:
+        subscription.close()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"PDF not found: {pdf_uuid}",
         )
-
-    pdf_path = storage.get_pdf_path(pdf_uuid)
-
-    return FileResponse(
-        str(pdf_path),
-        media_type="application/pdf",
-        filename=db_pdf.original_filename,
+    doc = DocumentMeta.from_model(db_pdf)
+
+    async def stream() -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.EVENTS_STREAM_MAX_SECONDS
+        with subscription:
+            yield b"retry: 3000\n\n" + sse_event("document", {
+                "pdf_uuid": doc.uuid,
+                "version": doc.version,
+                "page_count": doc.page_count,
+                "page_versions": [doc.page_version(n) for n in range(1, doc.page_count + 1)],
+            })
+            while (remaining := deadline - loop.time()) > 0:
+                event = await subscription.get(min(settings.EVENTS_KEEPALIVE_SECONDS, remaining))
+                if event is None:
+                    yield SSE_KEEPALIVE
+                else:
+                    yield sse_event(event.type, event.data)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-
@@ -0,0 +1,382 @@
+"""Admission control: concurrency limits, bounded queues and priorities for CPU-heavy endpoints."""
+import asyncio
+import math
+import re
+import tempfile
+import time
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import IO, Awaitable, Callable, Deque, Dict, Iterable, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from app.core.metrics import ADMISSION_REJECTIONS, ADMISSION_WAIT_SECONDS
+
+INTERACTIVE = "interactive"
+EDIT = "edit"
+BATCH = "batch"
+
+# (method or None for any, path pattern, query pattern or None for any,
+# operation class); first match wins. Requests matching nothing (uploads,
+# plain downloads, metadata, events, health, metrics) are never held back.
+ADMISSION_RULES = [
+    ("GET", re.compile(r"^/api/pdfs/[^/]+/pages/\d+/(image|text-map)$"), None, INTERACTIVE),
+    ("PUT", re.compile(r"^/api/pdfs/[^/]+/pages/\d+/(blocks|words)/[^/]+$"), None, EDIT),
+    ("POST", re.compile(r"^/api/pdfs/[^/]+/(undo|redo|versions/\d+/restore)$"), None, EDIT),
+    ("GET", re.compile(r"^/api/pdfs/[^/]+/pages/images$"), None, BATCH),
+    # Linearizing rewrites the whole document (on a cache miss)
+    (
+        "GET",
+        re.compile(r"^/api/pdfs/[^/]+/download$"),
+        re.compile(r"(^|&)linearized=(1|t|true|y|yes|on)(&|$)", re.IGNORECASE),
+        BATCH,
+    ),
+    (None, re.compile(r"^/api/pdf-operations/"), None, BATCH),
+]
+
+# Request bodies are received before a slot is taken, in memory up to this
+# size and in a temporary file beyond it
+BODY_SPOOL_MEMORY_BYTES = 1024 * 1024
+BODY_REPLAY_CHUNK_BYTES = 64 * 1024
+
+# Bounds for the Retry-After estimate, in seconds
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+
+# Weight of the latest request in the per-class service time average
+SERVICE_TIME_SMOOTHING = 0.2
+
+
+def classify(method: str, path: str, query: str = "") -> Optional[str]:
+    """
+    Get the operation class of a request.
+
+    Args:
+        method: HTTP method
+        path: Request path
+        query: Query string
+
+    Returns:
+        Operation class, or None if the request is not admission-controlled
+    """
+    for rule_method, pattern, query_pattern, operation_class in ADMISSION_RULES:
+        if (
+            (rule_method is None or rule_method == method)
+            and pattern.match(path)
+            and (query_pattern is None or query_pattern.search(query))
+        ):
+            return operation_class
+    return None
+
+
+@dataclass(frozen=True)
+class OperationClass:
+    """Limits of one class of requests."""
+
+    name: str
+    priority: int  # Lower is admitted first when slots free up
+    limit: int  # Requests of this class running at once
+    queue_size: int  # Requests waiting before new ones are refused (429)
+    queue_timeout: float  # Seconds a request may wait before it is refused (503)
+
+
+class AdmissionRejected(Exception):
+    """A request refused because the server is at capacity."""
+
+    def __init__(self, status_code: int, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class AdmissionController:
+    """
+    Admits requests into a fixed number of slots, by priority.
+
+    A request runs at once if a slot is free and its class is under its own
+    limit; otherwise it waits in its class's queue. Whenever a slot frees
+    up it goes to the oldest waiter of the highest-priority class that is
+    under its limit, so interactive requests overtake queued batch work and
+    batch work can never occupy more than its own limit. Requests that
+    can't even be queued are refused at once with 429; requests that wait
+    longer than their class's queue_timeout are refused with 503. Both
+    carry a Retry-After estimated from the queue length and recent service
+    times, so load beyond capacity is shed quickly instead of slowing every
+    request down.
+
+    Must be used from one event loop thread.
+    """
+
+    def __init__(self, classes: Iterable[OperationClass], max_concurrent: int):
+        """
+        Initialize admission controller.
+
+        Args:
+            classes: Operation classes
+            max_concurrent: Requests of all classes running at once
+        """
+        self.classes = {c.name: c for c in classes}
+        self.max_concurrent = max_concurrent
+        self._by_priority = sorted(self.classes.values(), key=lambda c: c.priority)
+        self._running: Dict[str, int] = {name: 0 for name in self.classes}
+        self._waiting: Dict[str, Deque[asyncio.Future]] = {name: deque() for name in self.classes}
+        self._service_time: Dict[str, float] = {name: 1.0 for name in self.classes}
+        self._rejected: Dict[str, int] = {name: 0 for name in self.classes}
+
+    @property
+    def running(self) -> int:
+        """Requests running now."""
+        return sum(self._running.values())
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiters, highest priority first."""
+        while self.running < self.max_concurrent:
+            for operation_class in self._by_priority:
+                queue = self._waiting[operation_class.name]
+                if queue and self._running[operation_class.name] < operation_class.limit:
+                    waiter = queue.popleft()
+                    if not waiter.done():
+                        self._running[operation_class.name] += 1
+                        waiter.set_result(None)
+                    break
+            else:
+                return
+
+    def _retry_after(self, operation_class: OperationClass) -> int:
+        """Seconds until a refused request of this class could probably run."""
+        ahead = len(self._waiting[operation_class.name]) + self._running[operation_class.name]
+        estimate = ahead / max(1, operation_class.limit) * self._service_time[operation_class.name]
+        return max(MIN_RETRY_AFTER, min(MAX_RETRY_AFTER, math.ceil(estimate)))
+
+    def _reject(self, operation_class: OperationClass, status_code: int, reason: str) -> AdmissionRejected:
+        self._rejected[operation_class.name] += 1
+        ADMISSION_REJECTIONS.labels(operation_class=operation_class.name, reason=reason).inc()
+        return AdmissionRejected(
+            status_code,
+            self._retry_after(operation_class),
+            f"Server busy ({operation_class.name} requests: {reason.replace('_', ' ')}), retry later",
+        )
+
+    async def acquire(self, name: str) -> None:
+        """
+        Wait for a slot for a request.
+
+        Args:
+            name: Operation class
+
+        Raises:
+            AdmissionRejected: 429 if the class's queue is full, 503 if the
+                request waited longer than queue_timeout
+        """
+        operation_class = self.classes[name]
+        queue = self._waiting[name]
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        self._dispatch()
+        if waiter.done():
+            ADMISSION_WAIT_SECONDS.labels(operation_class=name).observe(0.0)
+            return
+        if len(queue) > operation_class.queue_size:
+            queue.remove(waiter)
+            raise self._reject(operation_class, 429, "queue_full")
+
+        try:
+            await asyncio.wait_for(waiter, operation_class.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter in queue:
+                queue.remove(waiter)
+            raise self._reject(operation_class, 503, "queue_timeout")
+        except asyncio.CancelledError:
+            # Client went away: give back a slot granted meanwhile
+            if waiter in queue:
+                queue.remove(waiter)
+            elif waiter.done() and not waiter.cancelled():
+                self.release(name)
+            raise
+        ADMISSION_WAIT_SECONDS.labels(operation_class=name).observe(time.perf_counter() - started)
+
+    def release(self, name: str, service_time: Optional[float] = None) -> None:
+        """
+        Free a request's slot.
+
+        Args:
+            name: Operation class
+            service_time: How long the request ran (feeds Retry-After estimates)
+        """
+        self._running[name] -= 1
+        if service_time is not None:
+            self._service_time[name] += SERVICE_TIME_SMOOTHING * (
+                service_time - self._service_time[name]
+            )
+        self._dispatch()
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Get per-class statistics for this process.
+
+        Returns:
+            Dict of operation class -> running, waiting, rejected, limit and
+            average service time
+        """
+        return {
+            name: {
+                "running": self._running[name],
+                "waiting": len(self._waiting[name]),
+                "rejected": self._rejected[name],
+                "limit": operation_class.limit,
+                "service_time": round(self._service_time[name], 4),
+            }
+            for name, operation_class in self.classes.items()
+        }
+
+
+@lru_cache(maxsize=None)
+def open_admission_controller(
+    max_concurrent: int,
+    limits: Tuple[Tuple[str, int], ...],
+    queue_size: int,
+    queue_timeout: float,
+) -> AdmissionController:
+    """
+    Get the process-wide admission controller for a configuration.
+
+    Args:
+        max_concurrent: Requests of all classes running at once
+        limits: (operation class, limit) pairs, highest priority first
+        queue_size: Waiting requests per class
+        queue_timeout: Seconds a request may wait
+
+    Returns:
+        Admission controller
+    """
+    return AdmissionController(
+        [
+            OperationClass(name, priority, limit, queue_size, queue_timeout)
+            for priority, (name, limit) in enumerate(limits)
+        ],
+        max_concurrent,
+    )
+
+
+def _has_body(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"content-length":
+            return value.strip() not in (b"", b"0")
+        if name == b"transfer-encoding":
+            return True
+    return False
+
+
+async def spool_body(receive: Callable[[], Awaitable[dict]]) -> Optional[IO[bytes]]:
+    """
+    Receive a request's whole body.
+
+    Args:
+        receive: ASGI receive callable
+
+    Returns:
+        The body, rewound (in memory or a temporary file), or None if the
+        client disconnected first
+    """
+    body = tempfile.SpooledTemporaryFile(max_size=BODY_SPOOL_MEMORY_BYTES)
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            body.close()
+            return None
+        body.write(message.get("body", b""))
+        if not message.get("more_body", False):
+            body.seek(0)
+            return body
+
+
+def replay_body(
+    body: IO[bytes], receive: Callable[[], Awaitable[dict]]
+) -> Callable[[], Awaitable[dict]]:
+    """
+    Get an ASGI receive callable that replays a spooled body, then defers to receive.
+
+    Args:
+        body: Spooled body (see spool_body())
+        receive: Original receive callable (for disconnects after the body)
+
+    Returns:
+        Receive callable
+    """
+    size = body.seek(0, 2)
+    body.seek(0)
+    done = False
+
+    async def replay() -> dict:
+        nonlocal done
+        if done:
+            return await receive()
+        chunk = body.read(BODY_REPLAY_CHUNK_BYTES)
+        done = body.tell() >= size
+        return {"type": "http.request", "body": chunk, "more_body": not done}
+
+    return replay
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware holding CPU-heavy requests to the admission controller's limits.
+
+    A request's body (a merge upload, say) is received before it waits for
+    a slot, so slow clients don't hold slots while they upload; the request
+    then keeps its slot until its response is fully sent, so streamed
+    responses that render as they go are covered too.
+    """
+
+    def __init__(self, app, get_controller: Callable[[], Optional[AdmissionController]]):
+        """
+        Initialize admission middleware.
+
+        Args:
+            app: ASGI application
+            get_controller: Returns the controller to use (None disables admission control)
+        """
+        self.app = app
+        self.get_controller = get_controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        controller = self.get_controller()
+        name = None
+        if controller is not None:
+            name = classify(scope["method"], scope["path"], scope["query_string"].decode("latin-1"))
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        body = None
+        if _has_body(scope):
+            body = await spool_body(receive)
+            if body is None:
+                return
+            receive = replay_body(body, receive)
+        try:
+            try:
+                await controller.acquire(name)
+            except AdmissionRejected as e:
+                response = JSONResponse(
+                    {"detail": e.detail},
+                    status_code=e.status_code,
+                    headers={"Retry-After": str(e.retry_after)},
+                )
+                await response(scope, receive, send)
+                return
+
+            started = time.perf_counter()
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                controller.release(name, time.perf_counter() - started)
+        finally:
+            if body is not None:
+                body.close()
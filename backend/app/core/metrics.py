@@ -0,0 +1,171 @@
+"""Prometheus metrics for the API, the PDF engine and caches."""
+import os
+import time
+from contextlib import contextmanager
+from typing import Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+
+# Engine operations range from sub-millisecond opens to multi-second saves
+ENGINE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "aeropdf_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=HTTP_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "aeropdf_http_requests_in_flight",
+    "HTTP requests currently being handled",
+    multiprocess_mode="livesum",
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "aeropdf_admission_wait_seconds",
+    "Time admitted requests waited for a slot",
+    ["operation_class"],
+    buckets=HTTP_BUCKETS,
+)
+ADMISSION_REJECTIONS = Counter(
+    "aeropdf_admission_rejections_total",
+    "Requests refused by admission control",
+    ["operation_class", "reason"],  # reason: "queue_full" (429) or "queue_timeout" (503)
+)
+
+PDF_OPEN_SECONDS = Histogram(
+    "aeropdf_pdf_open_seconds",
+    "Time spent in fitz.open()",
+    buckets=ENGINE_BUCKETS,
+)
+PDF_RENDER_SECONDS = Histogram(
+    "aeropdf_pdf_render_seconds",
+    "Time spent rasterizing pages",
+    buckets=ENGINE_BUCKETS,
+)
+PDF_ENCODE_SECONDS = Histogram(
+    "aeropdf_pdf_encode_seconds",
+    "Time spent encoding rasterized pages",
+    ["format"],
+    buckets=ENGINE_BUCKETS,
+)
+PDF_EXTRACT_SECONDS = Histogram(
+    "aeropdf_pdf_extract_seconds",
+    "Time spent extracting page text maps",
+    buckets=ENGINE_BUCKETS,
+)
+PDF_SAVE_SECONDS = Histogram(
+    "aeropdf_pdf_save_seconds",
+    "Time spent writing PDFs",
+    ["operation"],
+    buckets=ENGINE_BUCKETS,
+)
+RENDER_MEMORY_BYTES = Gauge(
+    "aeropdf_render_memory_bytes",
+    "Memory reserved by page renders in progress",
+    multiprocess_mode="livesum",
+)
+BYTES_WRITTEN = Counter(
+    "aeropdf_bytes_written_total",
+    "Bytes written to disk",
+    ["kind"],  # "pdf" or "render"
+)
+CACHE_REQUESTS = Counter(
+    "aeropdf_cache_requests_total",
+    "Cache lookups by result",
+    ["cache", "result"],  # cache: render, text_map, metadata, shared; result: hit, miss
+)
+
+
+@contextmanager
+def observe(histogram, **labels):
+    """
+    Time a block into a histogram.
+
+    Args:
+        histogram: Histogram to observe into
+        **labels: Label values, if the histogram has labels
+    """
+    metric = histogram.labels(**labels) if labels else histogram
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metric.observe(time.perf_counter() - started)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """
+    Count a cache hit or miss.
+
+    Args:
+        cache: Cache name ("render", "text_map", "metadata")
+        hit: Whether the lookup was a hit
+    """
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Render all metrics in the Prometheus text format.
+
+    With several worker processes, set PROMETHEUS_MULTIPROC_DIR (an empty
+    directory shared by the workers) so every scrape aggregates all of them.
+
+    Returns:
+        (body, content type)
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route template.
+
+    Routes are labelled by their template ("/api/pdfs/{pdf_uuid}"), never
+    by the raw path, to keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status_code),
+            ).observe(time.perf_counter() - started)
@@ -0,0 +1,267 @@
+"""Lightweight request tracing: Server-Timing headers and optional OpenTelemetry export."""
+import asyncio
+import functools
+import logging
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from app.db.instrumentation import current_query_stats
+
+logger = logging.getLogger(__name__)
+
+TRACING_EXPORTERS = ("none", "otlp", "console", "file")
+
+# Set by configure_tracing() when spans are exported to OpenTelemetry
+_tracer = None
+_provider = None
+
+
+@dataclass
+class RequestTrace:
+    """Spans finished while handling one request."""
+
+    started: float = field(default_factory=time.perf_counter)
+    # (name, start offset in seconds, duration in seconds)
+    spans: List[Tuple[str, float, float]] = field(default_factory=list)
+    max_spans: int = 32
+    dropped: int = 0
+
+    def add(self, name: str, started: float, duration: float) -> None:
+        """Record a finished span, dropping it past max_spans to bound header size."""
+        if len(self.spans) >= self.max_spans:
+            self.dropped += 1
+            return
+        self.spans.append((name, started - self.started, duration))
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """Get the trace of the request being handled, if any."""
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a block as a span of the current request.
+
+    The span is added to the request's Server-Timing header and, when
+    OpenTelemetry export is configured, exported as a child span. Outside
+    a request with export disabled this is a no-op.
+
+    Args:
+        name: Span name ("pdf.save", "storage.commit", ...)
+        **attributes: OpenTelemetry span attributes
+    """
+    trace = _current_trace.get()
+    if trace is None and _tracer is None:
+        yield
+        return
+
+    otel_span = (
+        _tracer.start_as_current_span(name, attributes=attributes or None)
+        if _tracer is not None
+        else nullcontext()
+    )
+    started = time.perf_counter()
+    with otel_span:
+        try:
+            yield
+        finally:
+            if trace is not None:
+                trace.add(name, started, time.perf_counter() - started)
+
+
+def traced(name: str):
+    """
+    Decorator recording each call of a function as a span.
+
+    Args:
+        name: Span name
+    """
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def server_timing_header(trace: RequestTrace) -> str:
+    """
+    Format a request trace as a Server-Timing header value.
+
+    Repeated span names get a numeric suffix (pdf.extract_text_map,
+    pdf.extract_text_map_2) so each call stays visible in devtools.
+
+    Args:
+        trace: Finished request trace
+
+    Returns:
+        Header value, e.g. 'pdf.open;dur=1.20, db;dur=0.80;desc="2 queries", total;dur=9.10'
+    """
+    entries = []
+    seen = {}
+    for name, _, duration in sorted(trace.spans, key=lambda s: s[1]):
+        seen[name] = seen.get(name, 0) + 1
+        metric = name if seen[name] == 1 else f"{name}_{seen[name]}"
+        entries.append(f"{metric};dur={duration * 1000:.2f}")
+
+    stats = current_query_stats()
+    if stats is not None and stats.count:
+        entries.append(
+            f'db;dur={stats.duration_seconds * 1000:.2f};desc="{stats.count} queries"'
+        )
+    if trace.dropped:
+        entries.append(f'dropped;desc="{trace.dropped} spans"')
+    entries.append(f"total;dur={(time.perf_counter() - trace.started) * 1000:.2f}")
+    return ", ".join(entries)
+
+
+def configure_tracing(
+    exporter: str,
+    *,
+    service_name: str = "aeropdf-api",
+    otlp_endpoint: Optional[str] = None,
+    file_path: Optional[str] = None,
+) -> bool:
+    """
+    Export spans to OpenTelemetry.
+
+    Args:
+        exporter: "none", "otlp" (HTTP collector), "console" or "file" (JSON lines)
+        service_name: service.name resource attribute
+        otlp_endpoint: Collector traces URL for the otlp exporter
+        file_path: Output file for the file exporter
+
+    Returns:
+        True if export is enabled
+
+    Raises:
+        ValueError: If exporter is unknown
+    """
+    global _tracer, _provider
+
+    if exporter not in TRACING_EXPORTERS:
+        raise ValueError(f"TRACING_EXPORTER must be one of {', '.join(TRACING_EXPORTERS)}")
+    if exporter == "none":
+        return False
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    except ImportError:  # pragma: no cover - depends on environment
+        logger.warning(
+            "TRACING_EXPORTER is set but opentelemetry-sdk is not installed; "
+            "spans are only reported in Server-Timing headers"
+        )
+        return False
+
+    if exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        span_exporter = OTLPSpanExporter(endpoint=otlp_endpoint)
+    elif exporter == "file":
+        out = open(file_path, "a", encoding="utf-8")
+        span_exporter = ConsoleSpanExporter(
+            out=out, formatter=lambda s: s.to_json(indent=None) + "\n"
+        )
+    else:
+        span_exporter = ConsoleSpanExporter()
+
+    shutdown_tracing()
+    _provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    _provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    _tracer = _provider.get_tracer("aeropdf")
+    logger.info(f"Exporting traces via {exporter}")
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Flush pending spans and disable OpenTelemetry export."""
+    global _tracer, _provider
+
+    if _provider is not None:
+        _provider.shutdown()
+    _tracer = None
+    _provider = None
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware collecting spans per request.
+
+    Adds a Server-Timing header (engine, storage and database time) so the
+    breakdown of a slow request is visible in browser devtools, and opens
+    the root OpenTelemetry span when export is configured. Must run inside
+    QueryCountMiddleware to report database time.
+    """
+
+    def __init__(self, app, enabled: bool = True, max_spans: int = 32):
+        """
+        Initialize middleware.
+
+        Args:
+            app: ASGI application
+            enabled: Add Server-Timing headers
+            max_spans: Maximum spans reported per request
+        """
+        self.app = app
+        self.enabled = enabled
+        self.max_spans = max_spans
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (not self.enabled and _tracer is None):
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace(max_spans=self.max_spans) if self.enabled else None
+        token = _current_trace.set(trace)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            if message["type"] == "http.response.start" and trace is not None:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing_header(trace).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        if _tracer is None:
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                _current_trace.reset(token)
+            return
+
+        from opentelemetry.trace import SpanKind
+
+        with _tracer.start_as_current_span(
+            f"{scope['method']} {scope['path']}", kind=SpanKind.SERVER
+        ) as root:
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                _current_trace.reset(token)
+                route = scope.get("route")
+                if route is not None:
+                    root.update_name(f"{scope['method']} {route.path}")
+                    root.set_attribute("http.route", route.path)
+                root.set_attribute("http.method", scope["method"])
+                root.set_attribute("http.status_code", status_code)
@@ -0,0 +1,93 @@
+"""Per-request database query instrumentation."""
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryStats:
+    """Queries issued while handling one request."""
+
+    count: int = 0
+    duration_seconds: float = 0.0
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("db_query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Get the query stats of the request being handled, if any."""
+    return _current_stats.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    started = conn.info.get("query_started")
+    if stats is None or not started:
+        return
+    stats.count += 1
+    stats.duration_seconds += time.perf_counter() - started.pop()
+
+
+class QueryCountMiddleware:
+    """
+    ASGI middleware counting the SQL queries each request issues.
+
+    Adds X-DB-Query-Count and X-DB-Query-Time headers and logs a warning
+    for requests above warn_threshold queries (N+1 patterns, missing caching).
+    The stats object is shared through a context variable, which sync
+    endpoints running in the threadpool inherit.
+    """
+
+    def __init__(self, app, warn_threshold: int = 20):
+        """
+        Initialize middleware.
+
+        Args:
+            app: ASGI application
+            warn_threshold: Query count above which a request is logged (0 disables)
+        """
+        self.app = app
+        self.warn_threshold = warn_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(stats.count).encode()))
+                headers.append(
+                    (b"x-db-query-time", f"{stats.duration_seconds * 1000:.2f}ms".encode())
+                )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current_stats.reset(token)
+            if self.warn_threshold and stats.count > self.warn_threshold:
+                logger.warning(
+                    f"{scope.get('method')} {scope.get('path')} issued {stats.count} "
+                    f"queries ({stats.duration_seconds * 1000:.1f}ms)"
+                )
@@ -1,18 +1,164 @@
 """Database session management."""
-from sqlalchemy import create_engine
+import logging
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.config import settings
-from app.models.base import Base
+from app.db import instrumentation  # noqa: F401  (registers query counting listeners)
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
-    echo=settings.DEBUG,
-)
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations"
+
+# Async driver used for each sync dialect/driver in DATABASE_URL
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _configure_sqlite(engine: Engine, journal_mode: str, synchronous: str, busy_timeout_ms: int) -> None:
+    """
+    Set per-connection SQLite pragmas.
+
+    WAL lets readers proceed while a writer commits (the default rollback
+    journal blocks them), synchronous=NORMAL is durable in WAL mode with far
+    fewer fsyncs, and busy_timeout makes concurrent writers from several
+    worker processes wait instead of failing with "database is locked".
+    """
+    memory = _is_memory_sqlite(engine.url)
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if not memory:
+                cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+                cursor.execute(f"PRAGMA synchronous={synchronous}")
+            cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+        finally:
+            cursor.close()
+
+
+def _engine_options(url: URL, options: dict) -> dict:
+    """Pool and driver options for a URL, with caller overrides applied."""
+    sqlite = url.get_backend_name() == "sqlite"
+    defaults = {}
+    if sqlite:
+        defaults["connect_args"] = {"check_same_thread": False}
+    if "poolclass" not in options and not _is_memory_sqlite(url):
+        defaults.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+        if not sqlite:
+            defaults.update(pool_recycle=settings.DB_POOL_RECYCLE, pool_pre_ping=True)
+    defaults.update(options)
+    return defaults
+
+
+def _configure_engine(engine: Engine) -> None:
+    if engine.url.get_backend_name() == "sqlite":
+        _configure_sqlite(
+            engine,
+            settings.SQLITE_JOURNAL_MODE,
+            settings.SQLITE_SYNCHRONOUS,
+            settings.SQLITE_BUSY_TIMEOUT_MS,
+        )
+
+
+def create_db_engine(database_url: str, *, echo: bool = False, **options) -> Engine:
+    """
+    Create an engine configured for the database backend in use.
+
+    SQLite gets WAL mode and busy timeouts; server databases (PostgreSQL)
+    get a sized, pre-pinged and periodically recycled connection pool.
+
+    Args:
+        database_url: SQLAlchemy database URL
+        echo: Log every SQL statement
+        **options: Extra create_engine() options (e.g. poolclass)
+
+    Returns:
+        Configured engine
+    """
+    url = make_url(database_url)
+    engine = create_engine(url, echo=echo, **_engine_options(url, options))
+    _configure_engine(engine)
+    return engine
+
+
+def async_database_url(database_url: str) -> str:
+    """
+    Get the async-driver equivalent of a database URL.
+
+    sqlite:// becomes sqlite+aiosqlite:// and postgresql:// becomes
+    postgresql+asyncpg://; URLs that already name an async-capable driver
+    (e.g. postgresql+psycopg) are returned unchanged.
+
+    Args:
+        database_url: SQLAlchemy database URL
+
+    Returns:
+        URL usable with create_async_engine()
+    """
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.drivername)
+    if driver is None:
+        return database_url
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def create_async_db_engine(database_url: str, *, echo: bool = False, **options) -> AsyncEngine:
+    """
+    Create an async engine with the same pragmas and pool settings as
+    create_db_engine().
+
+    Args:
+        database_url: SQLAlchemy database URL (sync or async driver)
+        echo: Log every SQL statement
+        **options: Extra create_async_engine() options (e.g. poolclass)
+
+    Returns:
+        Configured async engine
+    """
+    url = make_url(async_database_url(database_url))
+    if url.get_backend_name() == "sqlite" and not _is_memory_sqlite(url):
+        # Pool aiosqlite connections too (this SQLAlchemy defaults it to NullPool)
+        options.setdefault("poolclass", AsyncAdaptedQueuePool)
+        if options["poolclass"] is AsyncAdaptedQueuePool:
+            options.setdefault("pool_size", settings.DB_POOL_SIZE)
+            options.setdefault("max_overflow", settings.DB_MAX_OVERFLOW)
+            options.setdefault("pool_timeout", settings.DB_POOL_TIMEOUT)
+    engine = create_async_engine(url, echo=echo, **_engine_options(url, options))
+    _configure_engine(engine.sync_engine)
+    return engine
+
+
+engine = create_db_engine(settings.DATABASE_URL, echo=settings.DB_ECHO)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_db_engine(
+    settings.ASYNC_DATABASE_URL or settings.DATABASE_URL, echo=settings.DB_ECHO
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
 
 def get_db() -> Session:
     """Dependency for getting database session."""
@@ -23,7 +169,31 @@ def get_db() -> Session:
         db.close()
 
 
-def init_db() -> None:
-    """Initialize database tables."""
-    Base.metadata.create_all(bind=engine)
+async def get_async_db() -> AsyncSession:
+    """Dependency for getting an async database session (for async endpoints)."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
 
+def run_migrations(bind: Engine = None, revision: str = "head") -> None:
+    """
+    Upgrade the database schema with Alembic.
+
+    Args:
+        bind: Engine to migrate (defaults to the application engine)
+        revision: Target revision
+    """
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    with (bind or engine).begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+
+def init_db() -> None:
+    """Initialize database tables by running migrations to head."""
+    run_migrations()
+    logger.info(f"Database schema up to date ({engine.url.get_backend_name()})")
@@ -1,11 +1,35 @@
 """FastAPI application entry point."""
+import asyncio
 import os
-from fastapi import FastAPI
+import tempfile
+from pathlib import Path
+
+from fastapi import Depends, FastAPI, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import text
+from sqlalchemy.orm import Session
 
+from app.core.admission import AdmissionMiddleware
 from app.core.config import settings
-from app.db.session import init_db
-from app.api.routes import pdfs, pdf_operations
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.tracing import ServerTimingMiddleware, configure_tracing, shutdown_tracing
+from app.db.instrumentation import QueryCountMiddleware
+from app.db.session import get_db, init_db
+from app.api.deps import (
+    get_admission_controller,
+    get_job_handlers,
+    get_job_queue,
+    get_metadata_cache,
+    get_page_render_cache,
+    get_render_memory,
+    get_retention_service,
+    get_shared_cache,
+    get_single_flight,
+    get_text_map_cache,
+)
+from app.services.jobs import run_job_worker
+from app.services.retention import run_retention_loop
+from app.api.routes import jobs, pdfs, pdf_operations
 
 app = FastAPI(
     title="AeroPdf API",
@@ -30,6 +54,10 @@ if production_domain:
         f"http://{production_domain}",
     ])
 
+# Concurrency limits and priorities for CPU-heavy endpoints. Added first so it
+# runs innermost: its 429/503 responses get CORS headers and are measured
+app.add_middleware(AdmissionMiddleware, get_controller=get_admission_controller)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[origin.strip() for origin in allowed_origins],
@@ -39,24 +67,75 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Per-request spans (Server-Timing header, OpenTelemetry export); runs inside
+# the query counter so database time is included
+app.add_middleware(
+    ServerTimingMiddleware,
+    enabled=settings.SERVER_TIMING_ENABLED,
+    max_spans=settings.SERVER_TIMING_MAX_SPANS,
+)
+
+# Count SQL queries per request (X-DB-Query-Count / X-DB-Query-Time headers)
+app.add_middleware(QueryCountMiddleware, warn_threshold=settings.DB_QUERY_WARN_THRESHOLD)
+
+# Prometheus request latency / in-flight metrics (scraped from /metrics)
+app.add_middleware(MetricsMiddleware)
+
 # Log CORS configuration for debugging
 print(f"CORS allowed origins: {[origin.strip() for origin in allowed_origins]}")
 
 # Include routers
 app.include_router(pdfs.router, prefix="/api")
 app.include_router(pdf_operations.router, prefix="/api")
+app.include_router(jobs.router, prefix="/api")
 
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize application on startup."""
-    # Initialize database
-    init_db()
+    # Initialize database (bring the schema up to date)
+    if settings.DB_AUTO_MIGRATE:
+        init_db()
 
     # Ensure storage directories exist (handled by Settings)
+
+    configure_tracing(
+        settings.TRACING_EXPORTER,
+        service_name=settings.TRACING_SERVICE_NAME,
+        otlp_endpoint=settings.TRACING_OTLP_ENDPOINT,
+        file_path=settings.TRACING_FILE,
+    )
+
+    # Start background garbage collection
+    if settings.GC_ENABLED:
+        app.state.gc_task = asyncio.create_task(run_retention_loop(
+            get_retention_service,
+            settings.GC_INTERVAL_SECONDS,
+            Path(settings.STORAGE_DIR) / "gc.lock",
+        ))
+
+    # Run queued background jobs (separate workers: python -m app.worker)
+    if settings.JOB_WORKER_ENABLED:
+        app.state.job_worker_task = asyncio.create_task(run_job_worker(
+            get_job_queue(),
+            get_job_handlers(),
+            concurrency=settings.JOB_WORKER_CONCURRENCY,
+            poll_interval=settings.JOB_POLL_INTERVAL_SECONDS,
+        ))
+
     print("AeroPdf API started successfully")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks on shutdown."""
+    for name in ("gc_task", "job_worker_task"):
+        task = getattr(app.state, name, None)
+        if task is not None:
+            task.cancel()
+    shutdown_tracing()
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
@@ -68,7 +147,44 @@ async def root():
 
 
 @app.get("/health")
-async def health_check():
-    """Health check endpoint."""
-    return {"status": "healthy"}
+def health_check(response: Response, db: Session = Depends(get_db)):
+    """Health check endpoint (database reachable, storage writable)."""
+    checks = {}
+    try:
+        db.execute(text("SELECT 1"))
+        checks["database"] = "ok"
+    except Exception as e:
+        checks["database"] = f"error: {e}"
+    try:
+        with tempfile.TemporaryFile(dir=settings.STORAGE_DIR):
+            pass
+        checks["storage"] = "ok"
+    except OSError as e:
+        checks["storage"] = f"error: {e}"
+
+    healthy = all(value == "ok" for value in checks.values())
+    if not healthy:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"status": "healthy" if healthy else "unhealthy", "checks": checks}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics (request latency, engine timings, cache hit rates)."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Cache statistics (hit rate, size, evictions)."""
+    shared = get_shared_cache()
+    return {
+        "render_cache": get_page_render_cache().stats(),
+        "metadata_cache": get_metadata_cache().stats(),
+        "text_map_cache": get_text_map_cache().stats(),
+        "shared_cache": shared.stats() if shared is not None else None,
+        "single_flight": get_single_flight().stats(),
+        "render_memory": get_render_memory().stats(),
+    }
 
@@ -1,6 +1,8 @@
 """Database models."""
 from app.models.base import Base
+from app.models.job import Job
 from app.models.pdf_document import PDFDocument
+from app.models.pdf_version import PDFVersion
 
-__all__ = ["Base", "PDFDocument"]
+__all__ = ["Base", "Job", "PDFDocument", "PDFVersion"]
 
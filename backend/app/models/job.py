@@ -0,0 +1,28 @@
+"""Background job database model."""
+from sqlalchemy import Boolean, Column, DateTime, Float, Integer, String, Text
+from sqlalchemy.sql import func
+
+from app.models.base import Base
+
+
+class Job(Base):
+    """Persistent record of a queued or running background operation."""
+
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True)  # UUID
+    kind = Column(String, nullable=False)  # "merge", "split", "rotate", "delete_pages"
+    status = Column(String, nullable=False, default="queued", index=True)
+    document_uuid = Column(String, nullable=True, index=True)  # Source document, if any
+    params = Column(Text, nullable=False, default="{}")  # JSON
+    result = Column(Text, nullable=True)  # JSON
+    error = Column(Text, nullable=True)
+    progress = Column(Float, nullable=False, default=0.0)  # 0.0 - 1.0
+    progress_message = Column(String, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,6 +1,6 @@
 """PDF document database model."""
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Text
 from sqlalchemy.sql import func
 
 from app.models.base import Base
@@ -16,6 +16,9 @@ class PDFDocument(Base):
     original_filename = Column(String, nullable=False)
     stored_path = Column(String, nullable=False)
     page_count = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Bumped on every content change
+    page_versions = Column(Text, nullable=True)  # JSON {"base": n, "pages": {page: n}}: version each page last changed in
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    last_accessed_at = Column(DateTime(timezone=True), nullable=True, index=True)
 
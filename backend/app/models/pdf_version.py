@@ -0,0 +1,37 @@
+"""PDF document version history model."""
+from sqlalchemy import Column, DateTime, Integer, String, Text, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.models.base import Base
+
+
+class PDFVersion(Base):
+    """
+    One version in a document's edit history.
+
+    Versions are incremental updates: the stored PDF at version N is the
+    file at its parent version plus the bytes [offset, size) appended by
+    the edit. A version with offset 0 is a full rewrite and starts a new
+    history.
+    """
+
+    __tablename__ = "pdf_versions"
+    __table_args__ = (UniqueConstraint("document_uuid", "number"),)
+
+    id = Column(Integer, primary_key=True)
+    document_uuid = Column(String, nullable=False, index=True)
+    number = Column(Integer, nullable=False)  # Matches pdf_documents.version
+    parent = Column(Integer, nullable=True)  # Previous version number (None for a full rewrite)
+    operation = Column(String, nullable=False)  # "upload", "edit_block", "rotate", ...
+    pages = Column(Text, nullable=True)  # JSON list of changed pages (None: all pages)
+    page_count = Column(Integer, nullable=False)
+    page_versions = Column(Text, nullable=True)  # JSON, see PDFDocument.page_versions
+    offset = Column(Integer, nullable=False)  # File size at the parent version
+    size = Column(Integer, nullable=False)  # File size at this version
+    checksum = Column(String, nullable=False)  # SHA-1 of the bytes before `size`
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    @property
+    def delta_size(self) -> int:
+        """Bytes this version added to the stored PDF."""
+        return self.size - self.offset
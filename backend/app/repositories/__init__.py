@@ -0,0 +1,4 @@
+"""Async data-access functions for database models."""
+from app.repositories import pdf_document
+
+__all__ = ["pdf_document"]
@@ -0,0 +1,73 @@
+"""Async repository functions for PDFDocument rows."""
+from typing import Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.pdf_document import PDFDocument
+
+
+async def get_by_uuid(db: AsyncSession, pdf_uuid: str) -> Optional[PDFDocument]:
+    """
+    Get a document by UUID.
+
+    Args:
+        db: Async database session
+        pdf_uuid: PDF document UUID
+
+    Returns:
+        Document row, or None if it doesn't exist
+    """
+    result = await db.execute(select(PDFDocument).where(PDFDocument.uuid == pdf_uuid))
+    return result.scalar_one_or_none()
+
+
+async def create(
+    db: AsyncSession,
+    *,
+    pdf_uuid: str,
+    original_filename: str,
+    stored_path: str,
+    page_count: int,
+) -> PDFDocument:
+    """
+    Insert a document row and commit.
+
+    Args:
+        db: Async database session
+        pdf_uuid: PDF document UUID
+        original_filename: Name shown to users and used for downloads
+        stored_path: Local path of the stored PDF
+        page_count: Number of pages
+
+    Returns:
+        Created document (server defaults loaded)
+    """
+    (db_pdf,) = await create_many(db, [{
+        "uuid": pdf_uuid,
+        "original_filename": original_filename,
+        "stored_path": stored_path,
+        "page_count": page_count,
+    }])
+    return db_pdf
+
+
+async def create_many(db: AsyncSession, rows: Iterable[dict]) -> List[PDFDocument]:
+    """
+    Insert several document rows in one transaction.
+
+    Args:
+        db: Async database session
+        rows: PDFDocument column values (uuid, original_filename, stored_path, page_count)
+
+    Returns:
+        Created documents (server defaults loaded)
+    """
+    documents = [PDFDocument(**row) for row in rows]
+    db.add_all(documents)
+    await db.commit()
+    for db_pdf in documents:
+        # Load server-side defaults (created_at, version, ...) without lazy IO later
+        await db.refresh(db_pdf)
+    return documents
+
@@ -0,0 +1,31 @@
+"""Background job schemas."""
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from pydantic import BaseModel, field_validator
+
+
+class JobResponse(BaseModel):
+    """Schema for job status API response."""
+
+    id: str
+    kind: str
+    status: str  # queued, running, succeeded, failed, cancelled
+    document_uuid: Optional[str] = None
+    progress: float
+    progress_message: Optional[str] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    cancel_requested: bool
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = {"from_attributes": True}
+
+    @field_validator("result", mode="before")
+    @classmethod
+    def _decode_result(cls, value):
+        """Results are stored as JSON text."""
+        return json.loads(value) if isinstance(value, str) else value
@@ -1,5 +1,5 @@
 """PDF text map schemas."""
-from typing import List, Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel
 
 
@@ -15,7 +15,7 @@ class BBox(BaseModel):
 class Word(BaseModel):
     """Word with bounding box and content."""
 
-    id: str  # e.g., "page-1-block-3-word-5"
+    id: str  # e.g., "page-1-word-3f9a0c12d4e5" (bbox + text digest)
     text: str
     bbox: BBox
     block_id: str  # Parent block ID
@@ -24,7 +24,7 @@ class Word(BaseModel):
 class TextBlock(BaseModel):
     """Text block with bounding box and content."""
 
-    id: str  # e.g., "page-1-block-3"
+    id: str  # e.g., "page-1-block-9b2e41d07a6c" (bbox + text digest)
     page_number: int  # 1-based page number
     bbox: BBox
     text: str
@@ -45,4 +45,6 @@ class BlockEditRequest(BaseModel):
     """Request schema for editing a text block."""
 
     new_text: str
+    auto_fit: bool = False  # Shrink the font so the whole text fits the block
+    mode: Optional[Literal["overlay", "redact"]] = None  # Defaults to TEXT_EDIT_MODE
 
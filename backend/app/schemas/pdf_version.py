@@ -0,0 +1,37 @@
+"""PDF version history schemas."""
+import json
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, field_validator
+
+
+class PDFVersionResponse(BaseModel):
+    """Schema for one version in a document's history."""
+
+    number: int
+    parent: Optional[int] = None  # None: full rewrite (history can't go further back)
+    operation: str
+    pages: Optional[List[int]] = None  # Changed pages, None for all pages
+    page_count: int
+    size: int  # PDF size at this version
+    delta_size: int  # Bytes this version added to the stored PDF
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+    @field_validator("pages", mode="before")
+    @classmethod
+    def _decode_pages(cls, value):
+        """Pages are stored as JSON text."""
+        return json.loads(value) if isinstance(value, str) else value
+
+
+class VersionHistoryResponse(BaseModel):
+    """Schema for a document's version history."""
+
+    pdf_uuid: str
+    current_version: int
+    can_undo: bool
+    can_redo: bool
+    versions: List[PDFVersionResponse]
@@ -1,6 +1,7 @@
 """Service layer for business logic."""
 from app.services.storage import PDFStorageService
 from app.services.pdf_engine import PDFEngine
+from app.services.text_layout import TextLayoutEngine
 
-__all__ = ["PDFStorageService", "PDFEngine"]
+__all__ = ["PDFStorageService", "PDFEngine", "TextLayoutEngine"]
 
@@ -0,0 +1,137 @@
+"""Per-document exclusive locks serializing changes to a stored PDF."""
+import asyncio
+import hashlib
+import os
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncIterator, Iterator, List, Optional
+
+from app.services.single_flight import LOCK_STRIPES, fcntl
+
+# Polling interval bounds while an async caller waits for a lock
+ASYNC_POLL_MIN_SECONDS = 0.005
+ASYNC_POLL_MAX_SECONDS = 0.1
+
+
+class DocumentLocks:
+    """
+    Exclusive locks held while a document's PDF and its database row change.
+
+    Everything that replaces a stored PDF holds its document's lock from
+    opening the PDF to recording the new version (open, save, commit_pdf,
+    mark_document_modified), so concurrent edits, jobs and undo/redo never
+    build on a file another writer is about to replace, and the file and
+    the version recorded for it can't get out of step. Reads don't take it:
+    stored PDFs are only ever replaced by atomic renames.
+
+    Within a process the lock is a threading lock; across the worker
+    processes of a node, a file lock in lock_dir. Documents are hashed onto
+    LOCK_STRIPES locks, so unrelated documents occasionally wait for each
+    other; a holder never takes a second document lock.
+    """
+
+    def __init__(self, lock_dir: Optional[Path] = None):
+        """
+        Initialize document locks.
+
+        Args:
+            lock_dir: Directory for cross-process lock files (None: in-process only)
+        """
+        self.lock_dir = Path(lock_dir) if lock_dir is not None else None
+        if self.lock_dir is not None:
+            self.lock_dir.mkdir(parents=True, exist_ok=True)
+        self._locks: List[threading.Lock] = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        # Lock file descriptors of the stripes held by this process
+        self._fds: List[Optional[int]] = [None] * LOCK_STRIPES
+
+    @staticmethod
+    def _stripe(pdf_uuid: str) -> int:
+        return int(hashlib.sha1(pdf_uuid.encode()).hexdigest(), 16) % LOCK_STRIPES
+
+    def _lock_file(self, stripe: int, blocking: bool) -> bool:
+        """Take a stripe's lock file (the stripe's threading lock must be held)."""
+        if self.lock_dir is None or fcntl is None:
+            return True
+        # Not the single-flight lock files: a writer holding this may render
+        fd = os.open(self.lock_dir / f"doc-{stripe:02x}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fds[stripe] = fd
+        return True
+
+    def _acquire(self, stripe: int, blocking: bool) -> bool:
+        if not self._locks[stripe].acquire(blocking):
+            return False
+        try:
+            if self._lock_file(stripe, blocking):
+                return True
+        except BaseException:
+            self._locks[stripe].release()
+            raise
+        self._locks[stripe].release()
+        return False
+
+    def _release(self, stripe: int) -> None:
+        fd = self._fds[stripe]
+        if fd is not None:
+            self._fds[stripe] = None
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        self._locks[stripe].release()
+
+    @contextmanager
+    def hold(self, pdf_uuid: str) -> Iterator[None]:
+        """
+        Hold a document's lock for the duration of a block, waiting for it if needed.
+
+        Args:
+            pdf_uuid: PDF document UUID
+        """
+        stripe = self._stripe(pdf_uuid)
+        self._acquire(stripe, blocking=True)
+        try:
+            yield
+        finally:
+            self._release(stripe)
+
+    @asynccontextmanager
+    async def hold_async(self, pdf_uuid: str) -> AsyncIterator[None]:
+        """
+        Async variant of hold() for async endpoints.
+
+        Waits by polling, so waiting doesn't occupy a threadpool thread.
+
+        Args:
+            pdf_uuid: PDF document UUID
+        """
+        stripe = self._stripe(pdf_uuid)
+        delay = ASYNC_POLL_MIN_SECONDS
+        while not self._acquire(stripe, blocking=False):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, ASYNC_POLL_MAX_SECONDS)
+        try:
+            yield
+        finally:
+            self._release(stripe)
+
+
+@lru_cache(maxsize=None)
+def open_document_locks(lock_dir: Optional[str] = None) -> DocumentLocks:
+    """
+    Get the process-wide document locks for a lock directory.
+
+    Args:
+        lock_dir: Directory for cross-process lock files (None: in-process only)
+
+    Returns:
+        Document locks
+    """
+    return DocumentLocks(Path(lock_dir) if lock_dir else None)
@@ -0,0 +1,373 @@
+"""Per-document change notifications for event streams (SQLite file, Redis or in-process)."""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+EVENT_BACKENDS = ("local", "sqlite", "redis")
+
+# Event types
+PAGE_RENDERED = "page_rendered"
+TEXT_MAP_READY = "text_map_ready"
+VERSION_CHANGED = "version_changed"
+JOB_PROGRESS = "job_progress"
+# Sent instead of events a slow subscriber missed: refetch everything shown
+RESYNC = "resync"
+
+
+@dataclass
+class DocumentEvent:
+    """Something that changed for a document."""
+
+    pdf_uuid: str
+    type: str
+    data: dict = field(default_factory=dict)
+
+    def to_json(self) -> str:
+        return json.dumps({"pdf_uuid": self.pdf_uuid, "type": self.type, "data": self.data})
+
+    @classmethod
+    def from_json(cls, raw) -> "DocumentEvent":
+        values = json.loads(raw)
+        return cls(values["pdf_uuid"], values["type"], values.get("data") or {})
+
+
+class Subscription:
+    """
+    Events of one document for one stream, queued on the subscriber's event loop.
+
+    Events may be published from any thread. A subscriber that falls more
+    than max_pending events behind gets a single "resync" event instead.
+    """
+
+    def __init__(self, bus: "EventBus", pdf_uuid: str, max_pending: int):
+        self.bus = bus
+        self.pdf_uuid = pdf_uuid
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue(max_pending)
+
+    def push(self, event: DocumentEvent) -> None:
+        """Queue an event (thread-safe)."""
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # Event loop closed: the stream is gone
+            self.close()
+
+    def _put(self, event: DocumentEvent) -> None:
+        if self._queue.full():
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            event = DocumentEvent(self.pdf_uuid, RESYNC)
+        self._queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> Optional[DocumentEvent]:
+        """
+        Wait for the next event.
+
+        Args:
+            timeout: Seconds to wait
+
+        Returns:
+            Event, or None if none arrived in time
+        """
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        """Stop receiving events."""
+        self.bus.unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class EventBus(ABC):
+    """
+    Publishes document events to the streams subscribed to them.
+
+    Every process delivers to its own subscribers; backends differ in how
+    an event reaches the other processes. Publishing is best effort:
+    backend errors are logged and never fail the request that caused the
+    event, since clients resynchronize from the snapshot sent when they
+    reconnect.
+    """
+
+    def __init__(self, max_pending: int = 256):
+        """
+        Initialize event bus.
+
+        Args:
+            max_pending: Events queued per subscriber before it must resync
+        """
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        # Weak, so a stream that never started can't leak its subscription
+        self._subscribers: "weakref.WeakSet[Subscription]" = weakref.WeakSet()
+        self.published = 0
+
+    @abstractmethod
+    def _send(self, event: DocumentEvent) -> None:
+        """Hand an event to every process (which calls _deliver())."""
+
+    def _start(self) -> None:
+        """Called when this process gets its first subscriber."""
+
+    def publish(self, pdf_uuid: str, event_type: str, **data) -> None:
+        """
+        Publish an event for a document.
+
+        Args:
+            pdf_uuid: PDF document UUID
+            event_type: Event type (PAGE_RENDERED, VERSION_CHANGED, ...)
+            **data: JSON-serializable event data
+        """
+        try:
+            self._send(DocumentEvent(pdf_uuid, event_type, data))
+            self.published += 1
+        except Exception as e:
+            logger.warning(f"Failed to publish {event_type} for {pdf_uuid}: {e}")
+
+    def subscribe(self, pdf_uuid: str) -> Subscription:
+        """
+        Subscribe to a document's events (call from the stream's event loop).
+
+        Args:
+            pdf_uuid: PDF document UUID
+
+        Returns:
+            Subscription (close it, or use it as a context manager)
+        """
+        subscription = Subscription(self, pdf_uuid, self.max_pending)
+        with self._lock:
+            first = not self._subscribers
+            self._subscribers.add(subscription)
+        if first:
+            self._start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscription."""
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        """Open subscriptions in this process."""
+        return len(self._subscribers)
+
+    def _deliver(self, event: DocumentEvent) -> None:
+        with self._lock:
+            subscribers = [s for s in self._subscribers if s.pdf_uuid == event.pdf_uuid]
+        for subscription in subscribers:
+            subscription.push(event)
+
+    def close(self) -> None:
+        """Release backend resources."""
+
+
+class LocalEventBus(EventBus):
+    """Events seen only by streams served by the publishing process."""
+
+    def _send(self, event: DocumentEvent) -> None:
+        self._deliver(event)
+
+
+class _ListenerBus(EventBus):
+    """Bus whose events arrive through a listener thread, run while anyone is subscribed."""
+
+    def __init__(self, max_pending: int = 256):
+        super().__init__(max_pending)
+        self._listener: Optional[threading.Thread] = None
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(
+                target=self._run_listener, name=f"{type(self).__name__}-listener", daemon=True
+            )
+            self._listener.start()
+
+    def _run_listener(self) -> None:
+        try:
+            self._listen()
+        except Exception:
+            logger.exception("Event listener stopped")
+        finally:
+            with self._lock:
+                self._listener = None
+                restart = bool(self._subscribers)
+            if restart:
+                # Subscribed while the listener was stopping
+                time.sleep(1.0)
+                self._start()
+
+    @abstractmethod
+    def _listen(self) -> None:
+        """Deliver incoming events until there are no subscribers left."""
+
+
+class SQLiteEventBus(_ListenerBus):
+    """
+    Events in a SQLite file on local disk (all workers of one node).
+
+    Published events are appended to a table that each process with
+    subscribers reads every poll_interval; rows are kept for
+    retention_seconds.
+    """
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS events ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, created_at REAL NOT NULL)",
+    )
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        poll_interval: float = 0.1,
+        retention_seconds: float = 60.0,
+        max_pending: int = 256,
+    ):
+        """
+        Initialize SQLite event bus.
+
+        Args:
+            path: Database file (created if missing)
+            poll_interval: Seconds between reads of new events
+            retention_seconds: How long published events are kept
+            max_pending: Events queued per subscriber before it must resync
+        """
+        super().__init__(max_pending)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self._local = threading.local()
+        self._connections = []
+        self._pruned_at = 0.0
+        with self._connect() as conn:
+            for statement in self._SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _send(self, event: DocumentEvent) -> None:
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO events (payload, created_at) VALUES (?, ?)", (event.to_json(), now)
+        )
+        if now - self._pruned_at > self.retention_seconds / 4:
+            self._pruned_at = now
+            conn.execute("DELETE FROM events WHERE created_at < ?", (now - self.retention_seconds,))
+
+    def _listen(self) -> None:
+        conn = self._connect()
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+        while self.subscriber_count:
+            rows = conn.execute(
+                "SELECT id, payload FROM events WHERE id > ? ORDER BY id", (last_id,)
+            ).fetchall()
+            for last_id, payload in rows:
+                self._deliver(DocumentEvent.from_json(payload))
+            time.sleep(self.poll_interval)
+
+    def close(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+class RedisEventBus(_ListenerBus):
+    """Events over Redis pub/sub (all workers of all nodes)."""
+
+    def __init__(self, client=None, *, url: Optional[str] = None, prefix: str = "aeropdf:",
+                 max_pending: int = 256):
+        """
+        Initialize Redis event bus.
+
+        Args:
+            client: Pre-built redis client (built from url if None)
+            url: Redis URL, e.g. redis://localhost:6379/0
+            prefix: Channel prefix
+            max_pending: Events queued per subscriber before it must resync
+        """
+        super().__init__(max_pending)
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:  # pragma: no cover - depends on environment
+                raise RuntimeError("Redis event bus requires redis (pip install redis)") from e
+            client = redis.Redis.from_url(url, socket_timeout=1.0)
+        self.client = client
+        self.channel_prefix = f"{prefix}events:"
+
+    def _send(self, event: DocumentEvent) -> None:
+        self.client.publish(self.channel_prefix + event.pdf_uuid, event.to_json())
+
+    def _listen(self) -> None:
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.psubscribe(self.channel_prefix + "*")
+            while self.subscriber_count:
+                message = pubsub.get_message(timeout=0.5)
+                if message is not None:
+                    self._deliver(DocumentEvent.from_json(message["data"]))
+        finally:
+            pubsub.close()
+
+    def close(self) -> None:
+        self.client.close()
+
+
+@lru_cache(maxsize=None)
+def open_event_bus(backend: str, path: str, redis_url: Optional[str] = None) -> EventBus:
+    """
+    Get the process-wide event bus for a configuration.
+
+    Args:
+        backend: "local", "sqlite" or "redis"
+        path: SQLite database file
+        redis_url: Redis URL for the redis backend
+
+    Returns:
+        Event bus
+
+    Raises:
+        ValueError: If backend is unknown
+    """
+    if backend not in EVENT_BACKENDS:
+        raise ValueError(f"EVENTS_BACKEND must be one of {', '.join(EVENT_BACKENDS)}")
+    if backend == "redis":
+        return RedisEventBus(url=redis_url)
+    if backend == "sqlite":
+        return SQLiteEventBus(path)
+    return LocalEventBus()
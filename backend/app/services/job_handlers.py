@@ -0,0 +1,258 @@
+"""Job handlers for merge, split, rotate, delete-pages and optimize."""
+import logging
+import uuid
+from dataclasses import asdict
+from pathlib import Path
+from typing import Callable, Dict
+
+from sqlalchemy.orm import Session
+
+from app.models.pdf_document import PDFDocument
+from app.models.pdf_version import PDFVersion
+from app.services.document_locks import DocumentLocks
+from app.services.jobs import JobConflict, JobContext, JobHandler, remove_job_inputs
+from app.services.metadata_cache import DocumentMeta, DocumentMetadataCache, mark_document_modified
+from app.services.pdf_engine import PDFEngine
+from app.services.render_cache import RenderCache
+from app.services.storage import PDFStorageService
+from app.services.versions import VersionHistory
+
+logger = logging.getLogger(__name__)
+
+
+def new_job_input_dir(storage: PDFStorageService) -> Path:
+    """
+    Create a directory for a job's uploaded inputs.
+
+    Pass it as the "input_dir" parameter; it is removed when the job ends
+    or is cancelled.
+
+    Args:
+        storage: Storage service
+
+    Returns:
+        Path to the new directory
+    """
+    path = storage.base_dir / "jobs" / str(uuid.uuid4())
+    path.mkdir(parents=True)
+    return path
+
+
+def build_job_handlers(
+    storage: PDFStorageService,
+    engine: PDFEngine,
+    session_factory: Callable[[], Session],
+    render_cache: RenderCache,
+    meta_cache: DocumentMetadataCache,
+    history: VersionHistory,
+    locks: DocumentLocks,
+) -> Dict[str, JobHandler]:
+    """
+    Build the handler for every job kind.
+
+    Args:
+        storage: Storage service
+        engine: PDF engine
+        session_factory: Callable returning a new database session
+        render_cache: Render cache (edited pages are invalidated)
+        meta_cache: Metadata cache of this process
+        history: Version history (in-place operations record a version)
+        locks: Document locks, held by in-place operations until the change is recorded
+
+    Returns:
+        Handler per job kind
+    """
+
+    def merge(ctx: JobContext) -> dict:
+        input_paths = [Path(p) for p in ctx.params["input_paths"]]
+        pdf_uuid = str(uuid.uuid4())
+        try:
+            merged_path = storage.new_pdf_path(pdf_uuid)
+            page_count = engine.merge_files(input_paths, merged_path, progress=ctx.progress)
+            storage.commit_pdf(pdf_uuid)
+            ctx.check_cancelled()
+        except BaseException:
+            storage.delete_pdf(pdf_uuid)
+            raise
+        finally:
+            remove_job_inputs(ctx.params)
+
+        db = session_factory()
+        try:
+            db.add(PDFDocument(
+                uuid=pdf_uuid,
+                original_filename=ctx.params.get("filename") or f"merged_{pdf_uuid[:8]}.pdf",
+                stored_path=str(merged_path),
+                page_count=page_count,
+            ))
+            db.commit()
+        finally:
+            db.close()
+        return {"uuid": pdf_uuid, "page_count": page_count}
+
+    def split(ctx: JobContext) -> dict:
+        source_uuid = ctx.document_uuid
+        db = session_factory()
+        try:
+            source = db.query(PDFDocument).filter(PDFDocument.uuid == source_uuid).first()
+            if source is None:
+                raise ValueError(f"PDF not found: {source_uuid}")
+            original_filename = source.original_filename
+        finally:
+            db.close()
+
+        page_ranges = ctx.params["page_ranges"]
+        split_uuids = [str(uuid.uuid4()) for _ in page_ranges]
+        try:
+            ranges = engine.split_pages(
+                storage.get_pdf_path(source_uuid),
+                page_ranges,
+                lambda index: storage.new_pdf_path(split_uuids[index]),
+                progress=lambda fraction, message: ctx.progress(fraction * 0.9, message),
+            )
+            for split_uuid in split_uuids:
+                storage.commit_pdf(split_uuid)
+            ctx.check_cancelled()
+        except BaseException:
+            for split_uuid in split_uuids:
+                storage.delete_pdf(split_uuid)
+            raise
+
+        db = session_factory()
+        try:
+            db.add_all([
+                PDFDocument(
+                    uuid=split_uuid,
+                    original_filename=f"{original_filename}_split_{start + 1}-{end + 1}.pdf",
+                    stored_path=str(storage.new_pdf_path(split_uuid)),
+                    page_count=end - start + 1,
+                )
+                for split_uuid, (start, end) in zip(split_uuids, ranges)
+            ])
+            db.commit()
+        finally:
+            db.close()
+        return {"split_uuids": split_uuids}
+
+    def load_meta(pdf_uuid: str) -> DocumentMeta:
+        db = session_factory()
+        try:
+            source = db.query(PDFDocument).filter(PDFDocument.uuid == pdf_uuid).first()
+            if source is None:
+                raise ValueError(f"PDF not found: {pdf_uuid}")
+            return DocumentMeta.from_model(source)
+        finally:
+            db.close()
+
+    def record_change(pdf_uuid: str, operation: str, **changes) -> None:
+        db = session_factory()
+        try:
+            mark_document_modified(db, meta_cache, history, pdf_uuid, operation=operation, **changes)
+        finally:
+            db.close()
+
+    def applied_by_earlier_run(ctx: JobContext, before: DocumentMeta) -> bool:
+        """
+        Whether an earlier run of this job already changed the document.
+
+        Jobs run at least once: a worker that dies after changing a document
+        but before the job is marked done leaves it to be run again. The
+        change was already made if the only version recorded since the one
+        the job was submitted at is the current one, made by this kind of
+        job.
+
+        Raises:
+            JobConflict: If the document changed some other way since the
+                job was submitted
+        """
+        submitted = ctx.params.get("version")
+        if submitted is None or before.version == submitted:
+            return False
+        db = session_factory()
+        try:
+            later = (
+                db.query(PDFVersion)
+                .filter(PDFVersion.document_uuid == before.uuid, PDFVersion.number > submitted)
+                .all()
+            )
+        finally:
+            db.close()
+        if (
+            len(later) == 1
+            and later[0].number == before.version
+            and later[0].operation == ctx.job.kind
+            and later[0].parent in (submitted, None)
+        ):
+            logger.info(f"Job {ctx.job_id} ({ctx.job.kind}) already made version {before.version}")
+            return True
+        raise JobConflict(
+            f"Document changed since the job was submitted "
+            f"(version {submitted}, now {before.version})"
+        )
+
+    def invalidate_renders(before: DocumentMeta, page_numbers) -> None:
+        for page_number in page_numbers:
+            render_cache.invalidate(
+                storage.get_render_path(before.uuid, page_number, before.page_version(page_number))
+            )
+
+    def rotate(ctx: JobContext) -> dict:
+        pdf_uuid = ctx.document_uuid
+        page_numbers = ctx.params["page_numbers"]
+        angle = ctx.params["angle"]
+        ctx.progress(0.1, "Rotating pages")
+        with locks.hold(pdf_uuid):
+            before = load_meta(pdf_uuid)
+            if applied_by_earlier_run(ctx, before):
+                return {"message": f"Rotated {len(page_numbers)} page(s) by {angle} degrees"}
+            engine.rotate_pages(storage.get_pdf_path(pdf_uuid), page_numbers, angle)
+            storage.commit_pdf(pdf_uuid)
+            record_change(pdf_uuid, "rotate", pages=page_numbers)
+        invalidate_renders(before, page_numbers)
+        return {"message": f"Rotated {len(page_numbers)} page(s) by {angle} degrees"}
+
+    def delete_pages(ctx: JobContext) -> dict:
+        pdf_uuid = ctx.document_uuid
+        page_numbers = ctx.params["page_numbers"]
+        ctx.progress(0.1, "Deleting pages")
+        with locks.hold(pdf_uuid):
+            before = load_meta(pdf_uuid)
+            if applied_by_earlier_run(ctx, before):
+                return {
+                    "message": f"Deleted {len(page_numbers)} page(s)",
+                    "new_page_count": before.page_count,
+                }
+            new_page_count = engine.delete_pages(storage.get_pdf_path(pdf_uuid), page_numbers)
+            storage.commit_pdf(pdf_uuid)
+            record_change(pdf_uuid, "delete_pages", page_count=new_page_count)
+        invalidate_renders(before, range(1, before.page_count + 1))
+        return {
+            "message": f"Deleted {len(page_numbers)} page(s)",
+            "new_page_count": new_page_count,
+        }
+
+    def optimize(ctx: JobContext) -> dict:
+        pdf_uuid = ctx.document_uuid
+        ctx.progress(0.1, "Optimizing")
+        with locks.hold(pdf_uuid):
+            before = load_meta(pdf_uuid)
+            result = engine.optimize(
+                storage.get_pdf_path(pdf_uuid),
+                image_dpi=ctx.params.get("image_dpi"),
+                subset_fonts=ctx.params.get("subset_fonts", True),
+                progress=ctx.progress,
+            )
+            if result.replaced:
+                storage.commit_pdf(pdf_uuid)
+                record_change(pdf_uuid, "optimize")
+        if result.replaced:
+            invalidate_renders(before, range(1, before.page_count + 1))
+        return asdict(result)
+
+    return {
+        "merge": merge,
+        "split": split,
+        "rotate": rotate,
+        "delete_pages": delete_pages,
+        "optimize": optimize,
+    }
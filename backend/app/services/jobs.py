@@ -0,0 +1,464 @@
+"""Database-backed queue for long-running PDF operations."""
+import asyncio
+import json
+import logging
+import os
+import shutil
+import socket
+import uuid
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.tracing import span
+from app.models.job import Job
+from app.services.events import JOB_PROGRESS, EventBus
+from app.services.retention import utcnow
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+TERMINAL_STATUSES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+
+def remove_job_inputs(params: dict) -> None:
+    """
+    Remove a job's input directory, if it has one.
+
+    Args:
+        params: Job parameters
+    """
+    if params.get("input_dir"):
+        shutil.rmtree(params["input_dir"], ignore_errors=True)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job handler when cancellation was requested."""
+
+
+class JobConflict(Exception):
+    """Raised inside a job handler when its document changed since the job was submitted."""
+
+
+class JobContext:
+    """Handle given to job handlers for parameters, progress and cancellation."""
+
+    def __init__(self, queue: "JobQueue", job: Job):
+        self.queue = queue
+        self.job = job
+        self.job_id = job.id
+        self.fraction = job.progress or 0.0
+        self.document_uuid = job.document_uuid
+        self.params = json.loads(job.params or "{}")
+
+    def progress(self, fraction: float, message: Optional[str] = None) -> None:
+        """
+        Report progress (also a heartbeat) and stop if cancellation was requested.
+
+        Args:
+            fraction: Work done, 0.0 - 1.0
+            message: Short human-readable status
+
+        Raises:
+            JobCancelled: If the job was cancelled
+        """
+        self.fraction = fraction
+        cancel_requested = self.queue.update_progress(self.job_id, fraction, message)
+        self.queue.notify(self.job, JOB_RUNNING, fraction, message)
+        if cancel_requested:
+            raise JobCancelled(self.job_id)
+
+    def check_cancelled(self) -> None:
+        """
+        Stop if cancellation was requested.
+
+        Raises:
+            JobCancelled: If the job was cancelled
+        """
+        if self.queue.is_cancel_requested(self.job_id):
+            raise JobCancelled(self.job_id)
+
+
+# A handler does the work and returns a JSON-serializable result
+JobHandler = Callable[[JobContext], dict]
+
+
+class JobQueue:
+    """
+    Persistent job queue on the application database.
+
+    Jobs are claimed with a conditional UPDATE (status must still be
+    "queued"), so any number of worker threads and processes can poll the
+    same table without running a job twice. Running jobs heartbeat through
+    progress updates; jobs whose worker died are requeued after
+    stale_after, up to max_attempts times. Progress of jobs on a document
+    is also published as job_progress events.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        stale_after: timedelta = timedelta(minutes=5),
+        max_attempts: int = 3,
+        events: Optional[EventBus] = None,
+    ):
+        """
+        Initialize job queue.
+
+        Args:
+            session_factory: Callable returning a new database session
+            stale_after: Heartbeat age after which a running job is considered dead
+            max_attempts: Runs allowed before a repeatedly dying job is failed
+            events: Event bus for job progress events (None disables them)
+        """
+        self.session_factory = session_factory
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self.events = events
+
+    def _detached(self, db: Session, job: Optional[Job]) -> Optional[Job]:
+        """Load a job's attributes and detach it so it outlives the session."""
+        if job is not None:
+            db.refresh(job)
+            db.expunge(job)
+        return job
+
+    def submit(self, kind: str, params: dict, *, document_uuid: Optional[str] = None) -> Job:
+        """
+        Queue a job.
+
+        Args:
+            kind: Handler name (e.g. "merge")
+            params: JSON-serializable handler parameters
+            document_uuid: Document the job operates on, if any
+
+        Returns:
+            Queued job
+        """
+        db = self.session_factory()
+        try:
+            job = Job(
+                id=str(uuid.uuid4()),
+                kind=kind,
+                status=JOB_QUEUED,
+                document_uuid=document_uuid,
+                params=json.dumps(params),
+                progress=0.0,
+                cancel_requested=False,
+                attempts=0,
+            )
+            db.add(job)
+            db.commit()
+            return self._detached(db, job)
+        finally:
+            db.close()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        Get a job by id.
+
+        Args:
+            job_id: Job id
+
+        Returns:
+            Job, or None if it doesn't exist
+        """
+        db = self.session_factory()
+        try:
+            return self._detached(db, db.get(Job, job_id))
+        finally:
+            db.close()
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a job.
+
+        Queued jobs are cancelled immediately (and their inputs removed);
+        running jobs are flagged and stop at their next progress report.
+
+        Args:
+            job_id: Job id
+
+        Returns:
+            Updated job, or None if it doesn't exist
+        """
+        db = self.session_factory()
+        try:
+            now = utcnow()
+            cancelled = db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JOB_QUEUED)
+                .values(status=JOB_CANCELLED, cancel_requested=True, finished_at=now)
+            ).rowcount
+            db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JOB_RUNNING)
+                .values(cancel_requested=True)
+            )
+            db.commit()
+            job = self._detached(db, db.get(Job, job_id))
+        finally:
+            db.close()
+        if cancelled:
+            # Never runs, so no handler will clean up its inputs
+            remove_job_inputs(json.loads(job.params or "{}"))
+        return job
+
+    def claim(self, worker_id: str, kinds: Iterable[str]) -> Optional[Job]:
+        """
+        Claim the oldest queued job of the given kinds.
+
+        Args:
+            worker_id: Identifier of the claiming worker
+            kinds: Job kinds the worker can run
+
+        Returns:
+            Claimed job (now "running"), or None if the queue is empty
+        """
+        db = self.session_factory()
+        try:
+            for _ in range(5):  # Retry when another worker wins the race
+                candidate = (
+                    db.query(Job.id)
+                    .filter(Job.status == JOB_QUEUED, Job.kind.in_(list(kinds)))
+                    .order_by(Job.created_at, Job.id)
+                    .first()
+                )
+                if candidate is None:
+                    return None
+                now = utcnow()
+                claimed = db.execute(
+                    update(Job)
+                    .where(Job.id == candidate.id, Job.status == JOB_QUEUED)
+                    .values(
+                        status=JOB_RUNNING,
+                        worker_id=worker_id,
+                        started_at=now,
+                        heartbeat_at=now,
+                        attempts=Job.attempts + 1,
+                    )
+                ).rowcount
+                db.commit()
+                if claimed:
+                    return self._detached(db, db.get(Job, candidate.id))
+            return None
+        finally:
+            db.close()
+
+    def update_progress(self, job_id: str, fraction: float, message: Optional[str] = None) -> bool:
+        """
+        Record progress and heartbeat for a running job.
+
+        Args:
+            job_id: Job id
+            fraction: Work done, 0.0 - 1.0
+            message: Short human-readable status
+
+        Returns:
+            True if cancellation was requested
+        """
+        db = self.session_factory()
+        try:
+            values = {"progress": max(0.0, min(1.0, fraction)), "heartbeat_at": utcnow()}
+            if message is not None:
+                values["progress_message"] = message
+            db.execute(update(Job).where(Job.id == job_id).values(**values))
+            db.commit()
+            return bool(db.query(Job.cancel_requested).filter(Job.id == job_id).scalar())
+        finally:
+            db.close()
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        """Check whether cancellation of a job was requested."""
+        db = self.session_factory()
+        try:
+            return bool(db.query(Job.cancel_requested).filter(Job.id == job_id).scalar())
+        finally:
+            db.close()
+
+    def notify(
+        self, job: Job, status: str, progress: float, message: Optional[str] = None
+    ) -> None:
+        """
+        Publish a job_progress event for a job that operates on a document.
+
+        Args:
+            job: Job
+            status: Job status
+            progress: Work done, 0.0 - 1.0
+            message: Short human-readable status
+        """
+        if self.events is None or job.document_uuid is None:
+            return
+        self.events.publish(
+            job.document_uuid,
+            JOB_PROGRESS,
+            job_id=job.id,
+            kind=job.kind,
+            status=status,
+            progress=max(0.0, min(1.0, progress)),
+            message=message,
+        )
+
+    def _finish(self, job_id: str, **values) -> None:
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JOB_RUNNING)
+                .values(finished_at=utcnow(), **values)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def run(self, job: Job, handlers: Dict[str, JobHandler]) -> None:
+        """
+        Run a claimed job to completion, recording its outcome.
+
+        Args:
+            job: Claimed job
+            handlers: Handler per job kind
+        """
+        handler = handlers.get(job.kind)
+        if handler is None:
+            error = f"Unknown job kind: {job.kind}"
+            self._finish(job.id, status=JOB_FAILED, error=error)
+            remove_job_inputs(json.loads(job.params or "{}"))
+            self.notify(job, JOB_FAILED, 0.0, error)
+            return
+
+        context = JobContext(self, job)
+        self.notify(job, JOB_RUNNING, context.fraction)
+        try:
+            context.check_cancelled()
+            with span(f"job.{job.kind}", job_id=job.id):
+                result = handler(context)
+        except JobCancelled:
+            logger.info(f"Job {job.id} ({job.kind}) cancelled")
+            self._finish(job.id, status=JOB_CANCELLED)
+            self.notify(job, JOB_CANCELLED, context.fraction)
+        except Exception as e:
+            logger.exception(f"Job {job.id} ({job.kind}) failed")
+            error = str(e) or type(e).__name__
+            self._finish(job.id, status=JOB_FAILED, error=error)
+            self.notify(job, JOB_FAILED, context.fraction, error)
+        else:
+            self._finish(
+                job.id,
+                status=JOB_SUCCEEDED,
+                progress=1.0,
+                result=json.dumps(result),
+            )
+            self.notify(job, JOB_SUCCEEDED, 1.0)
+
+    def requeue_stale(self) -> int:
+        """
+        Requeue running jobs whose worker stopped heartbeating.
+
+        Jobs that already used max_attempts runs are failed instead, and
+        their inputs removed.
+
+        Returns:
+            Number of jobs requeued or failed
+        """
+        cutoff = utcnow() - self.stale_after
+        db = self.session_factory()
+        try:
+            stale = (Job.status == JOB_RUNNING, Job.heartbeat_at < cutoff)
+            exhausted = db.query(Job.id, Job.params).filter(
+                *stale, Job.attempts >= self.max_attempts
+            ).all()
+            failed = []
+            for job_id, params in exhausted:
+                if db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, *stale)
+                    .values(status=JOB_FAILED, error="Worker stopped responding", finished_at=utcnow())
+                ).rowcount:
+                    failed.append(params)
+            requeued = db.execute(
+                update(Job).where(*stale).values(status=JOB_QUEUED, worker_id=None)
+            ).rowcount
+            db.commit()
+        finally:
+            db.close()
+        for params in failed:
+            remove_job_inputs(json.loads(params or "{}"))
+        if failed or requeued:
+            logger.warning(f"Requeued {requeued} and failed {len(failed)} stale job(s)")
+        return len(failed) + requeued
+
+
+def default_worker_id() -> str:
+    """Identifier for this process, e.g. "host:1234"."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def run_job_worker(
+    queue: JobQueue,
+    handlers: Dict[str, JobHandler],
+    *,
+    concurrency: int = 2,
+    poll_interval: float = 1.0,
+    worker_id: Optional[str] = None,
+) -> None:
+    """
+    Claim and run jobs forever, at most `concurrency` at a time.
+
+    Jobs run in worker threads so the event loop stays free.
+
+    Args:
+        queue: Job queue
+        handlers: Handler per job kind
+        concurrency: Maximum jobs running at once in this process
+        poll_interval: Delay between polls when the queue is empty
+        worker_id: Worker identifier (defaults to host:pid)
+    """
+    worker_id = worker_id or default_worker_id()
+    slots = asyncio.Semaphore(concurrency)
+    running = set()
+    last_stale_check = 0.0
+    loop = asyncio.get_running_loop()
+
+    async def run_one(job: Job) -> None:
+        try:
+            await asyncio.to_thread(queue.run, job, handlers)
+        finally:
+            slots.release()
+
+    try:
+        while True:
+            await slots.acquire()
+            try:
+                if loop.time() - last_stale_check >= queue.stale_after.total_seconds() / 2:
+                    last_stale_check = loop.time()
+                    await asyncio.to_thread(queue.requeue_stale)
+                job = await asyncio.to_thread(queue.claim, worker_id, handlers.keys())
+            except Exception:
+                slots.release()
+                logger.exception("Job worker poll failed")
+                await asyncio.sleep(poll_interval)
+                continue
+
+            if job is None:
+                slots.release()
+                await asyncio.sleep(poll_interval)
+                continue
+
+            logger.info(f"Worker {worker_id} running job {job.id} ({job.kind})")
+            task = asyncio.create_task(run_one(job))
+            running.add(task)
+            task.add_done_callback(running.discard)
+    finally:
+        # Let in-flight jobs finish their current step; the threads can't be
+        # interrupted, and unfinished jobs are requeued once stale.
+        for task in running:
+            task.cancel()
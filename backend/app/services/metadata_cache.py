@@ -0,0 +1,246 @@
+"""In-process cache of PDF document metadata."""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.metrics import record_cache_lookup
+from app.models.pdf_document import PDFDocument
+from app.services.retention import ACCESS_TOUCH_INTERVAL, record_access, utcnow
+from app.services.versions import VersionHistory, page_version, parse_page_versions
+
+
+@dataclass(frozen=True)
+class DocumentMeta:
+    """Immutable snapshot of the document fields hot read paths need."""
+
+    id: int
+    uuid: str
+    original_filename: str
+    stored_path: str
+    page_count: int
+    version: int
+    last_accessed_at: Optional[datetime] = None
+    page_versions: Optional[dict] = None
+
+    @classmethod
+    def from_model(cls, db_pdf: PDFDocument) -> "DocumentMeta":
+        """Build a snapshot from a database row."""
+        return cls(
+            id=db_pdf.id,
+            uuid=db_pdf.uuid,
+            original_filename=db_pdf.original_filename,
+            stored_path=db_pdf.stored_path,
+            page_count=db_pdf.page_count,
+            version=db_pdf.version or 1,
+            last_accessed_at=db_pdf.last_accessed_at,
+            page_versions=parse_page_versions(db_pdf.page_versions),
+        )
+
+    def page_version(self, page_number: int) -> int:
+        """Version in which a page last changed (renders and text maps are cached under it)."""
+        return page_version(self.page_versions, self.version, page_number)
+
+    def needs_access_touch(self) -> bool:
+        """Whether last_accessed_at is stale enough to be written again."""
+        last = self.last_accessed_at
+        return last is None or last.replace(tzinfo=None) <= utcnow() - ACCESS_TOUCH_INTERVAL
+
+
+class DocumentMetadataCache:
+    """
+    LRU cache of uuid -> DocumentMeta with a TTL.
+
+    Writers in this process invalidate entries explicitly; the TTL bounds
+    how long another worker's change can go unnoticed.
+
+    Unlike text maps, metadata is not kept in the shared cache tier: its key
+    can't carry the version it is the source of, so a worker could put back
+    a row another worker just invalidated.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, max_entries: int = 10000):
+        """
+        Initialize metadata cache.
+
+        Args:
+            ttl_seconds: Entry lifetime (0 disables caching)
+            max_entries: Maximum cached documents
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, pdf_uuid: str) -> Optional[DocumentMeta]:
+        """
+        Get cached metadata.
+
+        Args:
+            pdf_uuid: PDF document UUID
+
+        Returns:
+            Cached metadata, or None on a miss or expired entry
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(pdf_uuid)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[pdf_uuid]
+                self.misses += 1
+                meta = None
+            else:
+                self._entries.move_to_end(pdf_uuid)
+                self.hits += 1
+                meta = entry[0]
+        record_cache_lookup("metadata", meta is not None)
+        return meta
+
+    def put(self, meta: DocumentMeta) -> None:
+        """
+        Cache metadata.
+
+        Args:
+            meta: Document metadata
+        """
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[meta.uuid] = (meta, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(meta.uuid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, pdf_uuid: str) -> None:
+        """
+        Drop a cached entry (call after any write to the document).
+
+        Args:
+            pdf_uuid: PDF document UUID
+        """
+        with self._lock:
+            self._entries.pop(pdf_uuid, None)
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dict with entries, hits, misses and hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def load_document_meta(
+    db: Session, cache: DocumentMetadataCache, pdf_uuid: str
+) -> Optional[DocumentMeta]:
+    """
+    Get document metadata, querying the database only on a cache miss.
+
+    Also records the access for retention when the stored timestamp is
+    stale (at most once per ACCESS_TOUCH_INTERVAL).
+
+    Args:
+        db: Database session (not used on a fresh cache hit)
+        cache: Metadata cache
+        pdf_uuid: PDF document UUID
+
+    Returns:
+        Document metadata, or None if the document doesn't exist
+    """
+    meta = cache.get(pdf_uuid)
+    if meta is not None and not meta.needs_access_touch():
+        return meta
+
+    db_pdf = db.query(PDFDocument).filter(PDFDocument.uuid == pdf_uuid).first()
+    if db_pdf is None:
+        cache.invalidate(pdf_uuid)
+        return None
+    record_access(db, db_pdf)
+    meta = DocumentMeta.from_model(db_pdf)
+    cache.put(meta)
+    return meta
+
+
+def mark_document_modified(
+    db: Session,
+    cache: DocumentMetadataCache,
+    history: VersionHistory,
+    pdf_uuid: str,
+    *,
+    operation: str,
+    pages: Optional[Sequence[int]] = None,
+    page_count: Optional[int] = None,
+) -> Optional[int]:
+    """
+    Record a new document version after its PDF changed and invalidate caches.
+
+    Args:
+        db: Database session
+        cache: Metadata cache
+        history: Version history
+        pdf_uuid: PDF document UUID
+        operation: What changed the document ("edit_block", "rotate", ...)
+        pages: Pages whose content changed (None: all pages)
+        page_count: New page count, if it changed
+
+    Returns:
+        The new version, or None if the document doesn't exist
+    """
+    version = history.commit_change(
+        db, pdf_uuid, operation=operation, pages=pages, page_count=page_count
+    )
+    cache.invalidate(pdf_uuid)
+    return version
+
+
+async def mark_document_modified_async(
+    db: AsyncSession,
+    cache: DocumentMetadataCache,
+    history: VersionHistory,
+    pdf_uuid: str,
+    *,
+    operation: str,
+    pages: Optional[Sequence[int]] = None,
+    page_count: Optional[int] = None,
+) -> Optional[int]:
+    """
+    Async variant of mark_document_modified() for async endpoints.
+
+    Args:
+        db: Async database session
+        cache: Metadata cache
+        history: Version history
+        pdf_uuid: PDF document UUID
+        operation: What changed the document ("rotate", "delete_pages", ...)
+        pages: Pages whose content changed (None: all pages)
+        page_count: New page count, if it changed
+
+    Returns:
+        The new version, or None if the document doesn't exist
+    """
+    version = await history.commit_change_async(
+        db, pdf_uuid, operation=operation, pages=pages, page_count=page_count
+    )
+    cache.invalidate(pdf_uuid)
+    return version
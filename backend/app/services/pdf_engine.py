@@ -1,28 +1,362 @@
 """PDF processing engine using PyMuPDF."""
+import hashlib
+import io
 import logging
+import math
+import mmap
+import os
+import shutil
+import subprocess
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, Callable, Iterator, List, Optional, Sequence, Tuple
 
 import fitz  # PyMuPDF
 
+from app.core.metrics import (
+    BYTES_WRITTEN,
+    PDF_ENCODE_SECONDS,
+    PDF_EXTRACT_SECONDS,
+    PDF_OPEN_SECONDS,
+    PDF_RENDER_SECONDS,
+    PDF_SAVE_SECONDS,
+    observe,
+)
+from app.core.tracing import span, traced
 from app.schemas.pdf_text_map import TextBlock, BBox, Word
-from app.services.storage import PDFStorageService
+from app.services.rendering import (
+    MemoryBudget,
+    PNGWriter,
+    band_bytes,
+    band_rows,
+    fit_zoom,
+    rasterize_bands,
+)
+from app.services.storage import PDFStorageService, sibling_temp_path
+from app.services.text_layout import TextLayoutEngine, get_layout_engine
 
 logger = logging.getLogger(__name__)
 
+# Called with (fraction done, message); may raise to abort the operation
+ProgressCallback = Callable[[float, str], None]
+
+# Linearized PDFs declare it in a dictionary at the very start of the file
+LINEARIZED_HEADER_BYTES = 1024
+
+# Compacting rewrites drop objects nothing references any more (replaced
+# content streams, applied redaction annotations) and renumber the rest, so
+# repeated redaction edits don't grow the file
+COMPACT_SAVE_OPTIONS = dict(garbage=2)
+
+# Suffix of the working copy an edit is applied to when saving incrementally
+STAGING_SUFFIX = ".stage.tmp"
+
+# Full compaction: drop unused objects and merge duplicates (garbage=4),
+# compress every stream, sanitize and merge page content streams (clean),
+# and pack small objects into compressed object streams
+OPTIMIZE_SAVE_OPTIONS = dict(
+    garbage=4,
+    clean=True,
+    deflate=True,
+    deflate_images=True,
+    deflate_fonts=True,
+    use_objstms=1,
+)
+
+# Text edit modes: "overlay" paints a white box over the old text (which stays
+# in the content stream); "redact" removes the old glyphs first
+EDIT_MODES = ("overlay", "redact")
+
+# Text-only redaction (apply_redactions(text=PDF_REDACT_TEXT_REMOVE)) is
+# missing from older PyMuPDF releases such as 1.24.0; there "redact" edits
+# fall back to "overlay"
+REDACT_TEXT_SUPPORTED = hasattr(fitz, "PDF_REDACT_TEXT_REMOVE")
+
+# How documents are opened for reading: through buffered file I/O, or
+# parsed in place from a read-only memory map of the file
+OPEN_MODES = ("file", "mmap")
+
+# Fraction of a line's height left out of its redaction area at the top and
+# at the bottom. Line boxes include ascender/descender space overlapping the
+# neighbouring lines, and MuPDF removes every glyph a redaction touches.
+REDACT_VERTICAL_INSET = 0.3
+
+# Only downsample images more than this factor above the target DPI
+IMAGE_DPI_TOLERANCE = 1.2
+
+# Document.rewrite_images() (image downsampling) is missing from older
+# PyMuPDF releases such as 1.24.0
+IMAGE_REWRITE_SUPPORTED = hasattr(fitz.Document, "rewrite_images")
+
+# Coordinates are rounded to this many decimals before hashing so that
+# float noise from re-extraction does not change identifiers.
+ID_COORD_PRECISION = 1
+
+
+def content_id(text: str, x0: float, y0: float, x1: float, y1: float) -> str:
+    """
+    Build a deterministic identifier digest from geometry and content.
+
+    The digest only depends on the element's own bounding box and text, so
+    it is unaffected by edits to other elements on the same page.
+
+    Args:
+        text: Element text
+        x0, y0, x1, y1: Element bounding box
+
+    Returns:
+        Short hex digest (12 characters)
+    """
+    key = "|".join(
+        [f"{v:.{ID_COORD_PRECISION}f}" for v in (x0, y0, x1, y1)] + [text]
+    )
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def parse_page_range(range_str: str, page_count: int) -> Tuple[int, int]:
+    """
+    Parse a 1-based inclusive page range such as "1-5" or "11-".
+
+    A bare start page ("11") also runs to the last page.
+
+    Args:
+        range_str: Range expression
+        page_count: Number of pages in the document
+
+    Returns:
+        (start, end) as 0-based inclusive page indexes
+
+    Raises:
+        ValueError: If the range is malformed or out of bounds
+    """
+    try:
+        parts = range_str.split("-")
+        start = int(parts[0]) - 1
+        end = int(parts[1]) - 1 if len(parts) > 1 and parts[1] else page_count - 1
+    except ValueError:
+        raise ValueError(f"Invalid page range: {range_str}")
+    if len(parts) > 2 or start < 0 or end >= page_count or start > end:
+        raise ValueError(f"Invalid page range: {range_str}")
+    return start, end
+
+
+def open_mapped(pdf_path) -> fitz.Document:
+    """
+    Open a PDF from a read-only memory map of the file.
+
+    MuPDF reads the mapping in place (zero-copy), so the file's pages live
+    in the OS page cache once, shared by every process that has it open,
+    instead of being copied into per-process read buffers. The mapping is
+    released with the document object.
+
+    Files must not be modified in place while mapped (the storage layer
+    only ever replaces them with a rename, which leaves the mapping
+    intact); truncating a mapped file crashes readers with SIGBUS.
+
+    Args:
+        pdf_path: Path to PDF file
+
+    Returns:
+        Open PyMuPDF document
+    """
+    with open(pdf_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # mmap refuses empty files; let MuPDF raise its usual error
+            return fitz.open(pdf_path)
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return fitz.open(stream=memoryview(mapping), filetype="pdf")
+
+
+def _check_edit_mode(mode: str) -> str:
+    """Validate an edit mode; returns the mode this PyMuPDF can apply."""
+    if mode not in EDIT_MODES:
+        raise ValueError(f"Invalid edit mode: {mode} (expected one of {', '.join(EDIT_MODES)})")
+    if mode == "redact" and not REDACT_TEXT_SUPPORTED:
+        _warn_redact_unsupported()
+        return "overlay"
+    return mode
+
+
+@lru_cache(maxsize=1)
+def _warn_redact_unsupported() -> None:
+    logger.warning(
+        f"PyMuPDF {fitz.VersionBind} can't redact text only; using overlay edits instead"
+    )
+
+
+def _unique_id(base_id: str, seen: dict) -> str:
+    """Disambiguate identical elements (same bbox and text) deterministically."""
+    count = seen.get(base_id, 0) + 1
+    seen[base_id] = count
+    return base_id if count == 1 else f"{base_id}-{count}"
+
+
+@dataclass
+class OptimizeResult:
+    """Outcome of PDFEngine.optimize()."""
+
+    bytes_before: int
+    bytes_after: int
+    bytes_saved: int
+    replaced: bool  # False if the optimized file was not smaller
+    fonts_subset: bool
+    images_downsampled: bool
+
+
+class LinearizationUnavailable(RuntimeError):
+    """Neither pikepdf nor the qpdf command line tool is installed."""
+
+
+def _linearize_with_pikepdf(pdf_path: Path, output_path: Path) -> None:
+    import pikepdf
+
+    with pikepdf.open(pdf_path) as pdf:
+        pdf.save(output_path, linearize=True)
+
+
+def _linearize_with_qpdf(pdf_path: Path, output_path: Path) -> None:
+    result = subprocess.run(
+        ["qpdf", "--linearize", str(pdf_path), str(output_path)],
+        capture_output=True,
+        text=True,
+    )
+    # Exit status 3 means the file was written with warnings
+    if result.returncode not in (0, 3):
+        raise RuntimeError(f"qpdf --linearize failed: {result.stderr.strip()}")
+
+
+@lru_cache(maxsize=1)
+def find_linearizer() -> Optional[Callable[[Path, Path], None]]:
+    """
+    Find a tool that can write linearized ("fast web view") PDFs.
+
+    MuPDF dropped linearization support, so this is delegated to qpdf,
+    through pikepdf if installed, else through the qpdf command line.
+
+    Returns:
+        Function writing a linearized copy of a PDF, or None if unavailable
+    """
+    try:
+        import pikepdf  # noqa: F401
+        return _linearize_with_pikepdf
+    except ImportError:
+        pass
+    if shutil.which("qpdf"):
+        return _linearize_with_qpdf
+    return None
+
+
+def is_linearized(pdf_path: Path) -> bool:
+    """
+    Check whether a PDF is linearized.
+
+    Only the file header is read; a linearized file whose later incremental
+    updates broke the linearization is still reported as linearized.
+
+    Args:
+        pdf_path: PDF file
+
+    Returns:
+        True if the file starts with a linearization dictionary
+    """
+    with open(pdf_path, "rb") as f:
+        return b"/Linearized" in f.read(LINEARIZED_HEADER_BYTES)
+
+
+class PageRenderer:
+    """Renders pages of one opened PDF (see PDFEngine.page_renderer)."""
+
+    def __init__(self, engine: "PDFEngine", doc: fitz.Document, zoom: float):
+        self.engine = engine
+        self.doc = doc
+        self.zoom = zoom
+
+    def check(self, page_number: int) -> None:
+        """
+        Validate a page number.
+
+        Raises:
+            ValueError: If the page number is out of range
+        """
+        if page_number < 1 or page_number > len(self.doc):
+            raise ValueError(f"Invalid page number: {page_number}")
+
+    def __call__(self, page_number: int) -> bytes:
+        """
+        Render a page to PNG bytes.
+
+        Args:
+            page_number: Page number (1-based)
+
+        Returns:
+            PNG image bytes
+
+        Raises:
+            ValueError: If the page number is out of range
+        """
+        buffer = io.BytesIO()
+        self.write(page_number, buffer)
+        return buffer.getvalue()
+
+    def write(self, page_number: int, out: BinaryIO) -> None:
+        """
+        Render a page, streaming the PNG to a file.
+
+        Args:
+            page_number: Page number (1-based)
+            out: Binary output
+
+        Raises:
+            ValueError: If the page number is out of range
+        """
+        self.check(page_number)
+        self.engine._write_png(self.doc[page_number - 1], self.zoom, out)
+
 
 class PDFEngine:
     """PDF processing engine using PyMuPDF."""
 
-    def __init__(self, storage_service: PDFStorageService):
+    def __init__(
+        self,
+        storage_service: PDFStorageService,
+        layout_engine: Optional[TextLayoutEngine] = None,
+        incremental_saves: bool = False,
+        max_render_pixels: int = 0,
+        render_band_pixels: int = 0,
+        render_memory: Optional[MemoryBudget] = None,
+        open_mode: str = "file",
+    ):
         """
         Initialize PDF engine.
 
         Args:
             storage_service: Storage service instance
+            layout_engine: Text layout engine (defaults to the shared instance)
+            incremental_saves: Append in-place edits to the file as incremental
+                updates instead of rewriting it (keeps earlier versions
+                recoverable as a prefix of the file, see services/versions.py)
+            max_render_pixels: Pixel budget per rendered page; larger pages
+                are rendered at a lower zoom (0 for unlimited)
+            render_band_pixels: Pixels rasterized at once; taller pages are
+                rendered in horizontal bands (0 renders whole pages at once)
+            render_memory: Memory budget shared by concurrent renders
+            open_mode: "file" or "mmap" (see open_mapped()); documents that
+                will be modified are always opened from their file
         """
+        if open_mode not in OPEN_MODES:
+            raise ValueError(f"Invalid open mode: {open_mode} (expected one of {', '.join(OPEN_MODES)})")
         self.storage = storage_service
-
+        self.layout = layout_engine or get_layout_engine()
+        self.incremental_saves = incremental_saves
+        self.max_render_pixels = max_render_pixels
+        self.render_band_pixels = render_band_pixels
+        self.render_memory = render_memory
+        self.open_mode = open_mode
+
+    @traced("pdf.get_page_count")
     def get_page_count(self, pdf_path: Path) -> int:
         """
         Get total number of pages in PDF.
@@ -33,12 +367,13 @@ class PDFEngine:
         Returns:
             Number of pages
         """
-        doc = fitz.open(pdf_path)
+        doc = self._open(pdf_path)
         try:
             return len(doc)
         finally:
             doc.close()
 
+    @traced("pdf.render_page_to_png")
     def render_page_to_png(
         self, pdf_path: Path, page_number: int, zoom: float = 2.0
     ) -> bytes:
@@ -53,19 +388,120 @@ class PDFEngine:
         Returns:
             PNG image bytes
         """
-        doc = fitz.open(pdf_path)
-        try:
-            if page_number < 1 or page_number > len(doc):
-                raise ValueError(f"Invalid page number: {page_number}")
+        buffer = io.BytesIO()
+        self.write_page_png(pdf_path, page_number, buffer, zoom)
+        return buffer.getvalue()
 
-            page = doc[page_number - 1]  # Convert to 0-based index
-            mat = fitz.Matrix(zoom, zoom)
-            pix = page.get_pixmap(matrix=mat)
-            png_bytes = pix.tobytes("png")
-            return png_bytes
+    @traced("pdf.write_page_png")
+    def write_page_png(
+        self, pdf_path: Path, page_number: int, out: BinaryIO, zoom: float = 2.0
+    ) -> None:
+        """
+        Render a PDF page, streaming the PNG to a file.
+
+        Pages are rasterized in bands and encoded as they go, so memory use
+        is bounded by the band size rather than the page size, and pages
+        beyond the engine's pixel budget are rendered at a lower zoom.
+
+        Args:
+            pdf_path: Path to PDF file
+            page_number: Page number (1-based)
+            out: Binary output (e.g. the render cache's temporary file)
+            zoom: Zoom factor for rendering (default: 2.0)
+
+        Raises:
+            ValueError: If the page number is out of range
+        """
+        with self.page_renderer(pdf_path, zoom) as render:
+            render.write(page_number, out)
+
+    def render_pages_to_png(
+        self, pdf_path: Path, page_numbers: Sequence[int], zoom: float = 2.0
+    ) -> Iterator[Tuple[int, bytes]]:
+        """
+        Render several pages of a PDF to PNG bytes from one opened document.
+
+        Pages are yielded as soon as each is rendered, so callers can stream
+        them. PyMuPDF holds the GIL while rendering and a document must not
+        be shared between threads, so pages are rendered one after another;
+        the saving over separate render_page_to_png() calls is opening and
+        parsing the file once.
+
+        Args:
+            pdf_path: Path to PDF file
+            page_numbers: Page numbers to render (1-based), in output order
+            zoom: Zoom factor for rendering (default: 2.0)
+
+        Yields:
+            (page number, PNG image bytes)
+
+        Raises:
+            ValueError: If a page number is out of range
+        """
+        with self.page_renderer(pdf_path, zoom) as render:
+            for page_number in page_numbers:
+                render.check(page_number)
+            for page_number in page_numbers:
+                yield page_number, render(page_number)
+
+    @contextmanager
+    def page_renderer(self, pdf_path: Path, zoom: float = 2.0) -> Iterator["PageRenderer"]:
+        """
+        Open a PDF once to render pages from it on demand.
+
+        Like render_pages_to_png(), but the caller decides page by page
+        which pages to render (e.g. skipping pages another request is
+        already rendering). Not for concurrent use from several threads.
+
+        Args:
+            pdf_path: Path to PDF file
+            zoom: Zoom factor for rendering (default: 2.0)
+
+        Yields:
+            Callable rendering a page number (1-based) to PNG bytes
+        """
+        doc = self._open(pdf_path)
+        try:
+            yield PageRenderer(self, doc, zoom)
         finally:
             doc.close()
 
+    def _write_png(self, page: fitz.Page, zoom: float, out: BinaryIO) -> None:
+        """
+        Rasterize a page band by band and stream it to out as PNG.
+
+        Holds the render memory budget for one band while rendering, and
+        records rasterizing and encoding time separately.
+        """
+        zoom = fit_zoom(page.rect, zoom, self.max_render_pixels)
+        size = (page.rect * fitz.Matrix(zoom, zoom)).irect
+        width, height = size.width, size.height
+        rows = band_rows(width, height, self.render_band_pixels)
+        reservation = (
+            self.render_memory.reserve(band_bytes(width, rows))
+            if self.render_memory is not None
+            else nullcontext()
+        )
+        rasterize_seconds = encode_seconds = 0.0
+        with reservation, span("pdf.render", zoom=zoom, bands=math.ceil(height / rows)):
+            # Several bands: interpret the page once, rasterize each band from the display list
+            source = page if rows >= height else page.get_displaylist()
+            writer = PNGWriter(out, width, height)
+            bands = rasterize_bands(source, page.rect, zoom, height, rows)
+            while True:
+                started = time.perf_counter()
+                samples = next(bands, None)
+                rasterized = time.perf_counter()
+                rasterize_seconds += rasterized - started
+                if samples is None:
+                    break
+                writer.write_rows(samples)
+                encode_seconds += time.perf_counter() - rasterized
+            writer.close()
+        PDF_RENDER_SECONDS.observe(rasterize_seconds)
+        PDF_ENCODE_SECONDS.labels(format="png").observe(encode_seconds)
+
+    @traced("pdf.extract_text_map")
     def extract_text_map(
         self, pdf_path: Path, page_number: int
     ) -> tuple[List[TextBlock], float, float]:
@@ -85,11 +521,12 @@ class PDFEngine:
         Raises:
             ValueError: If page_number is out of range
         """
-        doc = fitz.open(pdf_path)
+        doc = self._open(pdf_path)
         try:
             if page_number < 1 or page_number > len(doc):
                 raise ValueError(f"Invalid page number: {page_number}")
 
+            started = time.perf_counter()
             page = doc[page_number - 1]  # Convert to 0-based index
             page_rect = page.rect
             page_width = page_rect.width
@@ -98,7 +535,8 @@ class PDFEngine:
             blocks = page.get_text("blocks")
 
             text_blocks = []
-            block_index = 0
+            seen_block_ids: dict = {}
+            seen_word_ids: dict = {}
 
             for block in blocks:
                 # PyMuPDF block format: (x0, y0, x1, y1, "text", block_no, block_type, ...)
@@ -111,12 +549,15 @@ class PDFEngine:
 
                     # Only include non-empty blocks with valid bounding boxes
                     if text and x1 > x0 and y1 > y0:
-                        block_index += 1
-                        block_id = f"page-{page_number}-block-{block_index}"
-                        
+                        block_id = _unique_id(
+                            f"page-{page_number}-block-{content_id(text, x0, y0, x1, y1)}",
+                            seen_block_ids,
+                        )
+
                         # Extract words with bounding boxes
                         words = self._extract_words_from_block(
-                            page, block_id, text, x0, y0, x1, y1, page_number
+                            page, block_id, text, x0, y0, x1, y1, page_number,
+                            seen_word_ids,
                         )
                         
                         text_blocks.append(
@@ -129,11 +570,14 @@ class PDFEngine:
                             )
                         )
 
+            PDF_EXTRACT_SECONDS.observe(time.perf_counter() - started)
+
             # Return tuple with page dimensions (will be used in API route)
             return text_blocks, page_width, page_height
         finally:
             doc.close()
 
+    @traced("pdf.apply_block_edit")
     def apply_block_edit(
         self,
         pdf_path: Path,
@@ -145,17 +589,25 @@ class PDFEngine:
         font_size: float = 11.0,
         padding: float = 1.0,
         line_spacing: float = 1.2,
+        auto_fit: bool = False,
+        min_font_size: float = 4.0,
+        mode: str = "overlay",
     ) -> None:
         """
-        Apply a block edit using overlay approach.
+        Apply a block edit.
 
-        This method performs a visual overlay edit:
-        1. Draws a white rectangle over the original block region (with padding)
+        This method performs the edit in three steps:
+        1. Hides the original text: "overlay" mode draws a white rectangle
+           over the block region (with padding); "redact" mode removes the
+           block's glyphs from the content stream, keeping images, vector
+           art and the background
         2. Word-wraps the new text to fit within the block width
+           (with auto_fit, shrinks the font until all lines fit the height)
         3. Draws the wrapped text lines inside the block region
 
-        Note: This is NOT a low-level PDF content stream rewrite.
-        We are visually overriding the original block region.
+        Overlay edits leave the old text in the content stream, so it is
+        still extracted and every edit makes the page heavier; redaction
+        does not.
 
         Args:
             pdf_path: Path to PDF file (will be overwritten)
@@ -166,11 +618,15 @@ class PDFEngine:
             font_size: Font size in points (default: 11.0)
             padding: Internal padding within block (default: 1.0)
             line_spacing: Line spacing multiplier (default: 1.2)
+            auto_fit: Shrink font_size (as an upper bound) until the text fits
+            min_font_size: Smallest font size auto_fit may use (default: 4.0)
+            mode: "overlay" or "redact" (default: "overlay"; see REDACT_TEXT_SUPPORTED)
 
         Raises:
-            ValueError: If page_number is out of range or bbox is invalid
+            ValueError: If page_number, bbox or mode is invalid
         """
-        doc = fitz.open(pdf_path)
+        mode = _check_edit_mode(mode)
+        doc = self._open_for_update(pdf_path)
         try:
             if page_number < 1 or page_number > len(doc):
                 raise ValueError(f"Invalid page number: {page_number}")
@@ -181,19 +637,20 @@ class PDFEngine:
             if block_bbox.x1 <= block_bbox.x0 or block_bbox.y1 <= block_bbox.y0:
                 raise ValueError(f"Invalid bounding box: {block_bbox}")
 
-            # Calculate padded rectangle for white-out (extend outward slightly)
-            whiteout_x0 = block_bbox.x0 - padding
-            whiteout_y0 = block_bbox.y0 - padding
-            whiteout_x1 = block_bbox.x1 + padding
-            whiteout_y1 = block_bbox.y1 + padding
-
-            # Draw white rectangle to cover original text
-            whiteout_rect = fitz.Rect(whiteout_x0, whiteout_y0, whiteout_x1, whiteout_y1)
-            page.draw_rect(whiteout_rect, color=(1, 1, 1), fill=(1, 1, 1))
+            block_rect = fitz.Rect(block_bbox.x0, block_bbox.y0, block_bbox.x1, block_bbox.y1)
+            if mode == "redact":
+                self._redact_text(page, block_rect)
+            else:
+                # Draw white rectangle (extended outward slightly) to cover original text
+                page.draw_rect(
+                    block_rect + (-padding, -padding, padding, padding),
+                    color=(1, 1, 1),
+                    fill=(1, 1, 1),
+                )
 
-            # If new_text is empty, just white-out and return
+            # If new_text is empty, just remove the old text and return
             if not new_text or not new_text.strip():
-                doc.save(pdf_path, incremental=False)
+                self._save_in_place(doc, pdf_path, compact=mode == "redact")
                 return
 
             # Calculate internal text area (with padding inside block)
@@ -213,18 +670,39 @@ class PDFEngine:
             available_width = text_x1 - text_x0
             available_height = text_y1 - text_y0
 
+            # Measure once; auto-fit probes and the final wrap reuse the metrics
+            prepared = self.layout.prepare(new_text, font_name)
+
+            if auto_fit:
+                fitted_size = self.layout.fit_font_size(
+                    prepared,
+                    available_width,
+                    available_height,
+                    max_font_size=font_size,
+                    min_font_size=min(min_font_size, font_size),
+                    line_spacing=line_spacing,
+                )
+                if fitted_size is None:
+                    fitted_size = min(min_font_size, font_size)
+                    logger.warning(
+                        f"Text does not fit block {block_bbox} even at {fitted_size}pt"
+                    )
+                font_size = fitted_size
+
             # Word-wrap text to fit block width
-            wrapped_lines = self._word_wrap_text(
-                page, new_text, available_width, font_name, font_size
-            )
+            wrapped_lines = prepared.wrap(available_width, font_size)
 
             # Draw wrapped lines
             line_height = font_size * line_spacing
             current_y = text_y0 + font_size  # Start below top padding
 
-            for line in wrapped_lines:
+            for index, line in enumerate(wrapped_lines):
                 # Stop if we exceed available height
                 if current_y > text_y1:
+                    logger.warning(
+                        f"Truncated {len(wrapped_lines) - index} line(s) "
+                        f"that do not fit block {block_bbox}"
+                    )
                     break
 
                 # Draw line
@@ -239,74 +717,138 @@ class PDFEngine:
                 current_y += line_height
 
             # Save modified PDF (overwrite original)
-            doc.save(pdf_path, incremental=False)
+            self._save_in_place(doc, pdf_path, compact=mode == "redact")
         finally:
-            doc.close()
+            self._close_for_update(doc)
 
-    def _word_wrap_text(
-        self,
-        page: fitz.Page,
-        text: str,
-        max_width: float,
-        font_name: str,
-        font_size: float,
-    ) -> List[str]:
+    def _redact_text(self, page: fitz.Page, area: fitz.Rect) -> int:
         """
-        Word-wrap text to fit within a given width.
+        Remove the text lines inside an area from a page's content stream.
 
-        Handles explicit newlines (\n) as line breaks and word-wraps
-        each paragraph independently.
+        Each line whose center lies in the area is redacted through the
+        middle band of its box only, so glyphs of neighbouring lines are
+        never touched. Images, vector art and the background are kept and
+        nothing is painted over the area.
 
         Args:
-            page: PyMuPDF page object
-            text: Text to wrap (may contain explicit newlines)
-            max_width: Maximum width in points
-            font_name: Font name
-            font_size: Font size in points
+            page: Page to modify
+            area: Region whose text is removed
 
         Returns:
-            List of wrapped lines
+            Number of lines removed
         """
-        if not text:
-            return [""]
-
-        # Split by explicit newlines first
-        paragraphs = text.split("\n")
-        all_lines = []
+        with span("pdf.redact"):
+            removed = 0
+            text_dict = page.get_text("dict", clip=area, flags=0)
+            for block in text_dict["blocks"]:
+                for line in block.get("lines", []):
+                    line_rect = fitz.Rect(line["bbox"])
+                    center = (line_rect.tl + line_rect.br) / 2
+                    if not area.contains(center):
+                        continue
+                    inset = line_rect.height * REDACT_VERTICAL_INSET
+                    page.add_redact_annot(line_rect + (0, inset, 0, -inset), fill=False)
+                    removed += 1
+            if removed:
+                page.apply_redactions(
+                    images=fitz.PDF_REDACT_IMAGE_NONE,
+                    graphics=fitz.PDF_REDACT_LINE_ART_NONE,
+                    text=fitz.PDF_REDACT_TEXT_REMOVE,
+                )
+            return removed
 
-        for paragraph in paragraphs:
-            # Normalize whitespace: collapse multiple spaces to single space
-            paragraph = " ".join(paragraph.split())
+    def _open(self, pdf_path) -> fitz.Document:
+        """Open a PDF for reading (memory-mapped in "mmap" mode), recording the time spent."""
+        if self.open_mode != "mmap":
+            return self._open_file(pdf_path)
+        with span("pdf.open", mode="mmap"), observe(PDF_OPEN_SECONDS):
+            return open_mapped(pdf_path)
 
-            if not paragraph:
-                # Empty paragraph becomes empty line
-                all_lines.append("")
-                continue
+    def _open_file(self, pdf_path) -> fitz.Document:
+        """Open a PDF from its file, recording the time spent in fitz.open()."""
+        with span("pdf.open"), observe(PDF_OPEN_SECONDS):
+            return fitz.open(pdf_path)
 
-            # Word-wrap this paragraph
-            words = paragraph.split()
-            current_line = []
+    def _save_new(self, doc: fitz.Document, path, operation: str, **options) -> None:
+        """
+        Save a document to a new file, recording time and bytes written.
 
-            for word in words:
-                # Test if adding this word would exceed width
-                test_line = " ".join(current_line + [word])
-                text_width = page.get_text_length(
-                    test_line, fontname=font_name, fontsize=font_size
-                )
+        Args:
+            doc: Open PyMuPDF document
+            path: Output path
+            operation: Metric label ("rewrite", "merge", "split", ...)
+            **options: Document.save() options
+        """
+        with span("pdf.save", operation=operation), observe(PDF_SAVE_SECONDS, operation=operation):
+            doc.save(path, **options)
+        BYTES_WRITTEN.labels(kind="pdf").inc(os.path.getsize(path))
 
-                if text_width <= max_width:
-                    current_line.append(word)
-                else:
-                    # Current line is full, start new line
-                    if current_line:
-                        all_lines.append(" ".join(current_line))
-                    current_line = [word]
+    def _open_for_update(self, pdf_path: Path) -> fitz.Document:
+        """
+        Open a PDF that will be modified and saved with _save_in_place().
+
+        With incremental saves the document is opened from a staging copy,
+        so the update can be appended to it and the result published with
+        one atomic rename; readers never see a half-written file. Each
+        update gets its own uniquely named staging copy. Close it with
+        _close_for_update(). Callers hold the document's lock (see
+        DocumentLocks) until the saved file is committed and recorded.
+        """
+        if not self.incremental_saves:
+            return self._open_file(pdf_path)
+        pdf_path = Path(pdf_path)
+        staging_path = sibling_temp_path(pdf_path, suffix=STAGING_SUFFIX)
+        try:
+            shutil.copyfile(pdf_path, staging_path)
+            return self._open_file(staging_path)
+        except Exception:
+            staging_path.unlink(missing_ok=True)
+            raise
+
+    def _close_for_update(self, doc: fitz.Document) -> None:
+        """Close a document from _open_for_update(), removing an unpublished staging copy."""
+        name = doc.name
+        doc.close()
+        if name and name.endswith(STAGING_SUFFIX):
+            Path(name).unlink(missing_ok=True)
+
+    def _save_in_place(self, doc: fitz.Document, pdf_path: Path, compact: bool = False) -> None:
+        """
+        Save an open document over its source file.
 
-            # Add remaining words as last line
-            if current_line:
-                all_lines.append(" ".join(current_line))
+        Documents opened from a staging copy get an incremental update
+        appended and then replace pdf_path. Otherwise (or if MuPDF had to
+        repair the file, which rules out incremental updates) the
+        document is fully rewritten: MuPDF refuses non-incremental saves to
+        the file a document was opened from, so it is written to a sibling
+        temp file which then atomically replaces the original.
 
-        return all_lines if all_lines else [""]
+        Args:
+            doc: Open PyMuPDF document (from _open_file() or _open_for_update())
+            pdf_path: Path to overwrite
+            compact: Drop unreferenced objects on full rewrites (costs a pass
+                over all objects)
+        """
+        pdf_path = Path(pdf_path)
+        # Not can_save_incrementally(): it refuses after apply_redactions(), as
+        # earlier revisions keep the removed text, which versioning relies on
+        if doc.name.endswith(STAGING_SUFFIX) and not doc.is_repaired:
+            staging_path = Path(doc.name)
+            size_before = staging_path.stat().st_size
+            with span("pdf.save", operation="append"), observe(PDF_SAVE_SECONDS, operation="append"):
+                doc.saveIncr()
+            BYTES_WRITTEN.labels(kind="pdf").inc(staging_path.stat().st_size - size_before)
+            os.replace(staging_path, pdf_path)
+            return
+
+        tmp_path = sibling_temp_path(pdf_path)
+        options = COMPACT_SAVE_OPTIONS if compact else {}
+        try:
+            self._save_new(doc, tmp_path, "rewrite", **options)
+            os.replace(tmp_path, pdf_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
 
     def _extract_words_from_block(
         self,
@@ -318,16 +860,21 @@ class PDFEngine:
         block_x1: float,
         block_y1: float,
         page_number: int,
+        seen_ids: dict = None,
     ) -> List[Word]:
         """
         Extract words with bounding boxes from a text block.
 
+        Word IDs are derived from each word's own bbox and text (not from
+        the parent block), so editing one word leaves its siblings' IDs intact.
+
         Args:
             page: PyMuPDF page object
             block_id: Block identifier
             block_text: Block text content
             block_x0, block_y0, block_x1, block_y1: Block bounding box
             page_number: Page number (1-based)
+            seen_ids: Page-wide ID counts used to disambiguate duplicate words
 
         Returns:
             List of words with bounding boxes
@@ -335,9 +882,10 @@ class PDFEngine:
         try:
             # Get ALL words from the page (not clipped) to avoid missing words
             all_words = page.get_text("words")
-            
+            if seen_ids is None:
+                seen_ids = {}
+
             words = []
-            word_index = 0
             
             # Expand block bounds slightly to catch words on edges
             margin = 2.0
@@ -361,12 +909,9 @@ class PDFEngine:
                         wx1 > wx0 and wy1 > wy0 and
                         expanded_x0 <= word_center_x <= expanded_x1 and
                         expanded_y0 <= word_center_y <= expanded_y1):
-                        word_index += 1
-                        # Use coordinate-based ID for better reliability
-                        word_id = f"{block_id}-word-{int(wx0)}-{int(wy0)}-{word_index}"
                         words.append(
                             Word(
-                                id=word_id,
+                                id="",
                                 text=word_text,
                                 bbox=BBox(x0=wx0, y0=wy0, x1=wx1, y1=wy1),
                                 block_id=block_id,
@@ -376,15 +921,22 @@ class PDFEngine:
             # Sort words by position (top to bottom, left to right)
             words.sort(key=lambda w: (w.bbox.y0, w.bbox.x0))
             
-            # Re-assign sequential IDs after sorting
-            for idx, word in enumerate(words, 1):
-                word.id = f"{block_id}-word-{idx}"
+            # Assign content-derived IDs after sorting so duplicate suffixes
+            # follow reading order
+            for word in words:
+                bbox = word.bbox
+                word.id = _unique_id(
+                    f"page-{page_number}-word-"
+                    f"{content_id(word.text, bbox.x0, bbox.y0, bbox.x1, bbox.y1)}",
+                    seen_ids,
+                )
             
             return words
         except Exception as e:
             logger.warning(f"Failed to extract words from block {block_id}: {e}")
             return []
 
+    @traced("pdf.apply_word_edit")
     def apply_word_edit(
         self,
         pdf_path: Path,
@@ -395,12 +947,15 @@ class PDFEngine:
         font_name: str = "helv",
         font_size: float = None,
         padding: float = 2.0,
+        mode: str = "overlay",
     ) -> None:
         """
-        Apply a word-level edit by overlaying new text over the original word.
+        Apply a word-level edit.
 
-        This method performs a visual overlay edit:
-        1. Draws a white rectangle over the original word region (with padding)
+        This method performs the edit in two steps:
+        1. Hides the original word: "overlay" mode draws a white rectangle
+           over the word region (with padding); "redact" mode removes the
+           word's glyphs from the content stream
         2. Draws the new text at the word position
 
         Args:
@@ -411,11 +966,13 @@ class PDFEngine:
             font_name: Font name (default: "helv")
             font_size: Font size in points (auto-detected if None)
             padding: Internal padding around word (default: 2.0)
+            mode: "overlay" or "redact" (default: "overlay"; see REDACT_TEXT_SUPPORTED)
 
         Raises:
-            ValueError: If page_number is out of range or bbox is invalid
+            ValueError: If page_number, bbox or mode is invalid
         """
-        doc = fitz.open(pdf_path)
+        mode = _check_edit_mode(mode)
+        doc = self._open_for_update(pdf_path)
         try:
             if page_number < 1 or page_number > len(doc):
                 raise ValueError(f"Invalid page number: {page_number}")
@@ -433,19 +990,20 @@ class PDFEngine:
                 font_size = max(word_height * 0.8, 8.0)  # Minimum 8pt
                 logger.debug(f"Auto-detected font size: {font_size} from word height: {word_height}")
 
-            # Calculate padded rectangle for white-out (more padding for better coverage)
-            whiteout_x0 = word_bbox.x0 - padding
-            whiteout_y0 = word_bbox.y0 - padding
-            whiteout_x1 = word_bbox.x1 + padding
-            whiteout_y1 = word_bbox.y1 + padding
-
-            # Draw white rectangle to cover original word
-            whiteout_rect = fitz.Rect(whiteout_x0, whiteout_y0, whiteout_x1, whiteout_y1)
-            page.draw_rect(whiteout_rect, color=(1, 1, 1), fill=(1, 1, 1))
+            word_rect = fitz.Rect(word_bbox.x0, word_bbox.y0, word_bbox.x1, word_bbox.y1)
+            if mode == "redact":
+                self._redact_text(page, word_rect)
+            else:
+                # Draw white rectangle (more padding for better coverage) to cover original word
+                page.draw_rect(
+                    word_rect + (-padding, -padding, padding, padding),
+                    color=(1, 1, 1),
+                    fill=(1, 1, 1),
+                )
 
-            # If new_text is empty, just white-out and return
+            # If new_text is empty, just remove the old word and return
             if not new_text or not new_text.strip():
-                doc.save(pdf_path, incremental=False)
+                self._save_in_place(doc, pdf_path, compact=mode == "redact")
                 return
 
             # Calculate text position (baseline) - PyMuPDF uses bottom-left origin
@@ -464,7 +1022,255 @@ class PDFEngine:
             )
 
             # Save modified PDF
-            doc.save(pdf_path, incremental=False)
+            self._save_in_place(doc, pdf_path, compact=mode == "redact")
+        finally:
+            self._close_for_update(doc)
+
+
+    @traced("pdf.rotate_pages")
+    def rotate_pages(self, pdf_path: Path, page_numbers: List[int], angle: int) -> None:
+        """
+        Set the rotation of pages and save the PDF in place.
+
+        Args:
+            pdf_path: Path to PDF file (will be overwritten)
+            page_numbers: Pages to rotate (1-based)
+            angle: Rotation angle (90, 180 or 270)
+
+        Raises:
+            ValueError: If a page number is out of range
+        """
+        doc = self._open_for_update(pdf_path)
+        try:
+            for page_number in page_numbers:
+                if page_number < 1 or page_number > len(doc):
+                    raise ValueError(f"Invalid page number: {page_number}")
+                doc[page_number - 1].set_rotation(angle)
+            self._save_in_place(doc, pdf_path)
+        finally:
+            self._close_for_update(doc)
+
+    @traced("pdf.delete_pages")
+    def delete_pages(self, pdf_path: Path, page_numbers: List[int]) -> int:
+        """
+        Delete pages and save the PDF in place.
+
+        Args:
+            pdf_path: Path to PDF file (will be overwritten)
+            page_numbers: Pages to delete (1-based)
+
+        Returns:
+            Page count after deletion
+
+        Raises:
+            ValueError: If a page number is out of range
+        """
+        doc = self._open_for_update(pdf_path)
+        try:
+            for page_number in page_numbers:
+                if page_number < 1 or page_number > len(doc):
+                    raise ValueError(f"Invalid page number: {page_number}")
+            doc.delete_pages(sorted({p - 1 for p in page_numbers}))
+            self._save_in_place(doc, pdf_path)
+            return len(doc)
+        finally:
+            self._close_for_update(doc)
+
+    @traced("pdf.merge_files")
+    def merge_files(
+        self,
+        input_paths: Sequence[Path],
+        output_path: Path,
+        progress: Optional[ProgressCallback] = None,
+    ) -> int:
+        """
+        Merge PDFs into a new file.
+
+        Args:
+            input_paths: PDFs to append, in order
+            output_path: Path for the merged PDF
+            progress: Called after each input is appended
+
+        Returns:
+            Page count of the merged PDF
+        """
+        merged_doc = fitz.open()
+        try:
+            for index, input_path in enumerate(input_paths):
+                src_doc = self._open(input_path)
+                try:
+                    merged_doc.insert_pdf(src_doc)
+                finally:
+                    src_doc.close()
+                if progress is not None:
+                    progress((index + 1) / (len(input_paths) + 1), f"Merged file {index + 1}/{len(input_paths)}")
+            self._save_new(merged_doc, output_path, "merge")
+            return len(merged_doc)
+        finally:
+            merged_doc.close()
+
+    @traced("pdf.split_pages")
+    def split_pages(
+        self,
+        pdf_path: Path,
+        page_ranges: Sequence[str],
+        output_path_for: Callable[[int], Path],
+        progress: Optional[ProgressCallback] = None,
+    ) -> List[Tuple[int, int]]:
+        """
+        Write one new PDF per page range.
+
+        All ranges are validated before anything is written.
+
+        Args:
+            pdf_path: Source PDF
+            page_ranges: Range expressions (see parse_page_range)
+            output_path_for: Returns the output path for the range at an index
+            progress: Called after each range is written
+
+        Returns:
+            (start, end) 0-based inclusive page indexes per range
+
+        Raises:
+            ValueError: If a range is invalid
+        """
+        source_doc = self._open(pdf_path)
+        try:
+            ranges = [parse_page_range(r, len(source_doc)) for r in page_ranges]
+            for index, (start, end) in enumerate(ranges):
+                new_doc = fitz.open()
+                try:
+                    new_doc.insert_pdf(source_doc, from_page=start, to_page=end)
+                    self._save_new(new_doc, output_path_for(index), "split")
+                finally:
+                    new_doc.close()
+                if progress is not None:
+                    progress((index + 1) / len(ranges), f"Wrote part {index + 1}/{len(ranges)}")
+            return ranges
+        finally:
+            source_doc.close()
+
+    @traced("pdf.optimize")
+    def optimize(
+        self,
+        pdf_path: Path,
+        image_dpi: Optional[int] = None,
+        subset_fonts: bool = True,
+        progress: Optional[ProgressCallback] = None,
+    ) -> OptimizeResult:
+        """
+        Shrink a PDF in place.
+
+        Overlay edits only ever add content, so edited documents accumulate
+        unused objects and uncompressed streams. This rewrites the file with
+        garbage collection, duplicate object merging, stream compression and
+        object streams, optionally subsetting embedded fonts and downsampling
+        images. The original is kept if the result is not smaller.
+
+        Args:
+            pdf_path: PDF to optimize (replaced atomically)
+            image_dpi: Downsample images above this resolution (None keeps images)
+            subset_fonts: Reduce embedded fonts to the glyphs actually used
+            progress: Called after each step
+
+        Returns:
+            Sizes before and after, and which steps were applied
+
+        Raises:
+            ValueError: If image_dpi is given but can_downsample_images() is False
+        """
+        if image_dpi is not None and not self.can_downsample_images():
+            raise ValueError("Image downsampling requires a newer PyMuPDF release")
+        pdf_path = Path(pdf_path)
+        bytes_before = os.path.getsize(pdf_path)
+        fonts_subset = images_downsampled = False
+
+        doc = self._open_file(pdf_path)
+        try:
+            if image_dpi is not None:
+                with span("pdf.rewrite_images", dpi=image_dpi):
+                    doc.rewrite_images(
+                        dpi_threshold=int(image_dpi * IMAGE_DPI_TOLERANCE) + 1,
+                        dpi_target=image_dpi,
+                    )
+                images_downsampled = True
+                if progress is not None:
+                    progress(0.4, "Downsampled images")
+
+            if subset_fonts:
+                try:
+                    with span("pdf.subset_fonts"):
+                        doc.subset_fonts()
+                    fonts_subset = True
+                except Exception as e:
+                    # Best effort: MuPDF's subsetter can reject unusual fonts
+                    logger.warning(f"Font subsetting failed for {pdf_path.name}: {e}")
+                if progress is not None:
+                    progress(0.6, "Subset fonts")
+
+            tmp_path = sibling_temp_path(pdf_path)
+            try:
+                self._save_new(doc, tmp_path, "optimize", **OPTIMIZE_SAVE_OPTIONS)
+                bytes_after = os.path.getsize(tmp_path)
+                replaced = bytes_after < bytes_before
+                if replaced:
+                    os.replace(tmp_path, pdf_path)
+            finally:
+                if tmp_path.exists():
+                    tmp_path.unlink()
+            if progress is not None:
+                progress(0.9, "Saved optimized file")
         finally:
             doc.close()
 
+        if not replaced:
+            bytes_after = bytes_before
+        return OptimizeResult(
+            bytes_before=bytes_before,
+            bytes_after=bytes_after,
+            bytes_saved=bytes_before - bytes_after,
+            replaced=replaced,
+            fonts_subset=fonts_subset,
+            images_downsampled=images_downsampled,
+        )
+
+    def can_downsample_images(self) -> bool:
+        """Whether optimize() can downsample images in this environment."""
+        return IMAGE_REWRITE_SUPPORTED
+
+    def can_linearize(self) -> bool:
+        """Whether linearize() is available in this environment."""
+        return find_linearizer() is not None
+
+    @traced("pdf.linearize")
+    def linearize(self, pdf_path: Path, output_path: Path) -> None:
+        """
+        Write a linearized copy of a PDF.
+
+        Linearized files put the first page and a page index at the start,
+        so viewers using range requests can show page 1 before the rest of
+        the file has arrived. The copy is written to a temp file and
+        atomically moved into place.
+
+        Args:
+            pdf_path: Source PDF
+            output_path: Path for the linearized copy
+
+        Raises:
+            LinearizationUnavailable: If no linearization tool is installed
+        """
+        linearizer = find_linearizer()
+        if linearizer is None:
+            raise LinearizationUnavailable("Linearization requires pikepdf or qpdf")
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = sibling_temp_path(output_path)
+        try:
+            with span("pdf.save", operation="linearize"), \
+                    observe(PDF_SAVE_SECONDS, operation="linearize"):
+                linearizer(Path(pdf_path), tmp_path)
+            BYTES_WRITTEN.labels(kind="pdf").inc(os.path.getsize(tmp_path))
+            os.replace(tmp_path, output_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
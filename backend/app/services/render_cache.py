@@ -0,0 +1,281 @@
+"""Size-bounded cache of rendered page images."""
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Optional
+
+from app.core.metrics import BYTES_WRITTEN, record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+EVICTION_POLICIES = ("lru", "lfu")
+
+
+class RenderCache:
+    """
+    Byte-budgeted cache of rendered page files under a render directory.
+
+    The file modification time doubles as the last-access timestamp (it is
+    bumped on every hit), so recency survives restarts and is shared by all
+    worker processes using the same directory. When the budget is exceeded
+    the directory is scanned and files are evicted down to a low-water mark,
+    which amortizes the scan over many writes.
+    """
+
+    def __init__(
+        self,
+        render_dir: str,
+        max_bytes: int,
+        *,
+        policy: str = "lru",
+        low_water_ratio: float = 0.9,
+    ):
+        """
+        Initialize render cache.
+
+        Args:
+            render_dir: Directory holding rendered images
+            max_bytes: Byte budget for the whole directory (0 disables eviction)
+            policy: "lru" (oldest access first) or "lfu" (fewest hits first)
+            low_water_ratio: Fraction of max_bytes to evict down to
+        """
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+
+        self.render_dir = Path(render_dir)
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.low_water_bytes = int(max_bytes * low_water_ratio)
+
+        self._lock = threading.Lock()
+        self._access_counts: Dict[str, int] = {}
+        self._size_bytes: Optional[int] = None  # Lazily computed by a scan
+        self._entries = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+    def lookup(self, path: Path) -> bool:
+        """
+        Check whether a rendered file is cached, recording a hit or miss.
+
+        Args:
+            path: Render path (from PDFStorageService.get_render_path)
+
+        Returns:
+            True on a hit
+        """
+        try:
+            # Bump the access timestamp used for LRU ordering
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            record_cache_lookup("render", False)
+            return False
+
+        with self._lock:
+            self.hits += 1
+            key = str(path)
+            self._access_counts[key] = self._access_counts.get(key, 0) + 1
+        record_cache_lookup("render", True)
+        return True
+
+    def store(self, path: Path, data: bytes) -> Path:
+        """
+        Write a rendered file atomically and evict if over budget.
+
+        Args:
+            path: Render path
+            data: File contents
+
+        Returns:
+            The render path
+        """
+        return self.store_from(path, lambda f: f.write(data))
+
+    def store_from(self, path: Path, write: Callable[[BinaryIO], None]) -> Path:
+        """
+        Write a rendered file atomically, streaming its contents, and evict if over budget.
+
+        Args:
+            path: Render path
+            write: Writes the file contents to the binary file it is given
+
+        Returns:
+            The render path
+        """
+        with self._lock:
+            # Size the directory before adding to it so the new file is
+            # not counted twice
+            self._ensure_scanned()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+                size = f.tell()
+            try:
+                previous_size = path.stat().st_size
+            except FileNotFoundError:
+                previous_size = None
+            os.replace(tmp_name, path)
+        finally:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+        BYTES_WRITTEN.labels(kind="render").inc(size)
+
+        with self._lock:
+            # Count the write as a use so fresh renders are not the first LFU victims
+            self._access_counts[str(path)] = self._access_counts.get(str(path), 0) + 1
+            self._size_bytes += size - (previous_size or 0)
+            if previous_size is None:
+                self._entries += 1
+            over_budget = self.max_bytes and self._size_bytes > self.max_bytes
+
+        if over_budget:
+            self.evict()
+        return path
+
+    def invalidate(self, path: Path) -> None:
+        """
+        Remove a rendered file (e.g. after its page was edited).
+
+        Args:
+            path: Render path
+        """
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._access_counts.pop(str(path), None)
+            if self._size_bytes is not None:
+                self._size_bytes = max(0, self._size_bytes - size)
+                self._entries = max(0, self._entries - 1)
+
+    def _scan(self) -> list:
+        """List (path, size, mtime) for every cached file."""
+        entries = []
+        stack = [self.render_dir]
+        while stack:
+            try:
+                iterator = os.scandir(stack.pop())
+            except FileNotFoundError:
+                continue
+            with iterator:
+                for entry in iterator:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith(".png"):
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _ensure_scanned(self) -> None:
+        """Compute the directory size once (caller holds the lock)."""
+        if self._size_bytes is None:
+            entries = self._scan()
+            self._size_bytes = sum(size for _, size, _ in entries)
+            self._entries = len(entries)
+
+    def evict(self) -> int:
+        """
+        Evict files until the cache is under its low-water mark.
+
+        Returns:
+            Number of files evicted
+        """
+        started = time.monotonic()
+        entries = self._scan()
+        total = sum(size for _, size, _ in entries)
+
+        with self._lock:
+            if self.policy == "lfu":
+                counts = self._access_counts
+                entries.sort(key=lambda e: (counts.get(e[0], 0), e[2]))
+            else:
+                entries.sort(key=lambda e: e[2])
+
+        evicted = 0
+        evicted_bytes = 0
+        for path, size, _ in entries:
+            if total <= self.low_water_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+            evicted_bytes += size
+
+        with self._lock:
+            for path, _, _ in entries[:evicted]:
+                self._access_counts.pop(path, None)
+            self._size_bytes = total
+            self._entries = len(entries) - evicted
+            self.evictions += evicted
+            self.evicted_bytes += evicted_bytes
+
+        logger.info(
+            f"Render cache evicted {evicted} file(s), {evicted_bytes} bytes "
+            f"in {time.monotonic() - started:.3f}s"
+        )
+        return evicted
+
+    def stats(self) -> dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dict with hits, misses, hit_rate, size_bytes, entries, evictions
+        """
+        with self._lock:
+            self._ensure_scanned()
+            lookups = self.hits + self.misses
+            return {
+                "policy": self.policy,
+                "max_bytes": self.max_bytes,
+                "size_bytes": self._size_bytes,
+                "entries": self._entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "evicted_bytes": self.evicted_bytes,
+            }
+
+
+_caches: Dict[tuple, RenderCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_render_cache(render_dir: str, max_bytes: int, policy: str = "lru") -> RenderCache:
+    """
+    Get the process-wide render cache for a directory.
+
+    Args:
+        render_dir: Directory holding rendered images
+        max_bytes: Byte budget
+        policy: Eviction policy
+
+    Returns:
+        Shared RenderCache instance
+    """
+    key = (str(render_dir), max_bytes, policy)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = RenderCache(render_dir, max_bytes, policy=policy)
+            _caches[key] = cache
+        return cache
@@ -0,0 +1,249 @@
+"""Memory-bounded page rendering: pixel budgets, banded rasterization and streaming PNG encoding."""
+import math
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import BinaryIO, Dict, Iterator, Union
+
+import fitz  # PyMuPDF
+
+from app.core.metrics import RENDER_MEMORY_BYTES
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# PNG color type 2: 8-bit RGB, no alpha (what get_pixmap() produces by default)
+PNG_COLOR_TYPE_RGB = 2
+RGB_CHANNELS = 3
+
+# Compressed data is buffered up to this size per IDAT chunk
+PNG_CHUNK_BYTES = 64 * 1024
+
+# Bands are rasterized with this many extra rows on each side, which are
+# dropped: without them anti-aliasing of shapes crossing a band seam
+# differs slightly from a single-pass render
+BAND_OVERLAP_ROWS = 2
+
+# Page content rasterized from a display list or page
+PageSource = Union[fitz.Page, fitz.DisplayList]
+
+
+def fit_zoom(rect: fitz.Rect, zoom: float, max_pixels: int) -> float:
+    """
+    Lower a zoom factor so a page renders to at most max_pixels pixels.
+
+    Args:
+        rect: Page rectangle (points)
+        zoom: Requested zoom factor
+        max_pixels: Pixel budget per render (0 for unlimited)
+
+    Returns:
+        The requested zoom, or the largest zoom within the budget
+    """
+    area = rect.width * rect.height
+    if max_pixels <= 0 or area <= 0 or area * zoom * zoom <= max_pixels:
+        return zoom
+    return math.sqrt(max_pixels / area)
+
+
+def band_rows(width: int, height: int, band_pixels: int) -> int:
+    """
+    Get the number of rows rasterized at once.
+
+    Args:
+        width: Image width in pixels
+        height: Image height in pixels
+        band_pixels: Pixels rasterized at once (0 renders the whole page at once)
+
+    Returns:
+        Rows per band (at least 1)
+    """
+    if band_pixels <= 0:
+        return max(1, height)
+    return max(1, min(height, band_pixels // max(1, width)))
+
+
+def band_bytes(width: int, rows: int) -> int:
+    """Memory held while rendering one band: the pixmap and its filtered, compressed copy."""
+    return 2 * (rows + 2 * BAND_OVERLAP_ROWS) * (width * RGB_CHANNELS + 1)
+
+
+class PNGWriter:
+    """
+    Encodes an 8-bit RGB image as PNG, band by band.
+
+    Rows are deflated and written to the output as they are added, so
+    neither the whole raster nor the whole encoded image is held in memory.
+    """
+
+    def __init__(self, out: BinaryIO, width: int, height: int, level: int = 6):
+        """
+        Initialize the writer and write the PNG header.
+
+        Args:
+            out: Binary output (file, response buffer)
+            width: Image width in pixels
+            height: Image height in pixels
+            level: zlib compression level
+        """
+        self.out = out
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self._compressor = zlib.compressobj(level)
+        self._pending = []
+        self._pending_bytes = 0
+        out.write(PNG_SIGNATURE)
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, PNG_COLOR_TYPE_RGB, 0, 0, 0))
+
+    def _chunk(self, tag: bytes, data: bytes) -> None:
+        self.out.write(struct.pack(">I", len(data)))
+        self.out.write(tag)
+        self.out.write(data)
+        self.out.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(tag))))
+
+    def _add_compressed(self, data: bytes, flush: bool = False) -> None:
+        if data:
+            self._pending.append(data)
+            self._pending_bytes += len(data)
+        if self._pending and (flush or self._pending_bytes >= PNG_CHUNK_BYTES):
+            self._chunk(b"IDAT", b"".join(self._pending))
+            self._pending = []
+            self._pending_bytes = 0
+
+    def write_rows(self, samples: memoryview) -> None:
+        """
+        Add rows of pixels.
+
+        Args:
+            samples: RGB samples of whole rows, top to bottom
+        """
+        stride = self.width * RGB_CHANNELS
+        rows, remainder = divmod(len(samples), stride)
+        if remainder or self.rows_written + rows > self.height:
+            raise ValueError("Samples don't match the image size")
+        # Filter type 0 (none) before each row
+        filtered = b"".join(
+            b"\x00" + samples[row * stride:(row + 1) * stride] for row in range(rows)
+        )
+        self._add_compressed(self._compressor.compress(filtered))
+        self.rows_written += rows
+
+    def close(self) -> None:
+        """Finish the image data and write the PNG trailer."""
+        if self.rows_written != self.height:
+            raise ValueError(f"Wrote {self.rows_written} of {self.height} rows")
+        self._add_compressed(self._compressor.flush(), flush=True)
+        self._chunk(b"IEND", b"")
+
+
+def rasterize_bands(
+    source: PageSource, rect: fitz.Rect, zoom: float, height: int, rows: int
+) -> Iterator[memoryview]:
+    """
+    Rasterize a page in horizontal bands, top to bottom.
+
+    Each band's pixmap is kept alive until the next band is requested, so
+    the samples must be consumed before asking for more.
+
+    Args:
+        source: Page, or its display list when rendering several bands
+        rect: Page rectangle (points)
+        zoom: Zoom factor
+        height: Height of the whole image in rows
+        rows: Rows per band
+
+    Yields:
+        RGB samples of each band's rows
+    """
+    matrix = fitz.Matrix(zoom, zoom)
+    for top in range(0, height, rows):
+        bottom = min(height, top + rows)
+        start = max(0, top - BAND_OVERLAP_ROWS)
+        end = min(height, bottom + BAND_OVERLAP_ROWS)
+        clip = fitz.Rect(rect.x0, rect.y0 + start / zoom, rect.x1, rect.y0 + end / zoom)
+        pix = source.get_pixmap(matrix=matrix, clip=clip, alpha=False)
+        if pix.height != end - start:
+            raise RuntimeError(f"Band rendered {pix.height} rows instead of {end - start}")
+        yield pix.samples_mv[(top - start) * pix.stride:(bottom - start) * pix.stride]
+        del pix
+
+
+class MemoryBudget:
+    """
+    Bounds the memory held by the renders running at once in a process.
+
+    Each render reserves what its largest band needs before rasterizing
+    and waits while the budget is taken. A reservation larger than the
+    whole budget waits until nothing else is reserved, so oversized renders
+    run alone instead of failing.
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Initialize memory budget.
+
+        Args:
+            max_bytes: Bytes reserved at once (0 for unlimited)
+        """
+        self.max_bytes = max_bytes
+        self.in_use = 0
+        self.peak = 0
+        self.waits = 0
+        self._condition = threading.Condition()
+
+    def _fits(self, nbytes: int) -> bool:
+        return not self.max_bytes or self.in_use == 0 or self.in_use + nbytes <= self.max_bytes
+
+    @contextmanager
+    def reserve(self, nbytes: int) -> Iterator[None]:
+        """
+        Hold part of the budget for the duration of a block.
+
+        Args:
+            nbytes: Bytes to reserve
+        """
+        with self._condition:
+            if not self._fits(nbytes):
+                self.waits += 1
+                self._condition.wait_for(lambda: self._fits(nbytes))
+            self.in_use += nbytes
+            self.peak = max(self.peak, self.in_use)
+        RENDER_MEMORY_BYTES.inc(nbytes)
+        try:
+            yield
+        finally:
+            RENDER_MEMORY_BYTES.dec(nbytes)
+            with self._condition:
+                self.in_use -= nbytes
+                self._condition.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get statistics for this process.
+
+        Returns:
+            Dict with max_bytes, in_use, peak and waits
+        """
+        with self._condition:
+            return {
+                "max_bytes": self.max_bytes,
+                "in_use": self.in_use,
+                "peak": self.peak,
+                "waits": self.waits,
+            }
+
+
+@lru_cache(maxsize=None)
+def open_memory_budget(max_bytes: int) -> MemoryBudget:
+    """
+    Get the process-wide render memory budget for a size.
+
+    Args:
+        max_bytes: Bytes reserved at once (0 for unlimited)
+
+    Returns:
+        Memory budget
+    """
+    return MemoryBudget(max_bytes)
@@ -0,0 +1,378 @@
+"""Retention policies and garbage collection for stored documents."""
+import asyncio
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.pdf_document import PDFDocument
+from app.services.render_cache import RenderCache
+from app.services.storage import PDFStorageService
+from app.services.storage_backends import LocalStorageBackend
+from app.services.versions import VersionHistory
+
+logger = logging.getLogger(__name__)
+
+# Only bump last_accessed_at when it is older than this, so hot read paths
+# don't turn into a database write per request
+ACCESS_TOUCH_INTERVAL = timedelta(hours=1)
+
+# Leftovers from interrupted merges, in-place saves and render writes
+TEMP_FILE_PATTERN = re.compile(r"^(temp_.*\.pdf|.*\.tmp|.*\.part)$")
+# Page renders and linearized copies, both kept in the render directory
+RENDER_FILE_PATTERN = re.compile(r"^(?P<uuid>.+)_(page_\d+(_v\d+)?\.png|v\d+_linear\.pdf)$")
+
+
+def utcnow() -> datetime:
+    """Current UTC time as a naive datetime (as stored by SQLite)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def record_access(db: Session, db_pdf: PDFDocument) -> None:
+    """
+    Mark a document as recently used for TTL-based retention.
+
+    Writes at most once per ACCESS_TOUCH_INTERVAL per document.
+
+    Args:
+        db: Database session
+        db_pdf: Accessed document
+    """
+    now = utcnow()
+    last = db_pdf.last_accessed_at
+    if last is not None and last.replace(tzinfo=None) > now - ACCESS_TOUCH_INTERVAL:
+        return
+    db_pdf.last_accessed_at = now
+    db.commit()
+
+
+@dataclass
+class GCReport:
+    """Counts from one garbage-collection pass."""
+
+    expired_documents: int = 0
+    missing_file_rows: int = 0
+    orphan_pdfs: int = 0
+    orphan_renders: int = 0
+    temp_files: int = 0
+    bytes_freed: int = 0
+    duration_seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    def total(self) -> int:
+        """Total number of removed items."""
+        return (
+            self.expired_documents
+            + self.missing_file_rows
+            + self.orphan_pdfs
+            + self.orphan_renders
+            + self.temp_files
+        )
+
+
+class RetentionService:
+    """
+    Incremental garbage collector for PDFs, renders and document rows.
+
+    Each run_once() call does a bounded amount of work: at most batch_size
+    rows are examined per phase and at most shards_per_run shard
+    directories are scanned for orphans. Cursors persist between calls so
+    repeated runs sweep the whole store without ever stalling the API.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        storage: PDFStorageService,
+        render_cache: Optional[RenderCache] = None,
+        *,
+        document_ttl: Optional[timedelta] = None,
+        temp_file_ttl: timedelta = timedelta(hours=1),
+        orphan_grace: timedelta = timedelta(hours=1),
+        batch_size: int = 100,
+        shards_per_run: int = 16,
+    ):
+        """
+        Initialize retention service.
+
+        Args:
+            session_factory: Callable returning a new database session
+            storage: Storage service
+            render_cache: Render cache (renders of removed documents are dropped)
+            document_ttl: Delete documents not accessed for this long (None disables)
+            temp_file_ttl: Age after which temp files are considered stale
+            orphan_grace: Minimum age before a file without a row is removed
+                (protects uploads whose row is not committed yet)
+            batch_size: Maximum rows examined per phase per run
+            shards_per_run: Maximum shard directories scanned per run
+        """
+        self.session_factory = session_factory
+        self.storage = storage
+        self.render_cache = render_cache
+        self.document_ttl = document_ttl
+        self.temp_file_ttl = temp_file_ttl
+        self.orphan_grace = orphan_grace
+        self.batch_size = batch_size
+        self.shards_per_run = shards_per_run
+
+        self._row_cursor = 0
+        self._shard_queue: List[Path] = []
+
+    def run_once(self) -> GCReport:
+        """
+        Run one bounded garbage-collection pass.
+
+        Returns:
+            Report of what was removed
+        """
+        started = time.monotonic()
+        report = GCReport()
+        db = self.session_factory()
+        try:
+            for phase in (
+                self._collect_expired_documents,
+                self._collect_missing_files,
+                self._collect_orphan_files,
+            ):
+                try:
+                    phase(db, report)
+                except Exception as e:  # Keep later phases running
+                    db.rollback()
+                    logger.exception(f"GC phase {phase.__name__} failed")
+                    report.errors.append(f"{phase.__name__}: {e}")
+        finally:
+            db.close()
+
+        report.duration_seconds = time.monotonic() - started
+        if report.total() or report.errors:
+            logger.info(f"GC pass: {report}")
+        return report
+
+    def delete_document(self, db: Session, db_pdf: PDFDocument) -> int:
+        """
+        Delete a document's PDF, renders, linearized copies, version history and row.
+
+        Args:
+            db: Database session
+            db_pdf: Document to delete
+
+        Returns:
+            Bytes freed on local storage (best effort)
+        """
+        freed = 0
+        try:
+            freed += self.storage.backend.size(self.storage.pdf_key(db_pdf.uuid))
+        except FileNotFoundError:
+            pass
+        self.storage.delete_pdf(db_pdf.uuid)
+        self.storage.backend.delete(f"{db_pdf.uuid}.pdf")  # Legacy flat key
+
+        for render_path in self.storage.render_paths(db_pdf.uuid):
+            if self.render_cache is not None:
+                self.render_cache.invalidate(render_path)
+            else:
+                render_path.unlink(missing_ok=True)
+        for linearized_path in self.storage.linearized_paths(db_pdf.uuid):
+            linearized_path.unlink(missing_ok=True)
+
+        VersionHistory(self.storage).delete_all(db, db_pdf.uuid)
+        db.delete(db_pdf)
+        db.commit()
+        return freed
+
+    def _collect_expired_documents(self, db: Session, report: GCReport) -> None:
+        """Delete documents whose last access is older than the TTL."""
+        if self.document_ttl is None:
+            return
+        cutoff = utcnow() - self.document_ttl
+        last_used = func.coalesce(PDFDocument.last_accessed_at, PDFDocument.updated_at)
+        expired = (
+            db.query(PDFDocument)
+            .filter(last_used < cutoff)
+            .order_by(last_used)
+            .limit(self.batch_size)
+            .all()
+        )
+        for db_pdf in expired:
+            report.bytes_freed += self.delete_document(db, db_pdf)
+            report.expired_documents += 1
+
+    def _collect_missing_files(self, db: Session, report: GCReport) -> None:
+        """Delete rows whose PDF file no longer exists (one id-ordered batch)."""
+        rows = (
+            db.query(PDFDocument)
+            .filter(PDFDocument.id > self._row_cursor)
+            .order_by(PDFDocument.id)
+            .limit(self.batch_size)
+            .all()
+        )
+        # Wrap around after the last batch
+        self._row_cursor = rows[-1].id if len(rows) == self.batch_size else 0
+
+        cutoff = utcnow() - self.orphan_grace
+        for db_pdf in rows:
+            if self.storage.pdf_exists(db_pdf.uuid):
+                continue
+            created = db_pdf.created_at.replace(tzinfo=None) if db_pdf.created_at else None
+            if created is not None and created > cutoff:
+                continue
+            logger.warning(f"Removing row for missing PDF file: {db_pdf.uuid}")
+            self.delete_document(db, db_pdf)
+            report.missing_file_rows += 1
+
+    def _next_shards(self) -> List[Path]:
+        """Take the next shard directories (relative to the storage roots) to scan."""
+        if not self._shard_queue:
+            roots = [self.storage.render_dir]
+            if isinstance(self.storage.backend, LocalStorageBackend):
+                roots.insert(0, self.storage.backend.root_dir)
+            shards = {Path(".")}
+            for root in roots:
+                shards.update(self._list_shards(root, self.storage.shard_depth))
+            self._shard_queue = sorted(shards)
+        batch = self._shard_queue[:self.shards_per_run]
+        del self._shard_queue[:self.shards_per_run]
+        return batch
+
+    @staticmethod
+    def _list_shards(root: Path, depth: int) -> List[Path]:
+        """List leaf shard directories under a root, relative to it."""
+        level = [Path(".")]
+        for _ in range(depth):
+            next_level = []
+            for relative in level:
+                try:
+                    with os.scandir(root / relative) as entries:
+                        next_level.extend(
+                            relative / entry.name
+                            for entry in entries
+                            if entry.is_dir(follow_symlinks=False)
+                        )
+                except FileNotFoundError:
+                    continue
+            level = next_level
+        return level
+
+    def _collect_orphan_files(self, db: Session, report: GCReport) -> None:
+        """Remove stale temp files and PDFs/renders that have no row."""
+        now = time.time()
+        temp_cutoff = now - self.temp_file_ttl.total_seconds()
+        orphan_cutoff = now - self.orphan_grace.total_seconds()
+
+        pdf_root = None
+        if isinstance(self.storage.backend, LocalStorageBackend):
+            pdf_root = self.storage.backend.root_dir
+        # Temp files are written next to PDFs even with remote backends
+        temp_roots = {self.storage.pdf_dir, self.storage.render_dir}
+        if pdf_root is not None:
+            temp_roots.add(pdf_root)
+
+        for shard in self._next_shards():
+            candidates = []  # (path, uuid, kind)
+            for root in temp_roots:
+                for entry in self._files_in(root / shard):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    if TEMP_FILE_PATTERN.match(entry.name):
+                        if stat.st_mtime < temp_cutoff:
+                            report.bytes_freed += self._remove(entry.path, stat.st_size)
+                            report.temp_files += 1
+                        continue
+                    if stat.st_mtime >= orphan_cutoff:
+                        continue
+                    if root == pdf_root and entry.name.endswith(".pdf"):
+                        candidates.append((entry, stat, entry.name[:-4], "pdf"))
+                    elif root == self.storage.render_dir:
+                        match = RENDER_FILE_PATTERN.match(entry.name)
+                        if match:
+                            candidates.append((entry, stat, match.group("uuid"), "render"))
+
+            if not candidates:
+                continue
+            uuids = {uuid for _, _, uuid, _ in candidates}
+            known = {
+                row.uuid
+                for row in db.query(PDFDocument.uuid).filter(PDFDocument.uuid.in_(uuids))
+            }
+            for entry, stat, uuid, kind in candidates:
+                if uuid in known:
+                    continue
+                report.bytes_freed += self._remove(entry.path, stat.st_size)
+                if kind == "pdf":
+                    report.orphan_pdfs += 1
+                else:
+                    report.orphan_renders += 1
+
+    @staticmethod
+    def _files_in(directory: Path) -> List[os.DirEntry]:
+        """List regular files directly inside a directory."""
+        try:
+            with os.scandir(directory) as entries:
+                return [entry for entry in entries if entry.is_file(follow_symlinks=False)]
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _remove(path: str, size: int) -> int:
+        """Remove a file, returning the bytes freed."""
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            return 0
+        logger.debug(f"GC removed {path}")
+        return size
+
+
+def _try_lock(lock_path: Path):
+    """Take a non-blocking exclusive file lock, or return None if held elsewhere."""
+    try:
+        import fcntl
+    except ImportError:  # pragma: no cover - Windows: no cross-worker exclusion
+        return open(lock_path, "a")
+
+    lock_file = open(lock_path, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+async def run_retention_loop(
+    service_factory: Callable[[], RetentionService],
+    interval_seconds: float,
+    lock_path: Path,
+) -> None:
+    """
+    Run garbage collection periodically in a worker thread.
+
+    Only one worker process runs a pass at a time (file lock); the others
+    skip that tick.
+
+    Args:
+        service_factory: Returns the retention service to run
+        interval_seconds: Delay between passes
+        lock_path: Lock file shared by all workers on the node
+    """
+    service = service_factory()
+    while True:
+        await asyncio.sleep(interval_seconds)
+        lock_file = _try_lock(lock_path)
+        if lock_file is None:
+            continue
+        try:
+            await asyncio.to_thread(service.run_once)
+        except Exception:
+            logger.exception("GC pass failed")
+        finally:
+            lock_file.close()
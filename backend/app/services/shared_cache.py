@@ -0,0 +1,470 @@
+"""Cache tier shared by all worker processes (SQLite file or Redis)."""
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, ContextManager, Dict, Iterator, Optional
+
+from app.core.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_BACKENDS = ("none", "sqlite", "redis")
+
+# Only rewrite an entry's access time this often, so reads stay read-only
+ACCESS_TOUCH_SECONDS = 60.0
+
+
+class SharedCache(ABC):
+    """
+    Byte-value cache visible to every worker process on a node (or cluster).
+
+    Keys must embed the version of whatever they were derived from
+    ("textmap:<uuid>:v3:p1"), so a stale entry can never be read for newer
+    content and edits need no cross-process invalidation.
+
+    Backend errors are logged and treated as misses: the shared tier must
+    never fail a request that could have been served without it.
+    """
+
+    def __init__(self, lease_seconds: float = 30.0):
+        """
+        Initialize shared cache.
+
+        Args:
+            lease_seconds: Lifetime of a single-writer lease (bounds how long
+                a crashed writer can block others)
+        """
+        self.lease_seconds = lease_seconds
+        self._owner_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.lease_waits = 0
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[bytes]:
+        """Backend read."""
+
+    @abstractmethod
+    def _put(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        """Backend write."""
+
+    @abstractmethod
+    def _delete(self, key: str) -> None:
+        """Backend delete."""
+
+    @abstractmethod
+    def _acquire(self, key: str, owner: str, ttl: float) -> bool:
+        """Take a lease unless another live owner holds it."""
+
+    @abstractmethod
+    def _release(self, key: str, owner: str) -> None:
+        """Drop a lease if still held by owner."""
+
+    def _count(self, attr: str) -> None:
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def _guard(self, operation: str, func: Callable, default=None):
+        try:
+            return func()
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"Shared cache {operation} failed: {e}")
+            return default
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Get a value.
+
+        Args:
+            key: Versioned cache key
+
+        Returns:
+            Cached bytes, or None on a miss (or backend error)
+        """
+        value = self.peek(key)
+        self._count("hits" if value is not None else "misses")
+        record_cache_lookup("shared", value is not None)
+        return value
+
+    def peek(self, key: str) -> Optional[bytes]:
+        """
+        Get a value without counting a hit or miss (re-checks after waiting).
+
+        Args:
+            key: Versioned cache key
+
+        Returns:
+            Cached bytes, or None
+        """
+        return self._guard("get", lambda: self._get(key))
+
+    def put(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """
+        Store a value.
+
+        Args:
+            key: Versioned cache key
+            value: Bytes to store
+            ttl: Lifetime in seconds (None: until evicted)
+        """
+        self._guard("put", lambda: self._put(key, value, ttl))
+
+    def delete(self, key: str) -> None:
+        """
+        Remove a value.
+
+        Args:
+            key: Cache key
+        """
+        self._guard("delete", lambda: self._delete(key))
+
+    @contextmanager
+    def single_writer(self, key: str, wait_timeout: Optional[float] = None) -> Iterator[bool]:
+        """
+        Serialize the producers of one key across processes.
+
+        The first caller takes a lease and produces the value; concurrent
+        callers wait until the lease is released (or expires) and should then
+        re-check the cache before producing anything themselves.
+
+        Args:
+            key: Key being produced
+            wait_timeout: Give up waiting after this long and proceed without
+                the lease (defaults to lease_seconds)
+
+        Yields:
+            True if this caller holds the lease, False if it gave up waiting
+        """
+        owner = f"{self._owner_prefix}:{threading.get_ident()}:{uuid.uuid4().hex[:8]}"
+        deadline = time.monotonic() + (wait_timeout if wait_timeout is not None else self.lease_seconds)
+        delay = 0.005
+        acquired = False
+        waited = False
+        while True:
+            # On backend errors behave as if the lease was ours: no coordination, no blocking
+            acquired = self._guard(
+                "acquire", lambda: self._acquire(key, owner, self.lease_seconds), default=True
+            )
+            if acquired or time.monotonic() >= deadline:
+                break
+            waited = True
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+        if waited:
+            self._count("lease_waits")
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self._guard("release", lambda: self._release(key, owner))
+
+    def get_or_compute(
+        self, key: str, compute: Callable[[], bytes], ttl: Optional[float] = None
+    ) -> bytes:
+        """
+        Get a value, producing it at most once across processes on a miss.
+
+        Args:
+            key: Versioned cache key
+            compute: Produces the value
+            ttl: Lifetime in seconds (None: until evicted)
+
+        Returns:
+            Cached or freshly computed bytes
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self.single_writer(key):
+            # Another process may have produced it while we waited
+            value = self.peek(key)
+            if value is None:
+                value = compute()
+                self.put(key, value, ttl)
+        return value
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Get cache statistics for this process.
+
+        Returns:
+            Dict with backend, hits, misses, hit_rate, errors and lease_waits
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self).__name__,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "errors": self.errors,
+                "lease_waits": self.lease_waits,
+            }
+
+    def close(self) -> None:
+        """Release backend connections."""
+
+
+class SQLiteSharedCache(SharedCache):
+    """
+    Shared cache in a SQLite file on local disk (all workers of one node).
+
+    WAL mode lets readers proceed while one process writes. The total value
+    size is kept under max_bytes by evicting least recently used entries.
+    """
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS entries ("
+        " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,"
+        " expires_at REAL, accessed_at REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS ix_entries_accessed_at ON entries (accessed_at)",
+        "CREATE TABLE IF NOT EXISTS leases ("
+        " key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)",
+    )
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        *,
+        lease_seconds: float = 30.0,
+        evict_every: int = 64,
+        low_water_ratio: float = 0.9,
+    ):
+        """
+        Initialize SQLite shared cache.
+
+        Args:
+            path: Database file (created if missing)
+            max_bytes: Budget for stored values (0 disables eviction)
+            lease_seconds: Single-writer lease lifetime
+            evict_every: Check the budget once per this many writes
+            low_water_ratio: Fraction of max_bytes to evict down to
+        """
+        super().__init__(lease_seconds)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self.low_water_bytes = int(max_bytes * low_water_ratio)
+        self._local = threading.local()
+        self._connections = []
+        self._writes = 0
+        self.evictions = 0
+        with self._connect() as conn:
+            for statement in self._SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _get(self, key: str) -> Optional[bytes]:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, expires_at, accessed_at FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at, accessed_at = row
+        now = time.time()
+        if expires_at is not None and expires_at <= now:
+            conn.execute("DELETE FROM entries WHERE key = ? AND expires_at <= ?", (key, now))
+            return None
+        if accessed_at < now - ACCESS_TOUCH_SECONDS:
+            conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return value
+
+    def _put(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        now = time.time()
+        self._connect().execute(
+            "INSERT OR REPLACE INTO entries (key, value, size, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, sqlite3.Binary(value), len(value), now + ttl if ttl else None, now),
+        )
+        with self._lock:
+            self._writes += 1
+            due = self.max_bytes > 0 and self._writes % self.evict_every == 0
+        if due:
+            self.evict()
+
+    def _delete(self, key: str) -> None:
+        self._connect().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def _acquire(self, key: str, owner: str, ttl: float) -> bool:
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM leases WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, owner, now + ttl),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount == 1
+
+    def _release(self, key: str, owner: str) -> None:
+        self._connect().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def evict(self) -> int:
+        """
+        Drop expired entries, then least recently used ones down to the low-water mark.
+
+        Returns:
+            Number of entries removed
+        """
+        conn = self._connect()
+        removed = conn.execute(
+            "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        ).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if self.max_bytes and total > self.max_bytes:
+            excess = total - self.low_water_bytes
+            victims = []
+            for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+                victims.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+            removed += len(victims)
+        with self._lock:
+            self.evictions += removed
+        return removed
+
+    def stats(self) -> Dict[str, object]:
+        stats = super().stats()
+        stats["evictions"] = self.evictions
+        stats["size_bytes"] = self._guard(
+            "stats",
+            lambda: self._connect().execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0],
+        )
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+class RedisSharedCache(SharedCache):
+    """
+    Shared cache in Redis (all workers of all nodes).
+
+    Size limits are left to Redis: configure maxmemory with an LRU policy
+    (allkeys-lru). Leases are SET NX keys with an expiry.
+    """
+
+    def __init__(self, client=None, *, url: Optional[str] = None, prefix: str = "aeropdf:",
+                 lease_seconds: float = 30.0):
+        """
+        Initialize Redis shared cache.
+
+        Args:
+            client: Pre-built redis client (built from url if None)
+            url: Redis URL, e.g. redis://localhost:6379/0
+            prefix: Key prefix
+            lease_seconds: Single-writer lease lifetime
+        """
+        super().__init__(lease_seconds)
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:  # pragma: no cover - depends on environment
+                raise RuntimeError("Redis shared cache requires redis (pip install redis)") from e
+            client = redis.Redis.from_url(url, socket_timeout=1.0)
+        self.client = client
+        self.prefix = prefix
+
+    def _get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def _put(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        self.client.set(self.prefix + key, value, px=int(ttl * 1000) if ttl else None)
+
+    def _delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def _acquire(self, key: str, owner: str, ttl: float) -> bool:
+        return bool(self.client.set(f"{self.prefix}lease:{key}", owner, nx=True, px=int(ttl * 1000)))
+
+    def _release(self, key: str, owner: str) -> None:
+        lease_key = f"{self.prefix}lease:{key}"
+        if self.client.get(lease_key) == owner.encode():
+            self.client.delete(lease_key)
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def produce_once(cache: Optional[SharedCache], key: str) -> ContextManager:
+    """
+    Single-writer section for a key, or a no-op without a shared tier.
+
+    Args:
+        cache: Shared cache (may be None)
+        key: Key being produced
+
+    Returns:
+        Context manager (see SharedCache.single_writer)
+    """
+    if cache is None:
+        return nullcontext(True)
+    return cache.single_writer(key)
+
+
+@lru_cache(maxsize=None)
+def open_shared_cache(
+    backend: str,
+    path: str,
+    max_bytes: int,
+    redis_url: Optional[str] = None,
+    lease_seconds: float = 30.0,
+) -> Optional[SharedCache]:
+    """
+    Get the process-wide shared cache for a configuration.
+
+    Args:
+        backend: "none", "sqlite" or "redis"
+        path: SQLite database file
+        max_bytes: SQLite value budget
+        redis_url: Redis URL for the redis backend
+        lease_seconds: Single-writer lease lifetime
+
+    Returns:
+        Shared cache, or None if disabled
+
+    Raises:
+        ValueError: If backend is unknown
+    """
+    if backend not in SHARED_CACHE_BACKENDS:
+        raise ValueError(f"SHARED_CACHE_BACKEND must be one of {', '.join(SHARED_CACHE_BACKENDS)}")
+    if backend == "none":
+        return None
+    if backend == "redis":
+        return RedisSharedCache(url=redis_url, lease_seconds=lease_seconds)
+    return SQLiteSharedCache(path, max_bytes, lease_seconds=lease_seconds)
@@ -0,0 +1,187 @@
+"""Single-flight execution: concurrent identical computations share one run."""
+import hashlib
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: no cross-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Keys are hashed onto this many lock files, so the lock directory stays small
+LOCK_STRIPES = 256
+
+
+@dataclass
+class _Call:
+    """A computation in progress in this process."""
+
+    done: threading.Event = field(default_factory=threading.Event)
+    result: object = None
+    error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Runs each keyed computation once, however many callers ask at the same time.
+
+    Within a process, the first caller for a key (the leader) computes and
+    concurrent callers for the same key wait for its result (or exception)
+    instead of repeating the work. Across the worker processes of a node,
+    leaders of the same key are serialized with file locks in lock_dir: a
+    leader that had to wait re-checks (recheck) whether the other process
+    already produced the value before computing it itself.
+
+    Keys must identify the computation completely, including the version of
+    its input ("render:<uuid>_page_3_v7.png").
+    """
+
+    def __init__(self, lock_dir: Optional[Path] = None, wait_timeout: float = 60.0):
+        """
+        Initialize single-flight group.
+
+        Args:
+            lock_dir: Directory for cross-process lock files (None: in-process only)
+            wait_timeout: Give up waiting for another process after this long
+                and compute anyway (bounds the cost of a hung worker)
+        """
+        self.lock_dir = Path(lock_dir) if lock_dir is not None else None
+        if self.lock_dir is not None:
+            self.lock_dir.mkdir(parents=True, exist_ok=True)
+        self.wait_timeout = wait_timeout
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.leads = 0
+        self.coalesced = 0
+        self.lock_waits = 0
+
+    def do(
+        self,
+        key: str,
+        compute: Callable[[], T],
+        recheck: Optional[Callable[[], Optional[T]]] = None,
+    ) -> T:
+        """
+        Get the result of a computation, sharing concurrent runs of the same key.
+
+        Args:
+            key: Computation key
+            compute: Produces the value (and stores it wherever it belongs)
+            recheck: Returns the value if another process stored it, else
+                None; without it, processes don't wait for each other
+
+        Returns:
+            The value, computed by this caller or shared by the leader
+
+        Raises:
+            Exception: Whatever compute() raised, in the leader and every waiter
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leads += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._lead(key, compute, recheck)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _lead(
+        self, key: str, compute: Callable[[], T], recheck: Optional[Callable[[], Optional[T]]]
+    ) -> T:
+        if self.lock_dir is None or recheck is None or fcntl is None:
+            return compute()
+        with self._file_lock(key) as waited:
+            if waited:
+                # Another process held the lock and has probably produced the value
+                value = recheck()
+                if value is not None:
+                    return value
+            return compute()
+
+    @contextmanager
+    def _file_lock(self, key: str) -> Iterator[bool]:
+        """Hold the key's lock file; yields whether another process held it first."""
+        stripe = int(hashlib.sha1(key.encode()).hexdigest(), 16) % LOCK_STRIPES
+        fd = os.open(self.lock_dir / f"{stripe:02x}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        locked = False
+        try:
+            deadline = time.monotonic() + self.wait_timeout
+            delay = 0.005
+            waited = False
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    locked = True
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        logger.warning(f"Gave up waiting for another worker to produce {key}")
+                        break
+                    waited = True
+                    time.sleep(delay)
+                    delay = min(delay * 2, 0.1)
+            if waited:
+                with self._lock:
+                    self.lock_waits += 1
+            yield waited
+        finally:
+            if locked:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get statistics for this process.
+
+        Returns:
+            Dict with in_flight, leads, coalesced and lock_waits
+        """
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "leads": self.leads,
+                "coalesced": self.coalesced,
+                "lock_waits": self.lock_waits,
+            }
+
+
+@lru_cache(maxsize=None)
+def open_single_flight(lock_dir: Optional[str] = None) -> SingleFlight:
+    """
+    Get the process-wide single-flight group for a lock directory.
+
+    Args:
+        lock_dir: Directory for cross-process lock files (None: in-process only)
+
+    Returns:
+        Single-flight group
+    """
+    return SingleFlight(Path(lock_dir) if lock_dir else None)
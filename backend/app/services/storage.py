@@ -1,30 +1,123 @@
 """PDF file storage service."""
+import hashlib
+import logging
+import os
+import tempfile
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from app.core.tracing import traced
+from app.services.storage_backends import LocalStorageBackend, StorageBackend
+
+logger = logging.getLogger(__name__)
+
+
+def shard_prefix(name: str, depth: int = 2) -> str:
+    """
+    Get a hash-based shard prefix for a file name.
+
+    Spreads files over 256**depth directories (e.g. "3f/a9") so no single
+    directory grows large enough to slow down lookups.
+
+    Args:
+        name: Identifier to shard (usually a PDF UUID)
+        depth: Number of two-hex-digit directory levels (0 disables sharding)
+
+    Returns:
+        Relative directory prefix, empty string if depth is 0
+    """
+    digest = hashlib.sha1(name.encode("utf-8")).hexdigest()
+    return "/".join(digest[2 * i:2 * i + 2] for i in range(depth))
+
+
+def sibling_temp_path(path: Path, suffix: str = ".tmp") -> Path:
+    """
+    Create an empty, uniquely named temp file next to a file.
+
+    Writes that end in os.replace() onto path go through it: being in the
+    same directory keeps the rename atomic, and the unique name keeps
+    concurrent writers from overwriting or deleting each other's temp files.
+
+    Args:
+        path: File the temp file will replace
+        suffix: Temp file suffix (retention sweeps leftover ".tmp" files)
+
+    Returns:
+        Path of the new temp file
+    """
+    fd, name = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix=suffix)
+    os.close(fd)
+    return Path(name)
 
 
 class PDFStorageService:
     """Service for managing PDF file storage."""
 
-    def __init__(self, base_dir: str, pdf_dir: str, render_dir: str):
+    def __init__(
+        self,
+        base_dir: str,
+        pdf_dir: str,
+        render_dir: str,
+        backend: Optional[StorageBackend] = None,
+        shard_depth: int = 2,
+    ):
         """
         Initialize storage service.
 
         Args:
             base_dir: Base storage directory
-            pdf_dir: Directory for PDF files
+            pdf_dir: Directory for PDF files (and local temp files)
             render_dir: Directory for rendered page images
+            backend: Backend holding the PDFs (defaults to local files in pdf_dir)
+            shard_depth: Directory levels for hash-sharded PDF keys and renders
         """
         self.base_dir = Path(base_dir)
         self.pdf_dir = Path(pdf_dir)
         self.render_dir = Path(render_dir)
+        self.backend = backend or LocalStorageBackend(pdf_dir)
+        self.shard_depth = shard_depth
 
         # Ensure directories exist
         self.pdf_dir.mkdir(parents=True, exist_ok=True)
         self.render_dir.mkdir(parents=True, exist_ok=True)
 
+    def _sharded(self, pdf_uuid: str, file_name: str) -> str:
+        prefix = shard_prefix(pdf_uuid, self.shard_depth)
+        return f"{prefix}/{file_name}" if prefix else file_name
+
+    def pdf_key(self, pdf_uuid: str) -> str:
+        """Get the backend object key for a PDF (e.g. "3f/a9/<uuid>.pdf")."""
+        return self._sharded(pdf_uuid, f"{pdf_uuid}.pdf")
+
+    def version_delta_key(self, pdf_uuid: str, version: int) -> str:
+        """
+        Get the backend object key for an undone version's delta.
+
+        Undo moves the bytes a version appended out of the PDF into this
+        object so redo can append them again.
+
+        Args:
+            pdf_uuid: Unique identifier for the PDF
+            version: Version number
+
+        Returns:
+            Object key (e.g. "3f/a9/<uuid>_v7.delta")
+        """
+        return self._sharded(pdf_uuid, f"{pdf_uuid}_v{version}.delta")
+
+    def _migrate_legacy_pdf(self, pdf_uuid: str) -> bool:
+        """Move a PDF stored under the old flat key to its sharded key."""
+        legacy_key = f"{pdf_uuid}.pdf"
+        key = self.pdf_key(pdf_uuid)
+        if legacy_key == key or not self.backend.exists(legacy_key):
+            return False
+        self.backend.move(legacy_key, key)
+        logger.info(f"Migrated {legacy_key} to sharded key {key}")
+        return True
+
     async def save_upload(self, file: UploadFile, pdf_uuid: str) -> str:
         """
         Save uploaded PDF file.
@@ -34,20 +127,22 @@ class PDFStorageService:
             pdf_uuid: Unique identifier for the PDF
 
         Returns:
-            Full path to saved PDF file
+            Full path to saved PDF file (local copy)
         """
-        file_path = self.pdf_dir / f"{pdf_uuid}.pdf"
-
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
-
-        return str(file_path)
+        await file.seek(0)
+        # Copying (and uploading to a remote backend) blocks; keep it off the event loop
+        await run_in_threadpool(self.backend.put_stream, self.pdf_key(pdf_uuid), file.file)
+        path = await run_in_threadpool(self.get_pdf_path, pdf_uuid)
+        return str(path)
 
+    @traced("storage.get_pdf_path")
     def get_pdf_path(self, pdf_uuid: str) -> Path:
         """
         Get path to PDF file.
 
+        With a remote backend this is a locally cached copy; call
+        commit_pdf() after modifying it in place.
+
         Args:
             pdf_uuid: Unique identifier for the PDF
 
@@ -57,21 +152,137 @@ class PDFStorageService:
         Raises:
             FileNotFoundError: If PDF file doesn't exist
         """
-        file_path = self.pdf_dir / f"{pdf_uuid}.pdf"
-        if not file_path.exists():
+        try:
+            return self.backend.local_path(self.pdf_key(pdf_uuid))
+        except FileNotFoundError:
+            if self._migrate_legacy_pdf(pdf_uuid):
+                return self.backend.local_path(self.pdf_key(pdf_uuid))
             raise FileNotFoundError(f"PDF not found: {pdf_uuid}")
-        return file_path
 
-    def get_render_path(self, pdf_uuid: str, page_number: int) -> Path:
+    def pdf_exists(self, pdf_uuid: str) -> bool:
+        """
+        Check whether a PDF is stored (under its sharded or legacy flat key).
+
+        Args:
+            pdf_uuid: Unique identifier for the PDF
+
+        Returns:
+            True if the PDF exists
+        """
+        return self.backend.exists(self.pdf_key(pdf_uuid)) or self.backend.exists(
+            f"{pdf_uuid}.pdf"
+        )
+
+    def new_pdf_path(self, pdf_uuid: str) -> Path:
+        """
+        Get a local path to write a new PDF to before commit_pdf().
+
+        Args:
+            pdf_uuid: Unique identifier for the PDF
+
+        Returns:
+            Local path for the new PDF file
+        """
+        return self.backend.staging_path(self.pdf_key(pdf_uuid))
+
+    @traced("storage.commit_pdf")
+    def commit_pdf(self, pdf_uuid: str, local_path: Optional[Path] = None) -> None:
+        """
+        Publish a locally written or modified PDF to the storage backend.
+
+        No-op for the local backend, where the local path is the stored file.
+
+        Args:
+            pdf_uuid: Unique identifier for the PDF
+            local_path: File to publish (defaults to get_pdf_path/new_pdf_path location)
+        """
+        key = self.pdf_key(pdf_uuid)
+        self.backend.put_file(key, local_path or self.backend.staging_path(key))
+
+    def read_pdf_range(self, pdf_uuid: str, start: int, end: int) -> bytes:
+        """
+        Read a byte range of a stored PDF without fetching the whole file.
+
+        Args:
+            pdf_uuid: Unique identifier for the PDF
+            start: First byte offset (inclusive)
+            end: Last byte offset (inclusive)
+
+        Returns:
+            Bytes in the range
+        """
+        return self.backend.read_range(self.pdf_key(pdf_uuid), start, end)
+
+    def delete_pdf(self, pdf_uuid: str) -> None:
+        """
+        Delete a stored PDF.
+
+        Args:
+            pdf_uuid: Unique identifier for the PDF
+        """
+        self.backend.delete(self.pdf_key(pdf_uuid))
+
+    def get_render_path(
+        self, pdf_uuid: str, page_number: int, version: Optional[int] = None
+    ) -> Path:
         """
         Get path for rendered page image.
 
+        Renders are tagged with the document version, so a render produced
+        from an older version (e.g. by another worker racing an edit) is
+        never served for the new one.
+
         Args:
             pdf_uuid: Unique identifier for the PDF
             page_number: Page number (1-based)
+            version: Document version the render belongs to
+
+        Returns:
+            Path to rendered PNG file (inside a hash-sharded subdirectory)
+        """
+        suffix = f"_v{version}" if version is not None else ""
+        return self.render_dir / self._sharded(
+            pdf_uuid, f"{pdf_uuid}_page_{page_number}{suffix}.png"
+        )
+
+    def render_paths(self, pdf_uuid: str) -> List[Path]:
+        """
+        List a document's rendered page images (all pages and versions).
+
+        Args:
+            pdf_uuid: Unique identifier for the PDF
+
+        Returns:
+            Existing render files
+        """
+        directory = self.get_render_path(pdf_uuid, 1).parent
+        return sorted(directory.glob(f"{pdf_uuid}_page_*.png"))
+
+    def get_linearized_path(self, pdf_uuid: str, version: int) -> Path:
+        """
+        Get path for a document version's linearized copy.
+
+        Linearized copies live next to the renders (they are derived data,
+        rebuilt on demand) but are not counted in the render cache budget.
+
+        Args:
+            pdf_uuid: Unique identifier for the PDF
+            version: Document version the copy belongs to
 
         Returns:
-            Path to rendered PNG file
+            Path to the linearized PDF (inside a hash-sharded subdirectory)
+        """
+        return self.render_dir / self._sharded(pdf_uuid, f"{pdf_uuid}_v{version}_linear.pdf")
+
+    def linearized_paths(self, pdf_uuid: str) -> List[Path]:
         """
-        return self.render_dir / f"{pdf_uuid}_page_{page_number}.png"
+        List a document's linearized copies (all versions).
 
+        Args:
+            pdf_uuid: Unique identifier for the PDF
+
+        Returns:
+            Existing linearized copies
+        """
+        directory = self.get_linearized_path(pdf_uuid, 1).parent
+        return sorted(directory.glob(f"{pdf_uuid}_v*_linear.pdf"))
@@ -0,0 +1,351 @@
+"""Storage backends for PDF files (local filesystem and S3-compatible)."""
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+
+def _copy_stream(stream: BinaryIO, target: Path) -> int:
+    """Copy a binary stream to a file in chunks, returning the byte count."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    with open(target, "wb") as f:
+        while True:
+            chunk = stream.read(DEFAULT_CHUNK_SIZE)
+            if not chunk:
+                break
+            f.write(chunk)
+            written += len(chunk)
+    return written
+
+
+class StorageBackend(ABC):
+    """Abstract object store addressed by string keys (e.g. "<uuid>.pdf")."""
+
+    @abstractmethod
+    def put_file(self, key: str, source_path: Path) -> None:
+        """
+        Store a local file under a key (replacing any existing object).
+
+        Args:
+            key: Object key
+            source_path: Local file to upload
+        """
+
+    @abstractmethod
+    def put_stream(self, key: str, stream: BinaryIO) -> int:
+        """
+        Store the contents of a binary stream under a key.
+
+        Args:
+            key: Object key
+            stream: Readable binary stream
+
+        Returns:
+            Number of bytes stored
+        """
+
+    @abstractmethod
+    def local_path(self, key: str) -> Path:
+        """
+        Get a local filesystem path holding the object's current contents.
+
+        Args:
+            key: Object key
+
+        Returns:
+            Local path (may be a cached copy)
+
+        Raises:
+            FileNotFoundError: If the object doesn't exist
+        """
+
+    @abstractmethod
+    def read_range(self, key: str, start: int, end: int) -> bytes:
+        """
+        Read a byte range of an object.
+
+        Args:
+            key: Object key
+            start: First byte offset (inclusive)
+            end: Last byte offset (inclusive)
+
+        Returns:
+            Bytes in the range
+
+        Raises:
+            FileNotFoundError: If the object doesn't exist
+        """
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        """
+        Get the size of an object in bytes.
+
+        Raises:
+            FileNotFoundError: If the object doesn't exist
+        """
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Check whether an object exists."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Delete an object (no-op if it doesn't exist)."""
+
+    def move(self, source_key: str, target_key: str) -> None:
+        """
+        Move an object to a new key.
+
+        Args:
+            source_key: Existing object key
+            target_key: New object key
+        """
+        self.put_file(target_key, self.local_path(source_key))
+        self.delete(source_key)
+
+    def staging_path(self, key: str) -> Path:
+        """
+        Get a local path where a new version of an object can be written
+        before calling put_file().
+
+        Args:
+            key: Object key
+
+        Returns:
+            Local path
+        """
+        return self.local_path(key)
+
+
+class LocalStorageBackend(StorageBackend):
+    """Backend storing objects as plain files under a root directory."""
+
+    def __init__(self, root_dir: str):
+        """
+        Initialize local backend.
+
+        Args:
+            root_dir: Directory holding the objects
+        """
+        self.root_dir = Path(root_dir)
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.root_dir / key
+
+    def put_file(self, key: str, source_path: Path) -> None:
+        target = self._path(key)
+        if Path(source_path).resolve() == target.resolve():
+            return
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(source_path, target)
+
+    def put_stream(self, key: str, stream: BinaryIO) -> int:
+        return _copy_stream(stream, self._path(key))
+
+    def local_path(self, key: str) -> Path:
+        path = self._path(key)
+        if not path.exists():
+            raise FileNotFoundError(f"Object not found: {key}")
+        return path
+
+    def staging_path(self, key: str) -> Path:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def move(self, source_key: str, target_key: str) -> None:
+        target = self._path(target_key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self.local_path(source_key), target)
+
+    def read_range(self, key: str, start: int, end: int) -> bytes:
+        with open(self.local_path(key), "rb") as f:
+            f.seek(start)
+            return f.read(end - start + 1)
+
+    def size(self, key: str) -> int:
+        return self.local_path(key).stat().st_size
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+
+class S3StorageBackend(StorageBackend):
+    """
+    Backend for S3-compatible object stores (AWS S3, MinIO, ...).
+
+    Objects are uploaded with multipart transfers above a size threshold.
+    local_path() keeps a read-through disk cache validated by ETag, so hot
+    documents are only re-downloaded when another node changed them.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        cache_dir: str,
+        *,
+        prefix: str = "",
+        client=None,
+        endpoint_url: Optional[str] = None,
+        region_name: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        multipart_threshold: int = 8 * 1024 * 1024,
+        multipart_chunk_size: int = 8 * 1024 * 1024,
+    ):
+        """
+        Initialize S3 backend.
+
+        Args:
+            bucket: Bucket name
+            cache_dir: Local directory for the read-through cache
+            prefix: Key prefix inside the bucket
+            client: Pre-built boto3 S3 client (built from the options below if None)
+            endpoint_url: Custom endpoint (e.g. MinIO)
+            region_name: Region name
+            access_key_id: Access key
+            secret_access_key: Secret key
+            multipart_threshold: Size above which uploads use multipart
+            multipart_chunk_size: Multipart part size
+        """
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+        except ImportError as e:  # pragma: no cover - depends on environment
+            raise RuntimeError(
+                "S3 storage backend requires boto3 (pip install boto3)"
+            ) from e
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.client = client or boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region_name,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunk_size,
+        )
+        # ETag of each cached object, as last seen on the store
+        self._cached_etags: dict = {}
+        self._lock = threading.Lock()
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _cache_path(self, key: str) -> Path:
+        return self.cache_dir / key
+
+    def _head(self, key: str) -> dict:
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                raise FileNotFoundError(f"Object not found: {key}") from e
+            raise
+
+    def put_file(self, key: str, source_path: Path) -> None:
+        self.client.upload_file(
+            str(source_path),
+            self.bucket,
+            self._object_key(key),
+            Config=self.transfer_config,
+        )
+        cache_path = self._cache_path(key)
+        if Path(source_path).resolve() != cache_path.resolve():
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(source_path, cache_path)
+        with self._lock:
+            self._cached_etags[key] = self._head(key)["ETag"]
+
+    def put_stream(self, key: str, stream: BinaryIO) -> int:
+        # Spool to the cache file first: it becomes the warm cached copy and
+        # lets the transfer manager do a parallel multipart upload from disk.
+        cache_path = self.staging_path(key)
+        written = _copy_stream(stream, cache_path)
+        self.put_file(key, cache_path)
+        return written
+
+    def staging_path(self, key: str) -> Path:
+        path = self._cache_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def local_path(self, key: str) -> Path:
+        etag = self._head(key)["ETag"]
+        cache_path = self._cache_path(key)
+        with self._lock:
+            if cache_path.exists() and self._cached_etags.get(key) == etag:
+                return cache_path
+
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=cache_path.parent, suffix=".part")
+        os.close(fd)
+        try:
+            self.client.download_file(
+                self.bucket,
+                self._object_key(key),
+                tmp_name,
+                Config=self.transfer_config,
+            )
+            os.replace(tmp_name, cache_path)
+        finally:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+
+        with self._lock:
+            self._cached_etags[key] = etag
+        logger.debug(f"Cached {key} from s3://{self.bucket}")
+        return cache_path
+
+    def read_range(self, key: str, start: int, end: int) -> bytes:
+        from botocore.exceptions import ClientError
+
+        try:
+            response = self.client.get_object(
+                Bucket=self.bucket,
+                Key=self._object_key(key),
+                Range=f"bytes={start}-{end}",
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                raise FileNotFoundError(f"Object not found: {key}") from e
+            raise
+        return response["Body"].read()
+
+    def size(self, key: str) -> int:
+        return int(self._head(key)["ContentLength"])
+
+    def exists(self, key: str) -> bool:
+        try:
+            self._head(key)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+        self._cache_path(key).unlink(missing_ok=True)
+        with self._lock:
+            self._cached_etags.pop(key, None)
@@ -0,0 +1,327 @@
+"""Text layout engine with cached font metrics for overlay edits."""
+import threading
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
+from typing import Dict, List, Optional
+
+import fitz  # PyMuPDF
+
+# Word widths kept per font (least recently used words are dropped beyond this)
+WORD_WIDTH_CACHE_SIZE = 10_000
+
+
+class FontMetrics:
+    """Glyph advance table for a single font, cached per character and word."""
+
+    def __init__(self, font_name: str):
+        """
+        Initialize font metrics.
+
+        Args:
+            font_name: PyMuPDF font name (e.g. "helv", "tiro", "cour")
+        """
+        self.font_name = font_name
+        self._font = fitz.Font(font_name)
+        self._char_advances: Dict[str, float] = {}
+        self._word_widths = lru_cache(maxsize=WORD_WIDTH_CACHE_SIZE)(self._measure_word)
+        self.space_width = self.char_advance(" ")
+
+    def char_advance(self, char: str) -> float:
+        """
+        Get the advance width of a character at font size 1.
+
+        Args:
+            char: Single character
+
+        Returns:
+            Advance width in unit-size points
+        """
+        advance = self._char_advances.get(char)
+        if advance is None:
+            advance = self._font.glyph_advance(ord(char))
+            self._char_advances[char] = advance
+        return advance
+
+    def word_width(self, word: str) -> float:
+        """
+        Get the width of a word at font size 1.
+
+        Args:
+            word: Word without whitespace
+
+        Returns:
+            Width in unit-size points
+        """
+        return self._word_widths(word)
+
+    def _measure_word(self, word: str) -> float:
+        return sum(map(self.char_advance, word))
+
+    def text_width(self, text: str, font_size: float) -> float:
+        """
+        Get the width of a text run at a given font size.
+
+        Args:
+            text: Text to measure
+            font_size: Font size in points
+
+        Returns:
+            Width in points
+        """
+        return sum(map(self.char_advance, text)) * font_size
+
+
+class PreparedParagraph:
+    """A paragraph measured once in unit-size space, ready to wrap at any size."""
+
+    def __init__(self, words: List[str], metrics: FontMetrics):
+        self.words = words
+        self._space = metrics.space_width
+        # offsets[k] = sum of (word width + space) for the first k words
+        self._offsets = [0.0] + list(
+            accumulate(metrics.word_width(w) + self._space for w in words)
+        )
+        # Width of the widest word at font size 1 (it can't be wrapped)
+        self.widest_word = max(
+            (b - a - self._space for a, b in zip(self._offsets, self._offsets[1:])),
+            default=0.0,
+        )
+
+    def break_lines(self, unit_max_width: float) -> List[tuple]:
+        """
+        Greedily break the paragraph into lines.
+
+        Args:
+            unit_max_width: Maximum line width divided by font size
+
+        Returns:
+            List of (start, end) word index ranges, end exclusive
+        """
+        if not self.words:
+            return [(0, 0)]
+
+        offsets = self._offsets
+        n = len(self.words)
+        ranges = []
+        start = 0
+        while start < n:
+            # Line start..end-1 has width offsets[end] - offsets[start] - space
+            limit = offsets[start] + unit_max_width + self._space
+            end = bisect_right(offsets, limit, start + 1, n + 1) - 1
+            # Always take at least one word, even if it overflows
+            end = max(end, start + 1)
+            ranges.append((start, end))
+            start = end
+        return ranges
+
+    def wrap(self, max_width: float, font_size: float) -> List[str]:
+        """
+        Wrap the paragraph to lines of text.
+
+        Args:
+            max_width: Maximum line width in points
+            font_size: Font size in points
+
+        Returns:
+            Wrapped lines
+        """
+        return [
+            " ".join(self.words[start:end])
+            for start, end in self.break_lines(max_width / font_size)
+        ]
+
+
+class PreparedText:
+    """Multi-paragraph text measured once for a given font."""
+
+    def __init__(self, text: str, metrics: FontMetrics):
+        self.metrics = metrics
+        # Explicit newlines are hard breaks; whitespace inside is collapsed
+        self.paragraphs = [
+            PreparedParagraph(paragraph.split(), metrics)
+            for paragraph in (text or "").split("\n")
+        ]
+        self.widest_word = max(p.widest_word for p in self.paragraphs)
+
+    def wrap(self, max_width: float, font_size: float) -> List[str]:
+        """
+        Wrap all paragraphs.
+
+        Args:
+            max_width: Maximum line width in points
+            font_size: Font size in points
+
+        Returns:
+            Wrapped lines (empty paragraphs become empty lines)
+        """
+        lines: List[str] = []
+        for paragraph in self.paragraphs:
+            lines.extend(paragraph.wrap(max_width, font_size))
+        return lines if lines else [""]
+
+    def line_count(self, max_width: float, font_size: float) -> int:
+        """
+        Count wrapped lines without building line strings.
+
+        Args:
+            max_width: Maximum line width in points
+            font_size: Font size in points
+
+        Returns:
+            Number of wrapped lines
+        """
+        unit_max_width = max_width / font_size
+        return sum(
+            len(paragraph.break_lines(unit_max_width))
+            for paragraph in self.paragraphs
+        )
+
+
+def block_height(line_count: int, font_size: float, line_spacing: float) -> float:
+    """
+    Height needed to draw wrapped lines inside a block.
+
+    Matches the overlay drawing loop: the first baseline sits one font size
+    below the top, each further line adds font_size * line_spacing.
+
+    Args:
+        line_count: Number of lines
+        font_size: Font size in points
+        line_spacing: Line spacing multiplier
+
+    Returns:
+        Height in points
+    """
+    if line_count <= 0:
+        return 0.0
+    return font_size + (line_count - 1) * font_size * line_spacing
+
+
+class TextLayoutEngine:
+    """Word-wrap engine that reuses font metrics across edits."""
+
+    def __init__(self):
+        self._metrics: Dict[str, FontMetrics] = {}
+        self._lock = threading.Lock()
+
+    def get_metrics(self, font_name: str) -> FontMetrics:
+        """
+        Get (and cache) metrics for a font.
+
+        Args:
+            font_name: PyMuPDF font name
+
+        Returns:
+            Font metrics instance
+        """
+        metrics = self._metrics.get(font_name)
+        if metrics is None:
+            with self._lock:
+                metrics = self._metrics.get(font_name)
+                if metrics is None:
+                    metrics = FontMetrics(font_name)
+                    self._metrics[font_name] = metrics
+        return metrics
+
+    def prepare(self, text: str, font_name: str) -> PreparedText:
+        """
+        Measure text once so it can be wrapped at several sizes cheaply.
+
+        Args:
+            text: Text (may contain explicit newlines)
+            font_name: PyMuPDF font name
+
+        Returns:
+            Prepared text
+        """
+        return PreparedText(text, self.get_metrics(font_name))
+
+    def wrap(
+        self,
+        text: str,
+        max_width: float,
+        font_name: str,
+        font_size: float,
+    ) -> List[str]:
+        """
+        Word-wrap text to fit within a given width.
+
+        Handles explicit newlines (\\n) as line breaks and word-wraps
+        each paragraph independently.
+
+        Args:
+            text: Text to wrap (may contain explicit newlines)
+            max_width: Maximum width in points
+            font_name: Font name
+            font_size: Font size in points
+
+        Returns:
+            List of wrapped lines
+        """
+        if not text:
+            return [""]
+        return self.prepare(text, font_name).wrap(max_width, font_size)
+
+    def fit_font_size(
+        self,
+        prepared: PreparedText,
+        max_width: float,
+        max_height: float,
+        *,
+        max_font_size: float,
+        min_font_size: float,
+        line_spacing: float = 1.2,
+        tolerance: float = 0.05,
+    ) -> Optional[float]:
+        """
+        Find the largest font size whose wrapped text fits a box.
+
+        Binary-searches the font size; each probe only re-breaks lines over
+        the prepared prefix sums, so no font measurement happens here. A
+        size fits when the wrapped lines fit the height and the widest word
+        (which can't be wrapped) fits the width.
+
+        Args:
+            prepared: Text measured with prepare()
+            max_width: Available width in points
+            max_height: Available height in points
+            max_font_size: Upper bound (returned as-is if it already fits)
+            min_font_size: Lower bound
+            line_spacing: Line spacing multiplier
+            tolerance: Search precision in points
+
+        Returns:
+            Largest fitting font size, or None if even min_font_size overflows
+        """
+
+        def fits(size: float) -> bool:
+            if prepared.widest_word * size > max_width:
+                return False
+            lines = prepared.line_count(max_width, size)
+            return block_height(lines, size, line_spacing) <= max_height
+
+        if fits(max_font_size):
+            return max_font_size
+        if not fits(min_font_size):
+            return None
+
+        low, high = min_font_size, max_font_size
+        while high - low > tolerance:
+            mid = (low + high) / 2
+            if fits(mid):
+                low = mid
+            else:
+                high = mid
+        return low
+
+
+_default_engine: Optional[TextLayoutEngine] = None
+
+
+def get_layout_engine() -> TextLayoutEngine:
+    """Get the process-wide layout engine (shares font metric caches)."""
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = TextLayoutEngine()
+    return _default_engine
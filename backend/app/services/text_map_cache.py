@@ -0,0 +1,197 @@
+"""Cache of extracted page text maps (in-process, backed by the shared tier)."""
+import json
+import threading
+from collections import OrderedDict
+from functools import partial
+from typing import Callable, List, Optional, Tuple
+
+from app.core.metrics import record_cache_lookup
+from app.schemas.pdf_text_map import TextBlock
+from app.services.shared_cache import SharedCache, produce_once
+from app.services.single_flight import SingleFlight
+
+# (blocks, page_width, page_height) as returned by PDFEngine.extract_text_map
+TextMap = Tuple[List[TextBlock], float, float]
+
+
+def text_map_key(pdf_uuid: str, version: int, page_number: int) -> str:
+    """Shared cache key of a page's text map."""
+    return f"textmap:{pdf_uuid}:v{version}:p{page_number}"
+
+
+def encode_text_map(text_map: TextMap) -> bytes:
+    """Serialize a text map for the shared cache."""
+    blocks, width, height = text_map
+    return json.dumps({
+        "blocks": [block.model_dump() for block in blocks],
+        "width": width,
+        "height": height,
+    }).encode()
+
+
+def decode_text_map(data: bytes) -> TextMap:
+    """Deserialize a text map from the shared cache."""
+    payload = json.loads(data)
+    blocks = [TextBlock.model_validate(block) for block in payload["blocks"]]
+    return blocks, payload["width"], payload["height"]
+
+
+class TextMapCache:
+    """
+    LRU cache of text maps keyed by (uuid, document version, page).
+
+    The document version is bumped on every edit, so entries never need
+    explicit invalidation: an edit simply makes lookups miss until the new
+    version is extracted. Cached blocks are shared and must not be mutated.
+
+    With a shared tier, local misses fall through to it and every put is
+    published to it, so a page extracted by one worker is reused by all.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        shared: Optional[SharedCache] = None,
+        flights: Optional[SingleFlight] = None,
+    ):
+        """
+        Initialize text map cache.
+
+        Args:
+            max_entries: Maximum cached pages (0 disables caching)
+            shared: Cross-worker cache tier (None for in-process only)
+            flights: Coalesces concurrent extractions of the same page
+        """
+        self.max_entries = max_entries
+        self.shared = shared
+        self.flights = flights
+        self._entries: "OrderedDict[tuple, TextMap]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, pdf_uuid: str, version: int, page_number: int) -> Optional[TextMap]:
+        """
+        Get a cached text map.
+
+        Args:
+            pdf_uuid: PDF document UUID
+            version: Document version
+            page_number: Page number (1-based)
+
+        Returns:
+            Cached text map, or None on a miss
+        """
+        key = (pdf_uuid, version, page_number)
+        with self._lock:
+            text_map = self._entries.get(key)
+            if text_map is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        record_cache_lookup("text_map", text_map is not None)
+
+        if text_map is None and self.shared is not None:
+            data = self.shared.get(text_map_key(pdf_uuid, version, page_number))
+            if data is not None:
+                text_map = decode_text_map(data)
+                self._put_local(key, text_map)
+        return text_map
+
+    def put(self, pdf_uuid: str, version: int, page_number: int, text_map: TextMap) -> None:
+        """
+        Cache a text map.
+
+        Args:
+            pdf_uuid: PDF document UUID
+            version: Document version the map was extracted from
+            page_number: Page number (1-based)
+            text_map: (blocks, page_width, page_height)
+        """
+        self._put_local((pdf_uuid, version, page_number), text_map)
+        if self.shared is not None:
+            self.shared.put(text_map_key(pdf_uuid, version, page_number), encode_text_map(text_map))
+
+    def get_or_load(
+        self, pdf_uuid: str, version: int, page_number: int, load: Callable[[], TextMap]
+    ) -> TextMap:
+        """
+        Get a text map, loading it on a miss.
+
+        Concurrent misses for the same page share one extraction: within the
+        process through the single-flight group, and across workers through
+        its file locks and the shared tier's lease (which also spans nodes).
+
+        Args:
+            pdf_uuid: PDF document UUID
+            version: Document version
+            page_number: Page number (1-based)
+            load: Extracts the text map
+
+        Returns:
+            Cached or freshly loaded text map
+        """
+        text_map = self.get(pdf_uuid, version, page_number)
+        if text_map is not None:
+            return text_map
+
+        key = text_map_key(pdf_uuid, version, page_number)
+
+        def produce() -> TextMap:
+            with produce_once(self.shared, key):
+                # Another worker may have extracted it while we waited
+                text_map = self._peek_shared(pdf_uuid, version, page_number)
+                if text_map is None:
+                    text_map = load()
+                    self.put(pdf_uuid, version, page_number, text_map)
+            return text_map
+
+        if self.flights is None:
+            return produce()
+        # Without a shared tier, other workers' results can't be seen: don't wait for them
+        recheck = None
+        if self.shared is not None:
+            recheck = partial(self._peek_shared, pdf_uuid, version, page_number)
+        return self.flights.do(key, produce, recheck)
+
+    def _peek_shared(self, pdf_uuid: str, version: int, page_number: int) -> Optional[TextMap]:
+        """Read a text map another worker published, caching it locally."""
+        if self.shared is None:
+            return None
+        data = self.shared.peek(text_map_key(pdf_uuid, version, page_number))
+        if data is None:
+            return None
+        text_map = decode_text_map(data)
+        self._put_local((pdf_uuid, version, page_number), text_map)
+        return text_map
+
+    def _put_local(self, key: tuple, text_map: TextMap) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = text_map
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dict with entries, hits, misses and hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,660 @@
+"""Document version history built on incremental PDF updates."""
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models.pdf_document import PDFDocument
+from app.models.pdf_version import PDFVersion
+from app.services.events import VERSION_CHANGED, EventBus
+from app.services.storage import PDFStorageService, sibling_temp_path
+
+logger = logging.getLogger(__name__)
+
+# Versions are identified by a hash of the bytes just before their end, so a
+# full rewrite of the file is never mistaken for an appended update
+CHECKSUM_BYTES = 1024
+
+# Every incremental update ends with its own end-of-file marker
+EOF_MARKER = b"%%EOF"
+
+# Initial read size when searching backwards for the previous update's end
+EOF_SCAN_BYTES = 64 * 1024
+
+COPY_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+
+class VersionNotFound(LookupError):
+    """The requested version is not (or no longer) in the document's history."""
+
+
+class VersionUnavailable(ValueError):
+    """The requested version can't be reached from the current one."""
+
+
+def parse_page_versions(raw: Optional[str]) -> Optional[dict]:
+    """
+    Decode a page_versions column.
+
+    Args:
+        raw: JSON text ({"base": n, "pages": {"<page>": n}}) or None
+
+    Returns:
+        Decoded mapping, or None if every page is at the document version
+    """
+    return json.loads(raw) if raw else None
+
+
+def page_version(page_versions: Optional[dict], version: int, page_number: int) -> int:
+    """
+    Get the version in which a page last changed.
+
+    Renders and text maps are cached under this number, so they stay valid
+    across versions that only touched other pages.
+
+    Args:
+        page_versions: Decoded page_versions column
+        version: Current document version
+        page_number: Page number (1-based)
+
+    Returns:
+        Version number of the page's current content
+    """
+    if not page_versions:
+        return version
+    return page_versions["pages"].get(str(page_number), page_versions["base"])
+
+
+def _next_page_versions(
+    raw: Optional[str], version: int, new_version: int, pages: Optional[Sequence[int]]
+) -> str:
+    """Page versions after a change to some pages (None: all pages changed)."""
+    if pages is None:
+        return json.dumps({"base": new_version, "pages": {}})
+    current = parse_page_versions(raw) or {"base": version, "pages": {}}
+    changed = dict(current["pages"])
+    changed.update({str(page): new_version for page in pages})
+    return json.dumps({"base": current["base"], "pages": changed})
+
+
+def _restored_page_versions(
+    raw: Optional[str], version: int, page_count: int, changed: Sequence[int], new_version: int
+) -> str:
+    """
+    Page versions of a version being restored under a new number.
+
+    Pages whose content differs from the version restored from get the new
+    number; the others keep theirs, so their cached renders and text maps
+    stay valid.
+    """
+    current = parse_page_versions(raw) or {"base": version, "pages": {}}
+    pages = {page: number for page, number in current["pages"].items() if int(page) <= page_count}
+    pages.update({str(page): new_version for page in changed if page <= page_count})
+    return json.dumps({"base": current["base"], "pages": pages})
+
+
+def _changed_pages(
+    before: Optional[dict], before_version: int, before_count: int,
+    after: Optional[dict], after_version: int, after_count: int,
+) -> List[int]:
+    """Pages whose content differs between two versions (added and removed pages included)."""
+    return [
+        page
+        for page in range(1, max(before_count, after_count) + 1)
+        if page > min(before_count, after_count)
+        or page_version(before, before_version, page) != page_version(after, after_version, page)
+    ]
+
+
+def _next_number(current: int, rows: Sequence[PDFVersion]) -> int:
+    """
+    Number for a document's next version.
+
+    Numbers are never reused, not even when undo or restore returns to
+    earlier content: a render or text map cached under a number by a reader
+    that raced a change could otherwise become current again.
+    """
+    return max([current] + [row.number for row in rows]) + 1
+
+
+def _checksum(f, end: int) -> str:
+    """SHA-1 of the CHECKSUM_BYTES bytes before offset end of an open file."""
+    start = max(0, end - CHECKSUM_BYTES)
+    f.seek(start)
+    return hashlib.sha1(f.read(end - start)).hexdigest()
+
+
+def _previous_update_end(f, size: int) -> Optional[int]:
+    """
+    Find where the file's last incremental update starts.
+
+    That is the end of the second-to-last %%EOF marker and its line break,
+    i.e. the size of the file before the update was appended.
+
+    Returns:
+        Byte offset, or None if the file has a single section
+    """
+    window = EOF_SCAN_BYTES
+    while True:
+        start = max(0, size - window)
+        f.seek(start)
+        data = f.read(size - start)
+        last = data.rfind(EOF_MARKER)
+        previous = data.rfind(EOF_MARKER, 0, last) if last > 0 else -1
+        if previous >= 0:
+            end = previous + len(EOF_MARKER)
+            # One line break belongs to the marker; MuPDF starts updates with another
+            for eol in (b"\r\n", b"\n", b"\r"):
+                if data.startswith(eol, end):
+                    end += len(eol)
+                    break
+            return start + end
+        if start == 0 or last < 0:
+            return None
+        window *= 4
+
+
+@dataclass(frozen=True)
+class FileState:
+    """Facts about a stored PDF needed to record its new version."""
+
+    size: int
+    checksum: str
+    previous_end: Optional[int] = None  # Start of the last incremental update
+    previous_checksum: Optional[str] = None  # Checksum of the file before it
+
+
+@dataclass
+class RecordedChange:
+    """Outcome of recording a change in the database."""
+
+    version: Optional[int]
+    discarded: List[int] = field(default_factory=list)  # Versions whose deltas can go
+    page_count: Optional[int] = None
+
+
+class VersionHistory:
+    """
+    Per-document version history with undo, redo and restore.
+
+    Edits are saved as incremental updates (see PDFEngine's
+    incremental_saves), so the stored PDF at any version is a prefix of the
+    PDF at every later version. A version therefore costs only the bytes it
+    appended: undo cuts the file back to its parent's size, moving the cut
+    bytes to a delta object that redo appends again. A new edit after an
+    undo discards the undone versions.
+
+    Full rewrites (optimization, or documents MuPDF can't update
+    incrementally) can't be undone this way and start a new history.
+
+    Every change of the current version is published as a version_changed
+    event naming the pages that changed.
+    """
+
+    def __init__(
+        self,
+        storage: PDFStorageService,
+        max_versions: int = 50,
+        events: Optional[EventBus] = None,
+    ):
+        """
+        Initialize version history.
+
+        Args:
+            storage: Storage service
+            max_versions: Versions kept per document (0 disables history)
+            events: Event bus for version_changed events (None disables them)
+        """
+        self.storage = storage
+        self.max_versions = max_versions
+        self.events = events
+
+    def _notify(
+        self,
+        pdf_uuid: str,
+        version: int,
+        operation: str,
+        pages: Optional[Sequence[int]],
+        page_count: Optional[int],
+    ) -> None:
+        if self.events is not None:
+            self.events.publish(
+                pdf_uuid,
+                VERSION_CHANGED,
+                version=version,
+                operation=operation,
+                pages=sorted(set(pages)) if pages is not None else None,
+                page_count=page_count,
+            )
+
+    @property
+    def enabled(self) -> bool:
+        """Whether versions are recorded."""
+        return self.max_versions > 0
+
+    def inspect(self, pdf_uuid: str) -> Optional[FileState]:
+        """
+        Read what record() needs to know about a changed PDF.
+
+        Args:
+            pdf_uuid: PDF document UUID
+
+        Returns:
+            File state, or None if history is disabled
+        """
+        if not self.enabled:
+            return None
+        path = self.storage.get_pdf_path(pdf_uuid)
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            previous_end = _previous_update_end(f, size)
+            return FileState(
+                size=size,
+                checksum=_checksum(f, size),
+                previous_end=previous_end,
+                previous_checksum=_checksum(f, previous_end) if previous_end else None,
+            )
+
+    def record(
+        self,
+        db: Session,
+        pdf_uuid: str,
+        state: Optional[FileState],
+        *,
+        operation: str,
+        pages: Optional[Sequence[int]] = None,
+        page_count: Optional[int] = None,
+    ) -> RecordedChange:
+        """
+        Record a new version of a document and commit.
+
+        Does no file IO (see inspect() and delete_deltas()), so async
+        endpoints can run it on their session with AsyncSession.run_sync().
+
+        Args:
+            db: Database session
+            pdf_uuid: PDF document UUID
+            state: State of the changed file from inspect()
+            operation: What changed the document ("edit_block", "rotate", ...)
+            pages: Pages whose content changed (None: all pages)
+            page_count: New page count, if it changed
+
+        Returns:
+            The new version and the undone versions it discarded
+        """
+        db_pdf = self._document(db, pdf_uuid)
+        if db_pdf is None:
+            return RecordedChange(version=None)
+
+        current = db_pdf.version or 1
+        rows = self._rows(db, pdf_uuid)
+        number = _next_number(current, rows)
+        page_versions = _next_page_versions(db_pdf.page_versions, current, number, pages)
+
+        discarded = rows
+        if state is not None:
+            parent = next((row for row in rows if row.number == current), None)
+            appended = state.previous_end is not None and (
+                parent is None
+                or (state.previous_end == parent.size and state.previous_checksum == parent.checksum)
+            )
+            if appended and parent is not None:
+                # Undone versions can't be redone after a new edit
+                ancestry = self._ancestry({row.number: row for row in rows}, parent)
+                discarded = [row for row in rows if row not in ancestry]
+            elif appended:
+                # First change with history on: the file before it is the update's prefix
+                parent = PDFVersion(
+                    document_uuid=pdf_uuid,
+                    number=current,
+                    parent=None,
+                    operation="original",
+                    pages=None,
+                    page_count=db_pdf.page_count,
+                    page_versions=db_pdf.page_versions,
+                    offset=0,
+                    size=state.previous_end,
+                    checksum=state.previous_checksum,
+                )
+                db.add(parent)
+            db.add(PDFVersion(
+                document_uuid=pdf_uuid,
+                number=number,
+                parent=parent.number if appended else None,
+                operation=operation,
+                pages=json.dumps(sorted(set(pages))) if pages is not None else None,
+                page_count=page_count if page_count is not None else db_pdf.page_count,
+                page_versions=page_versions,
+                offset=state.previous_end if appended else 0,
+                size=state.size,
+                checksum=state.checksum,
+            ))
+
+            kept = [row for row in rows if row not in discarded]
+            kept_count = len(kept) + (1 if appended and parent not in rows else 0) + 1
+            excess = max(0, kept_count - self.max_versions)
+            discarded = discarded + kept[:excess]
+
+        for row in discarded:
+            db.delete(row)
+        db_pdf.version = number
+        db_pdf.page_versions = page_versions
+        if page_count is not None:
+            db_pdf.page_count = page_count
+        db.commit()
+        return RecordedChange(
+            version=number,
+            discarded=[row.number for row in discarded],
+            page_count=db_pdf.page_count,
+        )
+
+    def commit_change(
+        self,
+        db: Session,
+        pdf_uuid: str,
+        *,
+        operation: str,
+        pages: Optional[Sequence[int]] = None,
+        page_count: Optional[int] = None,
+    ) -> Optional[int]:
+        """
+        Record a change to a stored PDF as a new version.
+
+        Args:
+            db: Database session
+            pdf_uuid: PDF document UUID
+            operation: What changed the document ("edit_block", "rotate", ...)
+            pages: Pages whose content changed (None: all pages)
+            page_count: New page count, if it changed
+
+        Returns:
+            The new version, or None if the document doesn't exist
+        """
+        change = self.record(
+            db, pdf_uuid, self.inspect(pdf_uuid),
+            operation=operation, pages=pages, page_count=page_count,
+        )
+        self.delete_deltas(pdf_uuid, change.discarded)
+        if change.version is not None:
+            self._notify(pdf_uuid, change.version, operation, pages, change.page_count)
+        return change.version
+
+    async def commit_change_async(
+        self,
+        db: AsyncSession,
+        pdf_uuid: str,
+        *,
+        operation: str,
+        pages: Optional[Sequence[int]] = None,
+        page_count: Optional[int] = None,
+    ) -> Optional[int]:
+        """
+        Async variant of commit_change() for async endpoints.
+
+        File IO runs in the threadpool; the database work runs on the async
+        session through run_sync().
+        """
+        state = await run_in_threadpool(self.inspect, pdf_uuid)
+        change = await db.run_sync(
+            lambda session: self.record(
+                session, pdf_uuid, state,
+                operation=operation, pages=pages, page_count=page_count,
+            )
+        )
+        if change.discarded:
+            await run_in_threadpool(self.delete_deltas, pdf_uuid, change.discarded)
+        if change.version is not None:
+            self._notify(pdf_uuid, change.version, operation, pages, change.page_count)
+        return change.version
+
+    def list_versions(self, db: Session, pdf_uuid: str) -> List[PDFVersion]:
+        """
+        List a document's recorded versions, oldest first.
+
+        Args:
+            db: Database session
+            pdf_uuid: PDF document UUID
+
+        Returns:
+            Version rows (empty until the document is first changed)
+        """
+        return self._rows(db, pdf_uuid)
+
+    def undo(self, db: Session, pdf_uuid: str) -> PDFVersion:
+        """
+        Go back to the version before the current one.
+
+        Raises:
+            VersionUnavailable: If there is nothing to undo (including when
+                the previous version was dropped to keep max_versions)
+        """
+        current = self._current_row(db, pdf_uuid)
+        if current is None or current.parent is None:
+            raise VersionUnavailable("Nothing to undo")
+        if current.parent not in {row.number for row in self._rows(db, pdf_uuid)}:
+            raise VersionUnavailable("Nothing to undo")
+        return self.restore(db, pdf_uuid, current.parent, operation="undo")
+
+    def redo(self, db: Session, pdf_uuid: str) -> PDFVersion:
+        """
+        Re-apply the most recently undone version.
+
+        Raises:
+            VersionUnavailable: If there is nothing to redo
+        """
+        current = self._current_row(db, pdf_uuid)
+        child = None
+        if current is not None:
+            child = (
+                db.query(PDFVersion)
+                .filter(PDFVersion.document_uuid == pdf_uuid, PDFVersion.parent == current.number)
+                .order_by(PDFVersion.number)
+                .first()
+            )
+        if child is None:
+            raise VersionUnavailable("Nothing to redo")
+        return self.restore(db, pdf_uuid, child.number, operation="redo")
+
+    def restore(
+        self, db: Session, pdf_uuid: str, number: int, *, operation: str = "restore"
+    ) -> PDFVersion:
+        """
+        Make a recorded version the current one.
+
+        Going back cuts the PDF to the version's size, keeping the removed
+        updates as deltas; going forward appends the kept deltas again.
+        Restoring doesn't create a version, so redo keeps working, but the
+        restored version gets a new number (see _next_number()), as do the
+        pages that change.
+
+        Args:
+            db: Database session
+            pdf_uuid: PDF document UUID
+            number: Version to restore
+            operation: Name given to the move in the version_changed event
+
+        Returns:
+            The restored version (under its new number)
+
+        Raises:
+            VersionNotFound: If the version isn't in the history
+            VersionUnavailable: If it can't be reached from the current version
+        """
+        db_pdf = self._document(db, pdf_uuid)
+        if db_pdf is None:
+            raise VersionNotFound(f"PDF not found: {pdf_uuid}")
+        rows = {row.number: row for row in self._rows(db, pdf_uuid)}
+        target = rows.get(number)
+        if target is None:
+            raise VersionNotFound(f"Version not found: {number}")
+        current = rows.get(db_pdf.version)
+        if current is None:
+            raise VersionUnavailable("The current version is not in the history")
+        if target is current:
+            return target
+
+        pdf_path = self.storage.get_pdf_path(pdf_uuid)
+        if pdf_path.stat().st_size != current.size:
+            raise VersionUnavailable("The stored PDF no longer matches its current version")
+
+        undone = self._path_between(rows, current, target)
+        if undone is not None:
+            # Keep each undone update so it can be redone
+            for row in undone:
+                self._save_delta(pdf_uuid, pdf_path, row)
+            self._publish(pdf_uuid, pdf_path, target.size, [])
+            applied = []
+        else:
+            applied = self._path_between(rows, target, current)
+            if applied is None:
+                raise VersionUnavailable(f"Version {number} is not reachable from the current version")
+            applied.reverse()
+            try:
+                deltas = [
+                    self.storage.backend.local_path(self.storage.version_delta_key(pdf_uuid, row.number))
+                    for row in applied
+                ]
+            except FileNotFoundError:
+                raise VersionUnavailable(f"The changes of version {number} are no longer stored")
+            self._publish(pdf_uuid, pdf_path, current.size, deltas)
+
+        pages = _changed_pages(
+            parse_page_versions(db_pdf.page_versions), db_pdf.version, db_pdf.page_count,
+            parse_page_versions(target.page_versions), target.number, target.page_count,
+        )
+        applied_numbers = [row.number for row in applied]
+        new_number = _next_number(db_pdf.version, list(rows.values()))
+        for row in rows.values():
+            if row.parent == target.number:
+                row.parent = new_number
+        target.page_versions = _restored_page_versions(
+            target.page_versions, target.number, target.page_count, pages, new_number
+        )
+        target.number = new_number
+        db_pdf.version = new_number
+        db_pdf.page_count = target.page_count
+        db_pdf.page_versions = target.page_versions
+        db.commit()
+        self.delete_deltas(pdf_uuid, applied_numbers)
+        logger.info(f"Restored {pdf_uuid} to version {number}, now version {new_number}")
+        self._notify(pdf_uuid, new_number, operation, pages, target.page_count)
+        return target
+
+    def delete_all(self, db: Session, pdf_uuid: str) -> None:
+        """
+        Delete a document's history rows and stored deltas (caller commits).
+
+        Args:
+            db: Database session
+            pdf_uuid: PDF document UUID
+        """
+        rows = self._rows(db, pdf_uuid)
+        self.delete_deltas(pdf_uuid, [row.number for row in rows])
+        for row in rows:
+            db.delete(row)
+
+    def delete_deltas(self, pdf_uuid: str, numbers: Sequence[int]) -> None:
+        """
+        Delete the stored deltas of versions (no-op for versions without one).
+
+        Args:
+            pdf_uuid: PDF document UUID
+            numbers: Version numbers
+        """
+        for number in numbers:
+            self.storage.backend.delete(self.storage.version_delta_key(pdf_uuid, number))
+
+    @staticmethod
+    def _document(db: Session, pdf_uuid: str) -> Optional[PDFDocument]:
+        # Reloaded even if the session already has the row: the version it
+        # builds on is the one in the database now, not when it was loaded
+        return (
+            db.query(PDFDocument)
+            .filter(PDFDocument.uuid == pdf_uuid)
+            .populate_existing()
+            .first()
+        )
+
+    def _rows(self, db: Session, pdf_uuid: str) -> List[PDFVersion]:
+        return (
+            db.query(PDFVersion)
+            .filter(PDFVersion.document_uuid == pdf_uuid)
+            .order_by(PDFVersion.number)
+            .all()
+        )
+
+    def _current_row(self, db: Session, pdf_uuid: str) -> Optional[PDFVersion]:
+        version = db.query(PDFDocument.version).filter(PDFDocument.uuid == pdf_uuid).scalar()
+        if version is None:
+            raise VersionNotFound(f"PDF not found: {pdf_uuid}")
+        return (
+            db.query(PDFVersion)
+            .filter(PDFVersion.document_uuid == pdf_uuid, PDFVersion.number == version)
+            .first()
+        )
+
+    @staticmethod
+    def _ancestry(rows: Dict[int, PDFVersion], start: PDFVersion) -> List[PDFVersion]:
+        """A version and its ancestors, newest first."""
+        path = [start]
+        while path[-1].parent is not None and path[-1].parent in rows:
+            path.append(rows[path[-1].parent])
+        return path
+
+    @staticmethod
+    def _path_between(
+        rows: Dict[int, PDFVersion], start: PDFVersion, ancestor: PDFVersion
+    ) -> Optional[List[PDFVersion]]:
+        """Versions from start back to (excluding) ancestor, or None if it isn't one."""
+        path = []
+        row = start
+        while row is not ancestor:
+            path.append(row)
+            row = rows.get(row.parent) if row.parent is not None else None
+            if row is None:
+                return None
+        return path
+
+    def _save_delta(self, pdf_uuid: str, pdf_path: Path, row: PDFVersion) -> None:
+        """Store the bytes a version appended as its delta object."""
+        key = self.storage.version_delta_key(pdf_uuid, row.number)
+        staging_path = self.storage.backend.staging_path(key)
+        with open(pdf_path, "rb") as src, open(staging_path, "wb") as dst:
+            src.seek(row.offset)
+            _copy_bytes(src, dst, row.size - row.offset)
+        self.storage.backend.put_file(key, staging_path)
+
+    def _publish(
+        self, pdf_uuid: str, pdf_path: Path, prefix_size: int, deltas: List[Path]
+    ) -> None:
+        """Atomically replace the stored PDF with a prefix of it plus appended deltas."""
+        target = self.storage.new_pdf_path(pdf_uuid)
+        tmp_path = sibling_temp_path(target)
+        try:
+            with open(pdf_path, "rb") as src, open(tmp_path, "wb") as dst:
+                _copy_bytes(src, dst, prefix_size)
+                for delta in deltas:
+                    with open(delta, "rb") as f:
+                        _copy_bytes(f, dst, None)
+            os.replace(tmp_path, target)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        self.storage.commit_pdf(pdf_uuid)
+
+
+def _copy_bytes(src, dst, count: Optional[int]) -> None:
+    """Copy count bytes (None: the rest) from one binary file to another."""
+    while count is None or count > 0:
+        chunk = src.read(COPY_CHUNK_SIZE if count is None else min(COPY_CHUNK_SIZE, count))
+        if not chunk:
+            break
+        dst.write(chunk)
+        if count is not None:
+            count -= len(chunk)
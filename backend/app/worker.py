@@ -0,0 +1,60 @@
+"""Standalone background job worker.
+
+Run one or more of these next to the API (with JOB_WORKER_ENABLED=false on
+the API) to keep heavy PDF operations out of the web processes:
+
+    python -m app.worker --concurrency 4
+"""
+import argparse
+import asyncio
+import logging
+
+from app.api.deps import get_job_handlers, get_job_queue
+from app.core.config import settings
+from app.core.tracing import configure_tracing, shutdown_tracing
+from app.db.session import init_db
+from app.services.jobs import run_job_worker
+
+
+def main() -> None:
+    """Parse arguments and run the worker until interrupted."""
+    parser = argparse.ArgumentParser(description="AeroPdf background job worker")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.JOB_WORKER_CONCURRENCY,
+        help="Jobs run at once by this process",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=settings.JOB_POLL_INTERVAL_SECONDS,
+        help="Seconds between polls when the queue is empty",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if settings.DB_AUTO_MIGRATE:
+        init_db()
+    configure_tracing(
+        settings.TRACING_EXPORTER,
+        service_name=f"{settings.TRACING_SERVICE_NAME}-worker",
+        otlp_endpoint=settings.TRACING_OTLP_ENDPOINT,
+        file_path=settings.TRACING_FILE,
+    )
+
+    try:
+        asyncio.run(run_job_worker(
+            get_job_queue(),
+            get_job_handlers(),
+            concurrency=args.concurrency,
+            poll_interval=args.poll_interval,
+        ))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutdown_tracing()
+
+
+if __name__ == "__main__":
+    main()
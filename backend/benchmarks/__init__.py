@@ -0,0 +1 @@
+"""Performance benchmarks for AeroPdf backend."""
@@ -0,0 +1,226 @@
+"""
+Benchmarks for PDFEngine operations on synthetic documents.
+
+Generates deterministic PDFs (see benchmarks/synthetic.py) into a temporary
+directory, times page counting, rendering at several zooms (whole pages and in
+bands), batch rendering, text map extraction, block and word edits,
+optimization, merge and split, and optionally saves or compares JSON
+baselines.
+
+Usage (from backend/):
+    python -m benchmarks.bench_engine                       # run and print
+    python -m benchmarks.bench_engine --save baseline.json  # record a baseline
+    python -m benchmarks.bench_engine --compare baseline.json  # exit 1 on regression
+    python -m benchmarks.bench_engine --quick --filter render
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.schemas.pdf_text_map import BBox
+from app.services.pdf_engine import PDFEngine
+from app.services.storage import PDFStorageService
+from benchmarks.harness import (
+    Case,
+    Stats,
+    compare,
+    format_comparison,
+    format_results,
+    load_baseline,
+    measure,
+    save_baseline,
+)
+from benchmarks.synthetic import PROFILES, DocumentProfile, first_block_and_word, write_pdf
+
+ZOOMS = (1.0, 2.0, 3.0)
+MERGE_FILES = 4
+# Band size of the memory-bounded render cases (pixels rasterized at once)
+BAND_PIXELS = 1_000_000
+BATCH_PAGES = 5
+
+
+def _bbox(rect: tuple) -> BBox:
+    x0, y0, x1, y1 = rect
+    return BBox(x0=x0, y0=y0, x1=x1, y1=y1)
+
+
+def build_cases(work_dir: Path, profiles: List[DocumentProfile]) -> List[Case]:
+    """
+    Generate documents and build the benchmark cases for them.
+
+    Args:
+        work_dir: Scratch directory (documents, edit copies, outputs)
+        profiles: Document profiles to benchmark
+
+    Returns:
+        Benchmark cases
+    """
+    storage = PDFStorageService(
+        base_dir=str(work_dir),
+        pdf_dir=str(work_dir / "pdfs"),
+        render_dir=str(work_dir / "renders"),
+    )
+    engine = PDFEngine(storage)
+    banded_engine = PDFEngine(storage, render_band_pixels=BAND_PIXELS)
+    scratch = work_dir / "scratch"
+    scratch.mkdir()
+    cases = []
+
+    for profile in profiles:
+        source = write_pdf(profile, work_dir)
+        name = profile.name
+        block_bbox, word_bbox = first_block_and_word(source)
+        edit_copy = scratch / f"{name}_edit.pdf"
+
+        def fresh_copy(source=source, target=edit_copy) -> Path:
+            shutil.copyfile(source, target)
+            return target
+
+        cases.append(Case(
+            f"get_page_count[{name}]",
+            lambda source=source: engine.get_page_count(source),
+            rounds=30,
+        ))
+        for zoom in ZOOMS:
+            cases.append(Case(
+                f"render_page_to_png[{name},zoom={zoom:g}]",
+                lambda source=source, zoom=zoom: engine.render_page_to_png(source, 1, zoom),
+                rounds=10 if zoom >= 3 else 15,
+            ))
+        cases.append(Case(
+            f"render_page_to_png[{name},zoom=3,banded]",
+            lambda source=source: banded_engine.render_page_to_png(source, 1, 3.0),
+            rounds=10,
+        ))
+        batch = list(range(1, min(profile.pages, BATCH_PAGES) + 1))
+        cases.append(Case(
+            f"render_pages_to_png[{name},pages={len(batch)}]",
+            lambda source=source, batch=batch: list(engine.render_pages_to_png(source, batch)),
+            rounds=8,
+        ))
+        cases.append(Case(
+            f"extract_text_map[{name}]",
+            lambda source=source: engine.extract_text_map(source, 1),
+        ))
+        cases.append(Case(
+            f"apply_block_edit[{name}]",
+            lambda path, bbox=_bbox(block_bbox): engine.apply_block_edit(
+                path, 1, bbox, "Replacement paragraph text " * 6, auto_fit=True
+            ),
+            setup=fresh_copy,
+            rounds=10,
+        ))
+        cases.append(Case(
+            f"apply_word_edit[{name}]",
+            lambda path, bbox=_bbox(word_bbox): engine.apply_word_edit(path, 1, bbox, "edited"),
+            setup=fresh_copy,
+            rounds=10,
+        ))
+        cases.append(Case(
+            f"apply_block_edit_redact[{name}]",
+            lambda path, bbox=_bbox(block_bbox): engine.apply_block_edit(
+                path, 1, bbox, "Replacement paragraph text " * 6, auto_fit=True, mode="redact"
+            ),
+            setup=fresh_copy,
+            rounds=10,
+        ))
+        cases.append(Case(
+            f"apply_word_edit_redact[{name}]",
+            lambda path, bbox=_bbox(word_bbox): engine.apply_word_edit(
+                path, 1, bbox, "edited", mode="redact"
+            ),
+            setup=fresh_copy,
+            rounds=10,
+        ))
+        cases.append(Case(
+            f"optimize[{name}]",
+            lambda path: engine.optimize(path, image_dpi=72),
+            setup=fresh_copy,
+            rounds=8,
+        ))
+        cases.append(Case(
+            f"merge_files[{name}x{MERGE_FILES}]",
+            lambda source=source, out=scratch / f"{name}_merged.pdf": engine.merge_files(
+                [source] * MERGE_FILES, out
+            ),
+            rounds=8,
+        ))
+        halves = [f"1-{max(1, profile.pages // 2)}", f"{profile.pages // 2 + 1}-"]
+        if profile.pages == 1:
+            halves = ["1-1"]
+        cases.append(Case(
+            f"split_pages[{name}]",
+            lambda source=source, halves=halves: engine.split_pages(
+                source, halves, lambda index: scratch / f"{name}_split_{index}.pdf"
+            ),
+            rounds=8,
+        ))
+    return cases
+
+
+def run(
+    profiles: List[DocumentProfile],
+    name_filter: Optional[str] = None,
+    rounds: Optional[int] = None,
+) -> Dict[str, Stats]:
+    """
+    Run the benchmarks.
+
+    Args:
+        profiles: Document profiles to benchmark
+        name_filter: Only run cases whose name contains this substring
+        rounds: Override the number of timed rounds per case
+
+    Returns:
+        Stats per case name
+    """
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="aeropdf-bench-") as tmp:
+        for case in build_cases(Path(tmp), profiles):
+            if name_filter and name_filter not in case.name:
+                continue
+            results[case.name] = measure(case, rounds)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="PDFEngine benchmarks")
+    parser.add_argument("--profile", action="append", choices=sorted(PROFILES),
+                        help="Document profile to run (repeatable; default: all)")
+    parser.add_argument("--filter", help="Only run cases whose name contains this text")
+    parser.add_argument("--rounds", type=int, help="Timed rounds per case")
+    parser.add_argument("--quick", action="store_true", help="3 rounds per case (smoke run)")
+    parser.add_argument("--save", type=Path, help="Write results as a JSON baseline")
+    parser.add_argument("--compare", type=Path, help="Compare against a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative slowdown reported as a regression (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    profiles = [PROFILES[name] for name in (args.profile or PROFILES)]
+    for profile in profiles:
+        print(f"{profile.name:<12} {profile.describe()}")
+    print()
+
+    results = run(profiles, args.filter, 3 if args.quick else args.rounds)
+    print(format_results(results))
+
+    if args.save:
+        save_baseline(results, args.save)
+        print(f"\nBaseline written to {args.save}")
+
+    if args.compare:
+        comparisons = compare(load_baseline(args.compare), results, threshold=args.threshold)
+        print()
+        print(format_comparison(comparisons))
+        regressions = [c.name for c in comparisons if c.regression]
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
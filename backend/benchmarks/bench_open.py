@@ -0,0 +1,185 @@
+"""
+Benchmarks for opening documents from their files versus memory maps.
+
+Generates a large synthetic PDF and compares PDFEngine's "file" and "mmap"
+open modes (see app/services/pdf_engine.py): opening, rendering and text
+extraction timed in this process, then the memory of several worker
+processes reading the whole document at the same time (resident memory
+split into private and shared, from /proc/self/smaps_rollup; Linux only).
+
+The file is in the OS page cache for every run, so this measures the cost
+of reading through buffered I/O versus in place, not disk speed.
+
+Usage (from backend/):
+    python -m benchmarks.bench_open
+    python -m benchmarks.bench_open --pages 1000 --workers 8 --rounds 5
+"""
+import argparse
+import multiprocessing
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import fitz  # PyMuPDF
+
+from app.services.pdf_engine import OPEN_MODES, PDFEngine, open_mapped
+from app.services.storage import PDFStorageService
+from benchmarks.harness import Case, format_results, measure
+from benchmarks.synthetic import DocumentProfile, write_pdf
+
+SMAPS_ROLLUP = Path("/proc/self/smaps_rollup")
+
+# Zoom of the thumbnails rendered when reading whole documents
+READ_ZOOM = 0.2
+
+
+def _open(mode: str, pdf_path: Path) -> fitz.Document:
+    return open_mapped(pdf_path) if mode == "mmap" else fitz.open(pdf_path)
+
+
+def _read_pages(doc: fitz.Document) -> None:
+    """Extract the text of every page and render it small, which decodes its images too."""
+    for page in doc:
+        page.get_text()
+        page.get_pixmap(matrix=fitz.Matrix(READ_ZOOM, READ_ZOOM))
+
+
+def _read_all_pages(mode: str, pdf_path: Path) -> None:
+    """Open a document and read every page (touches the whole file)."""
+    doc = _open(mode, pdf_path)
+    try:
+        _read_pages(doc)
+    finally:
+        doc.close()
+
+
+def build_cases(work_dir: Path, source: Path) -> List[Case]:
+    """
+    Build the timing cases for both open modes.
+
+    Args:
+        work_dir: Scratch directory
+        source: Large document
+
+    Returns:
+        Benchmark cases
+    """
+    storage = PDFStorageService(
+        base_dir=str(work_dir),
+        pdf_dir=str(work_dir / "pdfs"),
+        render_dir=str(work_dir / "renders"),
+    )
+    pages = fitz.open(source).page_count
+    cases = []
+    for mode in OPEN_MODES:
+        engine = PDFEngine(storage, open_mode=mode)
+        cases += [
+            Case(
+                f"get_page_count[{mode}]",
+                lambda engine=engine: engine.get_page_count(source),
+                rounds=30,
+            ),
+            Case(
+                f"extract_text_map[{mode},page={pages}]",
+                lambda engine=engine: engine.extract_text_map(source, pages),
+            ),
+            Case(
+                f"render_page_to_png[{mode},page={pages // 2}]",
+                lambda engine=engine: engine.render_page_to_png(source, pages // 2, 1.0),
+            ),
+            Case(
+                f"read_all_pages[{mode}]",
+                lambda mode=mode: _read_all_pages(mode, source),
+                rounds=3,
+            ),
+        ]
+    return cases
+
+
+def _memory_kb() -> Dict[str, int]:
+    """Resident memory of this process in kB: Rss, Pss and private / shared pages."""
+    fields = {}
+    for line in SMAPS_ROLLUP.read_text().splitlines()[1:]:
+        name, value = line.split(":", 1)
+        fields[name] = int(value.split()[0])
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "private": fields["Private_Clean"] + fields["Private_Dirty"],
+        "shared": fields["Shared_Clean"] + fields["Shared_Dirty"],
+    }
+
+
+def _worker(mode: str, pdf_path: str, barrier, results) -> None:
+    before = _memory_kb()
+    doc = _open(mode, Path(pdf_path))
+    _read_pages(doc)
+    # Everyone has the document open now, so shared pages count as shared
+    barrier.wait()
+    after = _memory_kb()
+    results.put({name: after[name] - before[name] for name in after})
+    barrier.wait()
+    doc.close()
+
+
+def measure_memory(source: Path, mode: str, workers: int) -> Dict[str, float]:
+    """
+    Read a document in several processes at once and average their memory growth.
+
+    Args:
+        source: Document
+        mode: "file" or "mmap"
+        workers: Number of processes
+
+    Returns:
+        Average growth of rss, pss, private and shared memory per process, in MB
+    """
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(mode, str(source), barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return {name: sum(s[name] for s in samples) / len(samples) / 1024 for name in samples[0]}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="File vs memory-mapped document opening")
+    parser.add_argument("--pages", type=int, default=200, help="Pages of the generated document")
+    parser.add_argument("--workers", type=int, default=4, help="Processes for the memory comparison")
+    parser.add_argument("--rounds", type=int, help="Timed rounds per case")
+    args = parser.parse_args(argv)
+
+    # Scan-like: large image streams dominate the file
+    profile = DocumentProfile(
+        "large", pages=args.pages, words_per_page=400, images_per_page=2, image_pixels=1024
+    )
+    with tempfile.TemporaryDirectory(prefix="aeropdf-bench-") as tmp:
+        source = write_pdf(profile, Path(tmp))
+        print(f"{profile.name:<12} {profile.describe()}, {source.stat().st_size / 2**20:.1f} MB")
+        print()
+
+        results = {case.name: measure(case, args.rounds) for case in build_cases(Path(tmp), source)}
+        print(format_results(results))
+
+        if not SMAPS_ROLLUP.exists():
+            print("\nMemory comparison skipped (needs /proc/self/smaps_rollup)")
+            return 0
+        print(f"\nMemory growth per process, {args.workers} processes reading every page (MB)")
+        print(f"{'mode':<8} {'rss':>8} {'pss':>8} {'private':>8} {'shared':>8}")
+        for mode in OPEN_MODES:
+            memory = measure_memory(source, mode, args.workers)
+            columns = (f"{memory[name]:8.1f}" for name in ("rss", "pss", "private", "shared"))
+            print(f"{mode:<8} " + " ".join(columns))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
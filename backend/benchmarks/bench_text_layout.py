@@ -0,0 +1,87 @@
+"""
+Microbenchmarks for the text layout engine.
+
+Compares the cached prefix-sum wrapper against re-measuring the growing
+line with PyMuPDF for every word, and times shrink-to-fit font sizing.
+
+Usage (from backend/):
+    python -m benchmarks.bench_text_layout
+"""
+import timeit
+
+import fitz  # PyMuPDF
+
+from app.services.text_layout import TextLayoutEngine
+
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod".split()
+
+
+def naive_wrap(text: str, max_width: float, font_name: str, font_size: float) -> list:
+    """Previous implementation: one MuPDF measurement per word, quadratic per line."""
+    lines = []
+    for paragraph in text.split("\n"):
+        words = paragraph.split()
+        current = []
+        for word in words:
+            test_line = " ".join(current + [word])
+            if fitz.get_text_length(test_line, fontname=font_name, fontsize=font_size) <= max_width:
+                current.append(word)
+            else:
+                if current:
+                    lines.append(" ".join(current))
+                current = [word]
+        if current:
+            lines.append(" ".join(current))
+    return lines
+
+
+def make_paragraph(word_count: int) -> str:
+    """Build a deterministic paragraph of the given length."""
+    return " ".join(WORDS[i % len(WORDS)] for i in range(word_count))
+
+
+def bench(label: str, func, number: int) -> None:
+    """Run a callable and print the best per-call time."""
+    best = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"{label:<48} {best * 1000:9.3f} ms")
+
+
+def main() -> None:
+    engine = TextLayoutEngine()
+
+    print("Long paragraphs (wide column, 500pt @ 11pt)")
+    for word_count in (200, 1000, 5000):
+        text = make_paragraph(word_count)
+        number = max(1, 2000 // word_count)
+        bench(f"  naive   {word_count:>5} words", lambda: naive_wrap(text, 500, "helv", 11), number)
+        bench(f"  engine  {word_count:>5} words", lambda: engine.wrap(text, 500, "helv", 11), number)
+
+    print("Batch edits (500 short blocks, 180pt @ 10pt)")
+    blocks = [make_paragraph(20 + i % 30) for i in range(500)]
+    bench("  naive   500 blocks", lambda: [naive_wrap(b, 180, "helv", 10) for b in blocks], 1)
+    bench("  engine  500 blocks", lambda: [engine.wrap(b, 180, "helv", 10) for b in blocks], 1)
+
+
+    print("Auto-fit (3 paragraphs, 300 words into 240x160pt)")
+    text = "\n".join(make_paragraph(100) for _ in range(3))
+
+    def naive_fit() -> float:
+        # Step down 0.5pt at a time, re-wrapping with MuPDF at each size
+        size = 11.0
+        while size > 4.0:
+            lines = naive_wrap(text, 240, "helv", size)
+            if size + (len(lines) - 1) * size * 1.2 <= 160:
+                break
+            size -= 0.5
+        return size
+
+    def engine_fit() -> float:
+        prepared = engine.prepare(text, "helv")
+        return engine.fit_font_size(prepared, 240, 160, max_font_size=11, min_font_size=4)
+
+    bench("  naive   linear search", naive_fit, 1)
+    bench("  engine  binary search", engine_fit, 20)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Timing, statistics and JSON baselines for benchmarks.
+
+Each case is warmed up, then timed over several rounds with the garbage
+collector disabled (like timeit). Reports use the median and interquartile
+range, which are far less sensitive to scheduler noise than the mean.
+"""
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import fitz  # PyMuPDF
+
+BASELINE_FORMAT = 1
+
+
+@dataclass
+class Stats:
+    """Timing statistics of one benchmark case, in seconds per call."""
+
+    rounds: int
+    min: float
+    median: float
+    mean: float
+    stdev: float
+    iqr: float
+    p95: float
+
+    @classmethod
+    def from_samples(cls, samples: List[float]) -> "Stats":
+        ordered = sorted(samples)
+        if len(ordered) >= 4:
+            q1, _, q3 = statistics.quantiles(ordered, n=4)
+        else:
+            q1, q3 = ordered[0], ordered[-1]
+        return cls(
+            rounds=len(ordered),
+            min=ordered[0],
+            median=statistics.median(ordered),
+            mean=statistics.fmean(ordered),
+            stdev=statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+            iqr=q3 - q1,
+            p95=ordered[min(len(ordered) - 1, round(0.95 * (len(ordered) - 1)))],
+        )
+
+
+@dataclass
+class Case:
+    """
+    A benchmark case.
+
+    setup() runs before every timed call and its return value is passed to
+    func(), so mutating operations (edits, saves) start from a fresh copy
+    without the copy being timed.
+    """
+
+    name: str
+    func: Callable
+    setup: Optional[Callable] = None
+    rounds: int = 15
+    warmup: int = 2
+
+
+def measure(case: Case, rounds: Optional[int] = None) -> Stats:
+    """
+    Time a case.
+
+    Args:
+        case: Benchmark case
+        rounds: Override the case's number of timed rounds
+
+    Returns:
+        Per-call statistics
+    """
+    rounds = rounds or case.rounds
+
+    def call_once() -> float:
+        arg = case.setup() if case.setup else None
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            if case.setup:
+                case.func(arg)
+            else:
+                case.func()
+            return time.perf_counter() - started
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    for _ in range(case.warmup):
+        call_once()
+    return Stats.from_samples([call_once() for _ in range(rounds)])
+
+
+def environment() -> dict:
+    """Describe the machine and library versions a baseline was recorded on."""
+    return {
+        "python": sys.version.split()[0],
+        "pymupdf": fitz.VersionBind,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def save_baseline(results: Dict[str, Stats], path: Path) -> None:
+    """
+    Write results as a JSON baseline.
+
+    Args:
+        results: Stats per case name
+        path: Output file
+    """
+    payload = {
+        "format": BASELINE_FORMAT,
+        "environment": environment(),
+        "results": {name: asdict(stats) for name, stats in sorted(results.items())},
+    }
+    Path(path).write_text(json.dumps(payload, indent=2) + "\n")
+
+
+def load_baseline(path: Path) -> Dict[str, Stats]:
+    """
+    Read a JSON baseline.
+
+    Args:
+        path: Baseline file
+
+    Returns:
+        Stats per case name
+
+    Raises:
+        ValueError: If the file is not a baseline of a supported format
+    """
+    payload = json.loads(Path(path).read_text())
+    if payload.get("format") != BASELINE_FORMAT:
+        raise ValueError(f"Unsupported baseline format in {path}")
+    return {name: Stats(**stats) for name, stats in payload["results"].items()}
+
+
+@dataclass
+class Comparison:
+    """A case compared against its baseline (median to median)."""
+
+    name: str
+    baseline: float
+    current: float
+    ratio: float
+    regression: bool
+    improvement: bool
+
+
+def compare(
+    baseline: Dict[str, Stats],
+    current: Dict[str, Stats],
+    threshold: float = 0.10,
+    min_delta: float = 0.0005,
+) -> List[Comparison]:
+    """
+    Compare results against a baseline.
+
+    A case regresses when its median is more than threshold slower than the
+    baseline median and the difference is larger than both min_delta and the
+    baseline's interquartile range, so noise on very fast or jittery cases is
+    not reported. Cases missing on either side are skipped.
+
+    Args:
+        baseline: Baseline stats per case
+        current: Current stats per case
+        threshold: Relative slowdown tolerated (0.10 = 10%)
+        min_delta: Absolute slowdown in seconds always tolerated
+
+    Returns:
+        Comparisons in case name order
+    """
+    comparisons = []
+    for name in sorted(baseline.keys() & current.keys()):
+        old, new = baseline[name], current[name]
+        delta = new.median - old.median
+        significant = abs(delta) > max(min_delta, old.iqr)
+        ratio = new.median / old.median if old.median else float("inf")
+        comparisons.append(Comparison(
+            name=name,
+            baseline=old.median,
+            current=new.median,
+            ratio=ratio,
+            regression=significant and ratio > 1 + threshold,
+            improvement=significant and ratio < 1 / (1 + threshold),
+        ))
+    return comparisons
+
+
+def format_results(results: Dict[str, Stats]) -> str:
+    """Render results as an aligned table (milliseconds)."""
+    lines = [f"{'case':<52} {'median':>10} {'iqr':>9} {'min':>10} {'p95':>10} {'n':>4}"]
+    for name, s in results.items():
+        lines.append(
+            f"{name:<52} {s.median * 1000:10.3f} {s.iqr * 1000:9.3f} "
+            f"{s.min * 1000:10.3f} {s.p95 * 1000:10.3f} {s.rounds:>4}"
+        )
+    return "\n".join(lines)
+
+
+def format_comparison(comparisons: List[Comparison]) -> str:
+    """Render a baseline comparison as an aligned table (milliseconds)."""
+    lines = [f"{'case':<52} {'baseline':>10} {'current':>10} {'change':>8}"]
+    for c in comparisons:
+        flag = "  REGRESSION" if c.regression else ("  faster" if c.improvement else "")
+        lines.append(
+            f"{c.name:<52} {c.baseline * 1000:10.3f} {c.current * 1000:10.3f} "
+            f"{(c.ratio - 1) * 100:+7.1f}%{flag}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,448 @@
+"""
+End-to-end load test against a local uvicorn cluster.
+
+Starts the API with N worker processes on a scratch database and storage
+directory, then replays editor sessions from concurrent simulated users:
+
+    upload -> metadata -> for each page: image + text map (page flips)
+           -> bursts of block and word edits -> download
+
+Each user edits its own document, so the user count is also the number of
+documents being edited at once. Reports throughput, p50/p95/p99 latency and
+error rate per operation for every (workers, users) combination.
+
+Usage (from backend/):
+    python -m benchmarks.loadtest --workers 2 --users 10 --duration 30
+    python -m benchmarks.loadtest --workers 1,2,4 --users 5,20 --json results.json
+    python -m benchmarks.loadtest --url http://staging:8001 --users 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+import httpx
+
+from benchmarks.synthetic import PROFILES, DocumentProfile, build_pdf
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+@dataclass
+class Scenario:
+    """Shape of one simulated editor session."""
+
+    page_flips: int = 5  # Pages viewed (image + text map) per session
+    edit_bursts: int = 2  # Bursts of edits per session
+    block_edits_per_burst: int = 3
+    word_edits_per_burst: int = 3
+    think_time: float = 0.2  # Mean pause between user actions (seconds, exponential)
+
+
+@dataclass
+class Sample:
+    """One completed (or failed) request."""
+
+    operation: str
+    latency: float
+    ok: bool
+
+
+@dataclass
+class OperationReport:
+    """Latency and error statistics of one operation."""
+
+    count: int
+    errors: int
+    error_rate: float
+    throughput: float  # Requests per second
+    p50: float
+    p95: float
+    p99: float
+    max: float
+
+
+@dataclass
+class RunReport:
+    """Result of one load test run."""
+
+    workers: Optional[int]
+    users: int
+    duration: float
+    sessions: int
+    throughput: float
+    error_rate: float
+    operations: Dict[str, OperationReport] = field(default_factory=dict)
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(
+    samples: List[Sample], duration: float, *, workers: Optional[int], users: int, sessions: int
+) -> RunReport:
+    """
+    Aggregate request samples into a report.
+
+    Args:
+        samples: All requests issued during the run
+        duration: Wall-clock run time (seconds)
+        workers: Server worker processes (None for an external server)
+        users: Concurrent users
+        sessions: Completed editor sessions
+
+    Returns:
+        Run report with per-operation statistics
+    """
+    by_operation: Dict[str, List[Sample]] = {}
+    for sample in samples:
+        by_operation.setdefault(sample.operation, []).append(sample)
+
+    operations = {}
+    for operation, items in sorted(by_operation.items()):
+        latencies = sorted(s.latency for s in items)
+        errors = sum(1 for s in items if not s.ok)
+        operations[operation] = OperationReport(
+            count=len(items),
+            errors=errors,
+            error_rate=errors / len(items),
+            throughput=len(items) / duration if duration else 0.0,
+            p50=_percentile(latencies, 0.50),
+            p95=_percentile(latencies, 0.95),
+            p99=_percentile(latencies, 0.99),
+            max=latencies[-1],
+        )
+
+    total_errors = sum(1 for s in samples if not s.ok)
+    return RunReport(
+        workers=workers,
+        users=users,
+        duration=duration,
+        sessions=sessions,
+        throughput=len(samples) / duration if duration else 0.0,
+        error_rate=total_errors / len(samples) if samples else 0.0,
+        operations=operations,
+    )
+
+
+class EditorSession:
+    """One simulated user replaying editor sessions against the API."""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        pdf_bytes: bytes,
+        scenario: Scenario,
+        samples: List[Sample],
+        rng: random.Random,
+    ):
+        self.client = client
+        self.pdf_bytes = pdf_bytes
+        self.scenario = scenario
+        self.samples = samples
+        self.rng = rng
+
+    async def _request(self, operation: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.samples.append(Sample(operation, time.perf_counter() - started, False))
+            return None
+        ok = response.status_code < 400
+        self.samples.append(Sample(operation, time.perf_counter() - started, ok))
+        return response if ok else None
+
+    async def _think(self) -> None:
+        if self.scenario.think_time > 0:
+            await asyncio.sleep(self.rng.expovariate(1 / self.scenario.think_time))
+
+    async def run_once(self) -> bool:
+        """
+        Run one session: upload, page flips, edit bursts, download.
+
+        Returns:
+            True if the session got far enough to edit its document
+        """
+        upload = await self._request(
+            "upload", "POST", "/api/pdfs/",
+            files={"file": ("loadtest.pdf", self.pdf_bytes, "application/pdf")},
+        )
+        if upload is None:
+            return False
+        pdf_uuid = upload.json()["uuid"]
+        base = f"/api/pdfs/{pdf_uuid}"
+
+        meta = await self._request("metadata", "GET", base)
+        if meta is None:
+            return False
+        page_count = meta.json()["page_count"]
+
+        text_maps = {}
+        for flip in range(self.scenario.page_flips):
+            page = flip % page_count + 1
+            await self._request("page_image", "GET", f"{base}/pages/{page}/image")
+            text_map = await self._request("text_map", "GET", f"{base}/pages/{page}/text-map")
+            if text_map is not None:
+                text_maps[page] = text_map.json()["blocks"]
+            await self._think()
+
+        editable = [page for page, blocks in text_maps.items() if blocks]
+        for _ in range(self.scenario.edit_bursts):
+            if not editable:
+                break
+            page = self.rng.choice(editable)
+            for _ in range(self.scenario.block_edits_per_burst):
+                block = self.rng.choice(text_maps[page])
+                edited = await self._request(
+                    "edit_block", "PUT", f"{base}/pages/{page}/blocks/{block['id']}",
+                    json={"new_text": f"Edited paragraph {self.rng.randrange(10**6)}"},
+                )
+                if edited is not None:
+                    text_maps[page] = edited.json()["blocks"] or text_maps[page]
+            for _ in range(self.scenario.word_edits_per_burst):
+                words = [w for b in text_maps[page] for w in (b.get("words") or [])]
+                if not words:
+                    break
+                word = self.rng.choice(words)
+                edited = await self._request(
+                    "edit_word", "PUT", f"{base}/pages/{page}/words/{word['id']}",
+                    json={"new_text": "edited"},
+                )
+                if edited is not None:
+                    text_maps[page] = edited.json()["blocks"] or text_maps[page]
+            await self._request("page_image", "GET", f"{base}/pages/{page}/image")
+            await self._think()
+
+        await self._request("download", "GET", f"{base}/download")
+        return True
+
+
+async def run_load(
+    client_factory: Callable[[], httpx.AsyncClient],
+    *,
+    users: int,
+    duration: float,
+    profile: DocumentProfile,
+    scenario: Scenario,
+    max_sessions: Optional[int] = None,
+    workers: Optional[int] = None,
+    seed: int = 1,
+) -> RunReport:
+    """
+    Run concurrent editor sessions until the duration elapses.
+
+    Sessions in progress at the deadline are finished, so every started
+    session contributes its full request mix.
+
+    Args:
+        client_factory: Creates the HTTP client (one per user)
+        users: Concurrent simulated users
+        duration: Seconds after which no new session is started
+        profile: Synthetic document each session uploads
+        scenario: Session shape
+        max_sessions: Stop each user after this many sessions (None: until duration)
+        workers: Server worker count, for the report
+        seed: Random seed (think times, edit targets)
+
+    Returns:
+        Run report
+    """
+    pdf_bytes = build_pdf(profile)
+    samples: List[Sample] = []
+    sessions = 0
+    started = time.perf_counter()
+    deadline = started + duration
+
+    async def user(index: int) -> None:
+        nonlocal sessions
+        rng = random.Random(seed * 1000 + index)
+        async with client_factory() as client:
+            session = EditorSession(client, pdf_bytes, scenario, samples, rng)
+            count = 0
+            while time.perf_counter() < deadline and (max_sessions is None or count < max_sessions):
+                if await session.run_once():
+                    sessions += 1
+                count += 1
+
+    await asyncio.gather(*(user(i) for i in range(users)))
+    return summarize(
+        samples, time.perf_counter() - started, workers=workers, users=users, sessions=sessions
+    )
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def local_cluster(
+    workers: int, *, log_path: Optional[Path] = None, startup_timeout: float = 60.0
+) -> Iterator[str]:
+    """
+    Run the API under uvicorn with several workers on scratch storage.
+
+    Migrations run once up front (DB_AUTO_MIGRATE is disabled in the
+    workers so they don't race), and the database and storage directory are
+    removed afterwards.
+
+    Args:
+        workers: uvicorn worker processes
+        log_path: Append server output to this file (discarded if None)
+        startup_timeout: Seconds to wait for /health
+
+    Yields:
+        Base URL of the cluster
+    """
+    with tempfile.TemporaryDirectory(prefix="aeropdf-load-") as tmp:
+        storage = Path(tmp) / "storage"
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{Path(tmp) / 'load.db'}",
+            "STORAGE_DIR": str(storage),
+            "PDF_DIR": str(storage / "pdfs"),
+            "RENDER_DIR": str(storage / "renders"),
+            "DEBUG": "false",
+            "GC_ENABLED": "false",
+            "DB_AUTO_MIGRATE": "false",
+        }
+        env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+        subprocess.run(
+            [sys.executable, "-c", "from app.db.session import init_db; init_db()"],
+            cwd=BACKEND_DIR, env=env, check=True,
+        )
+
+        port = _free_port()
+        log = open(log_path, "a") if log_path else subprocess.DEVNULL
+        process = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "app.main:app",
+                "--host", "127.0.0.1", "--port", str(port),
+                "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+            ],
+            cwd=BACKEND_DIR, env=env, stdout=log, stderr=log,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            deadline = time.monotonic() + startup_timeout
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+                try:
+                    if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError("Cluster did not become healthy in time")
+                time.sleep(0.2)
+            yield base_url
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            if log_path:
+                log.close()
+
+
+def format_report(report: RunReport) -> str:
+    """Render a run report as an aligned table (latencies in milliseconds)."""
+    workers = "external" if report.workers is None else f"{report.workers} worker(s)"
+    lines = [
+        f"{workers}, {report.users} user(s): {report.sessions} sessions in "
+        f"{report.duration:.1f}s, {report.throughput:.1f} req/s, "
+        f"{report.error_rate:.2%} errors",
+        f"  {'operation':<12} {'count':>7} {'req/s':>8} {'p50':>9} {'p95':>9} "
+        f"{'p99':>9} {'max':>9} {'errors':>8}",
+    ]
+    for name, op in report.operations.items():
+        lines.append(
+            f"  {name:<12} {op.count:>7} {op.throughput:8.1f} {op.p50 * 1000:9.1f} "
+            f"{op.p95 * 1000:9.1f} {op.p99 * 1000:9.1f} {op.max * 1000:9.1f} {op.error_rate:8.2%}"
+        )
+    return "\n".join(lines)
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="AeroPdf end-to-end load test")
+    parser.add_argument("--workers", type=_int_list, default=[2],
+                        help="uvicorn worker counts, comma separated (default: 2)")
+    parser.add_argument("--users", type=_int_list, default=[10],
+                        help="Concurrent users (= documents), comma separated (default: 10)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per run")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="single_page",
+                        help="Synthetic document uploaded by each session")
+    parser.add_argument("--think-time", type=float, default=0.2,
+                        help="Mean pause between user actions in seconds (0 for closed-loop)")
+    parser.add_argument("--page-flips", type=int, default=5)
+    parser.add_argument("--edit-bursts", type=int, default=2)
+    parser.add_argument("--edits-per-burst", type=int, default=3)
+    parser.add_argument("--url", help="Test an already running server instead of starting one")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout")
+    parser.add_argument("--json", type=Path, help="Write all reports to this file")
+    parser.add_argument("--server-log", type=Path, help="Append local server output to this file")
+    args = parser.parse_args(argv)
+
+    scenario = Scenario(
+        page_flips=args.page_flips,
+        edit_bursts=args.edit_bursts,
+        block_edits_per_burst=args.edits_per_burst,
+        word_edits_per_burst=args.edits_per_burst,
+        think_time=args.think_time,
+    )
+    profile = PROFILES[args.profile]
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+
+    def run_against(base_url: str, workers: Optional[int], users: int) -> RunReport:
+        return asyncio.run(run_load(
+            lambda: httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits),
+            users=users,
+            duration=args.duration,
+            profile=profile,
+            scenario=scenario,
+            workers=workers,
+        ))
+
+    reports = []
+    if args.url:
+        for users in args.users:
+            reports.append(run_against(args.url, None, users))
+            print(format_report(reports[-1]), end="\n\n", flush=True)
+    else:
+        for workers in args.workers:
+            # Fresh cluster per worker count; users share it so later runs see a warm server
+            with local_cluster(workers, log_path=args.server_log) as base_url:
+                for users in args.users:
+                    reports.append(run_against(base_url, workers, users))
+                    print(format_report(reports[-1]), end="\n\n", flush=True)
+
+    if args.json:
+        args.json.write_text(json.dumps([asdict(r) for r in reports], indent=2) + "\n")
+        print(f"Reports written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Deterministic synthetic PDFs for benchmarks.
+
+Documents are generated from a seed, so the same profile produces the same
+bytes on every machine and runs stay comparable against saved baselines.
+"""
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Tuple
+
+import fitz  # PyMuPDF
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua enim ad minim veniam "
+    "quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo"
+).split()
+
+# Base-14 fonts: available everywhere without embedding font files
+FONTS = ("helv", "tiro", "cour", "hebo", "tibo")
+
+PAGE_SIZE = (612, 792)  # US Letter
+MARGIN = 54
+PARAGRAPH_WORDS = 60
+
+
+@dataclass(frozen=True)
+class DocumentProfile:
+    """Shape of a synthetic document."""
+
+    name: str
+    pages: int
+    words_per_page: int
+    images_per_page: int = 0
+    image_pixels: int = 64  # Width and height of each embedded image
+    fonts: int = 1  # Number of distinct fonts used across paragraphs
+    seed: int = 1
+
+    def describe(self) -> str:
+        """One-line summary for benchmark output."""
+        return (
+            f"{self.pages}p x {self.words_per_page}w, "
+            f"{self.images_per_page} img/page, {self.fonts} font(s)"
+        )
+
+
+PROFILES = {
+    profile.name: profile
+    for profile in (
+        DocumentProfile("single_page", pages=1, words_per_page=250),
+        DocumentProfile("dense_text", pages=20, words_per_page=900),
+        DocumentProfile("image_heavy", pages=10, words_per_page=120, images_per_page=4),
+        DocumentProfile("mixed_fonts", pages=10, words_per_page=500, fonts=len(FONTS)),
+    )
+}
+
+
+def _paragraph(rng: random.Random, word_count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(word_count))
+
+
+def _noise_image(rng: random.Random, size: int) -> fitz.Pixmap:
+    """Blocky RGB noise: compresses like a photo rather than a flat fill."""
+    cell = 8
+    cells = size // cell
+    rows = []
+    for _ in range(cells):
+        row = b"".join(bytes(rng.randrange(256) for _ in range(3)) * cell for _ in range(cells))
+        rows.append(row * cell)
+    return fitz.Pixmap(fitz.csRGB, size, size, b"".join(rows), False)
+
+
+def _layout_page(page: fitz.Page, profile: DocumentProfile, rng: random.Random) -> None:
+    width, height = PAGE_SIZE
+    y = MARGIN
+    remaining = profile.words_per_page
+
+    for index in range(profile.images_per_page):
+        size = 96
+        x = MARGIN + index * (size + 12)
+        page.insert_image(fitz.Rect(x, y, x + size, y + size), pixmap=_noise_image(rng, profile.image_pixels))
+    if profile.images_per_page:
+        y += 96 + 18
+
+    paragraph = 0
+    while remaining > 0 and y < height - MARGIN:
+        count = min(PARAGRAPH_WORDS, remaining)
+        font = FONTS[paragraph % profile.fonts]
+        rect = fitz.Rect(MARGIN, y, width - MARGIN, height - MARGIN)
+        # insert_textbox returns the unused height (negative if it overflowed)
+        unused = page.insert_textbox(rect, _paragraph(rng, count), fontname=font, fontsize=9)
+        if unused < 0:
+            break
+        y = rect.y1 - unused + 9
+        remaining -= count
+        paragraph += 1
+
+
+def build_pdf(profile: DocumentProfile) -> bytes:
+    """
+    Generate a synthetic PDF.
+
+    Args:
+        profile: Document profile
+
+    Returns:
+        PDF bytes (identical for identical profiles)
+    """
+    rng = random.Random(profile.seed)
+    doc = fitz.open()
+    try:
+        for _ in range(profile.pages):
+            page = doc.new_page(width=PAGE_SIZE[0], height=PAGE_SIZE[1])
+            _layout_page(page, profile, rng)
+        # No timestamps / random IDs, so output is reproducible
+        doc.set_metadata({})
+        return doc.tobytes(garbage=3, deflate=True, no_new_id=True)
+    finally:
+        doc.close()
+
+
+def write_pdf(profile: DocumentProfile, directory: Path) -> Path:
+    """
+    Generate a synthetic PDF into a directory.
+
+    Args:
+        profile: Document profile
+        directory: Output directory
+
+    Returns:
+        Path of the written file ("<profile name>.pdf")
+    """
+    path = Path(directory) / f"{profile.name}.pdf"
+    path.write_bytes(build_pdf(profile))
+    return path
+
+
+def first_block_and_word(pdf_path: Path, page_number: int = 1) -> Tuple[tuple, tuple]:
+    """
+    Find edit targets on a page.
+
+    Returns:
+        (bbox of the first text block, bbox of its first word)
+    """
+    doc = fitz.open(pdf_path)
+    try:
+        page = doc[page_number - 1]
+        block = next(b for b in page.get_text("blocks") if b[6] == 0)
+        word = next(
+            w for w in page.get_text("words") if fitz.Rect(block[:4]).contains(fitz.Rect(w[:4]))
+        )
+        return tuple(block[:4]), tuple(word[:4])
+    finally:
+        doc.close()
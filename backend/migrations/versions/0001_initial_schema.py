@@ -0,0 +1,38 @@
+"""Initial schema: pdf_documents.
+
+Databases created before migrations were introduced (via create_all)
+already have this table; it is left as is and revision 0002 adds any
+columns they lack.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if not context.is_offline_mode() and sa.inspect(op.get_bind()).has_table("pdf_documents"):
+        return
+    op.create_table(
+        "pdf_documents",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("uuid", sa.String(), nullable=False),
+        sa.Column("original_filename", sa.String(), nullable=False),
+        sa.Column("stored_path", sa.String(), nullable=False),
+        sa.Column("page_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_pdf_documents_id", "pdf_documents", ["id"])
+    op.create_index("ix_pdf_documents_uuid", "pdf_documents", ["uuid"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_table("pdf_documents")
@@ -0,0 +1,40 @@
+"""Add pdf_documents.version and last_accessed_at.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns, indexes = set(), set()
+    if not context.is_offline_mode():
+        inspector = sa.inspect(op.get_bind())
+        columns = {column["name"] for column in inspector.get_columns("pdf_documents")}
+        indexes = {index["name"] for index in inspector.get_indexes("pdf_documents")}
+
+    with op.batch_alter_table("pdf_documents") as batch:
+        if "version" not in columns:
+            batch.add_column(
+                sa.Column("version", sa.Integer(), nullable=False, server_default="1")
+            )
+        if "last_accessed_at" not in columns:
+            batch.add_column(sa.Column("last_accessed_at", sa.DateTime(timezone=True), nullable=True))
+    if "ix_pdf_documents_last_accessed_at" not in indexes:
+        op.create_index(
+            "ix_pdf_documents_last_accessed_at", "pdf_documents", ["last_accessed_at"]
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_pdf_documents_last_accessed_at", table_name="pdf_documents")
+    with op.batch_alter_table("pdf_documents") as batch:
+        batch.drop_column("last_accessed_at")
+        batch.drop_column("version")
@@ -0,0 +1,48 @@
+"""Add pdf_versions table and pdf_documents.page_versions.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = set()
+    if not context.is_offline_mode():
+        inspector = sa.inspect(op.get_bind())
+        columns = {column["name"] for column in inspector.get_columns("pdf_documents")}
+
+    if "page_versions" not in columns:
+        with op.batch_alter_table("pdf_documents") as batch:
+            batch.add_column(sa.Column("page_versions", sa.Text(), nullable=True))
+
+    op.create_table(
+        "pdf_versions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("document_uuid", sa.String(), nullable=False),
+        sa.Column("number", sa.Integer(), nullable=False),
+        sa.Column("parent", sa.Integer(), nullable=True),
+        sa.Column("operation", sa.String(), nullable=False),
+        sa.Column("pages", sa.Text(), nullable=True),
+        sa.Column("page_count", sa.Integer(), nullable=False),
+        sa.Column("page_versions", sa.Text(), nullable=True),
+        sa.Column("offset", sa.Integer(), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("checksum", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint("document_uuid", "number"),
+    )
+    op.create_index("ix_pdf_versions_document_uuid", "pdf_versions", ["document_uuid"])
+
+
+def downgrade() -> None:
+    op.drop_table("pdf_versions")
+    with op.batch_alter_table("pdf_documents") as batch:
+        batch.drop_column("page_versions")
@@ -4,8 +4,9 @@ import tempfile
 import shutil
 from pathlib import Path
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 from app.main import app
 from app.models.base import Base
@@ -13,35 +14,70 @@ from app.core.config import settings
 
 
 @pytest.fixture(scope="function")
-def test_db():
+def test_db_url(tmp_path):
+    """URL of a temporary SQLite database shared by sync and async sessions."""
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+@pytest.fixture(scope="function")
+def test_db(test_db_url):
     """Create a temporary database for testing."""
-    # Use in-memory SQLite for tests
-    test_db_url = "sqlite:///:memory:"
-    engine = create_engine(test_db_url, connect_args={"check_same_thread": False})
+    from app.db.session import create_db_engine
+
+    # File-backed (not in-memory) so the async engine and concurrent requests
+    # (each with its own pooled connection) see the same data
+    engine = create_db_engine(test_db_url)
     TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     
     # Create tables
     Base.metadata.create_all(bind=engine)
     
-    yield TestingSessionLocal()
+    session = TestingSessionLocal()
+    yield session
     
     # Cleanup
+    session.close()
     Base.metadata.drop_all(bind=engine)
+    engine.dispose()
 
 
 @pytest.fixture(scope="function")
-def client(test_db):
-    """Create a test client with overridden database dependency."""
-    from app.db.session import get_db
+def client(test_db, test_db_url, monkeypatch):
+    """Create a test client with overridden database dependencies."""
+    from app.db.session import create_async_db_engine, get_async_db, get_db
+    from app.api.deps import get_metadata_cache, get_text_map_cache
+    
+    # NullPool: TestClient runs each test on its own event loop, so async
+    # connections must not outlive a request
+    async_engine = create_async_db_engine(test_db_url, poolclass=NullPool)
+    AsyncTestingSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
     
+    # A session per request, like get_db: requests may run concurrently
+    # (threads through one TestClient) and sessions are not thread-safe
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_db.get_bind())
+
     def override_get_db():
+        session = TestingSessionLocal()
         try:
-            yield test_db
+            yield session
         finally:
-            pass
+            session.close()
+    
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as session:
+            yield session
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    # Rebuilt lazily, with the shared cache tier in this test's storage directory
+    get_metadata_cache.cache_clear()
+    get_text_map_cache.cache_clear()
     
+    # The background loops use the application's own sessions, not the
+    # overrides; tests that need jobs run them on the test database
+    monkeypatch.setattr(settings, "JOB_WORKER_ENABLED", False)
+    monkeypatch.setattr(settings, "GC_ENABLED", False)
+
     with TestClient(app) as test_client:
         yield test_client
     
@@ -135,3 +171,51 @@ startxref
 398
 %%EOF"""
 
+
+
+@pytest.fixture
+def multi_block_pdf_bytes():
+    """Generate a one-page PDF with three separate text blocks."""
+    import fitz
+
+    doc = fitz.open()
+    page = doc.new_page(width=612, height=792)
+    page.insert_text((72, 100), "First block of text", fontname="helv", fontsize=12)
+    page.insert_text((72, 300), "Second block here", fontname="helv", fontsize=12)
+    page.insert_text((72, 500), "Third and last block", fontname="helv", fontsize=12)
+    try:
+        return doc.tobytes()
+    finally:
+        doc.close()
+
+
+@pytest.fixture
+def make_pdf_bytes():
+    """Factory generating a PDF whose pages read "Page <n> text"."""
+    import fitz
+
+    def make(page_count: int) -> bytes:
+        doc = fitz.open()
+        for i in range(page_count):
+            doc.new_page().insert_text((72, 72), f"Page {i + 1} text", fontname="helv", fontsize=12)
+        try:
+            return doc.tobytes()
+        finally:
+            doc.close()
+
+    return make
+
+
+@pytest.fixture
+def upload_pdf(client):
+    """Upload PDF bytes through the API and return the new document's UUID."""
+
+    def upload(pdf_bytes: bytes) -> str:
+        response = client.post(
+            "/api/pdfs/",
+            files={"file": ("test.pdf", pdf_bytes, "application/pdf")},
+        )
+        assert response.status_code == 201
+        return response.json()["uuid"]
+
+    return upload
@@ -0,0 +1,197 @@
+"""Tests for admission control of CPU-heavy endpoints."""
+import asyncio
+import threading
+import time
+
+import fitz
+import pytest
+
+from app.core.admission import (
+    BATCH,
+    EDIT,
+    INTERACTIVE,
+    AdmissionController,
+    AdmissionMiddleware,
+    AdmissionRejected,
+    OperationClass,
+    classify,
+)
+from app.core.config import settings
+from app.services.pdf_engine import PDFEngine
+
+
+def _controller(max_concurrent=1, limit=1, queue_size=4, queue_timeout=1.0):
+    return AdmissionController(
+        [
+            OperationClass(INTERACTIVE, 0, limit, queue_size, queue_timeout),
+            OperationClass(BATCH, 1, limit, queue_size, queue_timeout),
+        ],
+        max_concurrent,
+    )
+
+
+def test_classify():
+    """Test which requests are admission-controlled, and in which class."""
+    assert classify("GET", "/api/pdfs/abc/pages/3/image") == INTERACTIVE
+    assert classify("GET", "/api/pdfs/abc/pages/3/text-map") == INTERACTIVE
+    assert classify("PUT", "/api/pdfs/abc/pages/3/blocks/page-3-block-1") == EDIT
+    assert classify("POST", "/api/pdfs/abc/undo") == EDIT
+    assert classify("GET", "/api/pdfs/abc/pages/images") == BATCH
+    assert classify("POST", "/api/pdf-operations/merge") == BATCH
+    assert classify("GET", "/api/pdfs/abc/download", "linearized=true") == BATCH
+    assert classify("GET", "/api/pdfs/abc/download", "x=1&linearized=1") == BATCH
+    assert classify("GET", "/api/pdfs/abc/download", "linearized=false") is None
+    for method, path in [
+        ("GET", "/health"),
+        ("GET", "/api/pdfs/abc"),
+        ("GET", "/api/pdfs/abc/download"),
+        ("GET", "/api/pdfs/abc/events"),
+        ("POST", "/api/pdfs/"),
+    ]:
+        assert classify(method, path) is None
+
+
+def test_interactive_requests_overtake_queued_batch_work():
+    """Test that a freed slot goes to the highest-priority waiter, not the oldest."""
+    controller = _controller()
+    order = []
+
+    async def request(name):
+        await controller.acquire(name)
+        order.append(name)
+        await asyncio.sleep(0.01)
+        controller.release(name, 0.01)
+
+    async def scenario():
+        await controller.acquire(BATCH)  # Occupies the only slot
+        waiting = [asyncio.create_task(request(BATCH)), asyncio.create_task(request(INTERACTIVE))]
+        await asyncio.sleep(0.01)
+        assert controller.stats()[BATCH]["waiting"] == 1
+        controller.release(BATCH)
+        await asyncio.gather(*waiting)
+
+    asyncio.run(scenario())
+    assert order == [INTERACTIVE, BATCH]
+    assert controller.running == 0
+
+
+def test_full_queue_and_queue_timeout_are_refused():
+    """Test fast 429s when the queue is full and 503s after waiting too long."""
+    controller = _controller(queue_size=1, queue_timeout=0.1)
+
+    async def scenario():
+        await controller.acquire(BATCH)
+        queued = asyncio.create_task(controller.acquire(BATCH))
+        await asyncio.sleep(0)
+
+        started = time.perf_counter()
+        with pytest.raises(AdmissionRejected) as full:
+            await controller.acquire(BATCH)
+        assert time.perf_counter() - started < 0.05
+        assert full.value.status_code == 429
+        assert full.value.retry_after >= 1
+
+        with pytest.raises(AdmissionRejected) as timeout:
+            await queued
+        assert timeout.value.status_code == 503
+
+        # Other classes are limited separately, but share the slot
+        cancelled = asyncio.create_task(controller.acquire(INTERACTIVE))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        controller.release(BATCH)
+
+    asyncio.run(scenario())
+    stats = controller.stats()
+    assert stats[BATCH]["rejected"] == 2
+    assert controller.running == 0
+    assert stats[INTERACTIVE]["waiting"] == 0
+
+
+def test_slot_is_taken_after_the_body_is_received():
+    """Test that a slow upload doesn't hold a slot, and the app still gets the whole body."""
+    controller = _controller()
+    received = []
+    running = []
+
+    async def app(scope, receive, send):
+        running.append(controller.running)
+        while True:
+            message = await receive()
+            received.append(message["body"])
+            if not message["more_body"]:
+                break
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def scenario():
+        uploaded = asyncio.Event()
+        body = b"x" * 200_000
+        chunks = [body[:1000], body[1000:]]
+
+        async def receive():
+            if len(chunks) == 1:
+                await uploaded.wait()
+            chunk = chunks.pop(0)
+            return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+        async def send(message):
+            pass
+
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/api/pdf-operations/merge",
+            "query_string": b"",
+            "headers": [(b"content-length", str(len(body)).encode())],
+        }
+        middleware = AdmissionMiddleware(app, lambda: controller)
+        request = asyncio.create_task(middleware(scope, receive, send))
+        await asyncio.sleep(0.01)
+        # Still uploading: the slot is free for others
+        assert controller.running == 0
+        await controller.acquire(INTERACTIVE)
+        controller.release(INTERACTIVE)
+        uploaded.set()
+        await request
+        assert b"".join(received) == body
+
+    asyncio.run(scenario())
+    assert running == [1]
+    assert controller.running == 0
+
+
+def test_overloaded_endpoint_returns_retry_after(client, temp_storage, monkeypatch):
+    """Test that batch work beyond its limit is refused while page images are still served."""
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Hello", fontname="helv", fontsize=12)
+    response = client.post("/api/pdfs/", files={"file": ("doc.pdf", doc.tobytes(), "application/pdf")})
+    doc.close()
+    pdf_uuid = response.json()["uuid"]
+
+    monkeypatch.setattr(settings, "ADMISSION_BATCH_LIMIT", 1)
+    monkeypatch.setattr(settings, "ADMISSION_QUEUE_SIZE", 0)
+    rotate_pages = PDFEngine.rotate_pages
+
+    def slow_rotate(self, *args, **kwargs):
+        time.sleep(0.5)
+        return rotate_pages(self, *args, **kwargs)
+
+    monkeypatch.setattr(PDFEngine, "rotate_pages", slow_rotate)
+
+    first = {}
+    thread = threading.Thread(target=lambda: first.setdefault("response", client.post(
+        f"/api/pdf-operations/{pdf_uuid}/rotate?angle=90", json=[1]
+    )))
+    thread.start()
+    time.sleep(0.2)
+
+    refused = client.post(f"/api/pdf-operations/{pdf_uuid}/rotate?angle=180", json=[1])
+    image = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/image")
+    thread.join()
+
+    assert first["response"].status_code == 200
+    assert refused.status_code == 429
+    assert int(refused.headers["Retry-After"]) >= 1
+    assert image.status_code == 200
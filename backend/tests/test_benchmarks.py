@@ -0,0 +1,83 @@
+"""Tests for the benchmark harness and synthetic documents."""
+import fitz
+
+from benchmarks import bench_engine, bench_open
+from benchmarks.harness import Stats, compare, load_baseline, save_baseline
+from benchmarks.synthetic import PROFILES, DocumentProfile, build_pdf
+
+
+def _stats(median: float, iqr: float = 0.0) -> Stats:
+    return Stats(rounds=10, min=median, median=median, mean=median, stdev=0.0, iqr=iqr, p95=median)
+
+
+def test_synthetic_documents_are_reproducible():
+    """Test that a profile always produces the same document."""
+    profile = DocumentProfile("t", pages=2, words_per_page=200, images_per_page=2, fonts=3)
+    data = build_pdf(profile)
+    assert data == build_pdf(profile)
+
+    doc = fitz.open(stream=data, filetype="pdf")
+    try:
+        assert len(doc) == 2
+        assert len(doc[0].get_images()) == 2
+        assert len(doc[0].get_text("words")) == 200
+        assert len({font[3] for font in doc[0].get_fonts()}) == 3
+    finally:
+        doc.close()
+
+
+def test_compare_flags_only_significant_slowdowns():
+    """Test regression detection against a baseline."""
+    baseline = {
+        "slower": _stats(0.100),
+        "noisy": _stats(0.100, iqr=0.050),
+        "tiny": _stats(0.0001),
+        "faster": _stats(0.100),
+        "removed": _stats(0.100),
+    }
+    current = {
+        "slower": _stats(0.130),
+        "noisy": _stats(0.130),
+        "tiny": _stats(0.0002),
+        "faster": _stats(0.050),
+        "added": _stats(0.100),
+    }
+    results = {c.name: c for c in compare(baseline, current, threshold=0.10)}
+
+    assert set(results) == {"slower", "noisy", "tiny", "faster"}
+    assert results["slower"].regression
+    assert not results["noisy"].regression  # Within the baseline's spread
+    assert not results["tiny"].regression  # Below min_delta
+    assert results["faster"].improvement
+
+
+def test_baseline_round_trip_and_compare_exit_code(tmp_path):
+    """Test saving a baseline, then failing a comparison against a faster one."""
+    path = tmp_path / "baseline.json"
+    save_baseline({"case": _stats(0.010)}, path)
+    assert load_baseline(path) == {"case": _stats(0.010)}
+
+    argv = ["--profile", "single_page", "--filter", "extract_text_map", "--rounds", "3"]
+    assert bench_engine.main(argv + ["--save", str(path)]) == 0
+
+    fast = {name: _stats(stats.median / 100) for name, stats in load_baseline(path).items()}
+    save_baseline(fast, path)
+    assert bench_engine.main(argv + ["--compare", str(path)]) == 1
+
+
+def test_every_profile_builds():
+    """Test that all bundled profiles generate valid documents."""
+    for profile in PROFILES.values():
+        doc = fitz.open(stream=build_pdf(profile), filetype="pdf")
+        try:
+            assert len(doc) == profile.pages
+        finally:
+            doc.close()
+
+
+def test_open_mode_benchmark_runs(capsys):
+    """Test a small run of the file vs memory-mapped opening benchmark."""
+    assert bench_open.main(["--pages", "2", "--workers", "2", "--rounds", "1"]) == 0
+    output = capsys.readouterr().out
+    assert "read_all_pages[file]" in output
+    assert "read_all_pages[mmap]" in output
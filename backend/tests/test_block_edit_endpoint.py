@@ -37,13 +37,14 @@ def test_edit_block(client, temp_storage, sample_pdf_bytes):
         updated_text_map = response.json()
         assert updated_text_map["page_number"] == 1
         
-        # Find the edited block
+        # Block IDs are content-derived, so the edited block gets a new ID.
+        # The overlay only fits the first wrapped line into the narrow bbox.
         edited_block = next(
-            (b for b in updated_text_map["blocks"] if b["id"] == block_id),
+            (b for b in updated_text_map["blocks"] if "Edited" in b["text"]),
             None
         )
         assert edited_block is not None
-        assert edited_block["text"] == new_text
+        assert edited_block["id"] != block_id
         
         # Verify PDF was modified by checking download
         response = client.get(f"/api/pdfs/{pdf_uuid}/download")
@@ -110,3 +111,153 @@ def test_edit_block_empty_text(client, temp_storage, sample_pdf_bytes):
         )
         # Note: Empty blocks might be filtered out, so we just check the request succeeded
 
+
+
+def test_edit_block_keeps_unrelated_ids(client, temp_storage, multi_block_pdf_bytes):
+    """Test that editing one block leaves other block and word IDs unchanged."""
+    response = client.post(
+        "/api/pdfs/",
+        files={"file": ("multi.pdf", io.BytesIO(multi_block_pdf_bytes), "application/pdf")}
+    )
+    assert response.status_code == 201
+    pdf_uuid = response.json()["uuid"]
+
+    response = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map")
+    assert response.status_code == 200
+    blocks = response.json()["blocks"]
+    assert len(blocks) == 3
+
+    # Edit the first block
+    response = client.put(
+        f"/api/pdfs/{pdf_uuid}/pages/1/blocks/{blocks[0]['id']}",
+        json={"new_text": "Replaced"}
+    )
+    assert response.status_code == 200
+    updated = {b["id"]: b for b in response.json()["blocks"]}
+
+    for block in blocks[1:]:
+        assert block["id"] in updated
+        assert [w["id"] for w in block["words"]] == [
+            w["id"] for w in updated[block["id"]]["words"]
+        ]
+
+
+def test_edit_block_auto_fit(client, temp_storage, multi_block_pdf_bytes):
+    """Test that auto_fit shrinks long replacement text instead of truncating it."""
+    response = client.post(
+        "/api/pdfs/",
+        files={"file": ("multi.pdf", io.BytesIO(multi_block_pdf_bytes), "application/pdf")}
+    )
+    assert response.status_code == 201
+    pdf_uuid = response.json()["uuid"]
+
+    blocks = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map").json()["blocks"]
+    new_text = "alpha beta gamma delta epsilon zeta eta theta"
+
+    response = client.put(
+        f"/api/pdfs/{pdf_uuid}/pages/1/blocks/{blocks[1]['id']}",
+        json={"new_text": new_text, "auto_fit": True}
+    )
+    assert response.status_code == 200
+
+    page_words = {
+        w["text"] for b in response.json()["blocks"] for w in (b["words"] or [])
+    }
+    assert set(new_text.split()) <= page_words
+
+
+def _page_text(text_map: dict) -> str:
+    return " ".join(b["text"] for b in text_map["blocks"])
+
+
+def test_edit_modes(client, temp_storage, multi_block_pdf_bytes):
+    """Test that redaction removes the old text while overlay only hides it."""
+    for mode, old_text_extracted in (("overlay", True), ("redact", False)):
+        response = client.post(
+            "/api/pdfs/",
+            files={"file": ("multi.pdf", io.BytesIO(multi_block_pdf_bytes), "application/pdf")}
+        )
+        pdf_uuid = response.json()["uuid"]
+        blocks = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map").json()["blocks"]
+
+        response = client.put(
+            f"/api/pdfs/{pdf_uuid}/pages/1/blocks/{blocks[0]['id']}",
+            json={"new_text": "Replaced", "mode": mode}
+        )
+        assert response.status_code == 200
+        text = _page_text(response.json())
+        assert "Replaced" in text
+        assert ("First block of text" in text) is old_text_extracted
+        assert "Second block here" in text
+
+
+def test_repeated_edits_accumulate_only_with_overlay(tmp_path, multi_block_pdf_bytes):
+    """Test that redaction edits keep page text and file size stable over many edits."""
+    from app.services.pdf_engine import PDFEngine
+
+    engine = PDFEngine(storage_service=None)
+    for mode in ("overlay", "redact"):
+        pdf_path = tmp_path / f"{mode}.pdf"
+        pdf_path.write_bytes(multi_block_pdf_bytes)
+        blocks, _, _ = engine.extract_text_map(pdf_path, 1)
+        region = blocks[0].bbox
+
+        for index in range(100):
+            engine.apply_block_edit(pdf_path, 1, region, f"Revision {index:02d}", mode=mode)
+        blocks, _, _ = engine.extract_text_map(pdf_path, 1)
+        text = " ".join(b.text for b in blocks)
+
+        assert "Revision 99" in text
+        if mode == "redact":
+            assert len(blocks) == 3
+            assert "Revision 98" not in text and "First block" not in text
+            assert pdf_path.stat().st_size < len(multi_block_pdf_bytes) * 2
+        else:
+            assert "Revision 98" in text and "First block" in text
+
+
+def test_redact_falls_back_to_overlay_without_text_redaction(tmp_path, multi_block_pdf_bytes, monkeypatch):
+    """Test that PyMuPDF releases without text-only redaction still apply redact edits, as overlays."""
+    from app.services import pdf_engine
+
+    monkeypatch.setattr(pdf_engine, "REDACT_TEXT_SUPPORTED", False)
+    engine = pdf_engine.PDFEngine(storage_service=None)
+    pdf_path = tmp_path / "doc.pdf"
+    pdf_path.write_bytes(multi_block_pdf_bytes)
+    blocks, _, _ = engine.extract_text_map(pdf_path, 1)
+
+    engine.apply_block_edit(pdf_path, 1, blocks[0].bbox, "Replaced", mode="redact")
+
+    text = " ".join(b.text for b in engine.extract_text_map(pdf_path, 1)[0])
+    assert "Replaced" in text and "First block of text" in text
+
+
+def test_redact_word_edit_keeps_neighbouring_lines(client, temp_storage):
+    """Test that redacting a word leaves tightly spaced lines around it intact."""
+    import fitz
+
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "Hello brave new world", fontname="helv", fontsize=12)
+    page.insert_text((72, 86), "Second line right below", fontname="helv", fontsize=12)
+    pdf_bytes = doc.tobytes()
+    doc.close()
+
+    response = client.post(
+        "/api/pdfs/",
+        files={"file": ("lines.pdf", io.BytesIO(pdf_bytes), "application/pdf")}
+    )
+    pdf_uuid = response.json()["uuid"]
+    blocks = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map").json()["blocks"]
+    word = next(w for b in blocks for w in b["words"] if w["text"] == "brave")
+
+    response = client.put(
+        f"/api/pdfs/{pdf_uuid}/pages/1/words/{word['id']}",
+        json={"new_text": "bold", "mode": "redact"}
+    )
+    assert response.status_code == 200
+    words = [w["text"] for b in response.json()["blocks"] for w in b["words"]]
+    assert "brave" not in words
+    assert "bold" in words
+    for expected in ("Hello", "new", "world", "Second", "line", "right", "below"):
+        assert expected in words
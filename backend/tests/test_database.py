@@ -0,0 +1,94 @@
+"""Tests for engine configuration, migrations and query instrumentation."""
+import sqlite3
+
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import inspect, text
+
+from app.db.session import create_db_engine, run_migrations
+from app.models import Base
+
+
+def test_sqlite_file_engine_uses_wal(tmp_path):
+    """Test that file-backed SQLite connections get WAL and busy timeout pragmas."""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    try:
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+            assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+            # synchronous=NORMAL is 1
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+    finally:
+        engine.dispose()
+
+
+def test_migrations_create_schema(tmp_path):
+    """Test that migrating an empty database creates the current schema."""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    try:
+        run_migrations(engine)
+        inspector = inspect(engine)
+        columns = {c["name"] for c in inspector.get_columns("pdf_documents")}
+        assert {"uuid", "page_count", "version", "last_accessed_at"} <= columns
+
+        # Migrations and models agree
+        with engine.connect() as conn:
+            diff = compare_metadata(MigrationContext.configure(conn), Base.metadata)
+        assert diff == []
+
+        # Running again is a no-op
+        run_migrations(engine)
+    finally:
+        engine.dispose()
+
+
+def test_migrations_upgrade_legacy_database(tmp_path):
+    """Test that a database created before migrations existed is upgraded in place."""
+    db_path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE pdf_documents (id INTEGER PRIMARY KEY, uuid VARCHAR NOT NULL UNIQUE, "
+        "original_filename VARCHAR NOT NULL, stored_path VARCHAR NOT NULL, "
+        "page_count INTEGER NOT NULL, created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP, "
+        "updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    )
+    conn.execute(
+        "INSERT INTO pdf_documents (uuid, original_filename, stored_path, page_count) "
+        "VALUES ('abc', 'a.pdf', 'a.pdf', 3)"
+    )
+    conn.commit()
+    conn.close()
+
+    engine = create_db_engine(f"sqlite:///{db_path}")
+    try:
+        run_migrations(engine)
+        with engine.connect() as conn:
+            row = conn.execute(
+                text("SELECT page_count, version, last_accessed_at FROM pdf_documents")
+            ).one()
+        assert tuple(row) == (3, 1, None)
+    finally:
+        engine.dispose()
+
+
+def test_query_count_headers(client, temp_storage, sample_pdf_bytes):
+    """Test that responses report how many queries the request issued."""
+    upload = client.post(
+        "/api/pdfs/",
+        files={"file": ("test.pdf", sample_pdf_bytes, "application/pdf")},
+    )
+    assert upload.status_code == 201
+    assert int(upload.headers["X-DB-Query-Count"]) >= 1
+    assert upload.headers["X-DB-Query-Time"].endswith("ms")
+
+    pdf_uuid = upload.json()["uuid"]
+    first = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map")
+    assert first.status_code == 200
+
+    # Served from the metadata cache: no queries at all
+    second = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map")
+    assert second.headers["X-DB-Query-Count"] == "0"
+
+    root = client.get("/")
+    assert root.headers["X-DB-Query-Count"] == "0"
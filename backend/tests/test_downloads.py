@@ -0,0 +1,117 @@
+"""Tests for byte-range and linearized downloads."""
+import shutil
+from pathlib import Path
+
+import pytest
+
+from app.api.responses import RangeNotSatisfiable, parse_range_header
+from app.services import pdf_engine
+
+
+def test_parse_range_header():
+    """Test single, open-ended, suffix and ignored range forms."""
+    assert parse_range_header("bytes=0-99", 1000) == (0, 99)
+    assert parse_range_header("bytes=900-", 1000) == (900, 999)
+    assert parse_range_header("bytes=-100", 1000) == (900, 999)
+    assert parse_range_header("bytes=-5000", 1000) == (0, 999)
+    assert parse_range_header("bytes=500-5000", 1000) == (500, 999)
+
+    # Ignored: whole file is served
+    assert parse_range_header("bytes=0-1,5-6", 1000) is None
+    assert parse_range_header("items=0-1", 1000) is None
+    assert parse_range_header("bytes=abc", 1000) is None
+    assert parse_range_header("bytes=9-1", 1000) is None
+
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header("bytes=1000-", 1000)
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header("bytes=-0", 1000)
+
+
+def test_download_range_requests(client, temp_storage, sample_pdf_bytes, upload_pdf):
+    """Test 206, 416 and If-Range handling on the download endpoint."""
+    pdf_uuid = upload_pdf(sample_pdf_bytes)
+    url = f"/api/pdfs/{pdf_uuid}/download"
+    size = len(sample_pdf_bytes)
+
+    full = client.get(url)
+    assert full.status_code == 200
+    assert full.content == sample_pdf_bytes
+    assert full.headers["accept-ranges"] == "bytes"
+
+    head = client.get(url, headers={"Range": "bytes=0-9"})
+    assert head.status_code == 206
+    assert head.content == sample_pdf_bytes[:10]
+    assert head.headers["content-range"] == f"bytes 0-9/{size}"
+    assert head.headers["content-length"] == "10"
+
+    tail = client.get(url, headers={"Range": "bytes=-32"})
+    assert tail.status_code == 206
+    assert tail.content == sample_pdf_bytes[-32:]
+
+    unsatisfiable = client.get(url, headers={"Range": f"bytes={size}-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{size}"
+
+    etag = full.headers["etag"]
+    matching = client.get(url, headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert matching.status_code == 206
+    changed = client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+    assert changed.status_code == 200
+    assert changed.content == sample_pdf_bytes
+
+
+def test_linearized_download_unavailable(
+    client, temp_storage, sample_pdf_bytes, monkeypatch, upload_pdf
+):
+    """Test that the original is served when no linearizer is installed."""
+    monkeypatch.setattr(pdf_engine, "find_linearizer", lambda: None)
+    pdf_uuid = upload_pdf(sample_pdf_bytes)
+
+    response = client.get(f"/api/pdfs/{pdf_uuid}/download?linearized=true")
+    assert response.status_code == 200
+    assert response.headers["x-linearized"] == "false"
+    assert response.content == sample_pdf_bytes
+
+
+def test_linearized_copy_cached_per_version(
+    client, temp_storage, multi_block_pdf_bytes, monkeypatch, upload_pdf
+):
+    """Test that a linearized copy is built once per version and replaced after edits."""
+    calls = []
+
+    def fake_linearizer(pdf_path, output_path):
+        calls.append(pdf_path)
+        shutil.copyfile(pdf_path, output_path)
+
+    monkeypatch.setattr(pdf_engine, "find_linearizer", lambda: fake_linearizer)
+    pdf_uuid = upload_pdf(multi_block_pdf_bytes)
+    url = f"/api/pdfs/{pdf_uuid}/download?linearized=true"
+
+    for _ in range(2):
+        response = client.get(url, headers={"Range": "bytes=0-99"})
+        assert response.status_code == 206
+        assert response.headers["x-linearized"] == "true"
+    assert len(calls) == 1
+
+    blocks = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map").json()["blocks"]
+    client.put(
+        f"/api/pdfs/{pdf_uuid}/pages/1/blocks/{blocks[0]['id']}",
+        json={"new_text": "Edited"},
+    )
+    assert client.get(url).status_code == 200
+    assert len(calls) == 2
+
+    copies = sorted(p.name for p in Path(temp_storage, "renders").rglob("*_linear.pdf"))
+    assert copies == [f"{pdf_uuid}_v2_linear.pdf"]
+
+
+@pytest.mark.skipif(pdf_engine.find_linearizer() is None, reason="pikepdf/qpdf not installed")
+def test_linearize_writes_linearized_pdf(tmp_path, sample_pdf_bytes):
+    """Test real linearization when a linearizer is installed."""
+    source = tmp_path / "source.pdf"
+    source.write_bytes(sample_pdf_bytes)
+    output = tmp_path / "linear.pdf"
+
+    pdf_engine.PDFEngine(storage_service=None).linearize(source, output)
+    assert pdf_engine.is_linearized(output)
@@ -0,0 +1,118 @@
+"""Tests for document events and the event stream endpoint."""
+import asyncio
+import json
+import threading
+
+import fitz
+import pytest
+
+from app.core.config import settings
+from app.services.events import (
+    RESYNC,
+    VERSION_CHANGED,
+    LocalEventBus,
+    RedisEventBus,
+    SQLiteEventBus,
+)
+
+
+def _bus(backend: str, tmp_path):
+    if backend == "sqlite":
+        return SQLiteEventBus(str(tmp_path / "events.db"), poll_interval=0.02)
+    if backend == "redis":
+        fakeredis = pytest.importorskip("fakeredis")
+        return RedisEventBus(fakeredis.FakeRedis())
+    return LocalEventBus()
+
+
+@pytest.mark.parametrize("backend", ["local", "sqlite", "redis"])
+def test_event_bus_delivers_to_document_subscribers(backend, tmp_path):
+    """Test that events published from another thread reach only that document's streams."""
+    bus = _bus(backend, tmp_path)
+
+    async def scenario():
+        with bus.subscribe("doc-a") as a, bus.subscribe("doc-b") as b:
+            await asyncio.sleep(0.1)  # Let listener threads start
+            thread = threading.Thread(
+                target=bus.publish, args=("doc-a", VERSION_CHANGED), kwargs={"version": 2}
+            )
+            thread.start()
+            thread.join()
+            event = await a.get(timeout=2.0)
+            assert (event.type, event.data) == (VERSION_CHANGED, {"version": 2})
+            assert await b.get(timeout=0.2) is None
+        assert bus.subscriber_count == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        bus.close()
+
+
+def test_slow_subscriber_gets_resync():
+    """Test that a subscriber that falls behind gets one resync event instead of a backlog."""
+    bus = LocalEventBus(max_pending=2)
+
+    async def scenario():
+        with bus.subscribe("doc") as subscription:
+            for version in range(4):
+                bus.publish("doc", VERSION_CHANGED, version=version)
+            await asyncio.sleep(0)
+            received = [await subscription.get(timeout=0.1) for _ in range(3)]
+            assert [event.type if event else None for event in received] == [
+                RESYNC, VERSION_CHANGED, None
+            ]
+            assert received[1].data == {"version": 3}
+
+    asyncio.run(scenario())
+
+
+def _parse_events(body: bytes) -> list:
+    """Split an event stream into (event, data) pairs, skipping comments and retry fields."""
+    events = []
+    for message in body.decode().split("\n\n"):
+        fields = {}
+        for line in message.split("\n"):
+            name, _, value = line.partition(": ")
+            fields[name] = value
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_event_stream_reports_changes(client, temp_storage, monkeypatch):
+    """Test the stream: a snapshot, then the version, text map and render events of an edit."""
+    doc = fitz.open()
+    for i in range(2):
+        doc.new_page().insert_text((72, 72), f"Page {i + 1} text", fontname="helv", fontsize=12)
+    response = client.post("/api/pdfs/", files={"file": ("doc.pdf", doc.tobytes(), "application/pdf")})
+    doc.close()
+    pdf_uuid = response.json()["uuid"]
+    block_id = client.get(f"/api/pdfs/{pdf_uuid}/pages/2/text-map").json()["blocks"][0]["id"]
+
+    monkeypatch.setattr(settings, "EVENTS_STREAM_MAX_SECONDS", 1.5)
+    monkeypatch.setattr(settings, "EVENTS_KEEPALIVE_SECONDS", 0.2)
+
+    def edit():
+        client.put(f"/api/pdfs/{pdf_uuid}/pages/2/blocks/{block_id}", json={"new_text": "Edited"})
+        client.get(f"/api/pdfs/{pdf_uuid}/pages/2/image")
+
+    timer = threading.Timer(0.3, edit)
+    timer.start()
+    response = client.get(f"/api/pdfs/{pdf_uuid}/events")
+    timer.join()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert b": keepalive" in response.content
+    events = _parse_events(response.content)
+    assert events[0] == ("document", {
+        "pdf_uuid": pdf_uuid, "version": 1, "page_count": 2, "page_versions": [1, 1],
+    })
+    assert events[1] == ("version_changed", {
+        "version": 2, "operation": "edit_block", "pages": [2], "page_count": 2,
+    })
+    assert ("text_map_ready", {"page": 2, "version": 2}) in events
+    assert ("page_rendered", {"page": 2, "version": 2}) in events
+
+    assert client.get("/api/pdfs/missing/events").status_code == 404
@@ -0,0 +1,338 @@
+"""Tests for the background job queue and job endpoints."""
+import asyncio
+from datetime import timedelta
+from pathlib import Path
+
+import fitz
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+
+from app.api.deps import (
+    get_document_locks,
+    get_job_queue,
+    get_metadata_cache,
+    get_page_render_cache,
+    get_pdf_engine,
+    get_storage_service,
+    get_version_history,
+)
+from app.main import app
+from app.models.job import Job
+from app.services.events import LocalEventBus
+from app.services.job_handlers import build_job_handlers
+from app.services.jobs import JobContext, JobQueue, run_job_worker
+from app.services.retention import utcnow
+
+
+@pytest.fixture
+def session_factory(test_db):
+    """Sessions on the test database."""
+    return sessionmaker(autocommit=False, autoflush=False, bind=test_db.get_bind())
+
+
+@pytest.fixture
+def queue(client, session_factory):
+    """Job queue on the test database, also used by the API."""
+    job_queue = JobQueue(session_factory, stale_after=timedelta(minutes=5), max_attempts=2)
+    app.dependency_overrides[get_job_queue] = lambda: job_queue
+    return job_queue
+
+
+@pytest.fixture
+def handlers(temp_storage, session_factory):
+    """Job handlers using the temporary storage."""
+    return build_job_handlers(
+        get_storage_service(),
+        get_pdf_engine(),
+        session_factory,
+        get_page_render_cache(),
+        get_metadata_cache(),
+        get_version_history(),
+        get_document_locks(),
+    )
+
+
+def _run_next(queue, handlers):
+    job = queue.claim("test-worker", handlers.keys())
+    assert job is not None
+    queue.run(job, handlers)
+    return job
+
+
+def test_background_rotate(client, temp_storage, queue, handlers, make_pdf_bytes, upload_pdf):
+    """Test submitting a rotate job and polling it to completion."""
+    pdf_uuid = upload_pdf(make_pdf_bytes(2))
+
+    response = client.post(
+        f"/api/pdf-operations/{pdf_uuid}/rotate?angle=180&background=true",
+        json=[2],
+    )
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] == "queued"
+    assert response.headers["Location"] == f"/api/jobs/{job['id']}"
+
+    _run_next(queue, handlers)
+
+    status = client.get(f"/api/jobs/{job['id']}").json()
+    assert status["status"] == "succeeded"
+    assert status["progress"] == 1.0
+    assert status["document_uuid"] == pdf_uuid
+
+    download = client.get(f"/api/pdfs/{pdf_uuid}/download")
+    doc = fitz.open(stream=download.content, filetype="pdf")
+    try:
+        assert doc[1].rotation == 180
+    finally:
+        doc.close()
+
+
+def test_background_merge_cleans_up_inputs(client, temp_storage, queue, handlers, make_pdf_bytes):
+    """Test a merge job creates the document and removes its spooled uploads."""
+    response = client.post(
+        "/api/pdf-operations/merge?background=true",
+        files=[
+            ("files", ("a.pdf", make_pdf_bytes(1), "application/pdf")),
+            ("files", ("b.pdf", make_pdf_bytes(2), "application/pdf")),
+        ],
+    )
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    input_dirs = list((Path(temp_storage) / "jobs").iterdir())
+    assert len(input_dirs) == 1
+
+    _run_next(queue, handlers)
+
+    result = client.get(f"/api/jobs/{job_id}").json()["result"]
+    assert result["page_count"] == 3
+    assert client.get(f"/api/pdfs/{result['uuid']}").json()["page_count"] == 3
+    assert not input_dirs[0].exists()
+
+
+def test_background_delete_pages_updates_page_count(
+    client, temp_storage, queue, handlers, make_pdf_bytes, upload_pdf
+):
+    """Test a delete-pages job updates metadata served by the API."""
+    pdf_uuid = upload_pdf(make_pdf_bytes(3))
+    client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map")  # Warm the metadata cache
+
+    response = client.request(
+        "DELETE", f"/api/pdf-operations/{pdf_uuid}/pages?background=true", json=[1]
+    )
+    job_id = response.json()["id"]
+    _run_next(queue, handlers)
+
+    assert client.get(f"/api/jobs/{job_id}").json()["result"]["new_page_count"] == 2
+    assert client.get(f"/api/pdfs/{pdf_uuid}/pages/3/text-map").status_code == 400
+
+
+def test_retried_page_jobs_apply_once(
+    client, temp_storage, queue, handlers, make_pdf_bytes, upload_pdf
+):
+    """Test that re-running a page job after its change was made doesn't repeat it."""
+    pdf_uuid = upload_pdf(make_pdf_bytes(3))
+    response = client.request(
+        "DELETE", f"/api/pdf-operations/{pdf_uuid}/pages?background=true", json=[1]
+    )
+    job = queue.claim("test-worker", handlers.keys())
+    assert job.id == response.json()["id"]
+
+    # The worker died after deleting the page; the job is run again
+    first = handlers["delete_pages"](JobContext(queue, job))
+    second = handlers["delete_pages"](JobContext(queue, job))
+
+    assert first["new_page_count"] == second["new_page_count"] == 2
+    blocks = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map").json()["blocks"]
+    assert [b["text"] for b in blocks] == ["Page 2 text"]
+    versions = client.get(f"/api/pdfs/{pdf_uuid}/versions").json()["versions"]
+    assert [v["operation"] for v in versions] == ["original", "delete_pages"]
+
+
+def test_page_job_conflicts_with_later_changes(
+    client, temp_storage, queue, handlers, make_pdf_bytes, upload_pdf
+):
+    """Test that a page job fails if the document changed since it was submitted."""
+    pdf_uuid = upload_pdf(make_pdf_bytes(3))
+    response = client.request(
+        "DELETE", f"/api/pdf-operations/{pdf_uuid}/pages?background=true", json=[1]
+    )
+    client.post(f"/api/pdf-operations/{pdf_uuid}/rotate?angle=90", json=[2])
+    _run_next(queue, handlers)
+
+    status = client.get(f"/api/jobs/{response.json()['id']}").json()
+    assert status["status"] == "failed"
+    assert "changed since the job was submitted" in status["error"]
+    assert client.get(f"/api/pdfs/{pdf_uuid}").json()["page_count"] == 3
+
+
+def test_large_document_optimizes_in_background(
+    client, temp_storage, queue, handlers, monkeypatch, make_pdf_bytes, upload_pdf
+):
+    """Test that documents above the size threshold are optimized by a job."""
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "OPTIMIZE_BACKGROUND_MIN_BYTES", 1)
+    pdf_uuid = upload_pdf(make_pdf_bytes(3))
+
+    response = client.post(f"/api/pdf-operations/{pdf_uuid}/optimize")
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    _run_next(queue, handlers)
+
+    status = client.get(f"/api/jobs/{job_id}").json()
+    assert status["status"] == "succeeded"
+    assert status["result"]["bytes_before"] > 0
+    assert status["result"]["bytes_after"] <= status["result"]["bytes_before"]
+
+
+def test_failed_job_reports_error(
+    client, temp_storage, queue, handlers, make_pdf_bytes, upload_pdf
+):
+    """Test that a handler error marks the job failed with a message."""
+    pdf_uuid = upload_pdf(make_pdf_bytes(2))
+    response = client.post(
+        f"/api/pdf-operations/{pdf_uuid}/split?background=true", json=["1-9"]
+    )
+    job_id = response.json()["id"]
+    _run_next(queue, handlers)
+
+    status = client.get(f"/api/jobs/{job_id}").json()
+    assert status["status"] == "failed"
+    assert "Invalid page range" in status["error"]
+
+
+def test_cancel_queued_job(client, temp_storage, queue, handlers, make_pdf_bytes):
+    """Test that cancelling a queued job stops it from ever running."""
+    response = client.post(
+        "/api/pdf-operations/merge?background=true",
+        files=[
+            ("files", ("a.pdf", make_pdf_bytes(1), "application/pdf")),
+            ("files", ("b.pdf", make_pdf_bytes(1), "application/pdf")),
+        ],
+    )
+    job_id = response.json()["id"]
+
+    cancelled = client.post(f"/api/jobs/{job_id}/cancel").json()
+    assert cancelled["status"] == "cancelled"
+    assert queue.claim("test-worker", handlers.keys()) is None
+    assert list((Path(temp_storage) / "jobs").iterdir()) == []
+
+
+def test_cancel_running_job(client, temp_storage, queue, handlers, make_pdf_bytes, upload_pdf):
+    """Test that a running job stops at its next progress checkpoint."""
+    pdf_uuid = upload_pdf(make_pdf_bytes(2))
+    job = queue.submit("rotate", {"page_numbers": [1], "angle": 90}, document_uuid=pdf_uuid)
+
+    claimed = queue.claim("test-worker", handlers.keys())
+    assert client.post(f"/api/jobs/{job.id}/cancel").json()["cancel_requested"] is True
+    queue.run(claimed, handlers)
+
+    assert queue.get(job.id).status == "cancelled"
+
+
+def test_get_unknown_job(client, queue):
+    """Test 404 for unknown jobs."""
+    assert client.get("/api/jobs/missing").status_code == 404
+    assert client.post("/api/jobs/missing/cancel").status_code == 404
+
+
+def test_stale_jobs_are_requeued_then_failed(session_factory, test_db, tmp_path):
+    """Test that jobs of a dead worker are retried up to max_attempts, then their inputs removed."""
+    queue = JobQueue(session_factory, stale_after=timedelta(minutes=5), max_attempts=2)
+    input_dir = tmp_path / "inputs"
+    input_dir.mkdir()
+    job = queue.submit("merge", {"input_dir": str(input_dir)})
+
+    def claim_and_expire():
+        assert queue.claim("dead-worker", ["merge"]).id == job.id
+        db = session_factory()
+        try:
+            db.execute(
+                update(Job).values(heartbeat_at=utcnow() - timedelta(minutes=10))
+            )
+            db.commit()
+        finally:
+            db.close()
+        return queue.requeue_stale()
+
+    assert claim_and_expire() == 1
+    assert queue.get(job.id).status == "queued"
+    assert input_dir.exists()
+
+    assert claim_and_expire() == 1
+    failed = queue.get(job.id)
+    assert failed.status == "failed"
+    assert failed.attempts == 2
+    assert not input_dir.exists()
+
+
+def test_unknown_job_kind_fails_and_removes_inputs(session_factory, test_db, tmp_path):
+    """Test that a job no handler can run fails without leaking its inputs."""
+    queue = JobQueue(session_factory)
+    input_dir = tmp_path / "inputs"
+    input_dir.mkdir()
+    job = queue.submit("retired-kind", {"input_dir": str(input_dir)})
+
+    queue.run(queue.claim("test-worker", ["retired-kind"]), {})
+
+    assert queue.get(job.id).error == "Unknown job kind: retired-kind"
+    assert not input_dir.exists()
+
+
+def test_worker_loop_runs_jobs(session_factory, test_db):
+    """Test the async worker loop claims and runs queued jobs."""
+    queue = JobQueue(session_factory)
+    seen = []
+
+    def handler(ctx):
+        ctx.progress(0.5, "halfway")
+        seen.append(ctx.params["value"])
+        return {"doubled": ctx.params["value"] * 2}
+
+    job = queue.submit("double", {"value": 21})
+
+    async def scenario():
+        worker = asyncio.create_task(
+            run_job_worker(queue, {"double": handler}, concurrency=1, poll_interval=0.01)
+        )
+        try:
+            for _ in range(200):
+                if queue.get(job.id).status == "succeeded":
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            worker.cancel()
+
+    asyncio.run(scenario())
+    finished = queue.get(job.id)
+    assert finished.status == "succeeded"
+    assert finished.result == '{"doubled": 42}'
+    assert seen == [21]
+
+
+def test_job_progress_events(session_factory, test_db):
+    """Test that jobs on a document publish their progress and outcome as events."""
+    events = LocalEventBus()
+    queue = JobQueue(session_factory, events=events)
+
+    def handler(ctx):
+        ctx.progress(0.5, "halfway")
+        return {}
+
+    async def scenario():
+        with events.subscribe("doc") as subscription:
+            queue.submit("work", {}, document_uuid="doc")
+            queue.submit("work", {})  # No document: no events
+            for _ in range(2):
+                queue.run(queue.claim("test-worker", ["work"]), {"work": handler})
+            received = []
+            while (event := await subscription.get(timeout=0.1)) is not None:
+                received.append((event.data["status"], event.data["progress"], event.data["message"]))
+            return received
+
+    assert asyncio.run(scenario()) == [
+        ("running", 0.0, None),
+        ("running", 0.5, "halfway"),
+        ("succeeded", 1.0, None),
+    ]
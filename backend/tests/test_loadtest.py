@@ -0,0 +1,45 @@
+"""Tests for the load-testing harness (run in-process, without uvicorn)."""
+import asyncio
+
+import httpx
+
+from app.main import app
+from benchmarks.loadtest import Sample, Scenario, run_load, summarize
+from benchmarks.synthetic import PROFILES
+
+
+def test_editor_sessions_exercise_every_operation(client, temp_storage):
+    """Test that a session replays the full editor flow without errors."""
+    scenario = Scenario(page_flips=2, edit_bursts=1, block_edits_per_burst=2,
+                        word_edits_per_burst=2, think_time=0)
+
+    report = asyncio.run(run_load(
+        lambda: httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test"),
+        users=1,  # The test database session can't be shared by concurrent requests
+        duration=60,
+        profile=PROFILES["single_page"],
+        scenario=scenario,
+        max_sessions=2,
+    ))
+
+    assert report.sessions == 2
+    assert report.error_rate == 0
+    counts = {name: op.count for name, op in report.operations.items()}
+    assert counts == {
+        "upload": 2, "metadata": 2, "page_image": 6, "text_map": 4,
+        "edit_block": 4, "edit_word": 4, "download": 2,
+    }
+
+
+def test_summarize_percentiles_and_errors():
+    """Test report aggregation."""
+    samples = [Sample("text_map", i / 1000, ok=i != 100) for i in range(1, 101)]
+
+    report = summarize(samples, duration=2.0, workers=2, users=1, sessions=1)
+    op = report.operations["text_map"]
+    assert op.count == 100
+    assert op.errors == 1
+    assert op.throughput == 50.0
+    assert op.p50 == 0.051
+    assert op.p99 == 0.100
+    assert report.error_rate == 0.01
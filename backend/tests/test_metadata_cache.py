@@ -0,0 +1,97 @@
+"""Tests for cached document metadata lookups."""
+import io
+import time
+
+from sqlalchemy import event
+
+from app.services.metadata_cache import DocumentMeta, DocumentMetadataCache
+
+
+def _meta(pdf_uuid="doc", page_count=1, version=1):
+    return DocumentMeta(
+        id=1,
+        uuid=pdf_uuid,
+        original_filename="doc.pdf",
+        stored_path="doc.pdf",
+        page_count=page_count,
+        version=version,
+    )
+
+
+def test_cache_ttl_and_invalidation(monkeypatch):
+    """Test that entries expire after the TTL and on explicit invalidation."""
+    cache = DocumentMetadataCache(ttl_seconds=10)
+    cache.put(_meta())
+    assert cache.get("doc").page_count == 1
+
+    cache.invalidate("doc")
+    assert cache.get("doc") is None
+
+    cache.put(_meta())
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert cache.get("doc") is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_cache_is_bounded():
+    """Test that the least recently used entries are dropped at capacity."""
+    cache = DocumentMetadataCache(ttl_seconds=10, max_entries=2)
+    cache.put(_meta("a"))
+    cache.put(_meta("b"))
+    cache.get("a")
+    cache.put(_meta("c"))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_hot_read_paths_skip_database(client, test_db, temp_storage, sample_pdf_bytes):
+    """Test that repeated page requests are served without SQL queries."""
+    response = client.post(
+        "/api/pdfs/",
+        files={"file": ("test.pdf", io.BytesIO(sample_pdf_bytes), "application/pdf")}
+    )
+    pdf_uuid = response.json()["uuid"]
+    assert client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map").status_code == 200
+
+    statements = []
+    engine = test_db.get_bind()
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map").status_code == 200
+        assert client.get(f"/api/pdfs/{pdf_uuid}/pages/1/image").status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert statements == []
+
+
+def test_edit_bumps_version_and_invalidates(client, test_db, temp_storage, sample_pdf_bytes):
+    """Test that edits bump the document version and refresh cached metadata."""
+    from app.api.deps import get_metadata_cache
+
+    response = client.post(
+        "/api/pdfs/",
+        files={"file": ("test.pdf", io.BytesIO(sample_pdf_bytes), "application/pdf")}
+    )
+    pdf_uuid = response.json()["uuid"]
+    blocks = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map").json()["blocks"]
+    assert get_metadata_cache().get(pdf_uuid).version == 1
+
+    response = client.put(
+        f"/api/pdfs/{pdf_uuid}/pages/1/blocks/{blocks[0]['id']}",
+        json={"new_text": "Changed"}
+    )
+    assert response.status_code == 200
+    assert get_metadata_cache().get(pdf_uuid) is None
+
+    client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map")
+    assert get_metadata_cache().get(pdf_uuid).version == 2
+
+
+def test_unknown_document_is_404(client, temp_storage):
+    """Test that the metadata dependency reports missing documents."""
+    response = client.get("/api/pdfs/missing/pages/1/text-map")
+    assert response.status_code == 404
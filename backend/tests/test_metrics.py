@@ -0,0 +1,73 @@
+"""Tests for the /metrics endpoint and health checks."""
+from prometheus_client import REGISTRY
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_metrics_exposes_route_and_engine_metrics(
+    client, temp_storage, sample_pdf_bytes, upload_pdf
+):
+    """Test that requests and engine work show up in the Prometheus output."""
+    pdf_uuid = upload_pdf(sample_pdf_bytes)
+    assert client.get(f"/api/pdfs/{pdf_uuid}/pages/1/image").status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+
+    # Labelled by route template, not by the concrete UUID
+    assert 'route="/api/pdfs/{pdf_uuid}/pages/{page_number}/image"' in body
+    assert pdf_uuid not in body
+    for name in (
+        "aeropdf_http_requests_in_flight",
+        "aeropdf_pdf_open_seconds_count",
+        "aeropdf_pdf_render_seconds_count",
+        "aeropdf_pdf_encode_seconds_count",
+        "aeropdf_bytes_written_total",
+    ):
+        assert name in body
+
+
+def test_text_map_cache_hits_are_counted(client, temp_storage, sample_pdf_bytes, upload_pdf):
+    """Test that a repeated text map request is served from the cache."""
+    pdf_uuid = upload_pdf(sample_pdf_bytes)
+    stats_hits = client.get("/cache/stats").json()["text_map_cache"]["hits"]
+    hits = _sample("aeropdf_cache_requests_total", cache="text_map", result="hit")
+    misses = _sample("aeropdf_cache_requests_total", cache="text_map", result="miss")
+
+    first = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map")
+    second = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map")
+    assert first.json() == second.json()
+
+    assert _sample("aeropdf_cache_requests_total", cache="text_map", result="miss") == misses + 1
+    assert _sample("aeropdf_cache_requests_total", cache="text_map", result="hit") == hits + 1
+    assert client.get("/cache/stats").json()["text_map_cache"]["hits"] == stats_hits + 1
+
+
+def test_text_map_cache_follows_edits(client, temp_storage, multi_block_pdf_bytes, upload_pdf):
+    """Test that an edit is reflected in the next (cached) text map."""
+    pdf_uuid = upload_pdf(multi_block_pdf_bytes)
+    blocks = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map").json()["blocks"]
+
+    edit = client.put(
+        f"/api/pdfs/{pdf_uuid}/pages/1/blocks/{blocks[0]['id']}",
+        json={"new_text": "Edited"},
+    )
+    assert edit.status_code == 200
+
+    after = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map").json()["blocks"]
+    assert after == edit.json()["blocks"]
+    assert any("Edited" in block["text"] for block in after)
+
+
+def test_health_checks_database_and_storage(client, temp_storage):
+    """Test that /health reports its individual checks."""
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json() == {
+        "status": "healthy",
+        "checks": {"database": "ok", "storage": "ok"},
+    }
@@ -0,0 +1,73 @@
+"""Tests for opening documents from memory maps."""
+import fitz
+import pytest
+
+from app.core.config import settings
+from app.services.pdf_engine import PDFEngine
+from app.services.storage import PDFStorageService
+
+
+def _engine(tmp_path, open_mode: str) -> PDFEngine:
+    storage = PDFStorageService(str(tmp_path), str(tmp_path / "pdfs"), str(tmp_path / "renders"))
+    return PDFEngine(storage, incremental_saves=True, open_mode=open_mode)
+
+
+def _write_pdf(path, pages=3):
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"Page {i + 1} text", fontname="helv", fontsize=12)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_mapped_reads_match_file_reads(tmp_path):
+    """Test that page counts, text maps and renders don't depend on the open mode."""
+    pdf_path = _write_pdf(tmp_path / "doc.pdf")
+    by_file = _engine(tmp_path, "file")
+    mapped = _engine(tmp_path, "mmap")
+
+    assert mapped.get_page_count(pdf_path) == by_file.get_page_count(pdf_path) == 3
+    assert mapped.extract_text_map(pdf_path, 2) == by_file.extract_text_map(pdf_path, 2)
+    assert mapped.render_page_to_png(pdf_path, 3) == by_file.render_page_to_png(pdf_path, 3)
+
+    with pytest.raises(ValueError, match="Invalid open mode"):
+        _engine(tmp_path, "mapped")
+    empty = tmp_path / "empty.pdf"
+    empty.touch()
+    with pytest.raises(fitz.EmptyFileError):
+        mapped.get_page_count(empty)
+
+
+def test_mapped_reader_survives_edits(tmp_path):
+    """Test that an edit replaces the file without disturbing a reader that has it mapped."""
+    pdf_path = _write_pdf(tmp_path / "doc.pdf")
+    engine = _engine(tmp_path, "mmap")
+    block = engine.extract_text_map(pdf_path, 1)[0][0]
+
+    with engine.page_renderer(pdf_path) as render:
+        before = render(1)
+        engine.apply_block_edit(pdf_path, 1, block.bbox, "Edited text", mode="redact")
+        engine.rotate_pages(pdf_path, [1], 90)
+        # Still the old version, read from the old file's mapping
+        assert render(1) == before
+
+    assert [b.text for b in engine.extract_text_map(pdf_path, 1)[0]] == ["Edited text"]
+    assert engine.render_page_to_png(pdf_path, 1) != before
+
+
+def test_endpoints_in_mmap_mode(client, temp_storage, monkeypatch):
+    """Test viewing and editing a document with the API opening documents from memory maps."""
+    monkeypatch.setattr(settings, "PDF_OPEN_MODE", "mmap")
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Hello", fontname="helv", fontsize=12)
+    response = client.post("/api/pdfs/", files={"file": ("doc.pdf", doc.tobytes(), "application/pdf")})
+    doc.close()
+    pdf_uuid = response.json()["uuid"]
+
+    block_id = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map").json()["blocks"][0]["id"]
+    assert client.get(f"/api/pdfs/{pdf_uuid}/pages/1/image").status_code == 200
+    response = client.put(f"/api/pdfs/{pdf_uuid}/pages/1/blocks/{block_id}", json={"new_text": "Bye"})
+    assert response.status_code == 200
+    blocks = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map").json()["blocks"]
+    assert [b["text"] for b in blocks] == ["Bye"]
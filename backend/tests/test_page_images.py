@@ -0,0 +1,67 @@
+"""Tests for batch page image rendering."""
+import io
+import zipfile
+from pathlib import Path
+
+from app.core.config import settings
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _parse_multipart(response) -> list:
+    """Split a multipart/mixed body into (headers, body) pairs."""
+    boundary = response.headers["content-type"].split("boundary=")[1].encode()
+    parts = []
+    for chunk in response.content.split(b"--" + boundary)[1:-1]:
+        head, _, body = chunk.strip(b"\r\n").partition(b"\r\n\r\n")
+        headers = dict(line.split(": ", 1) for line in head.decode().split("\r\n"))
+        parts.append((headers, body))
+    return parts
+
+
+def test_page_images_multipart(client, temp_storage, make_pdf_bytes, upload_pdf):
+    """Test that a range of pages is streamed as multipart parts, reusing cached renders."""
+    pdf_uuid = upload_pdf(make_pdf_bytes(3))
+    single = client.get(f"/api/pdfs/{pdf_uuid}/pages/2/image").content
+
+    response = client.get(f"/api/pdfs/{pdf_uuid}/pages/images?range=1-3")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("multipart/mixed; boundary=")
+
+    parts = _parse_multipart(response)
+    assert [headers["X-Page-Number"] for headers, _ in parts] == ["1", "2", "3"]
+    assert all(body.startswith(PNG_SIGNATURE) for _, body in parts)
+    assert all(int(headers["Content-Length"]) == len(body) for headers, body in parts)
+    assert parts[1][1] == single
+
+    renders = sorted(p.name for p in Path(temp_storage, "renders").rglob("*.png"))
+    assert renders == [f"{pdf_uuid}_page_{n}_v1.png" for n in (1, 2, 3)]
+
+
+def test_page_images_zip(client, temp_storage, make_pdf_bytes, upload_pdf):
+    """Test the ZIP format and an open-ended range."""
+    pdf_uuid = upload_pdf(make_pdf_bytes(4))
+
+    response = client.get(f"/api/pdfs/{pdf_uuid}/pages/images?range=3-&format=zip")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.namelist() == ["page_3.png", "page_4.png"]
+        assert archive.read("page_4.png").startswith(PNG_SIGNATURE)
+
+
+def test_page_images_invalid_requests(
+    client, temp_storage, monkeypatch, make_pdf_bytes, upload_pdf
+):
+    """Test range validation and the per-request page limit."""
+    pdf_uuid = upload_pdf(make_pdf_bytes(3))
+    url = f"/api/pdfs/{pdf_uuid}/pages/images"
+
+    assert client.get(f"{url}?range=2-9").status_code == 400
+    assert client.get(f"{url}?range=abc").status_code == 400
+    assert client.get(f"{url}?format=tar").status_code == 422
+
+    monkeypatch.setattr(settings, "PAGE_BATCH_MAX_PAGES", 2)
+    assert client.get(f"{url}?range=1-3").status_code == 400
+    assert client.get(f"{url}?range=2-3").status_code == 200
@@ -0,0 +1,182 @@
+"""Tests for merge, split, rotate, delete-pages and optimize endpoints."""
+import asyncio
+import random
+
+import fitz
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.db.session import create_async_db_engine
+from app.repositories import pdf_document as pdf_documents
+
+
+def _bloated_pdf_bytes() -> bytes:
+    """A PDF with uncompressed streams and a 600 DPI noise image."""
+    rng = random.Random(7)
+    doc = fitz.open()
+    for i in range(2):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {i + 1}", fontname="helv", fontsize=12)
+        samples = bytes(rng.randrange(256) for _ in range(600 * 600 * 3))
+        pixmap = fitz.Pixmap(fitz.csRGB, 600, 600, samples, False)
+        page.insert_image(fitz.Rect(72, 100, 144, 172), pixmap=pixmap)
+    try:
+        return doc.tobytes(garbage=0, deflate=False)
+    finally:
+        doc.close()
+
+
+def test_merge_pdfs(client, temp_storage, make_pdf_bytes):
+    """Test merging creates a new document with all pages."""
+    response = client.post(
+        "/api/pdf-operations/merge",
+        files=[
+            ("files", ("a.pdf", make_pdf_bytes(2), "application/pdf")),
+            ("files", ("b.pdf", make_pdf_bytes(3), "application/pdf")),
+        ],
+    )
+    assert response.status_code == 200
+    merged = response.json()
+    assert merged["page_count"] == 5
+
+    metadata = client.get(f"/api/pdfs/{merged['uuid']}")
+    assert metadata.status_code == 200
+    assert metadata.json()["page_count"] == 5
+
+
+def test_merge_rejects_non_pdf(client, temp_storage, make_pdf_bytes):
+    """Test that a non-PDF part is rejected before any work is done."""
+    response = client.post(
+        "/api/pdf-operations/merge",
+        files=[
+            ("files", ("a.pdf", make_pdf_bytes(1), "application/pdf")),
+            ("files", ("b.txt", b"hello", "text/plain")),
+        ],
+    )
+    assert response.status_code == 400
+
+
+def test_split_pdf(client, temp_storage, make_pdf_bytes, upload_pdf):
+    """Test splitting creates one document per range."""
+    pdf_uuid = upload_pdf(make_pdf_bytes(5))
+
+    response = client.post(f"/api/pdf-operations/{pdf_uuid}/split", json=["1-2", "3-"])
+    assert response.status_code == 200
+    split_uuids = response.json()["split_uuids"]
+    assert len(split_uuids) == 2
+
+    page_counts = [client.get(f"/api/pdfs/{u}").json()["page_count"] for u in split_uuids]
+    assert page_counts == [2, 3]
+
+
+def test_rotate_pages(client, temp_storage, make_pdf_bytes, upload_pdf):
+    """Test rotating pages saves the rotation into the stored PDF."""
+    pdf_uuid = upload_pdf(make_pdf_bytes(2))
+
+    response = client.post(
+        f"/api/pdf-operations/{pdf_uuid}/rotate?angle=90",
+        json=[1],
+    )
+    assert response.status_code == 200
+
+    download = client.get(f"/api/pdfs/{pdf_uuid}/download")
+    doc = fitz.open(stream=download.content, filetype="pdf")
+    try:
+        assert doc[0].rotation == 90
+        assert doc[1].rotation == 0
+    finally:
+        doc.close()
+
+
+def test_rotate_invalid_page(client, temp_storage, make_pdf_bytes, upload_pdf):
+    """Test rotating a page out of range returns 400."""
+    pdf_uuid = upload_pdf(make_pdf_bytes(1))
+    response = client.post(f"/api/pdf-operations/{pdf_uuid}/rotate?angle=90", json=[3])
+    assert response.status_code == 400
+
+
+def test_delete_pages(client, temp_storage, make_pdf_bytes, upload_pdf):
+    """Test deleting pages updates the stored page count."""
+    pdf_uuid = upload_pdf(make_pdf_bytes(4))
+
+    response = client.request(
+        "DELETE", f"/api/pdf-operations/{pdf_uuid}/pages", json=[2, 4]
+    )
+    assert response.status_code == 200
+    assert response.json()["new_page_count"] == 2
+
+    assert client.get(f"/api/pdfs/{pdf_uuid}").json()["page_count"] == 2
+    text_map = client.get(f"/api/pdfs/{pdf_uuid}/pages/2/text-map")
+    assert "Page 3" in " ".join(b["text"] for b in text_map.json()["blocks"])
+
+
+def test_optimize_pdf(client, temp_storage, upload_pdf):
+    """Test optimizing shrinks the file, downsamples images and keeps the text."""
+    content = _bloated_pdf_bytes()
+    pdf_uuid = upload_pdf(content)
+
+    response = client.post(f"/api/pdf-operations/{pdf_uuid}/optimize?image_dpi=72")
+    assert response.status_code == 200
+    result = response.json()
+    assert result["bytes_before"] == len(content)
+    assert result["replaced"] is True
+    assert result["images_downsampled"] is True
+    assert result["bytes_after"] < len(content) // 10
+    assert result["bytes_saved"] == result["bytes_before"] - result["bytes_after"]
+
+    download = client.get(f"/api/pdfs/{pdf_uuid}/download")
+    assert len(download.content) == result["bytes_after"]
+    doc = fitz.open(stream=download.content, filetype="pdf")
+    try:
+        xref = doc[0].get_images()[0][0]
+        assert doc.extract_image(xref)["width"] < 600
+    finally:
+        doc.close()
+    text_map = client.get(f"/api/pdfs/{pdf_uuid}/pages/2/text-map")
+    assert "Page 2" in " ".join(b["text"] for b in text_map.json()["blocks"])
+
+
+def test_optimize_rejects_invalid_dpi(client, temp_storage, make_pdf_bytes, upload_pdf):
+    """Test that an out-of-range target DPI is rejected."""
+    pdf_uuid = upload_pdf(make_pdf_bytes(1))
+    response = client.post(f"/api/pdf-operations/{pdf_uuid}/optimize?image_dpi=5")
+    assert response.status_code == 422
+
+
+def test_optimize_rejects_image_dpi_without_downsampling(
+    client, temp_storage, monkeypatch, make_pdf_bytes, upload_pdf
+):
+    """Test a 400 for image_dpi when this PyMuPDF can't rewrite images."""
+    from app.services import pdf_engine
+
+    monkeypatch.setattr(pdf_engine, "IMAGE_REWRITE_SUPPORTED", False)
+    pdf_uuid = upload_pdf(make_pdf_bytes(1))
+    response = client.post(f"/api/pdf-operations/{pdf_uuid}/optimize?image_dpi=150")
+    assert response.status_code == 400
+    assert client.post(f"/api/pdf-operations/{pdf_uuid}/optimize").status_code == 200
+
+
+def test_async_repository(test_db, test_db_url):
+    """Test the async PDFDocument repository functions."""
+    async def scenario():
+        engine = create_async_db_engine(test_db_url)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        try:
+            async with session_factory() as db:
+                created = await pdf_documents.create(
+                    db,
+                    pdf_uuid="abc",
+                    original_filename="a.pdf",
+                    stored_path="a.pdf",
+                    page_count=3,
+                )
+                assert created.version == 1
+                assert created.created_at is not None
+
+            async with session_factory() as db:
+                loaded = await pdf_documents.get_by_uuid(db, "abc")
+                assert (loaded.version, loaded.page_count) == (1, 3)
+                assert await pdf_documents.get_by_uuid(db, "missing") is None
+        finally:
+            await engine.dispose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,108 @@
+"""Tests for the sharded storage layout and render cache eviction."""
+import io
+import os
+
+from app.services.render_cache import RenderCache
+from app.services.storage import PDFStorageService, shard_prefix
+
+
+def _store(cache, path, size, mtime):
+    cache.store(path, b"x" * size)
+    os.utime(path, (mtime, mtime))
+
+
+def test_render_paths_are_sharded(tmp_path):
+    """Test that PDFs and renders are placed in hash-sharded subdirectories."""
+    storage = PDFStorageService(str(tmp_path), str(tmp_path / "pdfs"), str(tmp_path / "renders"))
+    pdf_uuid = "0b6f3a3e-1111-4a4a-9c9c-222233334444"
+    prefix = shard_prefix(pdf_uuid)
+
+    assert len(prefix.split("/")) == 2
+    assert storage.pdf_key(pdf_uuid) == f"{prefix}/{pdf_uuid}.pdf"
+    assert storage.get_render_path(pdf_uuid, 3) == (
+        tmp_path / "renders" / prefix / f"{pdf_uuid}_page_3.png"
+    )
+
+
+def test_legacy_flat_pdf_is_migrated(tmp_path):
+    """Test that PDFs stored before sharding are moved on first access."""
+    storage = PDFStorageService(str(tmp_path), str(tmp_path / "pdfs"), str(tmp_path / "renders"))
+    legacy = tmp_path / "pdfs" / "abc.pdf"
+    legacy.write_bytes(b"%PDF")
+
+    path = storage.get_pdf_path("abc")
+    assert path == tmp_path / "pdfs" / storage.pdf_key("abc")
+    assert path.read_bytes() == b"%PDF"
+    assert not legacy.exists()
+
+
+def test_lru_eviction_removes_least_recently_used(tmp_path):
+    """Test that eviction drops the oldest-accessed files down to the low-water mark."""
+    cache = RenderCache(str(tmp_path), max_bytes=300, low_water_ratio=0.7)
+    paths = [tmp_path / "aa" / f"p{i}.png" for i in range(3)]
+    for i, path in enumerate(paths):
+        _store(cache, path, 100, 1000 + i)
+
+    # Touch the oldest file so it becomes most recently used
+    assert cache.lookup(paths[0])
+
+    _store(cache, tmp_path / "bb" / "p3.png", 100, 2000 + 10**9)
+
+    assert paths[0].exists()
+    assert not paths[1].exists()
+    assert not paths[2].exists()
+    stats = cache.stats()
+    assert stats["evictions"] == 2
+    assert stats["size_bytes"] == 200
+    assert stats["entries"] == 2
+
+
+def test_lfu_eviction_keeps_frequently_used(tmp_path):
+    """Test that LFU eviction keeps hot files regardless of recency."""
+    cache = RenderCache(str(tmp_path), max_bytes=200, policy="lfu", low_water_ratio=1.0)
+    hot = tmp_path / "hot.png"
+    cold = tmp_path / "cold.png"
+    _store(cache, hot, 100, 1000)
+    _store(cache, cold, 100, 2000)
+    for _ in range(3):
+        cache.lookup(hot)
+    os.utime(hot, (1000, 1000))
+
+    _store(cache, tmp_path / "new.png", 100, 3000)
+
+    assert hot.exists()
+    assert not cold.exists()
+
+
+def test_stats_hit_rate_and_invalidate(tmp_path):
+    """Test hit/miss accounting and invalidation."""
+    cache = RenderCache(str(tmp_path), max_bytes=0)
+    path = tmp_path / "p.png"
+
+    assert not cache.lookup(path)
+    cache.store(path, b"png")
+    assert cache.lookup(path)
+    assert cache.stats()["hit_rate"] == 0.5
+
+    cache.invalidate(path)
+    assert not path.exists()
+    assert cache.stats()["size_bytes"] == 0
+
+
+def test_page_image_endpoint_uses_cache(client, temp_storage, sample_pdf_bytes):
+    """Test that the page image endpoint renders once and then hits the cache."""
+    response = client.post(
+        "/api/pdfs/",
+        files={"file": ("test.pdf", io.BytesIO(sample_pdf_bytes), "application/pdf")}
+    )
+    pdf_uuid = response.json()["uuid"]
+
+    first = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/image")
+    before = client.get("/cache/stats").json()["render_cache"]
+    second = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/image")
+    after = client.get("/cache/stats").json()["render_cache"]
+
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    assert after["hits"] == before["hits"] + 1
+    assert after["entries"] >= 1
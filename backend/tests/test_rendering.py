@@ -0,0 +1,93 @@
+"""Tests for memory-bounded page rendering."""
+import io
+import threading
+import time
+
+import fitz
+import pytest
+
+from app.services.pdf_engine import PDFEngine
+from app.services.rendering import MemoryBudget, band_bytes
+from app.services.storage import PDFStorageService
+
+
+def _engine(tmp_path, **options) -> PDFEngine:
+    storage = PDFStorageService(str(tmp_path), str(tmp_path / "pdfs"), str(tmp_path / "renders"))
+    return PDFEngine(storage, **options)
+
+
+def _write_pdf(path, width=595, height=842, rotation=0):
+    doc = fitz.open()
+    page = doc.new_page(width=width, height=height)
+    for line in range(40):
+        page.insert_text((40, 30 + line * 18), f"Line {line} of sample text", fontname="helv", fontsize=11)
+    # Anti-aliased edges crossing many band seams
+    page.draw_circle((width / 2, height / 2), min(width, height) / 3, color=(1, 0, 0), fill=(0, 0, 1))
+    page.set_rotation(rotation)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+@pytest.mark.parametrize("zoom,rotation", [(2.0, 0), (1.37, 90)])
+def test_banded_render_matches_single_pass(tmp_path, zoom, rotation):
+    """Test that pages rendered in bands are pixel-identical to a whole-page render."""
+    pdf_path = _write_pdf(tmp_path / "doc.pdf", rotation=rotation)
+    png_bytes = _engine(tmp_path, render_band_pixels=50_000).render_page_to_png(pdf_path, 1, zoom)
+
+    doc = fitz.open(pdf_path)
+    try:
+        expected = doc[0].get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+    finally:
+        doc.close()
+    rendered = fitz.Pixmap(png_bytes)
+    assert (rendered.width, rendered.height) == (expected.width, expected.height)
+    assert rendered.samples == expected.samples
+
+
+def test_oversized_page_is_rendered_within_budgets(tmp_path):
+    """Test that a poster-sized page is scaled to the pixel budget and rendered band by band."""
+    pdf_path = _write_pdf(tmp_path / "poster.pdf", width=5000, height=7000)
+    budget = MemoryBudget(64 * 1024 * 1024)
+    engine = _engine(
+        tmp_path, max_render_pixels=4_000_000, render_band_pixels=500_000, render_memory=budget
+    )
+
+    out = io.BytesIO()
+    engine.write_page_png(pdf_path, 1, out)
+
+    rendered = fitz.Pixmap(out.getvalue())
+    assert rendered.width * rendered.height <= 4_000_000 * 1.01
+    assert rendered.width == pytest.approx(5000 * rendered.height / 7000, abs=2)
+    stats = budget.stats()
+    # One band's worth reserved, a fraction of the 12 MB raster
+    assert stats["peak"] == band_bytes(rendered.width, 500_000 // rendered.width)
+    assert stats["peak"] < rendered.width * rendered.height
+    assert stats["in_use"] == 0
+
+
+def test_memory_budget_limits_concurrent_reservations():
+    """Test that reservations wait for room, and oversized ones run alone."""
+    budget = MemoryBudget(100)
+    active = []
+    overlap = []
+
+    def hold(nbytes):
+        with budget.reserve(nbytes):
+            active.append(nbytes)
+            overlap.append(sum(active))
+            time.sleep(0.05)
+            active.remove(nbytes)
+
+    threads = [threading.Thread(target=hold, args=(n,)) for n in (60, 60, 250, 30)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(overlap) == 4
+    # Never over budget, except the oversized reservation on its own
+    assert all(total <= 100 or total == 250 for total in overlap)
+    stats = budget.stats()
+    assert stats["in_use"] == 0
+    assert stats["waits"] >= 1
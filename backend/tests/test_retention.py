@@ -0,0 +1,135 @@
+"""Tests for retention policies and garbage collection."""
+import os
+import time
+from datetime import timedelta
+
+import pytest
+
+from app.models.pdf_document import PDFDocument
+from app.services.render_cache import RenderCache
+from app.services.retention import RetentionService, utcnow
+from app.services.storage import PDFStorageService
+
+OLD = time.time() - 7 * 24 * 3600
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """Create a storage service in a temporary directory."""
+    return PDFStorageService(str(tmp_path), str(tmp_path / "pdfs"), str(tmp_path / "renders"))
+
+
+def _add_document(db, storage, pdf_uuid, *, accessed_days_ago=0, created_days_ago=0, with_file=True):
+    if with_file:
+        path = storage.new_pdf_path(pdf_uuid)
+        path.write_bytes(b"%PDF-1.4")
+        render_path = storage.get_render_path(pdf_uuid, 1)
+        render_path.parent.mkdir(parents=True, exist_ok=True)
+        render_path.write_bytes(b"png")
+    db_pdf = PDFDocument(
+        uuid=pdf_uuid,
+        original_filename=f"{pdf_uuid}.pdf",
+        stored_path=str(storage.new_pdf_path(pdf_uuid)),
+        page_count=1,
+        created_at=utcnow() - timedelta(days=created_days_ago),
+        last_accessed_at=utcnow() - timedelta(days=accessed_days_ago),
+    )
+    db.add(db_pdf)
+    db.commit()
+    return db_pdf
+
+
+def _service(test_db, storage, **kwargs):
+    kwargs.setdefault("document_ttl", timedelta(days=30))
+    return RetentionService(
+        lambda: test_db,
+        storage,
+        RenderCache(str(storage.render_dir), max_bytes=0),
+        **kwargs,
+    )
+
+
+def test_expired_documents_are_deleted(test_db, storage):
+    """Test that documents past the TTL lose their row, PDF and renders."""
+    _add_document(test_db, storage, "old-doc", accessed_days_ago=45, created_days_ago=60)
+    _add_document(test_db, storage, "fresh-doc", accessed_days_ago=1, created_days_ago=60)
+
+    report = _service(test_db, storage).run_once()
+
+    assert report.expired_documents == 1
+    assert not storage.pdf_exists("old-doc")
+    assert not storage.get_render_path("old-doc", 1).exists()
+    assert storage.pdf_exists("fresh-doc")
+    uuids = {row.uuid for row in test_db.query(PDFDocument.uuid)}
+    assert uuids == {"fresh-doc"}
+
+
+def test_expired_documents_are_deleted_in_batches(test_db, storage):
+    """Test that each pass deletes at most batch_size documents."""
+    for i in range(3):
+        _add_document(test_db, storage, f"old-{i}", accessed_days_ago=45, created_days_ago=60)
+
+    service = _service(test_db, storage, batch_size=2)
+    assert service.run_once().expired_documents == 2
+    assert service.run_once().expired_documents == 1
+    assert test_db.query(PDFDocument).count() == 0
+
+
+def test_rows_without_files_are_removed(test_db, storage):
+    """Test that rows whose PDF is gone are removed after the grace period."""
+    _add_document(test_db, storage, "lost", created_days_ago=2, with_file=False)
+    _add_document(test_db, storage, "uploading", with_file=False)
+
+    report = _service(test_db, storage, document_ttl=None).run_once()
+
+    assert report.missing_file_rows == 1
+    uuids = {row.uuid for row in test_db.query(PDFDocument.uuid)}
+    assert uuids == {"uploading"}
+
+
+def test_orphan_and_temp_files_are_removed(test_db, storage):
+    """Test that old files without rows and stale temp files are removed."""
+    _add_document(test_db, storage, "kept", created_days_ago=2)
+    orphan_pdf = storage.new_pdf_path("orphan")
+    orphan_pdf.write_bytes(b"%PDF-1.4")
+    orphan_render = storage.get_render_path("orphan", 2)
+    orphan_render.parent.mkdir(parents=True, exist_ok=True)
+    orphan_render.write_bytes(b"png")
+    young_orphan = storage.new_pdf_path("young")
+    young_orphan.write_bytes(b"%PDF-1.4")
+    temp_file = storage.pdf_dir / "temp_leaked.pdf"
+    temp_file.write_bytes(b"%PDF-1.4")
+
+    for path in (orphan_pdf, orphan_render, temp_file, storage.get_pdf_path("kept")):
+        os.utime(path, (OLD, OLD))
+
+    report = _service(test_db, storage, document_ttl=None).run_once()
+
+    assert report.orphan_pdfs == 1
+    assert report.orphan_renders == 1
+    assert report.temp_files == 1
+    assert not orphan_pdf.exists()
+    assert not orphan_render.exists()
+    assert not temp_file.exists()
+    assert young_orphan.exists()
+    assert storage.pdf_exists("kept")
+
+
+def test_orphan_scan_is_incremental(test_db, storage):
+    """Test that orphan scanning covers a bounded number of shards per pass."""
+    paths = []
+    for i in range(6):
+        path = storage.new_pdf_path(f"orphan-{i}")
+        path.write_bytes(b"%PDF-1.4")
+        os.utime(path, (OLD, OLD))
+        paths.append(path)
+
+    service = _service(test_db, storage, document_ttl=None, shards_per_run=2)
+    removed = []
+    for _ in range(10):
+        report = service.run_once()
+        assert report.orphan_pdfs <= 2
+        removed.append(report.orphan_pdfs)
+
+    assert sum(removed) == 6
+    assert not any(path.exists() for path in paths)
@@ -0,0 +1,175 @@
+"""Tests for the cross-worker shared cache tier."""
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app.schemas.pdf_text_map import BBox, TextBlock
+from app.services.shared_cache import RedisSharedCache, SQLiteSharedCache
+from app.services.text_map_cache import TextMapCache
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "shared.db")
+
+
+def _text_map():
+    block = TextBlock(
+        id="page-1-block-abc",
+        page_number=1,
+        bbox=BBox(x0=1, y0=2, x1=3, y1=4),
+        text="Hello",
+    )
+    return [block], 612.0, 792.0
+
+
+def test_sqlite_get_put_delete_and_ttl(cache_path):
+    """Test basic operations and expiry."""
+    cache = SQLiteSharedCache(cache_path)
+    assert cache.get("a") is None
+    cache.put("a", b"1")
+    cache.put("b", b"2", ttl=0.05)
+    assert cache.get("a") == b"1"
+    assert cache.get("b") == b"2"
+
+    time.sleep(0.06)
+    assert cache.get("b") is None
+    cache.delete("a")
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 2
+
+
+def test_sqlite_visible_across_instances(cache_path):
+    """Test that entries written by one process's instance are read by another."""
+    worker_a = SQLiteSharedCache(cache_path)
+    worker_b = SQLiteSharedCache(cache_path)
+    worker_a.put("textmap:doc:v1:p1", b"payload")
+    assert worker_b.get("textmap:doc:v1:p1") == b"payload"
+
+
+def test_sqlite_evicts_least_recently_used(cache_path):
+    """Test that the byte budget is enforced oldest-access first."""
+    cache = SQLiteSharedCache(cache_path, max_bytes=1000, evict_every=1)
+    for index in range(5):
+        cache.put(f"k{index}", b"x" * 300)
+    assert cache.stats()["size_bytes"] <= 1000
+    assert cache.get("k4") is not None
+    assert cache.get("k0") is None
+
+
+def test_single_writer_computes_once(cache_path):
+    """Test that concurrent misses in different workers produce a value once."""
+    workers = [SQLiteSharedCache(cache_path) for _ in range(2)]
+    calls = []
+    results = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return b"rendered"
+
+    def worker(cache):
+        results.append(cache.get_or_compute("render:doc_page_1_v1.png", compute))
+
+    threads = [threading.Thread(target=worker, args=(workers[i % 2],)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [b"rendered"] * 4
+
+
+def test_expired_lease_can_be_taken_over(cache_path):
+    """Test that a crashed writer only blocks others until its lease expires."""
+    crashed = SQLiteSharedCache(cache_path, lease_seconds=0.1)
+    survivor = SQLiteSharedCache(cache_path, lease_seconds=0.1)
+
+    assert crashed._acquire("key", "crashed-owner", 0.1)
+    started = time.monotonic()
+    with survivor.single_writer("key") as acquired:
+        assert acquired
+    assert time.monotonic() - started >= 0.05
+
+
+def test_backend_errors_are_misses(cache_path):
+    """Test that a broken shared tier degrades to misses instead of failing."""
+    cache = SQLiteSharedCache(cache_path)
+    conn = sqlite3.connect(cache_path)
+    conn.execute("DROP TABLE entries")
+    conn.close()
+
+    assert cache.get("a") is None
+    cache.put("a", b"1")
+    assert cache.stats()["errors"] >= 2
+
+
+def test_redis_backend_with_fake():
+    """Test the Redis backend against an in-process fake."""
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeRedis()
+    worker_a = RedisSharedCache(client)
+    worker_b = RedisSharedCache(client)
+
+    worker_a.put("meta:doc", b"{}", ttl=60)
+    assert worker_b.get("meta:doc") == b"{}"
+    assert client.pttl("aeropdf:meta:doc") > 0
+
+    with worker_a.single_writer("key") as acquired:
+        assert acquired
+        assert not worker_b._acquire("key", "other", 30)
+    assert worker_b._acquire("key", "other", 30)
+
+    calls = []
+    assert worker_a.get_or_compute("k", lambda: calls.append(1) or b"v") == b"v"
+    assert worker_b.get_or_compute("k", lambda: calls.append(1) or b"v") == b"v"
+    assert len(calls) == 1
+
+
+def test_text_maps_shared_between_workers(cache_path):
+    """Test that a text map extracted by one worker is served to another."""
+    worker_a = TextMapCache(shared=SQLiteSharedCache(cache_path))
+    worker_b = TextMapCache(shared=SQLiteSharedCache(cache_path))
+
+    loads = []
+
+    def load():
+        loads.append(1)
+        return _text_map()
+
+    first = worker_a.get_or_load("doc", 1, 1, load)
+    second = worker_b.get_or_load("doc", 1, 1, load)
+    assert len(loads) == 1
+    assert second == first
+
+    # A new version is a different key
+    worker_b.get_or_load("doc", 2, 1, load)
+    assert len(loads) == 2
+
+
+def test_renders_are_version_tagged(client, temp_storage, multi_block_pdf_bytes):
+    """Test that an edit switches the page image to a new version's render."""
+    upload = client.post(
+        "/api/pdfs/",
+        files={"file": ("test.pdf", multi_block_pdf_bytes, "application/pdf")},
+    )
+    pdf_uuid = upload.json()["uuid"]
+    assert client.get(f"/api/pdfs/{pdf_uuid}/pages/1/image").status_code == 200
+
+    renders = sorted(Path(temp_storage, "renders").rglob("*.png"))
+    assert [p.name for p in renders] == [f"{pdf_uuid}_page_1_v1.png"]
+
+    blocks = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map").json()["blocks"]
+    client.put(
+        f"/api/pdfs/{pdf_uuid}/pages/1/blocks/{blocks[0]['id']}",
+        json={"new_text": "Edited"},
+    )
+    assert client.get(f"/api/pdfs/{pdf_uuid}/pages/1/image").status_code == 200
+
+    renders = sorted(Path(temp_storage, "renders").rglob("*.png"))
+    assert [p.name for p in renders] == [f"{pdf_uuid}_page_1_v2.png"]
+    assert client.get("/cache/stats").json()["shared_cache"]["backend"] == "SQLiteSharedCache"
@@ -0,0 +1,113 @@
+"""Tests for single-flight coalescing of renders and extractions."""
+import fcntl
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz
+import pytest
+
+from app.api.deps import get_single_flight
+from app.services.pdf_engine import PDFEngine
+from app.services.single_flight import LOCK_STRIPES, SingleFlight
+
+
+def test_concurrent_calls_share_one_computation():
+    """Test that callers arriving while a key is computed get the leader's result."""
+    flights = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return "value"
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        leader = pool.submit(flights.do, "key", compute)
+        started.wait()
+        followers = [pool.submit(flights.do, "key", compute) for _ in range(7)]
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert results == ["value"] * 8
+    assert len(calls) == 1
+    assert flights.stats() == {"in_flight": 0, "leads": 1, "coalesced": 7, "lock_waits": 0}
+
+    # Finished keys are computed again
+    assert flights.do("key", lambda: "again") == "again"
+
+
+def test_leader_error_is_shared():
+    """Test that waiters see the leader's exception instead of retrying."""
+    flights = SingleFlight()
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("broken page")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flights.do, "key", fail)
+        started.wait()
+        follower = pool.submit(flights.do, "key", lambda: "unused")
+        for future in (leader, follower):
+            with pytest.raises(ValueError, match="broken page"):
+                future.result()
+
+
+def test_file_lock_waits_for_other_process(tmp_path):
+    """Test that a leader waiting on another worker's lock reuses that worker's result."""
+    flights = SingleFlight(tmp_path / "locks")
+    stored = {}
+
+    # Hold the key's lock file through a separate open file, like another process would
+    stripe = int(hashlib.sha1(b"key").hexdigest(), 16) % LOCK_STRIPES
+    fd = os.open(tmp_path / "locks" / f"{stripe:02x}.lock", os.O_RDWR | os.O_CREAT)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def other_worker_finishes():
+        time.sleep(0.2)
+        stored["key"] = "theirs"
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    threading.Thread(target=other_worker_finishes).start()
+    result = flights.do("key", lambda: "ours", recheck=lambda: stored.get("key"))
+
+    assert result == "theirs"
+    assert flights.stats()["lock_waits"] == 1
+    # Nothing stored by anyone else: computed after the wait
+    assert flights.do("other", lambda: "ours", recheck=lambda: stored.get("other")) == "ours"
+
+
+def test_concurrent_page_image_requests_render_once(client, temp_storage, monkeypatch):
+    """Test that simultaneous viewers of a fresh page trigger a single render."""
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Hello", fontname="helv", fontsize=12)
+    response = client.post("/api/pdfs/", files={"file": ("doc.pdf", doc.tobytes(), "application/pdf")})
+    doc.close()
+    pdf_uuid = response.json()["uuid"]
+
+    renders = []
+    write_page_png = PDFEngine.write_page_png
+
+    def slow_render(self, pdf_path, page_number, out, zoom=2.0):
+        renders.append(page_number)
+        time.sleep(0.3)
+        write_page_png(self, pdf_path, page_number, out, zoom)
+
+    monkeypatch.setattr(PDFEngine, "write_page_png", slow_render)
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        responses = list(pool.map(
+            lambda _: client.get(f"/api/pdfs/{pdf_uuid}/pages/1/image"), range(6)
+        ))
+
+    assert [r.status_code for r in responses] == [200] * 6
+    assert len({r.content for r in responses}) == 1
+    assert renders == [1]
+    assert get_single_flight().stats()["coalesced"] >= 1
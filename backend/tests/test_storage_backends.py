@@ -0,0 +1,165 @@
+"""Tests for pluggable PDF storage backends."""
+import io
+import threading
+
+import fitz
+import pytest
+
+from app.services.pdf_engine import PDFEngine
+from app.services.storage import PDFStorageService, shard_prefix, sibling_temp_path
+from app.services.storage_backends import LocalStorageBackend, S3StorageBackend
+
+BUCKET = "aeropdf-test"
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def s3_client():
+    """Create a mocked S3 client with an empty bucket."""
+    moto = pytest.importorskip("moto")
+    boto3 = pytest.importorskip("boto3")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def s3_backend(s3_client, tmp_path):
+    """Create an S3 backend with a small multipart threshold."""
+    return S3StorageBackend(
+        BUCKET,
+        str(tmp_path / "cache"),
+        prefix="pdfs",
+        client=s3_client,
+        multipart_threshold=5 * MB,
+        multipart_chunk_size=5 * MB,
+    )
+
+
+def test_local_backend_roundtrip(tmp_path):
+    """Test storing, reading ranges and deleting with the local backend."""
+    backend = LocalStorageBackend(str(tmp_path))
+    assert backend.put_stream("a.pdf", io.BytesIO(b"0123456789")) == 10
+
+    assert backend.exists("a.pdf")
+    assert backend.size("a.pdf") == 10
+    assert backend.read_range("a.pdf", 2, 5) == b"2345"
+    assert backend.local_path("a.pdf") == tmp_path / "a.pdf"
+
+    backend.delete("a.pdf")
+    assert not backend.exists("a.pdf")
+    with pytest.raises(FileNotFoundError):
+        backend.local_path("a.pdf")
+
+
+def test_concurrent_rewrites_use_separate_temp_files(tmp_path):
+    """Test that full rewrites of the same file racing each other all succeed and leave no temp files."""
+    first, second = sibling_temp_path(tmp_path / "a.pdf"), sibling_temp_path(tmp_path / "a.pdf")
+    assert first != second and first.name.startswith("a.pdf.") and first.suffix == ".tmp"
+    first.unlink()
+    second.unlink()
+
+    pdf_path = tmp_path / "doc.pdf"
+    doc = fitz.open()
+    doc.new_page()
+    doc.save(pdf_path)
+    doc.close()
+    storage = PDFStorageService(str(tmp_path), str(tmp_path / "pdfs"), str(tmp_path / "renders"))
+    engine = PDFEngine(storage, incremental_saves=False)
+    errors = []
+
+    def rotate():
+        try:
+            for _ in range(5):
+                engine.rotate_pages(pdf_path, [1], 90)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=rotate) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert engine.get_page_count(pdf_path) == 1
+    assert sorted(p.name for p in tmp_path.iterdir() if p.is_file()) == ["doc.pdf"]
+
+
+def test_s3_backend_roundtrip_and_range(s3_client, s3_backend):
+    """Test S3 storage with prefixed keys and ranged reads."""
+    s3_backend.put_stream("doc.pdf", io.BytesIO(b"%PDF-1.4 hello"))
+
+    stored = s3_client.get_object(Bucket=BUCKET, Key="pdfs/doc.pdf")["Body"].read()
+    assert stored == b"%PDF-1.4 hello"
+    assert s3_backend.size("doc.pdf") == 14
+    assert s3_backend.read_range("doc.pdf", 0, 3) == b"%PDF"
+
+    s3_backend.delete("doc.pdf")
+    assert not s3_backend.exists("doc.pdf")
+    with pytest.raises(FileNotFoundError):
+        s3_backend.local_path("doc.pdf")
+
+
+def test_s3_backend_multipart_upload(s3_client, s3_backend):
+    """Test that large objects are uploaded in multiple parts."""
+    data = bytes(range(256)) * (11 * MB // 256)
+    s3_backend.put_stream("big.pdf", io.BytesIO(data))
+
+    head = s3_client.head_object(Bucket=BUCKET, Key="pdfs/big.pdf")
+    assert head["ContentLength"] == len(data)
+    assert head["ETag"].strip('"').endswith("-3")
+    assert s3_backend.read_range("big.pdf", 6 * MB, 6 * MB + 9) == data[6 * MB:6 * MB + 10]
+
+
+def test_s3_backend_read_through_cache(s3_client, s3_backend, monkeypatch):
+    """Test that hot objects are served from the disk cache until changed remotely."""
+    s3_client.put_object(Bucket=BUCKET, Key="pdfs/doc.pdf", Body=b"version-1")
+
+    downloads = []
+    original_download = s3_client.download_file
+
+    def counting_download(*args, **kwargs):
+        downloads.append(args)
+        return original_download(*args, **kwargs)
+
+    monkeypatch.setattr(s3_client, "download_file", counting_download)
+
+    path = s3_backend.local_path("doc.pdf")
+    assert path.read_bytes() == b"version-1"
+    assert s3_backend.local_path("doc.pdf") == path
+    assert len(downloads) == 1
+
+    # Another node replaces the object: the cache is refreshed
+    s3_client.put_object(Bucket=BUCKET, Key="pdfs/doc.pdf", Body=b"version-2")
+    assert s3_backend.local_path("doc.pdf").read_bytes() == b"version-2"
+    assert len(downloads) == 2
+
+
+def test_api_with_s3_backend(client, temp_storage, s3_client, sample_pdf_bytes, monkeypatch):
+    """Test uploading and reading a PDF through the API with the S3 backend."""
+    from app.api import deps
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "s3")
+    monkeypatch.setattr(settings, "S3_BUCKET", BUCKET)
+    monkeypatch.setattr(settings, "STORAGE_CACHE_DIR", f"{temp_storage}/cache")
+    monkeypatch.setattr(deps, "_get_s3_backend", lambda: S3StorageBackend(
+        BUCKET, f"{temp_storage}/cache", client=s3_client
+    ))
+
+    response = client.post(
+        "/api/pdfs/",
+        files={"file": ("test.pdf", io.BytesIO(sample_pdf_bytes), "application/pdf")}
+    )
+    assert response.status_code == 201
+    pdf_uuid = response.json()["uuid"]
+
+    key = f"{shard_prefix(pdf_uuid)}/{pdf_uuid}.pdf"
+    stored = s3_client.get_object(Bucket=BUCKET, Key=key)["Body"].read()
+    assert stored == sample_pdf_bytes
+
+    response = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map")
+    assert response.status_code == 200
+    assert response.json()["blocks"]
@@ -0,0 +1,134 @@
+"""Tests for the cached text layout engine."""
+import fitz
+
+from app.services.text_layout import TextLayoutEngine
+
+
+def naive_wrap(text, max_width, font_name, font_size):
+    """Reference implementation: re-measure the growing line for every word."""
+    lines = []
+    for paragraph in text.split("\n"):
+        words = paragraph.split()
+        if not words:
+            lines.append("")
+            continue
+        current = []
+        for word in words:
+            width = fitz.get_text_length(
+                " ".join(current + [word]), fontname=font_name, fontsize=font_size
+            )
+            if width <= max_width:
+                current.append(word)
+            else:
+                if current:
+                    lines.append(" ".join(current))
+                current = [word]
+        if current:
+            lines.append(" ".join(current))
+    return lines or [""]
+
+
+def test_wrap_matches_reference():
+    """Test that prefix-sum wrapping matches per-word re-measurement."""
+    engine = TextLayoutEngine()
+    text = (
+        "The quick brown fox jumps over the lazy dog. " * 20
+        + "\n\nSecond   paragraph with  irregular spacing\nand a third"
+    )
+    for font_name in ("helv", "tiro", "cour"):
+        for width, size in ((120, 11), (250, 9.5), (60, 14)):
+            assert engine.wrap(text, width, font_name, size) == naive_wrap(
+                text, width, font_name, size
+            )
+
+
+def test_wrap_overlong_word_gets_own_line():
+    """Test that a word wider than the line is placed alone, not dropped."""
+    engine = TextLayoutEngine()
+    lines = engine.wrap("a supercalifragilisticexpialidocious b", 40, "helv", 11)
+    assert lines == ["a", "supercalifragilisticexpialidocious", "b"]
+
+
+def test_wrap_empty_text():
+    """Test wrapping empty text."""
+    engine = TextLayoutEngine()
+    assert engine.wrap("", 100, "helv", 11) == [""]
+
+
+def test_metrics_are_cached_per_font():
+    """Test that font metrics are built once and reused."""
+    engine = TextLayoutEngine()
+    metrics = engine.get_metrics("helv")
+    assert engine.get_metrics("helv") is metrics
+    assert engine.get_metrics("cour") is not metrics
+    assert abs(
+        metrics.text_width("Hello", 11)
+        - fitz.get_text_length("Hello", fontname="helv", fontsize=11)
+    ) < 1e-6
+
+
+def test_word_width_cache_is_bounded(monkeypatch):
+    """Test that word widths are cached up to a fixed number of words per font."""
+    from app.services import text_layout
+
+    monkeypatch.setattr(text_layout, "WORD_WIDTH_CACHE_SIZE", 3)
+    metrics = text_layout.FontMetrics("helv")
+    widths = [metrics.word_width(f"word{i}") for i in range(10)]
+
+    assert metrics._word_widths.cache_info().currsize == 3
+    assert metrics.word_width("word0") == widths[0]
+
+
+def test_prepared_text_line_count():
+    """Test that line_count agrees with wrap at several sizes."""
+    engine = TextLayoutEngine()
+    prepared = engine.prepare("lorem ipsum dolor sit amet " * 30, "helv")
+    for size in (6, 9, 12, 18):
+        assert prepared.line_count(150, size) == len(prepared.wrap(150, size))
+
+
+def test_fit_font_size_finds_largest_fitting_size():
+    """Test that auto-fit returns a size that fits and a slightly larger one does not."""
+    from app.services.text_layout import block_height
+
+    engine = TextLayoutEngine()
+    prepared = engine.prepare("word " * 120 + "\nsecond paragraph\nthird", "helv")
+    width, height = 200.0, 150.0
+
+    size = engine.fit_font_size(
+        prepared, width, height, max_font_size=24, min_font_size=4, line_spacing=1.2
+    )
+    assert size is not None and 4 <= size < 24
+    assert block_height(prepared.line_count(width, size), size, 1.2) <= height
+    bigger = size + 0.1
+    assert block_height(prepared.line_count(width, bigger), bigger, 1.2) > height
+
+
+def test_fit_font_size_keeps_max_when_it_fits():
+    """Test that short text keeps the requested size."""
+    engine = TextLayoutEngine()
+    prepared = engine.prepare("short", "helv")
+    assert engine.fit_font_size(
+        prepared, 200, 50, max_font_size=11, min_font_size=4
+    ) == 11
+
+
+def test_fit_font_size_returns_none_when_impossible():
+    """Test that text which cannot fit at the minimum size is reported."""
+    engine = TextLayoutEngine()
+    prepared = engine.prepare("word " * 500, "helv")
+    assert engine.fit_font_size(
+        prepared, 50, 10, max_font_size=11, min_font_size=4
+    ) is None
+
+
+def test_fit_font_size_shrinks_overlong_words():
+    """Test that a word wider than the box counts as overflow."""
+    engine = TextLayoutEngine()
+    word = "Supercalifragilisticexpialidocious"
+    prepared = engine.prepare(word, "helv")
+
+    size = engine.fit_font_size(prepared, 50, 40, max_font_size=11, min_font_size=1)
+    assert size is not None and size < 11
+    assert fitz.get_text_length(word, fontname="helv", fontsize=size) <= 50
+    assert engine.fit_font_size(prepared, 50, 40, max_font_size=11, min_font_size=4) is None
@@ -63,3 +63,48 @@ def test_get_text_map_invalid_page(client, temp_storage, sample_pdf_bytes):
     response = client.get(f"/api/pdfs/{pdf_uuid}/pages/999/text-map")
     assert response.status_code == 400
 
+
+
+def test_text_map_ids_are_deterministic(client, temp_storage, multi_block_pdf_bytes):
+    """Test that block and word IDs are stable across extractions."""
+    response = client.post(
+        "/api/pdfs/",
+        files={"file": ("multi.pdf", io.BytesIO(multi_block_pdf_bytes), "application/pdf")}
+    )
+    assert response.status_code == 201
+    pdf_uuid = response.json()["uuid"]
+
+    first = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map").json()
+    second = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map").json()
+
+    assert [b["id"] for b in first["blocks"]] == [b["id"] for b in second["blocks"]]
+    word_ids = [w["id"] for b in first["blocks"] for w in b["words"]]
+    assert len(word_ids) == len(set(word_ids))
+    assert all(block["id"].startswith("page-1-block-") for block in first["blocks"])
+
+
+def test_stale_metadata_gives_client_errors(client, temp_storage, sample_pdf_bytes):
+    """Test that pages and documents gone since metadata was cached give 400/404, not 500."""
+    import dataclasses
+
+    from app.api.deps import get_metadata_cache, get_storage_service
+
+    response = client.post(
+        "/api/pdfs/",
+        files={"file": ("test.pdf", io.BytesIO(sample_pdf_bytes), "application/pdf")}
+    )
+    pdf_uuid = response.json()["uuid"]
+    block_id = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map").json()["blocks"][0]["id"]
+
+    # Another worker deleted pages: this process still caches the old page count
+    cache = get_metadata_cache()
+    cache.put(dataclasses.replace(cache.get(pdf_uuid), page_count=5))
+    assert client.get(f"/api/pdfs/{pdf_uuid}/pages/2/image").status_code == 400
+    assert client.get(f"/api/pdfs/{pdf_uuid}/pages/2/text-map").status_code == 400
+    response = client.put(f"/api/pdfs/{pdf_uuid}/pages/2/blocks/{block_id}", json={"new_text": "x"})
+    assert response.status_code == 400
+
+    # ... or deleted the document
+    get_storage_service().get_pdf_path(pdf_uuid).unlink()
+    assert client.get(f"/api/pdfs/{pdf_uuid}/pages/1/image").status_code == 404
+    assert client.get(f"/api/pdfs/{pdf_uuid}/download").status_code == 404
@@ -0,0 +1,92 @@
+"""Tests for request spans, Server-Timing headers and OpenTelemetry export."""
+import json
+
+import pytest
+
+from app.core.tracing import (
+    RequestTrace,
+    configure_tracing,
+    server_timing_header,
+    shutdown_tracing,
+)
+
+
+def _timing_names(response) -> list:
+    return [entry.split(";")[0].strip() for entry in response.headers["Server-Timing"].split(",")]
+
+
+def test_edit_reports_engine_breakdown(client, temp_storage, multi_block_pdf_bytes, upload_pdf):
+    """Test that an edit's Server-Timing separates edit, save, extraction and database time."""
+    pdf_uuid = upload_pdf(multi_block_pdf_bytes)
+    text_map = client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map")
+    assert "pdf.extract_text_map" in _timing_names(text_map)
+    block_id = text_map.json()["blocks"][0]["id"]
+
+    response = client.put(
+        f"/api/pdfs/{pdf_uuid}/pages/1/blocks/{block_id}",
+        json={"new_text": "Edited"},
+    )
+    assert response.status_code == 200
+
+    names = _timing_names(response)
+    for name in ("pdf.apply_block_edit", "pdf.open", "pdf.save", "storage.commit_pdf", "db"):
+        assert name in names
+    # Lookup came from the text map cache; only the re-extraction after the edit ran
+    assert names.count("pdf.extract_text_map") == 1
+    assert names[-1] == "total"
+    assert 'desc="' in response.headers["Server-Timing"]
+
+
+def test_repeated_spans_get_suffixes():
+    """Test that repeated span names stay distinguishable in the header."""
+    trace = RequestTrace()
+    trace.add("pdf.extract_text_map", trace.started, 0.010)
+    trace.add("pdf.save", trace.started + 0.01, 0.020)
+    trace.add("pdf.extract_text_map", trace.started + 0.03, 0.005)
+
+    header = server_timing_header(trace)
+    assert header.startswith(
+        "pdf.extract_text_map;dur=10.00, pdf.save;dur=20.00, pdf.extract_text_map_2;dur=5.00"
+    )
+
+
+def test_span_count_is_bounded():
+    """Test that spans past max_spans are counted instead of reported."""
+    trace = RequestTrace(max_spans=2)
+    for _ in range(5):
+        trace.add("pdf.open", trace.started, 0.001)
+    assert len(trace.spans) == 2
+    assert 'dropped;desc="3 spans"' in server_timing_header(trace)
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    """Export spans to a JSON lines file for the duration of a test."""
+    path = tmp_path / "traces.jsonl"
+    assert configure_tracing("file", file_path=str(path))
+    yield path
+    shutdown_tracing()
+
+
+def test_file_exporter_writes_nested_spans(
+    client, temp_storage, sample_pdf_bytes, trace_file, upload_pdf
+):
+    """Test that exported engine spans are children of the request span."""
+    pdf_uuid = upload_pdf(sample_pdf_bytes)
+    assert client.get(f"/api/pdfs/{pdf_uuid}/pages/1/text-map").status_code == 200
+    shutdown_tracing()  # Flush
+
+    spans = [json.loads(line) for line in trace_file.read_text().splitlines()]
+    root = next(
+        s for s in spans if s["name"] == "GET /api/pdfs/{pdf_uuid}/pages/{page_number}/text-map"
+    )
+    extract = next(s for s in spans if s["name"] == "pdf.extract_text_map")
+    assert extract["context"]["trace_id"] == root["context"]["trace_id"]
+    assert extract["parent_id"] == root["context"]["span_id"]
+    assert root["attributes"]["http.status_code"] == 200
+
+
+def test_unknown_exporter_rejected():
+    """Test that a misspelled exporter fails loudly."""
+    with pytest.raises(ValueError):
+        configure_tracing("jaeger")
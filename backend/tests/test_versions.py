@@ -0,0 +1,205 @@
+"""Tests for document versions, undo, redo and restore."""
+import threading
+from pathlib import Path
+
+import fitz
+
+from app.api.deps import get_storage_service
+
+
+def _edit_first_block(client, pdf_uuid: str, text: str, page_number: int = 1) -> None:
+    blocks = client.get(f"/api/pdfs/{pdf_uuid}/pages/{page_number}/text-map").json()["blocks"]
+    response = client.put(
+        f"/api/pdfs/{pdf_uuid}/pages/{page_number}/blocks/{blocks[0]['id']}",
+        json={"new_text": text},
+    )
+    assert response.status_code == 200
+
+
+def _page_text(client, pdf_uuid: str, page_number: int = 1) -> str:
+    blocks = client.get(f"/api/pdfs/{pdf_uuid}/pages/{page_number}/text-map").json()["blocks"]
+    return " ".join(block["text"] for block in blocks)
+
+
+def _stored_bytes(pdf_uuid: str) -> bytes:
+    return get_storage_service().get_pdf_path(pdf_uuid).read_bytes()
+
+
+def test_undo_redo_restore_stored_bytes(client, temp_storage, make_pdf_bytes, upload_pdf):
+    """Test that undo and redo switch between byte-identical versions."""
+    original = make_pdf_bytes(1)
+    pdf_uuid = upload_pdf(original)
+
+    empty = client.get(f"/api/pdfs/{pdf_uuid}/versions").json()
+    assert empty["versions"] == []
+    assert not empty["can_undo"]
+
+    _edit_first_block(client, pdf_uuid, "First edit")
+    edited = _stored_bytes(pdf_uuid)
+    assert edited.startswith(original)
+
+    history = client.get(f"/api/pdfs/{pdf_uuid}/versions").json()
+    assert history["current_version"] == 2
+    assert history["can_undo"] and not history["can_redo"]
+    first, second = history["versions"]
+    assert (first["number"], first["operation"], first["size"]) == (1, "original", len(original))
+    assert second["parent"] == 1
+    assert second["operation"] == "edit_block"
+    assert second["pages"] == [1]
+    # A version costs the bytes it appended, not a copy of the file
+    assert second["delta_size"] == len(edited) - len(original)
+
+    undone = client.post(f"/api/pdfs/{pdf_uuid}/undo")
+    assert undone.status_code == 200
+    # Back to the original content, under a new number
+    assert undone.json()["current_version"] == 3
+    assert undone.json()["can_redo"]
+    assert _stored_bytes(pdf_uuid) == original
+    assert "First edit" not in _page_text(client, pdf_uuid)
+    assert client.post(f"/api/pdfs/{pdf_uuid}/undo").status_code == 409
+
+    redone = client.post(f"/api/pdfs/{pdf_uuid}/redo")
+    assert redone.status_code == 200
+    assert redone.json()["current_version"] == 4
+    assert _stored_bytes(pdf_uuid) == edited
+    assert "First edit" in _page_text(client, pdf_uuid)
+    assert client.post(f"/api/pdfs/{pdf_uuid}/redo").status_code == 409
+
+
+def test_restore_and_new_edit_discards_redo(client, temp_storage, make_pdf_bytes, upload_pdf):
+    """Test restoring across several versions and branching off an undone one."""
+    pdf_uuid = upload_pdf(make_pdf_bytes(1))
+    for text in ("Alpha", "Bravo", "Charlie"):
+        _edit_first_block(client, pdf_uuid, text)
+
+    restored = client.post(f"/api/pdfs/{pdf_uuid}/versions/2/restore")
+    assert restored.status_code == 200
+    assert "Alpha" in _page_text(client, pdf_uuid)
+    # Version numbers are never reused (caches are keyed by them): a
+    # restored version is renumbered
+    assert restored.json()["current_version"] == 5
+    assert [v["number"] for v in restored.json()["versions"]] == [1, 3, 4, 5]
+
+    forward = client.post(f"/api/pdfs/{pdf_uuid}/versions/4/restore")
+    assert forward.status_code == 200
+    assert "Charlie" in _page_text(client, pdf_uuid)
+    assert forward.json()["current_version"] == 6
+
+    assert client.post(f"/api/pdfs/{pdf_uuid}/versions/99/restore").status_code == 404
+    assert client.post(f"/api/pdfs/{pdf_uuid}/versions/2/restore").status_code == 404
+
+    client.post(f"/api/pdfs/{pdf_uuid}/versions/5/restore")
+    _edit_first_block(client, pdf_uuid, "Delta")
+    history = client.get(f"/api/pdfs/{pdf_uuid}/versions").json()
+    assert [v["number"] for v in history["versions"]] == [1, 7, 8]
+    assert history["current_version"] == 8
+    assert not history["can_redo"]
+    assert not list(Path(temp_storage).rglob("*.delta"))
+
+
+def test_page_caches_survive_versions_that_did_not_touch_them(
+    client, temp_storage, make_pdf_bytes, upload_pdf
+):
+    """Test that renders of untouched pages keep their names across versions."""
+    pdf_uuid = upload_pdf(make_pdf_bytes(2))
+    renders = Path(temp_storage, "renders")
+
+    assert client.get(f"/api/pdfs/{pdf_uuid}/pages/2/image").status_code == 200
+    _edit_first_block(client, pdf_uuid, "Edited first page")
+    assert client.get(f"/api/pdfs/{pdf_uuid}/pages/2/image").status_code == 200
+    assert client.get(f"/api/pdfs/{pdf_uuid}/pages/1/image").status_code == 200
+
+    names = sorted(p.name for p in renders.rglob("*.png"))
+    assert names == [f"{pdf_uuid}_page_1_v2.png", f"{pdf_uuid}_page_2_v1.png"]
+
+    # Undo gives the page it changes a new version; the other keeps its renders
+    client.post(f"/api/pdfs/{pdf_uuid}/undo")
+    client.get(f"/api/pdfs/{pdf_uuid}/pages/1/image")
+    client.get(f"/api/pdfs/{pdf_uuid}/pages/2/image")
+    names = {p.name for p in renders.rglob("*.png")}
+    assert {f"{pdf_uuid}_page_1_v3.png", f"{pdf_uuid}_page_2_v1.png"} <= names
+
+
+def test_rotate_and_optimize_versions(client, temp_storage, make_pdf_bytes, upload_pdf):
+    """Test page operations: rotations are undoable, optimization starts a new history."""
+    pdf_uuid = upload_pdf(make_pdf_bytes(2))
+
+    response = client.post(f"/api/pdf-operations/{pdf_uuid}/rotate?angle=90", json=[2])
+    assert response.status_code == 200
+    history = client.get(f"/api/pdfs/{pdf_uuid}/versions").json()
+    assert history["versions"][-1]["pages"] == [2]
+
+    client.post(f"/api/pdfs/{pdf_uuid}/undo")
+    with fitz.open(stream=_stored_bytes(pdf_uuid)) as doc:
+        assert doc[1].rotation == 0
+
+    response = client.post(f"/api/pdf-operations/{pdf_uuid}/optimize")
+    assert response.status_code == 200
+    assert response.json()["replaced"]
+    history = client.get(f"/api/pdfs/{pdf_uuid}/versions").json()
+    assert [v["operation"] for v in history["versions"]] == ["optimize"]
+    assert not history["can_undo"]
+
+
+def test_concurrent_changes_are_serialized(client, temp_storage, make_pdf_bytes, upload_pdf):
+    """Test that racing edits, rotations and undos each build on the previous one's file."""
+    pdf_uuid = upload_pdf(make_pdf_bytes(5))
+    block_ids = [
+        client.get(f"/api/pdfs/{pdf_uuid}/pages/{n}/text-map").json()["blocks"][0]["id"]
+        for n in range(1, 5)
+    ]
+    statuses = []
+
+    def change(index):
+        if index % 2:
+            response = client.post(f"/api/pdf-operations/{pdf_uuid}/rotate?angle=90", json=[5])
+        else:
+            page_number = index // 2 + 1
+            response = client.put(
+                f"/api/pdfs/{pdf_uuid}/pages/{page_number}/blocks/{block_ids[page_number - 1]}",
+                json={"new_text": f"Text {page_number}"},
+            )
+        statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=change, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses == [200] * 8
+    history = client.get(f"/api/pdfs/{pdf_uuid}/versions").json()
+    # Every change was appended to the one before it: none was lost
+    assert history["current_version"] == 9
+    assert len(history["versions"]) == 9
+    assert [_page_text(client, pdf_uuid, n) for n in range(1, 5)] == [
+        f"Text {n}" for n in range(1, 5)
+    ]
+    with fitz.open(stream=_stored_bytes(pdf_uuid)) as doc:
+        assert doc[4].rotation == 90
+    assert not list(Path(temp_storage).rglob("*.tmp"))
+
+    undone = [client.post(f"/api/pdfs/{pdf_uuid}/undo") for _ in range(2)]
+    assert [r.json()["current_version"] for r in undone] == [10, 11]
+
+
+def test_undo_stops_at_oldest_kept_version(
+    client, temp_storage, monkeypatch, make_pdf_bytes, upload_pdf
+):
+    """Test that undoing past the versions kept by VERSION_HISTORY_MAX gives 409, not 404."""
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "VERSION_HISTORY_MAX", 3)
+    pdf_uuid = upload_pdf(make_pdf_bytes(1))
+    for i in range(5):
+        _edit_first_block(client, pdf_uuid, f"Text {i}")
+
+    history = client.get(f"/api/pdfs/{pdf_uuid}/versions").json()
+    assert len(history["versions"]) == 3
+
+    undone = 0
+    while client.get(f"/api/pdfs/{pdf_uuid}/versions").json()["can_undo"]:
+        assert client.post(f"/api/pdfs/{pdf_uuid}/undo").status_code == 200
+        undone += 1
+    assert undone == 2
+    assert client.post(f"/api/pdfs/{pdf_uuid}/undo").status_code == 409